@@ -0,0 +1,37 @@
+"""
+Script for garbage collecting the shared asset content blobs which no asset references
+"""
+from datetime import timedelta
+import logging
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from xmodule.contentstore.django import contentstore
+from xmodule.contentstore.mongo import BLOB_GRACE_PERIOD
+
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Correct the reference counts of the shared asset content blobs, and delete the blobs which no asset references
+    """
+    help = 'Correct the reference counts of asset content blobs, and delete the blobs which no asset references'
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--grace-minutes',
+            type='int',
+            dest='grace_minutes',
+            default=int(BLOB_GRACE_PERIOD.total_seconds() // 60),
+            help='leave alone the blobs stored or referenced within this many minutes',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        """
+        Execute the command
+        """
+        blobs_deleted = contentstore().collect_blobs(grace_period=timedelta(minutes=options['grace_minutes']))
+        log.info(u"Total number of blobs deleted: {0}".format(blobs_deleted))
@@ -0,0 +1,25 @@
+"""
+Script for moving the content of assets saved before content-addressed storage
+into shared blobs, so that identical content is stored once
+"""
+import logging
+
+from django.core.management.base import BaseCommand
+from xmodule.contentstore.django import contentstore
+
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Move the content of all assets stored in their own GridFS files into shared, content-addressed blobs
+    """
+    help = 'Move the content of all assets stored in their own GridFS files into shared, content-addressed blobs'
+
+    def handle(self, *args, **options):
+        """
+        Execute the command
+        """
+        assets_moved = contentstore().move_content_to_blobs()
+        log.info(u"Total number of assets moved to blobs: {0}".format(assets_moved))
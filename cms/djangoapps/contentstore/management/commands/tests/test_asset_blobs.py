@@ -0,0 +1,43 @@
+"""
+Tests for the move_assets_to_blobs and collect_asset_blobs commands
+"""
+from django.core.management import call_command
+
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory
+
+
+class AssetBlobsTest(ModuleStoreTestCase):
+    """
+    Tests of moving asset content into blobs, and collecting unreferenced blobs.
+    """
+    def setUp(self):
+        super(AssetBlobsTest, self).setUp()
+        self.content_store = contentstore()
+        self.course = CourseFactory.create()
+
+    def test_move_assets_to_blobs(self):
+        asset_key = self.course.id.make_asset_key('asset', 'legacy.txt')
+        content_id, content_son = self.content_store.asset_db_key(asset_key)
+        self.content_store.fs.put(
+            'legacy content', _id=content_id, filename=unicode(asset_key), content_type='text/plain',
+            displayname='legacy.txt', content_son=content_son, thumbnail_location=None, import_path=None,
+        )
+
+        call_command('move_assets_to_blobs')
+        content = self.content_store.find(asset_key)
+        self.assertIsNotNone(content.content_hash)
+        self.assertEqual(content.data, 'legacy content')
+
+    def test_collect_asset_blobs(self):
+        asset_key = self.course.id.make_asset_key('asset', 'example.txt')
+        self.content_store.save(StaticContent(asset_key, 'example.txt', 'text/plain', 'example content'))
+        content_hash = self.content_store.find(asset_key).content_hash
+        self.content_store.fs_files.remove({'_id': self.content_store.asset_db_key(asset_key)[0]})
+
+        call_command('collect_asset_blobs')
+        self.assertIsNotNone(self.content_store.blob_files.find_one({'content_hash': content_hash}))
+        call_command('collect_asset_blobs', grace_minutes=0)
+        self.assertIsNone(self.content_store.blob_files.find_one({'content_hash': content_hash}))
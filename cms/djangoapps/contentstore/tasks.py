@@ -3,6 +3,8 @@ This file contains celery tasks for contentstore views
 """
 import json
 import logging
+import tarfile
+from tempfile import TemporaryFile
 from celery.task import task
 from celery.utils.log import get_task_logger
 from datetime import datetime
@@ -14,8 +16,11 @@ from contentstore.courseware_index import CoursewareSearchIndexer, LibrarySearch
 from contentstore.utils import initialize_permissions
 from course_action_state.models import CourseRerunState
 from opaque_keys.edx.keys import CourseKey
+from openedx.core.lib.report_store import ReportStore
+from xmodule.contentstore.django import contentstore
 from xmodule.course_module import CourseFields
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.xml_exporter import export_course_to_tar
 from xmodule.modulestore.exceptions import DuplicateCourseError, ItemNotFoundError
 
 LOGGER = get_task_logger(__name__)
@@ -117,6 +122,39 @@ def update_library_index(library_id, triggered_time_isoformat):
         LOGGER.debug('Search indexing successful for library %s', library_id)
 
 
+def get_course_export_store():
+    """
+    Return the report store which the tar.gz files of courses exported by export_olx are stored in.
+    """
+    return ReportStore.from_config('COURSE_EXPORT_DOWNLOAD')
+
+
+@task()
+def export_olx(user_id, course_key_string):
+    """
+    Exports a course to a tar.gz file in a celery task, and stores it in the course export store.
+    The export is streamed into the tar file as it's made, rather than written to disk and then tarred.
+    """
+    course_key = CourseKey.from_string(course_key_string)
+    course_module = modulestore().get_course(course_key)
+    name = course_module.url_name
+    filename = u'{}_{}.tar.gz'.format(name, datetime.now(UTC).strftime('%Y-%m-%d-%H%M%S'))
+
+    try:
+        with TemporaryFile() as export_file:
+            with tarfile.open(fileobj=export_file, mode='w:gz') as tar_file:
+                export_course_to_tar(modulestore(), contentstore(), course_key, tar_file, name)
+            get_course_export_store().store_file(
+                course_key, filename, export_file, {'content_type': 'application/x-tgz'}
+            )
+    except Exception as exc:  # pylint: disable=broad-except
+        LOGGER.exception(u'Error exporting course %s for user %s', course_key, user_id)
+        return "exception: " + unicode(exc)
+
+    LOGGER.info(u'Exported course %s for user %s to %s', course_key, user_id, filename)
+    return "succeeded"
+
+
 @task()
 def push_course_update_task(course_key_string, course_subscription_id, course_display_name):
     """
@@ -1,6 +1,8 @@
-from cache_toolbox.core import get_cached_content, set_cached_content, del_cached_content
+from cache_toolbox.core import get_cached_content, set_cached_content, del_cached_content, content_hash_key
+from django.core.cache import cache
 from opaque_keys.edx.locations import Location
 from django.test import TestCase
+from xmodule.contentstore.content import StaticContent
 
 
 class Content(object):
@@ -38,3 +40,19 @@ class CachingTestCase(TestCase):
                          'should not be stored in cache with unicodeLocation')
         self.assertEqual(None, get_cached_content(self.nonUnicodeLocation),
                          'should not be stored in cache with nonUnicodeLocation')
+
+    def test_content_cached_by_hash(self):
+        other_location = Location(u'c4x', u'mitX', u'801', u'run', u'asset', u'monsters.jpg')
+        for location in [self.unicodeLocation, other_location]:
+            set_cached_content(StaticContent(location, 'monsters.jpg', 'image/jpeg', 'my data', content_hash='abc'))
+
+        # the data is cached once, under its hash
+        self.assertEqual(cache.get(content_hash_key('abc')), 'my data')
+        self.assertIsNone(cache.get(unicode(other_location).encode('utf-8')).data)
+        for location in [self.unicodeLocation, other_location]:
+            content = get_cached_content(location)
+            self.assertEqual(content.data, 'my data')
+            self.assertEqual(content.location, location)
+
+        cache.delete(content_hash_key('abc'))
+        self.assertIsNone(get_cached_content(other_location))
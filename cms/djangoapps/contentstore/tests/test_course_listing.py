@@ -89,7 +89,8 @@ class TestCourseListing(ModuleStoreTestCase):
 
     def test_errored_course_global_staff(self):
         """
-        Test the course list for global staff when get_course returns an ErrorDescriptor
+        Test that the course list for global staff is built without loading the courses,
+        so includes a course for which get_course returns an ErrorDescriptor
         """
         GlobalStaff().add_users(self.user)
 
@@ -101,15 +102,16 @@ class TestCourseListing(ModuleStoreTestCase):
 
             # get courses through iterating all courses
             courses_list, __ = _accessible_courses_list(self.request)
-            self.assertEqual(courses_list, [])
+            self.assertEqual([course.id for course in courses_list], [course_key])
 
             # get courses by reversing group name formats
             courses_list_by_groups, __ = _accessible_courses_list_from_groups(self.request)
-            self.assertEqual(courses_list_by_groups, [])
+            self.assertEqual([course.id for course in courses_list_by_groups], [course_key])
 
     def test_errored_course_regular_access(self):
         """
-        Test the course list for regular staff when get_course returns an ErrorDescriptor
+        Test that the course list for regular staff is built without loading the courses,
+        so includes a course for which get_course returns an ErrorDescriptor
         """
         GlobalStaff().remove_users(self.user)
         CourseStaffRole(self.store.make_course_key('Non', 'Existent', 'Course')).add_users(self.user)
@@ -122,12 +124,29 @@ class TestCourseListing(ModuleStoreTestCase):
 
             # get courses through iterating all courses
             courses_list, __ = _accessible_courses_list(self.request)
-            self.assertEqual(courses_list, [])
+            self.assertEqual([course.id for course in courses_list], [course_key])
 
             # get courses by reversing group name formats
             courses_list_by_groups, __ = _accessible_courses_list_from_groups(self.request)
-            self.assertEqual(courses_list_by_groups, [])
-            self.assertEqual(courses_list, courses_list_by_groups)
+            self.assertEqual([course.id for course in courses_list_by_groups], [course_key])
+
+    def test_course_list_display_fields(self):
+        """
+        Test that the course summaries in the course list have the display fields of the courses
+        """
+        course_key = self.store.make_course_key('Org1', 'Course1', 'Run1')
+        course = self._create_course_with_access_groups(course_key, self.user)
+        course.display_name = u'Summarized Course'
+        course.display_organization = u'Display Org'
+        self.store.update_item(course, self.user.id)
+
+        for method in (_accessible_courses_list, _accessible_courses_list_from_groups):
+            courses_list, __ = method(self.request)
+            self.assertEqual(len(courses_list), 1)
+            self.assertEqual(courses_list[0].display_name, u'Summarized Course')
+            self.assertEqual(courses_list[0].display_org_with_default, u'Display Org')
+            self.assertEqual(courses_list[0].display_number_with_default, 'Course1')
+            self.assertEqual(courses_list[0].location, course.location)
 
     def test_get_course_list_with_invalid_course_location(self):
         """
@@ -200,14 +219,13 @@ class TestCourseListing(ModuleStoreTestCase):
         self.assertGreaterEqual(iteration_over_courses_time_1.elapsed, iteration_over_groups_time_1.elapsed)
         self.assertGreaterEqual(iteration_over_courses_time_2.elapsed, iteration_over_groups_time_2.elapsed)
 
-        # Now count the db queries
-        with check_mongo_calls(USER_COURSES_COUNT):
-            _accessible_courses_list_from_groups(self.request)
-
-        # Calls:
-        #    1) query old mongo
+        # Now count the db queries. Neither method loads any course, so for each the calls are:
+        #    1) query old mongo for the course summaries
         #    2) get_more on old mongo
         #    3) query split (but no courses so no fetching of data)
+        with check_mongo_calls(3):
+            _accessible_courses_list_from_groups(self.request)
+
         with check_mongo_calls(3):
             _accessible_courses_list(self.request)
 
@@ -20,7 +20,6 @@ from util.date_utils import get_default_time_display
 from edxmako.shortcuts import render_to_response
 
 from xmodule.course_module import DEFAULT_START_DATE
-from xmodule.error_module import ErrorDescriptor
 from xmodule.modulestore.django import modulestore
 from xmodule.contentstore.content import StaticContent
 from xmodule.tabs import CourseTab, CourseTabList, InvalidTabsException
@@ -76,8 +75,9 @@ from contentstore.push_notification import push_notification_enabled
 from course_creators.views import get_course_creator_status, add_user_with_status_unrequested
 from contentstore import utils
 from student.roles import (
-    CourseInstructorRole, CourseStaffRole, CourseCreatorRole, GlobalStaff, UserBasedRole
+    CourseInstructorRole, CourseStaffRole, CourseCreatorRole, GlobalStaff
 )
+from student.models import CourseAccessRole
 from student import auth
 from course_action_state.models import CourseRerunState, CourseRerunUIStateManager
 from course_action_state.managers import CourseActionStateItemNotFoundError
@@ -322,84 +322,111 @@ def course_search_index_handler(request, course_key_string):
         }), content_type=content_type, status=200)
 
 
-def _course_outline_json(request, course_module):
+def _course_outline_json(request, course_module, graders=None):
     """
     Returns a JSON representation of the course module and recursively all of its children.
     """
+    if graders is None:
+        graders = CourseGradingModel(course_module).graders
     return create_xblock_info(
         course_module,
         include_child_info=True,
         course_outline=True,
         include_children_predicate=lambda xblock: not xblock.category == 'vertical',
-        user=request.user
+        graders=graders,
+        user=request.user,
+        course=course_module,
     )
 
 
+def _course_read_access_checker(user):
+    """
+    Returns a function which tells whether `user` has studio read access to a course key.
+
+    Rather than checking the user's access to each course, the user's instructor and staff roles
+    (which give read access to a course, or to all of an org's courses) are fetched in a single query.
+    """
+    if GlobalStaff().has_user(user):
+        return lambda course_key: True
+
+    role_course_keys = set()
+    role_orgs = set()
+    if user.is_active:
+        for course_access in CourseAccessRole.objects.filter(
+                user=user, role__in=[CourseInstructorRole.ROLE, CourseStaffRole.ROLE]
+        ):
+            if course_access.course_id is None:
+                role_orgs.add(course_access.org)
+            else:
+                role_course_keys.add(course_access.course_id)
+
+    return lambda course_key: course_key.org in role_orgs or course_key.for_branch(None) in role_course_keys
+
+
 def _accessible_courses_list(request):
     """
-    List all courses available to the logged in user by iterating through all the courses
+    List all courses available to the logged in user by iterating through the summaries of all
+    the courses, without loading the courses themselves
     """
-    def course_filter(course):
+    has_read_access = _course_read_access_checker(request.user)
+
+    def course_filter(course_summary):
         """
-        Filter out unusable and inaccessible courses
+        Filter out inaccessible courses
         """
-        if isinstance(course, ErrorDescriptor):
-            return False
-
         # pylint: disable=fixme
         # TODO remove this condition when templates purged from db
-        if course.location.course == 'templates':
+        if course_summary.location.course == 'templates':
             return False
 
-        return has_studio_read_access(request.user, course.id)
+        return has_read_access(course_summary.id)
 
-    courses = filter(course_filter, modulestore().get_courses())
-    in_process_course_actions = [
-        course for course in
-        CourseRerunState.objects.find_all(
-            exclude_args={'state': CourseRerunUIStateManager.State.SUCCEEDED}, should_display=True
-        )
-        if has_studio_read_access(request.user, course.course_key)
-    ]
-    return courses, in_process_course_actions
+    courses = filter(course_filter, modulestore().get_course_summaries())
+    return courses, _accessible_in_process_course_actions(has_read_access)
 
 
 def _accessible_courses_list_from_groups(request):
     """
     List all courses available to the logged in user by reversing access group names
     """
-    courses_list = {}
-    in_process_course_actions = []
-
-    instructor_courses = UserBasedRole(request.user, CourseInstructorRole.ROLE).courses_with_role()
-    staff_courses = UserBasedRole(request.user, CourseStaffRole.ROLE).courses_with_role()
-    all_courses = instructor_courses | staff_courses
-
-    for course_access in all_courses:
-        course_key = course_access.course_id
-        if course_key is None:
+    course_keys = set()
+    # Fetch the user's instructor and staff roles in a single query
+    for course_access in CourseAccessRole.objects.filter(
+            user=request.user, role__in=[CourseInstructorRole.ROLE, CourseStaffRole.ROLE]
+    ):
+        if course_access.course_id is None:
             # If the course_access does not have a course_id, it's an org-based role, so we fall back
             raise AccessListFallback
-        if course_key not in courses_list:
-            # check for any course action state for this course
-            in_process_course_actions.extend(
-                CourseRerunState.objects.find_all(
-                    exclude_args={'state': CourseRerunUIStateManager.State.SUCCEEDED},
-                    should_display=True,
-                    course_key=course_key,
-                )
-            )
-            # check for the course itself
-            try:
-                course = modulestore().get_course(course_key)
-            except ItemNotFoundError:
-                # If a user has access to a course that doesn't exist, don't do anything with that course
-                pass
-            if course is not None and not isinstance(course, ErrorDescriptor):
-                # ignore deleted or errored courses
-                courses_list[course_key] = course
+        course_keys.add(course_access.course_id)
+
+    courses = [
+        # Only the user's courses are summarized; courses a user has roles in which don't exist
+        # (or have been deleted) aren't summarized
+        course_summary for course_summary in modulestore().get_course_summaries(course_keys=course_keys)
+        if course_summary.id in course_keys
+    ]
+    # The user's roles give read access to all of these courses, so their actions need no further check
+    return courses, _accessible_in_process_course_actions(lambda course_key: True, course_keys)
 
-    return courses_list.values(), in_process_course_actions
+
+def _accessible_in_process_course_actions(has_read_access, course_keys=None):
+    """
+    List the unsucceeded course actions (such as reruns) to display to the user, using a single query.
+    `has_read_access` is a function, as returned by `_course_read_access_checker`, telling whether the
+    user may read a course key. If `course_keys` is given, only the actions on those courses are listed.
+    """
+    filter_args = {}
+    if course_keys is not None:
+        if not course_keys:
+            return []
+        filter_args['course_key__in'] = list(course_keys)
+    return [
+        course for course in
+        CourseRerunState.objects.find_all(
+            exclude_args={'state': CourseRerunUIStateManager.State.SUCCEEDED}, should_display=True, **filter_args
+        )
+        if has_read_access(course.course_key)
+    ]
 
 
 def _accessible_libraries_list(user):
@@ -531,7 +558,8 @@ def course_index(request, course_key):
         if settings.FEATURES.get('ENABLE_COURSEWARE_INDEX', False):
             reindex_link = "/course/{course_id}/search_reindex".format(course_id=unicode(course_key))
         sections = course_module.get_children()
-        course_structure = _course_outline_json(request, course_module)
+        graders = CourseGradingModel(course_module).graders
+        course_structure = _course_outline_json(request, course_module, graders)
         locator_to_show = request.REQUEST.get('show', None)
         course_release_date = get_default_time_display(course_module.start) if course_module.start != DEFAULT_START_DATE else _("Unscheduled")
         settings_url = reverse_course_url('settings_handler', course_key)
@@ -549,9 +577,7 @@ def course_index(request, course_key):
             'sections': sections,
             'course_structure': course_structure,
             'initial_state': course_outline_initial_state(locator_to_show, course_structure) if locator_to_show else None,
-            'course_graders': json.dumps(
-                CourseGradingModel.fetch(course_key).graders
-            ),
+            'course_graders': json.dumps(graders),
             'rerun_notification_id': current_action.id if current_action else None,
             'course_release_date': course_release_date,
             'settings_url': settings_url,
@@ -605,11 +631,11 @@ def _remove_in_process_courses(courses, in_process_course_actions):
             'run': course.location.run
         }
 
-    in_process_action_course_keys = [uca.course_key for uca in in_process_course_actions]
+    in_process_action_course_keys = set(uca.course_key for uca in in_process_course_actions)
     courses = [
         format_course_for_view(c)
         for c in courses
-        if not isinstance(c, ErrorDescriptor) and (c.id not in in_process_action_course_keys)
+        if c.id not in in_process_action_course_keys
     ]
     return courses
 
@@ -9,7 +9,6 @@ import re
 import shutil
 import tarfile
 from path import Path as path
-from tempfile import mkdtemp
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
@@ -29,7 +28,7 @@ from xmodule.modulestore.django import modulestore
 from opaque_keys.edx.keys import CourseKey
 from opaque_keys.edx.locator import LibraryLocator
 from xmodule.modulestore.xml_importer import import_course_from_xml, import_library_from_xml
-from xmodule.modulestore.xml_exporter import export_course_to_xml, export_library_to_xml
+from xmodule.modulestore.xml_exporter import export_course_to_tar, export_library_to_tar
 from xmodule.modulestore import COURSE_ROOT, LIBRARY_ROOT
 
 from student.auth import has_course_author_access
@@ -38,12 +37,13 @@ from openedx.core.lib.extract_tar import safetar_extractall
 from util.json_request import JsonResponse
 from util.views import ensure_valid_course_key
 
+from contentstore.tasks import export_olx, get_course_export_store
 from contentstore.utils import reverse_course_url, reverse_usage_url, reverse_library_url
 
 
 __all__ = [
     'import_handler', 'import_status_handler',
-    'export_handler',
+    'export_handler', 'export_status_handler',
 ]
 
 
@@ -365,17 +365,15 @@ def create_export_tarball(course_module, course_key, context):
     """
     name = course_module.url_name
     export_file = NamedTemporaryFile(prefix=name + '.', suffix=".tar.gz")
-    root_dir = path(mkdtemp())
 
     try:
-        if isinstance(course_key, LibraryLocator):
-            export_library_to_xml(modulestore(), contentstore(), course_key, root_dir, name)
-        else:
-            export_course_to_xml(modulestore(), contentstore(), course_module.id, root_dir, name)
-
+        # The export is streamed into the tar file as it's made, rather than written to disk and then tarred.
         logging.debug(u'tar file being generated at %s', export_file.name)
         with tarfile.open(name=export_file.name, mode='w:gz') as tar_file:
-            tar_file.add(root_dir / name, arcname=name)
+            if isinstance(course_key, LibraryLocator):
+                export_library_to_tar(modulestore(), contentstore(), course_key, tar_file, name)
+            else:
+                export_course_to_tar(modulestore(), contentstore(), course_module.id, tar_file, name)
 
     except SerializationError as exc:
         log.exception(u'There was an error exporting %s', course_key)
@@ -409,8 +407,6 @@ def create_export_tarball(course_module, course_key, context):
             'unit': None,
             'raw_err_msg': str(exc)})
         raise
-    finally:
-        shutil.rmtree(root_dir / name)
 
     return export_file
 
@@ -429,7 +425,7 @@ def send_tarball(tarball):
 # pylint: disable=unused-argument
 @ensure_csrf_cookie
 @login_required
-@require_http_methods(("GET",))
+@require_http_methods(("GET", "POST"))
 @ensure_valid_course_key
 def export_handler(request, course_key_string):
     """
@@ -439,6 +435,9 @@ def export_handler(request, course_key_string):
         html: return html page for import page
         application/x-tgz: return tar.gz file containing exported course
         json: not supported
+    POST
+        Start exporting the course to a tar.gz file in the background (courses only, not libraries).
+        See export_status_handler for downloading it.
 
     Note that there are 2 ways to request the tar.gz file. The request header can specify
     application/x-tgz via HTTP_ACCEPT, or a query parameter can be used (?_accept=application/x-tgz).
@@ -451,6 +450,12 @@ def export_handler(request, course_key_string):
     if not has_course_author_access(request.user, course_key):
         raise PermissionDenied()
 
+    if request.method == 'POST':
+        if isinstance(course_key, LibraryLocator):
+            return HttpResponse(status=406)
+        export_olx.delay(request.user.id, unicode(course_key))
+        return JsonResponse({'ExportStatus': 'queued'})
+
     if isinstance(course_key, LibraryLocator):
         courselike_module = modulestore().get_library(course_key)
         context = {
@@ -484,3 +489,23 @@ def export_handler(request, course_key_string):
     else:
         # Only HTML or x-tgz request formats are supported (no JSON).
         return HttpResponse(status=406)
+
+
+@require_GET
+@ensure_csrf_cookie
+@login_required
+@ensure_valid_course_key
+def export_status_handler(request, course_key_string):
+    """
+    Returns the tar.gz files of the course exported in the background (see export_handler), newest
+    first, as a list of {"name": ..., "url": ...} under "exports".
+    """
+    course_key = CourseKey.from_string(course_key_string)
+    if not has_course_author_access(request.user, course_key):
+        raise PermissionDenied()
+
+    return JsonResponse({
+        'exports': [
+            {'name': name, 'url': url} for name, url in get_course_export_store().links_for(course_key)
+        ]
+    })
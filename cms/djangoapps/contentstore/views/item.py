@@ -763,7 +763,7 @@ def _get_module_info(xblock, rewrite_static_links=True, include_ancestor_info=Fa
 
 def create_xblock_info(xblock, data=None, metadata=None, include_ancestor_info=False, include_child_info=False,
                        course_outline=False, include_children_predicate=NEVER, parent_xblock=None, graders=None,
-                       user=None, course=None):
+                       user=None, course=None, subtree_changes=None, published_versions=None):
     """
     Creates the information needed for client-side XBlockInfo.
 
@@ -778,13 +778,25 @@ def create_xblock_info(xblock, data=None, metadata=None, include_ancestor_info=F
 
     In addition, an optional include_children_predicate argument can be provided to define whether or
     not a particular xblock should have its children included.
+
+    The graders, course, subtree_changes and published_versions (see get_subtree_changes on the
+    modulestore) are computed once for the outermost xblock, and passed down when recursively creating
+    the info of its children.
     """
     is_library_block = isinstance(xblock.location, LibraryUsageLocator)
     is_xblock_unit = is_unit(xblock, parent_xblock)
     # this should not be calculated for Sections and Subsections on Unit page or for library blocks
     has_changes = None
     if (is_xblock_unit or course_outline) and not is_library_block:
-        has_changes = modulestore().has_changes(xblock)
+        if course_outline and include_child_info and subtree_changes is None:
+            # Compute the changes and published versions of the whole outline in a single pass,
+            # rather than once per block
+            published_versions = {}
+            subtree_changes = modulestore().get_subtree_changes(xblock, published_versions)
+        if subtree_changes is not None:
+            has_changes = subtree_changes[(xblock.location.block_type, xblock.location.block_id)]
+        else:
+            has_changes = modulestore().has_changes(xblock)
 
     if graders is None:
         if not is_library_block:
@@ -809,7 +821,9 @@ def create_xblock_info(xblock, data=None, metadata=None, include_ancestor_info=F
             graders,
             include_children_predicate=include_children_predicate,
             user=user,
-            course=course
+            course=course,
+            subtree_changes=subtree_changes,
+            published_versions=published_versions,
         )
     else:
         child_info = None
@@ -820,7 +834,12 @@ def create_xblock_info(xblock, data=None, metadata=None, include_ancestor_info=F
         visibility_state = _compute_visibility_state(xblock, child_info, is_xblock_unit and has_changes)
     else:
         visibility_state = None
-    published = modulestore().has_published_version(xblock) if not is_library_block else None
+    if is_library_block:
+        published = None
+    elif published_versions is not None:
+        published = published_versions[(xblock.location.block_type, xblock.location.block_id)]
+    else:
+        published = modulestore().has_published_version(xblock)
 
     # defining the default value 'True' for delete, drag and add new child actions in xblock_actions for each xblock.
     xblock_actions = {'deletable': True, 'draggable': True, 'childAddable': True}
@@ -890,7 +909,7 @@ def create_xblock_info(xblock, data=None, metadata=None, include_ancestor_info=F
     if metadata is not None:
         xblock_info["metadata"] = metadata
     if include_ancestor_info:
-        xblock_info['ancestor_info'] = _create_xblock_ancestor_info(xblock, course_outline)
+        xblock_info['ancestor_info'] = _create_xblock_ancestor_info(xblock, course_outline, graders, course)
     if child_info:
         xblock_info['child_info'] = child_info
     if visibility_state == VisibilityState.staff_only:
@@ -1012,7 +1031,7 @@ def _compute_visibility_state(xblock, child_info, is_unit_with_changes):
         return VisibilityState.ready
 
 
-def _create_xblock_ancestor_info(xblock, course_outline):
+def _create_xblock_ancestor_info(xblock, course_outline, graders=None, course=None):
     """
     Returns information about the ancestors of an xblock. Note that the direct parent will also return
     information about all of its children.
@@ -1029,7 +1048,9 @@ def _create_xblock_ancestor_info(xblock, course_outline):
                 ancestor,
                 include_child_info=include_child_info,
                 course_outline=course_outline,
-                include_children_predicate=direct_children_only
+                include_children_predicate=direct_children_only,
+                graders=graders,
+                course=course,
             ))
             collect_ancestor_info(get_parent_xblock(ancestor))
     collect_ancestor_info(get_parent_xblock(xblock), include_child_info=True)
@@ -1038,7 +1059,8 @@ def _create_xblock_ancestor_info(xblock, course_outline):
     }
 
 
-def _create_xblock_child_info(xblock, course_outline, graders, include_children_predicate=NEVER, user=None, course=None):  # pylint: disable=line-too-long
+def _create_xblock_child_info(xblock, course_outline, graders, include_children_predicate=NEVER, user=None, course=None,  # pylint: disable=line-too-long
+                              subtree_changes=None, published_versions=None):
     """
     Returns information about the children of an xblock, as well as about the primary category
     of xblock expected as children.
@@ -1059,6 +1081,8 @@ def _create_xblock_child_info(xblock, course_outline, graders, include_children_
                 graders=graders,
                 user=user,
                 course=course,
+                subtree_changes=subtree_changes,
+                published_versions=published_versions,
             ) for child in xblock.get_children()
         ]
     return child_info
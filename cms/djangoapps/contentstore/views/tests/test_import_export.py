@@ -388,6 +388,20 @@ class ExportTestCase(CourseTestCase):
         resp = self.client.get(self.url + '?_accept=application/x-tgz')
         self._verify_export_succeeded(resp)
 
+    def test_export_in_background(self):
+        """
+        Export the course in a celery task, and get the link to download its tar.gz file.
+        """
+        self.addCleanup(shutil.rmtree, settings.COURSE_EXPORT_DOWNLOAD['ROOT_PATH'], ignore_errors=True)
+        resp = self.client.post(self.url)
+        self.assertEquals(resp.status_code, 200)
+
+        resp = self.client.get(reverse_course_url('export_status_handler', self.course.id))
+        self.assertEquals(resp.status_code, 200)
+        exports = json.loads(resp.content)['exports']
+        self.assertEqual(len(exports), 1)
+        self.assertTrue(exports[0]['name'].endswith('.tar.gz'))
+
     def _verify_export_succeeded(self, resp):
         """ Export success helper method. """
         self.assertEquals(resp.status_code, 200)
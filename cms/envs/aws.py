@@ -184,6 +184,9 @@ TIME_ZONE = ENV_TOKENS.get('TIME_ZONE', TIME_ZONE)
 # Push to LMS overrides
 GIT_REPO_EXPORT_DIR = ENV_TOKENS.get('GIT_REPO_EXPORT_DIR', '/edx/var/edxapp/export_course_repos')
 
+# Background course export overrides
+COURSE_EXPORT_DOWNLOAD = ENV_TOKENS.get('COURSE_EXPORT_DOWNLOAD', COURSE_EXPORT_DOWNLOAD)
+
 # Translation overrides
 LANGUAGES = ENV_TOKENS.get('LANGUAGES', LANGUAGES)
 LANGUAGE_CODE = ENV_TOKENS.get('LANGUAGE_CODE', LANGUAGE_CODE)
@@ -355,3 +358,8 @@ XBLOCK_SETTINGS.setdefault("VideoModule", {})['YOUTUBE_API_KEY'] = AUTH_TOKENS.g
 
 PROCTORING_BACKEND_PROVIDER = AUTH_TOKENS.get("PROCTORING_BACKEND_PROVIDER", PROCTORING_BACKEND_PROVIDER)
 PROCTORING_SETTINGS = ENV_TOKENS.get("PROCTORING_SETTINGS", PROCTORING_SETTINGS)
+
+################# CALL STACK MANAGER ##################
+
+CALL_STACK_SAMPLE_RATE = ENV_TOKENS.get('CALL_STACK_SAMPLE_RATE', CALL_STACK_SAMPLE_RATE)
+CALL_STACK_BOOK_SIZE = ENV_TOKENS.get('CALL_STACK_BOOK_SIZE', CALL_STACK_BOOK_SIZE)
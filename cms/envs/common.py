@@ -287,6 +287,9 @@ TEMPLATE_LOADERS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    # Sends buffered metrics after every other middleware has processed the response
+    'datadog.middleware.FlushMetricsMiddleware',
+
     'request_cache.middleware.RequestCache',
     'django.middleware.cache.UpdateCacheMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -667,6 +670,16 @@ CELERY_QUEUES = {
     DEFAULT_PRIORITY_QUEUE: {}
 }
 
+############################## Course Export ##################################
+
+# Where the tar.gz files of courses exported in the background are stored,
+# in the same form as the LMS's GRADES_DOWNLOAD report store.
+COURSE_EXPORT_DOWNLOAD = {
+    'STORAGE_TYPE': 'localfs',
+    'BUCKET': 'edx-course-exports',
+    'ROOT_PATH': '/tmp/edx-s3/course_exports',
+}
+
 
 ############################## Video ##########################################
 
@@ -1088,3 +1101,10 @@ PROCTORING_BACKEND_PROVIDER = {
     'options': {},
 }
 PROCTORING_SETTINGS = {}
+
+#### CALL STACK MANAGER
+
+# Fraction of calls to tracked models whose call stack is captured.
+CALL_STACK_SAMPLE_RATE = 0.01
+# Number of distinct call stacks kept by each process.
+CALL_STACK_BOOK_SIZE = 1000
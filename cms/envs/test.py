@@ -72,6 +72,11 @@ COMMON_TEST_DATA_ROOT = COMMON_ROOT / "test" / "data"
 FEATURES['ENABLE_EXPORT_GIT'] = True
 GIT_REPO_EXPORT_DIR = TEST_ROOT / "export_course_repos"
 
+COURSE_EXPORT_DOWNLOAD = {
+    'STORAGE_TYPE': 'localfs',
+    'ROOT_PATH': TEST_ROOT / "course_exports",
+}
+
 # Makes the tests run much faster...
 SOUTH_TESTS_MIGRATE = False  # To disable migrations and use syncdb instead
 
@@ -177,6 +182,8 @@ INSTALLED_APPS += ('external_auth', )
 
 # Add milestones to Installed apps for testing
 INSTALLED_APPS += ('milestones', 'openedx.core.djangoapps.call_stack_manager')
+# Capture every call stack, so that tests are deterministic
+CALL_STACK_SAMPLE_RATE = 1.0
 
 # hide ratelimit warnings while running tests
 filterwarnings('ignore', message='No request passed to the backend, unable to rate-limit')
@@ -110,12 +110,40 @@ def instance_key(model, instance_or_pk):
     )
 
 
+def content_hash_key(content_hash):
+    """
+    Returns the cache key for the data of content with this content_hash.
+    """
+    return 'content_hash:{}'.format(content_hash)
+
+
 def set_cached_content(content):
-    cache.set(unicode(content.location).encode("utf-8"), content)
+    """
+    Cache content by its location. The data of content stored by its hash (such as assets shared between
+    courses) is cached once under the hash, however many locations share it; the location's entry
+    holds the rest of the content.
+    """
+    location_key = unicode(content.location).encode("utf-8")
+    content_hash = getattr(content, 'content_hash', None)
+    if content_hash is None:
+        cache.set(location_key, content)
+    else:
+        cache.set_many({
+            location_key: content.replace_data(None),
+            content_hash_key(content_hash): content.data,
+        })
 
 
 def get_cached_content(location):
-    return cache.get(unicode(location).encode("utf-8"))
+    content = cache.get(unicode(location).encode("utf-8"))
+    content_hash = getattr(content, 'content_hash', None)
+    if content_hash is not None:
+        data = cache.get(content_hash_key(content_hash))
+        if data is None:
+            # the data was evicted
+            return None
+        content = content.replace_data(data)
+    return content
 
 
 def del_cached_content(location):
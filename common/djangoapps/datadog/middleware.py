@@ -0,0 +1,16 @@
+"""
+Middleware for sending the metrics buffered while handling a request.
+"""
+import dogstats_wrapper
+
+
+class FlushMetricsMiddleware(object):
+    """
+    Flushes the metrics recorded through dogstats_wrapper at the end of each request.
+    """
+    def process_response(self, request, response):  # pylint: disable=unused-argument
+        """
+        Send any buffered metrics to statsd.
+        """
+        dogstats_wrapper.flush()
+        return response
@@ -1,6 +1,8 @@
+from celery.signals import task_postrun
 from django.conf import settings
 
 from dogapi import dog_stats_api, dog_http_api
+import dogstats_wrapper
 
 
 def run():
@@ -10,6 +12,11 @@ def run():
     Can be configured using a dictionary named DATADOG in the django
     project settings.
 
+    When sending to the statsd agent, metrics recorded through dogstats_wrapper
+    are aggregated in process and flushed every 'buffer_flush_interval' seconds
+    (10 by default), at the end of each request and after each celery task.
+    Set 'buffer' to False to send every metric as it is recorded.
+
     """
 
     # By default use the statsd agent
@@ -18,8 +25,26 @@ def run():
     if hasattr(settings, 'DATADOG'):
         options.update(settings.DATADOG)
 
+    buffer_metrics = options.pop('buffer', True)
+    buffer_flush_interval = options.pop('buffer_flush_interval', 10)
+
     # Not all arguments are documented.
     # Look at the source code for details.
     dog_stats_api.start(**options)
 
     dog_http_api.api_key = options.get('api_key')
+
+    if buffer_metrics and options.get('statsd'):
+        dogstats_wrapper.start_buffering(
+            host=options.get('statsd_host', 'localhost'),
+            port=options.get('statsd_port', 8125),
+            flush_interval=buffer_flush_interval,
+        )
+        task_postrun.connect(flush_metrics, dispatch_uid='datadog.startup.flush_metrics')
+
+
+def flush_metrics(**kwargs):  # pylint: disable=unused-argument
+    """
+    Send the metrics buffered while running a celery task.
+    """
+    dogstats_wrapper.flush()
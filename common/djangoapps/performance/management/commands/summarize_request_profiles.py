@@ -0,0 +1,114 @@
+"""
+A command to aggregate the request profiles logged by RequestProfilerMiddleware.
+
+Each profile is logged to the perflog logger as a JSON object. This reads those
+lines from log files, and prints, for each view, the mean number and duration
+of each kind of operation per request, followed by the block types and handlers
+making the most operations per request. Views whose requests make many more
+queries than usual are likely to have an N+1 query.
+"""
+
+from collections import defaultdict
+import json
+import optparse
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """The summarize_request_profiles command."""
+
+    args = "<log file> [<log file> ...]"
+    help = "Aggregates request profiles logged by the RequestProfilerMiddleware."
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--top',
+            type='int',
+            default=20,
+            help="Number of block types and handlers to list.",
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if not args:
+            raise CommandError("At least one log file is required.")
+
+        summary = ProfileSummary()
+        for path in args:
+            with open(path) as log_file:
+                summary.add_lines(log_file)
+
+        for view, requests, counter, count, seconds in summary.views():
+            self.stdout.write(u"{:<60} {:>6} {:<10} {:>10.1f} {:>10.4f}s\n".format(
+                view, requests, counter, count, seconds
+            ))
+        self.stdout.write("\n")
+        for view, block_type, handler, counter, count, seconds in summary.blocks()[:options['top']]:
+            self.stdout.write(u"{:<60} {:<20} {:<20} {:<10} {:>10.1f} {:>10.4f}s\n".format(
+                view, block_type, handler, counter, count, seconds
+            ))
+
+
+class ProfileSummary(object):
+    """
+    The mean of each counter per request, by view and by block type and handler.
+    """
+    def __init__(self):
+        self.requests = defaultdict(int)
+        self.totals = defaultdict(lambda: [0, 0.0])
+        self.block_totals = defaultdict(lambda: [0, 0.0])
+
+    def add_lines(self, lines):
+        """
+        Add the profiles logged in `lines`, ignoring any other lines.
+        """
+        for line in lines:
+            start = line.find('{')
+            if start == -1 or 'request_profile' not in line:
+                continue
+            try:
+                profile = json.loads(line[start:])
+            except ValueError:
+                continue
+            if profile.get('event') == 'request_profile':
+                self.add(profile)
+
+    def add(self, profile):
+        """
+        Add a profile, as logged by :meth:`performance.profiler.RequestProfile.report`.
+        """
+        view = profile['view']
+        self.requests[view] += 1
+        for counter, total in profile['totals'].iteritems():
+            totals = self.totals[(view, counter)]
+            totals[0] += total['count']
+            totals[1] += total['seconds']
+        for block in profile['blocks']:
+            totals = self.block_totals[(view, block['block_type'], block['handler'], block['counter'])]
+            totals[0] += block['count']
+            totals[1] += block['seconds']
+
+    def views(self):
+        """
+        Return (view, requests, counter, mean count, mean seconds) tuples, ordered by view.
+        """
+        return [
+            (view, self.requests[view], counter, float(count) / self.requests[view], seconds / self.requests[view])
+            for (view, counter), (count, seconds) in sorted(self.totals.items())
+        ]
+
+    def blocks(self):
+        """
+        Return (view, block type, handler, counter, mean count, mean seconds) tuples,
+        with the highest mean count first.
+        """
+        return sorted(
+            (
+                (view, block_type, handler, counter,
+                 float(count) / self.requests[view], seconds / self.requests[view])
+                for (view, block_type, handler, counter), (count, seconds) in self.block_totals.iteritems()
+            ),
+            key=lambda row: row[4],
+            reverse=True,
+        )
@@ -0,0 +1,48 @@
+"""
+Middleware for profiling a sample of requests.
+"""
+import random
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from performance import profiler
+
+
+class RequestProfilerMiddleware(object):
+    """
+    Profiles the fraction settings.REQUEST_PROFILER_SAMPLE_RATE of requests, and
+    reports each profile when the response is returned.
+
+    This must come after request_cache.middleware.RequestCache, which holds the
+    current profile.
+    """
+    def __init__(self):
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILER_SAMPLE_RATE', 0)
+        if not self.sample_rate:
+            raise MiddlewareNotUsed()
+        profiler.install()
+
+    def process_request(self, request):  # pylint: disable=unused-argument
+        """
+        Start profiling a sample of requests.
+        """
+        if random.random() < self.sample_rate:
+            profiler.start_profile()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):  # pylint: disable=unused-argument
+        """
+        Attribute the profile to the view handling the request.
+        """
+        profile = profiler.get_current_profile()
+        if profile is not None:
+            profile.view = u'{}.{}'.format(view_func.__module__, getattr(view_func, '__name__', type(view_func).__name__))
+
+    def process_response(self, request, response):
+        """
+        Stop profiling the request, and report its profile.
+        """
+        profile = profiler.stop_profile()
+        if profile is not None:
+            profile.report(request.path, response.status_code)
+        return response
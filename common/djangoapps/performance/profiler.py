@@ -0,0 +1,237 @@
+"""
+Sampled profiling of the work done while handling a request.
+
+While a :class:`RequestProfile` is active, the number and duration of these
+operations are recorded:
+
+    sql: Queries made through the Django database connections.
+    mongo: Operations timed by the split modulestore's QueryTimer.
+    cache_get: Reads from the Django caches (``get`` and ``get_many``).
+    get_item: Calls to ``get_item`` on the mixed modulestore.
+
+Each operation is attributed to the innermost XBlock type and handler active
+when it was made (see :func:`attribute_to`), and the profile as a whole to the
+view that handled the request. :class:`performance.middleware.RequestProfilerMiddleware`
+profiles a sample of requests, and the ``summarize_request_profiles``
+management command aggregates the profiles it logs.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+import json
+import logging
+from time import time
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.db import connections
+from django.db.backends.util import CursorDebugWrapper
+import dogstats_wrapper as dog_stats_api
+
+import request_cache
+
+
+perflog = logging.getLogger("perflog")
+
+REQUEST_CACHE_NAME = 'performance.profiler'
+
+_INSTALLED = False
+
+
+class RequestProfile(object):
+    """
+    The counts and durations of the operations made while handling one request.
+
+    Arguments:
+        view (str): The dotted path of the view handling the request, if known.
+    """
+    def __init__(self, view=None):
+        self.view = view
+        # Map (block type, handler, counter) to [count, seconds].
+        self.counters = defaultdict(lambda: [0, 0.0])
+        self.active = set()
+        self._attribution = [(None, None)]
+        self._debug_cursors = {}
+
+    def record(self, counter, seconds=0.0, count=1):
+        """
+        Record `count` operations of kind `counter` that took `seconds` in total.
+        """
+        totals = self.counters[self._attribution[-1] + (counter,)]
+        totals[0] += count
+        totals[1] += seconds
+
+    @contextmanager
+    def attribute(self, block_type, handler=None):
+        """
+        Attribute operations made in this context to `block_type`, and to `handler`
+        (or to the handler of the enclosing context, if `handler` is None).
+        """
+        self._attribution.append((block_type, handler or self._attribution[-1][1]))
+        try:
+            yield
+        finally:
+            self._attribution.pop()
+
+    def summary(self):
+        """
+        Return the profile as a JSON serializable dict, with the total of each counter in
+        'totals', and the counters attributed to each block type and handler in 'blocks'.
+        """
+        totals = {}
+        blocks = []
+        for (block_type, handler, counter), (count, seconds) in sorted(self.counters.items()):
+            total = totals.setdefault(counter, {'count': 0, 'seconds': 0.0})
+            total['count'] += count
+            total['seconds'] += seconds
+            if block_type is not None:
+                blocks.append({
+                    'block_type': block_type,
+                    'handler': handler,
+                    'counter': counter,
+                    'count': count,
+                    'seconds': seconds,
+                })
+        return {'view': self.view, 'totals': totals, 'blocks': blocks}
+
+    def report(self, path, status_code):
+        """
+        Send the profile to datadog, and log it to the perflog logger.
+        """
+        summary = self.summary()
+        view_tag = u'view:{}'.format(self.view)
+        dog_stats_api.increment('request_profile.requests', tags=[view_tag])
+        for counter, total in summary['totals'].iteritems():
+            dog_stats_api.histogram('request_profile.{}.count'.format(counter), total['count'], tags=[view_tag])
+            dog_stats_api.histogram('request_profile.{}.seconds'.format(counter), total['seconds'], tags=[view_tag])
+        for block in summary['blocks']:
+            dog_stats_api.histogram(
+                'request_profile.{}.block_count'.format(block['counter']),
+                block['count'],
+                tags=[
+                    view_tag,
+                    u'block_type:{}'.format(block['block_type']),
+                    u'handler:{}'.format(block['handler']),
+                ],
+            )
+
+        summary.update({
+            'event_source': 'server',
+            'event': 'request_profile',
+            'path': path,
+            'status_code': status_code,
+        })
+        perflog.info(json.dumps(summary))
+
+
+def get_current_profile():
+    """
+    Return the RequestProfile of the current request, or None if it isn't being profiled.
+    """
+    return request_cache.get_cache(REQUEST_CACHE_NAME).get('profile')
+
+
+def start_profile(view=None):
+    """
+    Start profiling the current request, and return its RequestProfile.
+    """
+    profile = RequestProfile(view)
+    # Only the debug cursor reports each query, so use it while profiling.
+    for connection in connections.all():
+        profile._debug_cursors[connection.alias] = connection.use_debug_cursor  # pylint: disable=protected-access
+        connection.use_debug_cursor = True
+    request_cache.get_cache(REQUEST_CACHE_NAME)['profile'] = profile
+    return profile
+
+
+def stop_profile():
+    """
+    Stop profiling the current request, and return its RequestProfile (or None if it wasn't being profiled).
+    """
+    profile = request_cache.get_cache(REQUEST_CACHE_NAME).pop('profile', None)
+    if profile is not None:
+        for alias, use_debug_cursor in profile._debug_cursors.iteritems():  # pylint: disable=protected-access
+            connections[alias].use_debug_cursor = use_debug_cursor
+    return profile
+
+
+@contextmanager
+def attribute_to(block_type, handler=None):
+    """
+    Attribute operations made in this context to `block_type` and `handler`,
+    if the current request is being profiled.
+    """
+    profile = get_current_profile()
+    if profile is None:
+        yield
+    else:
+        with profile.attribute(block_type, handler):
+            yield
+
+
+def _profiled(counter, func):
+    """
+    Wrap `func` so that each call made while a request is being profiled is recorded as `counter`.
+
+    Calls made from within another call recorded as the same counter (such as the
+    ``get`` calls made by the default ``get_many`` of a cache) aren't recorded again.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        """Record the call in the current profile."""
+        profile = get_current_profile()
+        if profile is None or counter in profile.active:
+            return func(*args, **kwargs)
+
+        profile.active.add(counter)
+        start = time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.active.discard(counter)
+            profile.record(counter, time() - start)
+
+    wrapper.profiled_counter = counter
+    return wrapper
+
+
+def _profile_method(cls, name, counter):
+    """
+    Replace the method `name` of `cls` with one recorded as `counter`, unless it already is.
+    """
+    method = getattr(cls, name)
+    if getattr(method, 'profiled_counter', None) != counter:
+        setattr(cls, name, _profiled(counter, method.__func__))
+
+
+def _record_mongo_operation(metric_name, seconds):  # pylint: disable=unused-argument
+    """
+    A QueryTimer listener, which records each timed operation in the current profile.
+    """
+    profile = get_current_profile()
+    if profile is not None:
+        profile.record('mongo', seconds)
+
+
+def install():
+    """
+    Instrument the operations recorded in profiles. This is idempotent, and adds no overhead
+    to requests that aren't being profiled beyond looking up the current profile.
+    """
+    global _INSTALLED  # pylint: disable=global-statement
+    if _INSTALLED:
+        return
+
+    # Imported here, so that the modulestore is only loaded by processes that profile requests.
+    from xmodule.modulestore.mixed import MixedModuleStore
+    from xmodule.modulestore.split_mongo.mongo_connection import TIMER
+
+    for name in ('execute', 'executemany'):
+        _profile_method(CursorDebugWrapper, name, 'sql')
+    for alias in settings.CACHES:
+        for name in ('get', 'get_many'):
+            _profile_method(type(get_cache(alias)), name, 'cache_get')
+    _profile_method(MixedModuleStore, 'get_item', 'get_item')
+    TIMER.add_listener(_record_mongo_operation)
+    _INSTALLED = True
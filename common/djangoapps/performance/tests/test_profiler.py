@@ -0,0 +1,129 @@
+"""Tests of sampled request profiling."""
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from mock import patch
+
+from performance import profiler
+from performance.management.commands.summarize_request_profiles import ProfileSummary
+from performance.middleware import RequestProfilerMiddleware
+from request_cache.middleware import RequestCache
+
+
+def profiled_view(request):  # pylint: disable=unused-argument
+    """A view that reads from the database and the cache, partly on behalf of a block."""
+    list(User.objects.all())
+    cache.get('profiled_view')
+    with profiler.attribute_to('problem', 'problem_check'):
+        list(User.objects.all())
+        cache.get_many(['profiled_view_a', 'profiled_view_b'])
+        with profiler.attribute_to('html'):
+            cache.get('profiled_view')
+    return HttpResponse()
+
+
+class RequestProfileTest(TestCase):
+    """
+    Tests of recording and attributing operations in a RequestProfile.
+    """
+    def test_attribution(self):
+        profile = profiler.RequestProfile('view')
+        profile.record('sql', 0.5)
+        with profile.attribute('sequential'):
+            profile.record('sql', 0.25)
+            with profile.attribute('problem', 'problem_check'):
+                profile.record('sql', 0.25)
+                with profile.attribute('html'):
+                    profile.record('cache_get')
+
+        summary = profile.summary()
+        self.assertEqual(summary['view'], 'view')
+        self.assertEqual(summary['totals'], {
+            'sql': {'count': 3, 'seconds': 1.0},
+            'cache_get': {'count': 1, 'seconds': 0.0},
+        })
+        self.assertEqual(
+            [(block['block_type'], block['handler'], block['counter'], block['count']) for block in summary['blocks']],
+            [
+                ('html', 'problem_check', 'cache_get', 1),
+                ('problem', 'problem_check', 'sql', 1),
+                ('sequential', None, 'sql', 1),
+            ]
+        )
+
+    def test_not_profiling(self):
+        RequestCache.clear_request_cache()
+        self.assertIsNone(profiler.get_current_profile())
+        with profiler.attribute_to('problem'):
+            list(User.objects.all())
+        self.assertIsNone(profiler.stop_profile())
+
+
+@override_settings(REQUEST_PROFILER_SAMPLE_RATE=1)
+class RequestProfilerMiddlewareTest(TestCase):
+    """
+    Tests of profiling requests with the RequestProfilerMiddleware.
+    """
+    def setUp(self):
+        super(RequestProfilerMiddlewareTest, self).setUp()
+        self.request = RequestFactory().get('/courses/profiled')
+        self.request_cache = RequestCache()
+        self.middleware = RequestProfilerMiddleware()
+
+    def process(self, view):
+        """
+        Handle self.request with `view`, through the request cache and profiler middleware.
+        """
+        self.request_cache.process_request(self.request)
+        self.middleware.process_request(self.request)
+        self.middleware.process_view(self.request, view, [], {})
+        response = self.middleware.process_response(self.request, view(self.request))
+        return self.request_cache.process_response(self.request, response)
+
+    @patch('performance.profiler.perflog')
+    def test_profiles_request(self, mock_perflog):
+        self.process(profiled_view)
+
+        logged = json.loads(mock_perflog.info.call_args[0][0])
+        self.assertEqual(logged['event'], 'request_profile')
+        self.assertEqual(logged['view'], 'performance.tests.test_profiler.profiled_view')
+        self.assertEqual(logged['path'], '/courses/profiled')
+        self.assertEqual(logged['totals']['sql']['count'], 2)
+        # get_many counts as a single read, even where it is implemented with get.
+        self.assertEqual(logged['totals']['cache_get']['count'], 3)
+        self.assertEqual(
+            sorted((block['block_type'], block['handler'], block['counter']) for block in logged['blocks']),
+            [
+                ('html', 'problem_check', 'cache_get'),
+                ('problem', 'problem_check', 'cache_get'),
+                ('problem', 'problem_check', 'sql'),
+            ]
+        )
+
+    @override_settings(REQUEST_PROFILER_SAMPLE_RATE=0.5)
+    @patch('performance.profiler.perflog')
+    @patch('performance.middleware.random.random', return_value=0.75)
+    def test_unsampled_request(self, _mock_random, mock_perflog):
+        self.middleware = RequestProfilerMiddleware()
+        self.process(profiled_view)
+        self.assertFalse(mock_perflog.info.called)
+
+    @patch('performance.profiler.perflog')
+    def test_summarize(self, mock_perflog):
+        self.process(profiled_view)
+        self.process(profiled_view)
+
+        summary = ProfileSummary()
+        summary.add_lines([
+            'INFO 123 [perflog] profiler.py:1 - ' + call[0][0]
+            for call in mock_perflog.info.call_args_list
+        ] + ['INFO 123 [tracking] an unrelated line'])
+
+        view = 'performance.tests.test_profiler.profiled_view'
+        self.assertIn((view, 2, 'sql', 2.0), [row[:4] for row in summary.views()])
+        self.assertIn((view, 'problem', 'problem_check', 'sql', 1.0), [row[:5] for row in summary.blocks()])
@@ -70,7 +70,7 @@ from xmodule.modulestore import ModuleStoreEnum
 
 from collections import namedtuple
 
-from courseware.courses import get_courses, sort_by_announcement, sort_by_start_date  # pylint: disable=import-error
+from courseware.courses import get_catalog_order, get_courses  # pylint: disable=import-error
 from courseware.access import has_access
 
 from django_comment_common.models import Role
@@ -158,12 +158,9 @@ def index(request, extra_context=None, user=AnonymousUser()):
     if domain is False:
         domain = request.META.get('HTTP_HOST')
 
-    courses = get_courses(user, domain=domain)
-    if microsite.get_value("ENABLE_COURSE_SORTING_BY_START_DATE",
-                           settings.FEATURES["ENABLE_COURSE_SORTING_BY_START_DATE"]):
-        courses = sort_by_start_date(courses)
-    else:
-        courses = sort_by_announcement(courses)
+    # Load one more course than the homepage lists, so that it can tell whether there are more.
+    limit = settings.HOMEPAGE_COURSE_MAX + 1 if settings.HOMEPAGE_COURSE_MAX else None
+    courses = get_courses(user, domain=domain, order=get_catalog_order(), limit=limit)
 
     context = {'courses': courses}
 
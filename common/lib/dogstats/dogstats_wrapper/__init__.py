@@ -1 +1 @@
-from .wrapper import increment, histogram, timer
+from .wrapper import increment, histogram, timer, start_buffering, stop_buffering, flush
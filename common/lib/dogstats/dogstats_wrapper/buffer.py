@@ -0,0 +1,125 @@
+"""
+In-process aggregation of statsd metrics.
+
+Recording a metric into a MetricsBuffer is a dictionary update. Counters are
+summed and histogram values are grouped per (metric, tags), and everything
+is sent to the statsd agent in as few datagrams as possible when the buffer
+is flushed.
+"""
+import logging
+import socket
+import threading
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+class MetricsBuffer(object):
+    """
+    Aggregates counters and histograms, and flushes them to statsd as batched datagrams.
+
+    Arguments:
+        host (str): The statsd agent host.
+        port (int): The statsd agent port.
+        flush_interval (float): Seconds after which recording a metric flushes the buffer.
+        max_packet_size (int): Maximum size in bytes of a datagram.
+    """
+    def __init__(self, host='localhost', port=8125, flush_interval=10, max_packet_size=1024):
+        self.address = (host, port)
+        self.flush_interval = flush_interval
+        self.max_packet_size = max_packet_size
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = time.time()
+        self._socket = None
+
+    def increment(self, metric_name, value, tags):
+        """
+        Add `value` to the counter `metric_name` with the (cleaned) tuple of `tags`.
+        """
+        key = (metric_name, tags)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._flush_if_due()
+
+    def histogram(self, metric_name, value, tags):
+        """
+        Record `value` in the histogram `metric_name` with the (cleaned) tuple of `tags`.
+        """
+        key = (metric_name, tags)
+        with self._lock:
+            values = self._histograms.get(key)
+            if values is None:
+                self._histograms[key] = [value]
+            else:
+                values.append(value)
+        self._flush_if_due()
+
+    def _flush_if_due(self):
+        """
+        Flush the buffer if `flush_interval` seconds have passed since the last flush.
+        """
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Send all buffered metrics to statsd, and empty the buffer.
+        """
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            histograms, self._histograms = self._histograms, {}
+            self._last_flush = time.time()
+
+        lines = [
+            self._format(metric_name, value, 'c', tags)
+            for (metric_name, tags), value in counters.iteritems()
+        ]
+        lines.extend(
+            self._format(metric_name, value, 'h', tags)
+            for (metric_name, tags), values in histograms.iteritems()
+            for value in values
+        )
+        for packet in self._packets(lines):
+            self._send(packet)
+
+    @staticmethod
+    def _format(metric_name, value, metric_type, tags):
+        """
+        Return the dogstatsd line for one metric value.
+        """
+        line = '{}:{}|{}'.format(metric_name, value, metric_type)
+        if tags:
+            line += '|#' + ','.join(tags)
+        return line
+
+    def _packets(self, lines):
+        """
+        Join `lines` into newline separated datagrams of at most `max_packet_size` bytes.
+
+        A single line longer than `max_packet_size` is sent in a datagram of its own.
+        """
+        packet = []
+        size = 0
+        for line in lines:
+            if packet and size + len(line) + 1 > self.max_packet_size:
+                yield '\n'.join(packet)
+                packet = []
+                size = 0
+            packet.append(line)
+            size += len(line) + 1
+        if packet:
+            yield '\n'.join(packet)
+
+    def _send(self, packet):
+        """
+        Send a datagram to statsd. Like statsd clients, errors are logged and otherwise ignored.
+        """
+        try:
+            if self._socket is None:
+                self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.sendto(packet, self.address)
+        except socket.error:
+            log.exception("Could not send metrics to statsd at %s:%s", *self.address)
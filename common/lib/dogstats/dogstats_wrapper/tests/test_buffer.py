@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for buffered metrics.
+"""
+import unittest
+
+from mock import patch
+
+import dogstats_wrapper
+from dogstats_wrapper.buffer import MetricsBuffer
+
+
+class MetricsBufferTest(unittest.TestCase):
+    """
+    Tests of MetricsBuffer aggregation and flushing.
+    """
+    def setUp(self):
+        super(MetricsBufferTest, self).setUp()
+        self.buffer = MetricsBuffer(flush_interval=60)
+        patcher = patch.object(self.buffer, '_send')
+        self.mock_send = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sent_lines(self):
+        """
+        Return all lines sent to statsd, sorted.
+        """
+        return sorted(
+            line
+            for call in self.mock_send.call_args_list
+            for line in call[0][0].split('\n')
+        )
+
+    def test_aggregates_counters(self):
+        for __ in range(3):
+            self.buffer.increment('requests', 1, ('course:a',))
+        self.buffer.increment('requests', 2, ('course:b',))
+        self.buffer.increment('requests', 1, ())
+        self.buffer.flush()
+
+        self.assertEqual(self.mock_send.call_count, 1)
+        self.assertEqual(
+            self.sent_lines(),
+            ['requests:1|c', 'requests:2|c|#course:b', 'requests:3|c|#course:a']
+        )
+
+    def test_histogram_values(self):
+        self.buffer.histogram('latency', 0.5, ('a:b', 'c:d'))
+        self.buffer.histogram('latency', 1.5, ('a:b', 'c:d'))
+        self.buffer.flush()
+
+        self.assertEqual(self.sent_lines(), ['latency:0.5|h|#a:b,c:d', 'latency:1.5|h|#a:b,c:d'])
+
+    def test_flush_empties_buffer(self):
+        self.buffer.increment('requests', 1, ())
+        self.buffer.flush()
+        self.buffer.flush()
+        self.assertEqual(self.mock_send.call_count, 1)
+
+    def test_packet_size(self):
+        self.buffer.max_packet_size = 30
+        for index in range(10):
+            self.buffer.increment('metric_{}'.format(index), 1, ())
+        self.buffer.flush()
+
+        self.assertGreater(self.mock_send.call_count, 1)
+        for call in self.mock_send.call_args_list:
+            self.assertLessEqual(len(call[0][0]), 30)
+        self.assertEqual(len(self.sent_lines()), 10)
+
+    def test_flush_interval(self):
+        self.buffer.flush_interval = 0
+        self.buffer.increment('requests', 1, ())
+        self.assertEqual(self.mock_send.call_count, 1)
+
+
+class BufferedWrapperTest(unittest.TestCase):
+    """
+    Tests of the wrapper functions while buffering.
+    """
+    def setUp(self):
+        super(BufferedWrapperTest, self).setUp()
+        patcher = patch.object(MetricsBuffer, '_send')
+        self.mock_send = patcher.start()
+        self.addCleanup(patcher.stop)
+        dogstats_wrapper.start_buffering(flush_interval=60)
+        self.addCleanup(dogstats_wrapper.stop_buffering)
+
+    @patch('dogstats_wrapper.wrapper.dog_stats_api')
+    def test_buffered(self, mock_dog_stats_api):
+        dogstats_wrapper.increment('requests', tags=[u'course:é|x'])
+        dogstats_wrapper.increment('requests', tags=[u'course:é|x'])
+        dogstats_wrapper.histogram('size', 10, tags=['course:a'])
+        with dogstats_wrapper.timer('time'):
+            pass
+        self.assertFalse(mock_dog_stats_api.method_calls)
+
+        dogstats_wrapper.flush()
+        lines = self.mock_send.call_args[0][0].split('\n')
+        self.assertIn('requests:2|c|#course:\xc3\xa9_x', lines)
+        self.assertIn('size:10|h|#course:a', lines)
+        self.assertTrue(any(line.startswith('time:') for line in lines))
+
+    @patch('dogstats_wrapper.wrapper.dog_stats_api')
+    def test_unbuffered_arguments(self, mock_dog_stats_api):
+        dogstats_wrapper.increment('requests', sample_rate=0.5, tags=['a|b'])
+        mock_dog_stats_api.increment.assert_called_once_with('requests', sample_rate=0.5, tags=['a_b'])
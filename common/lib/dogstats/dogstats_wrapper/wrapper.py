@@ -1,9 +1,26 @@
 """
 Wrapper for dog_stats_api, ensuring tags are valid.
 See: http://help.datadoghq.com/customer/portal/questions/908720-api-guidelines
+
+Once start_buffering() has been called, increment, histogram and timer record
+into an in-process MetricsBuffer instead of sending a statsd datagram per call.
 """
+import atexit
+from contextlib import contextmanager
+import time
+
 from dogapi import dog_stats_api
 
+from .buffer import MetricsBuffer
+
+# The MetricsBuffer that metrics are recorded into, or None to send them directly
+_BUFFER = None
+
+# Cleaned tags, keyed by the tuple of raw tags
+_CLEANED_TAGS = {}
+# Number of distinct tag tuples to cache before the cache is emptied
+MAX_CLEANED_TAGS = 10000
+
 
 def _clean_tags(tags):
     """
@@ -20,10 +37,60 @@ def _clean_tags(tags):
     return [clean(t) for t in tags]
 
 
+def _cleaned_tag_tuple(tags):
+    """
+    Return the cleaned `tags` as a tuple, cleaning each distinct tuple of tags only once.
+    """
+    if not tags:
+        return ()
+    key = tuple(tags)
+    cleaned = _CLEANED_TAGS.get(key)
+    if cleaned is None:
+        if len(_CLEANED_TAGS) >= MAX_CLEANED_TAGS:
+            _CLEANED_TAGS.clear()
+        cleaned = _CLEANED_TAGS[key] = tuple(_clean_tags(tags))
+    return cleaned
+
+
+def start_buffering(host='localhost', port=8125, flush_interval=10):
+    """
+    Record metrics into an in-process buffer which is flushed to the statsd
+    agent at `host`:`port` at most every `flush_interval` seconds, when
+    flush() is called, and when the process exits.
+    """
+    global _BUFFER  # pylint: disable=global-statement
+    if _BUFFER is not None:
+        _BUFFER.flush()
+    else:
+        atexit.register(flush)
+    _BUFFER = MetricsBuffer(host, port, flush_interval)
+
+
+def stop_buffering():
+    """
+    Flush the buffer, and send metrics directly through dog_stats_api from now on.
+    """
+    global _BUFFER  # pylint: disable=global-statement
+    if _BUFFER is not None:
+        _BUFFER.flush()
+        _BUFFER = None
+
+
+def flush():
+    """
+    Send any buffered metrics to statsd.
+    """
+    if _BUFFER is not None:
+        _BUFFER.flush()
+
+
 def increment(metric_name, *args, **kwargs):
     """
     Wrapper around dog_stats_api.increment that cleans any tags used.
     """
+    if _BUFFER is not None and not args and set(kwargs) <= {'value', 'tags'}:
+        _BUFFER.increment(metric_name, kwargs.get('value', 1), _cleaned_tag_tuple(kwargs.get('tags')))
+        return
     if "tags" in kwargs:
         kwargs["tags"] = _clean_tags(kwargs["tags"])
     dog_stats_api.increment(metric_name, *args, **kwargs)
@@ -33,6 +100,10 @@ def histogram(metric_name, *args, **kwargs):
     """
     Wrapper around dog_stats_api.histogram that cleans any tags used.
     """
+    if _BUFFER is not None and set(kwargs) <= {'value', 'tags'} and len(args) + ('value' in kwargs) == 1:
+        value = args[0] if args else kwargs['value']
+        _BUFFER.histogram(metric_name, value, _cleaned_tag_tuple(kwargs.get('tags')))
+        return
     if "tags" in kwargs:
         kwargs["tags"] = _clean_tags(kwargs["tags"])
     dog_stats_api.histogram(metric_name, *args, **kwargs)
@@ -42,6 +113,20 @@ def timer(metric_name, *args, **kwargs):
     """
     Wrapper around dog_stats_api.timer that cleans any tags used.
     """
+    if _BUFFER is not None and not args and set(kwargs) <= {'tags'}:
+        return _buffered_timer(_BUFFER, metric_name, _cleaned_tag_tuple(kwargs.get('tags')))
     if "tags" in kwargs:
         kwargs["tags"] = _clean_tags(kwargs["tags"])
     return dog_stats_api.timer(metric_name, *args, **kwargs)
+
+
+@contextmanager
+def _buffered_timer(metrics_buffer, metric_name, tags):
+    """
+    Record the seconds taken by the body of the with statement in the histogram `metric_name`.
+    """
+    start = time.time()
+    try:
+        yield
+    finally:
+        metrics_buffer.histogram(metric_name, time.time() - start, tags)
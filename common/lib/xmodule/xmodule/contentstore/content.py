@@ -7,6 +7,7 @@ XASSET_THUMBNAIL_TAIL_NAME = '.jpg'
 
 STREAM_DATA_CHUNK_SIZE = 1024
 
+import copy
 import os
 import logging
 import StringIO
@@ -21,7 +22,7 @@ from PIL import Image
 
 class StaticContent(object):
     def __init__(self, loc, name, content_type, data, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_hash=None):
         self.location = loc
         self.name = name  # a display string which can be edited, and thus not part of the location which needs to be fixed
         self.content_type = content_type
@@ -33,6 +34,8 @@ class StaticContent(object):
         # cycles
         self.import_path = import_path
         self.locked = locked
+        # the hash identifying the data, if the data is stored by its hash (and so may be shared with other content)
+        self.content_hash = content_hash
 
     @property
     def is_thumbnail(self):
@@ -71,6 +74,14 @@ class StaticContent(object):
     def data(self):
         return self._data
 
+    def replace_data(self, data):
+        """
+        Return a copy of this content with `data` as its data.
+        """
+        content = copy.copy(self)
+        content._data = data  # pylint: disable=protected-access
+        return content
+
     ASSET_URL_RE = re.compile(r"""
         /?c4x/
         (?P<org>[^/]+)/
@@ -171,12 +182,18 @@ class StaticContent(object):
 
 class StaticContentStream(StaticContent):
     def __init__(self, loc, name, content_type, stream, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_hash=None):
         super(StaticContentStream, self).__init__(loc, name, content_type, None, last_modified_at=last_modified_at,
                                                   thumbnail_location=thumbnail_location, import_path=import_path,
-                                                  length=length, locked=locked)
+                                                  length=length, locked=locked, content_hash=content_hash)
         self._stream = stream
 
+    def read(self, size=-1):
+        """
+        Read up to `size` bytes of the content from the stream, so that the content can be copied like a file.
+        """
+        return self._stream.read(size)
+
     def stream_data(self):
         while True:
             chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
@@ -206,7 +223,8 @@ class StaticContentStream(StaticContent):
         self._stream.seek(0)
         content = StaticContent(self.location, self.name, self.content_type, self._stream.read(),
                                 last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
-                                import_path=self.import_path, length=self.length, locked=self.locked)
+                                import_path=self.import_path, length=self.length, locked=self.locked,
+                                content_hash=self.content_hash)
         return content
 
 
@@ -1,21 +1,44 @@
 import pymongo
 import gridfs
 from gridfs.errors import NoFile
+from gridfs.grid_file import DEFAULT_CHUNK_SIZE
+from pymongo.errors import DuplicateKeyError
 
 from xmodule.contentstore.content import XASSET_LOCATION_TAG
 
+import hashlib
 import logging
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from functools import partial
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
+
+from bson.objectid import ObjectId
 
 from .content import StaticContent, ContentStore, StaticContentStream
 from xmodule.exceptions import NotFoundError
 from fs.osfs import OSFS
 import os
 import json
+from tempfile import SpooledTemporaryFile
 from bson.son import SON
 from opaque_keys.edx.keys import AssetKey
 from xmodule.modulestore.django import ASSET_IGNORE_REGEX
 from xmodule.util.misc import escape_invalid_characters
 
+# The number of assets to fetch from GridFS at once while exporting
+ASSET_EXPORT_WORKERS = 4
+
+# The GridFS bucket, within the asset bucket, of the content blobs which assets share by reference
+BLOB_BUCKET = 'blobs'
+# The attributes of a blob which the entries of the assets referencing it copy
+BLOB_FIELDS = ['content_hash', 'length', 'md5', 'chunkSize']
+# Content streamed into an asset is buffered in memory up to this size, and on disk beyond it, while it's hashed
+SAVE_SPOOL_SIZE = 1024 * 1024
+# How long a blob is left alone by collect_blobs after it's stored, as its asset may still be being saved
+BLOB_GRACE_PERIOD = timedelta(hours=1)
+
 
 class MongoContentStore(ContentStore):
 
@@ -47,6 +70,17 @@ class MongoContentStore(ContentStore):
         self.fs = gridfs.GridFS(_db, bucket)
 
         self.fs_files = _db[bucket + ".files"]  # the underlying collection GridFS uses
+        self.fs_chunks = _db[bucket + ".chunks"]
+
+        # Asset content is stored once, as a blob identified by the sha256 of the content and counting the
+        # assets which reference it; so identical content saved in many courses (or copied to a rerun) is
+        # shared. The fs_files entry of an asset holds the asset's attributes and the blob's content_hash, but
+        # no chunks of its own. (Assets saved before blobs were introduced have their own GridFS file, until
+        # they're moved with move_content_to_blobs.)
+        blob_bucket = '{}.{}'.format(bucket, BLOB_BUCKET)
+        self.blobs = gridfs.GridFS(_db, blob_bucket)
+        self.blob_files = _db[blob_bucket + ".files"]
+        self.blob_chunks = _db[blob_bucket + ".chunks"]
 
     def close_connections(self):
         """
@@ -65,38 +99,201 @@ class MongoContentStore(ContentStore):
     def save(self, content):
         content_id, content_son = self.asset_db_key(content.location)
 
-        # The way to version files in gridFS is to not use the file id as the _id but just as the filename.
-        # Then you can upload as many versions as you like and access by date or version. Because we use
-        # the location as the _id, we must delete before adding (there's no replace method in gridFS)
-        self.delete(content_id)  # delete is a noop if the entry doesn't exist; so, don't waste time checking
+        blob = self._store_blob(self._content_stream(content))
+        # Saving replaces any existing asset at the location (releasing its reference to its content)
+        self.delete(content_id)
 
         thumbnail_location = content.thumbnail_location.to_deprecated_list_repr() if content.thumbnail_location else None
-        with self.fs.new_file(_id=content_id, filename=unicode(content.location), content_type=content.content_type,
-                              displayname=content.name, content_son=content_son,
-                              thumbnail_location=thumbnail_location,
-                              import_path=content.import_path,
-                              # getattr b/c caching may mean some pickled instances don't have attr
-                              locked=getattr(content, 'locked', False)) as fp:
-            if hasattr(content.data, '__iter__'):
-                for chunk in content.data:
-                    fp.write(chunk)
-            else:
-                fp.write(content.data)
-
+        asset = {
+            '_id': content_id, 'filename': unicode(content.location), 'contentType': content.content_type,
+            'displayname': content.name, 'content_son': content_son,
+            'thumbnail_location': thumbnail_location,
+            'import_path': content.import_path,
+            # getattr b/c caching may mean some pickled instances don't have attr
+            'locked': getattr(content, 'locked', False),
+            'uploadDate': datetime.utcnow(),
+        }
+        asset.update((field, blob[field]) for field in BLOB_FIELDS)
+        self.fs_files.insert(asset)
+
+        content.content_hash = blob['content_hash']
         return content
 
+    @staticmethod
+    def _content_stream(content):
+        """
+        Return a seekable stream of the data of content.
+        """
+        if isinstance(content, StaticContentStream):
+            chunks = content.stream_data()
+        elif hasattr(content.data, '__iter__'):
+            chunks = content.data
+        else:
+            return BytesIO(content.data)
+
+        stream = SpooledTemporaryFile(max_size=SAVE_SPOOL_SIZE)
+        for chunk in chunks:
+            stream.write(chunk)
+        stream.seek(0)
+        return stream
+
     def delete(self, location_or_id):
         if isinstance(location_or_id, AssetKey):
             location_or_id, _ = self.asset_db_key(location_or_id)
         # Deletes of non-existent files are considered successful
-        self.fs.delete(location_or_id)
+        self._delete_asset(location_or_id)
+
+    def _delete_asset(self, content_id):
+        """
+        Delete the asset content_id, releasing its reference to its blob if its content is shared.
+
+        The asset's entry is removed atomically, and only the call which actually removed it releases
+        the reference; so concurrent deletes of the same asset can't release it twice (and free a blob
+        which other assets still reference).
+        """
+        asset = self.fs_files.find_and_modify({'_id': content_id}, remove=True, fields={'content_hash': True})
+        if asset is None:
+            return
+        content_hash = asset.get('content_hash')
+        if content_hash is None:
+            # the asset has its own GridFS file
+            self.fs_chunks.remove({'files_id': content_id})
+        else:
+            self._release_blob(content_hash)
+
+    def _get_file(self, content_id):
+        """
+        Return the GridFS file of the asset content_id, and the GridFS file holding its content: the
+        shared blob if the asset references one, or else the asset's own file.
+        """
+        fp = self.fs.get(content_id)
+        content_hash = getattr(fp, 'content_hash', None)
+        if content_hash is None:
+            return fp, fp
+        return fp, self.blobs.get_last_version(content_hash=content_hash)
+
+    def _store_blob(self, stream):
+        """
+        Add a reference to the blob of the content read from the seekable stream, storing the content
+        as a new blob only if there isn't one with the same content already, and return the blob's
+        BLOB_FIELDS.
+        """
+        sha = hashlib.sha256()
+        for chunk in iter(partial(stream.read, DEFAULT_CHUNK_SIZE), ''):
+            sha.update(chunk)
+        content_hash = sha.hexdigest()
+
+        blob = self._add_blob_reference(content_hash)
+        if blob is None:
+            stream.seek(0)
+            blob_id = ObjectId()
+            try:
+                self.blobs.put(stream, _id=blob_id, content_hash=content_hash, refcount=1)
+                blob = self.blob_files.find_one({'_id': blob_id}, BLOB_FIELDS)
+            except DuplicateKeyError:
+                # Someone else stored the same content meanwhile (caught by the unique index on content_hash)
+                self.blob_chunks.remove({'files_id': blob_id})
+                blob = self._add_blob_reference(content_hash)
+        return blob
+
+    def _add_blob_reference(self, content_hash):
+        """
+        Count one more reference to the blob content_hash, and return its BLOB_FIELDS; or return None
+        if there is no such blob.
+
+        The time of the reference is recorded as the blob's referencedAt, as the asset entry holding the
+        reference is only inserted afterwards (see collect_blobs).
+        """
+        return self.blob_files.find_and_modify(
+            {'content_hash': content_hash},
+            {'$inc': {'refcount': 1}, '$set': {'referencedAt': datetime.utcnow()}},
+            new=True, fields=BLOB_FIELDS
+        )
+
+    def _release_blob(self, content_hash):
+        """
+        Count one less reference to the blob content_hash, and delete it once nothing references it.
+        """
+        blob = self.blob_files.find_and_modify(
+            {'content_hash': content_hash}, {'$inc': {'refcount': -1}}, new=True, fields={'refcount': True}
+        )
+        if blob is not None and blob['refcount'] <= 0:
+            # Only delete the blob if it wasn't referenced again meanwhile
+            result = self.blob_files.remove({'_id': blob['_id'], 'refcount': {'$lte': 0}})
+            if result.get('n', 1):
+                self.blob_chunks.remove({'files_id': blob['_id']})
+
+    def _share_content(self, content_id):
+        """
+        Move the content of the asset content_id from the asset's own GridFS file into a blob,
+        and return the blob's content_hash; or return None if the asset was saved again (so that it
+        references the blob of its new content) or deleted meanwhile.
+        """
+        with self.fs.get(content_id) as fp:
+            content_hash = self._store_blob(fp)['content_hash']
+        # Point the asset at the blob before dropping its chunks, so that its content is always readable
+        result = self.fs_files.update(
+            {'_id': content_id, 'content_hash': {'$exists': False}}, {'$set': {'content_hash': content_hash}}
+        )
+        if not result.get('n', 1):
+            self._release_blob(content_hash)
+            return None
+        self.fs_chunks.remove({'files_id': content_id})
+        return content_hash
+
+    def move_content_to_blobs(self):
+        """
+        Move the content of every asset which still has its own GridFS file into a blob, so that all
+        identical content is stored once. Returns the number of assets moved.
+        """
+        # Collect the ids up front, as moving the assets' content changes the entries being iterated over
+        content_ids = [
+            self.make_id_son(asset)
+            for asset in self.fs_files.find({'content_hash': {'$exists': False}}, {'_id': True})
+        ]
+        for content_id in content_ids:
+            self._share_content(content_id)
+        return len(content_ids)
+
+    def collect_blobs(self, grace_period=BLOB_GRACE_PERIOD):
+        """
+        Reset the reference count of every blob to the number of assets referencing it, and delete the
+        blobs which no asset references (such as those left by interrupted saves or deletes).
+
+        A reference is counted in the blob before the asset entry holding it is inserted, so blobs which
+        were stored, or referenced, within the grace_period are left alone: the saves or copies adding
+        them may still be in flight. The grace_period must be longer than any save takes.
+
+        Returns the number of blobs deleted.
+        """
+        cutoff = datetime.utcnow() - grace_period
+        settled = {'uploadDate': {'$lt': cutoff}, 'referencedAt': {'$not': {'$gte': cutoff}}}
+        # Read the blobs before counting their references: any reference added or released after this
+        # changes the blob's refcount or referencedAt, and then the blob is skipped below.
+        blobs = list(self.blob_files.find(settled, {'content_hash': True, 'refcount': True}))
+        references = Counter(
+            asset['content_hash']
+            for asset in self.fs_files.find({'content_hash': {'$exists': True}}, {'content_hash': True})
+        )
+
+        deleted = 0
+        for blob in blobs:
+            unchanged = dict(settled, _id=blob['_id'], refcount=blob.get('refcount'))
+            count = references[blob.get('content_hash')]
+            if count == 0:
+                if self.blob_files.remove(unchanged).get('n', 1):
+                    self.blob_chunks.remove({'files_id': blob['_id']})
+                    deleted += 1
+            elif count != blob.get('refcount'):
+                self.blob_files.update(unchanged, {'$set': {'refcount': count}})
+        return deleted
 
     def find(self, location, throw_on_not_found=True, as_stream=False):
         content_id, __ = self.asset_db_key(location)
 
         try:
             if as_stream:
-                fp = self.fs.get(content_id)
+                fp, data = self._get_file(content_id)
                 thumbnail_location = getattr(fp, 'thumbnail_location', None)
                 if thumbnail_location:
                     thumbnail_location = location.course_key.make_asset_key(
@@ -104,13 +301,15 @@ class MongoContentStore(ContentStore):
                         thumbnail_location[4]
                     )
                 return StaticContentStream(
-                    location, fp.displayname, fp.content_type, fp, last_modified_at=fp.uploadDate,
+                    location, fp.displayname, fp.content_type, data, last_modified_at=fp.uploadDate,
                     thumbnail_location=thumbnail_location,
                     import_path=getattr(fp, 'import_path', None),
-                    length=fp.length, locked=getattr(fp, 'locked', False)
+                    length=fp.length, locked=getattr(fp, 'locked', False),
+                    content_hash=getattr(fp, 'content_hash', None)
                 )
             else:
-                with self.fs.get(content_id) as fp:
+                fp, data = self._get_file(content_id)
+                with data:
                     thumbnail_location = getattr(fp, 'thumbnail_location', None)
                     if thumbnail_location:
                         thumbnail_location = location.course_key.make_asset_key(
@@ -118,10 +317,11 @@ class MongoContentStore(ContentStore):
                             thumbnail_location[4]
                         )
                     return StaticContent(
-                        location, fp.displayname, fp.content_type, fp.read(), last_modified_at=fp.uploadDate,
+                        location, fp.displayname, fp.content_type, data.read(), last_modified_at=fp.uploadDate,
                         thumbnail_location=thumbnail_location,
                         import_path=getattr(fp, 'import_path', None),
-                        length=fp.length, locked=getattr(fp, 'locked', False)
+                        length=fp.length, locked=getattr(fp, 'locked', False),
+                        content_hash=getattr(fp, 'content_hash', None)
                     )
         except NoFile:
             if throw_on_not_found:
@@ -158,10 +358,26 @@ class MongoContentStore(ContentStore):
             assets_policy_file: the filename for the policy file which should be in the same
                 directory as the other policy files.
         """
+        if not os.path.exists(output_directory):
+            os.makedirs(output_directory)
+        policy = self.export_all_for_course_to_fs(course_key, OSFS(output_directory))
+
+        with open(assets_policy_file, 'w') as f:
+            json.dump(policy, f, sort_keys=True, indent=4)
+
+    def export_all_for_course_to_fs(self, course_key, output_fs, workers=ASSET_EXPORT_WORKERS):
+        """
+        Export all of this course's assets to the filesystem output_fs (such as an OSFS, or the
+        TarExportFS of a streaming export), and return the assets' attributes for the policy file.
+
+        Up to `workers` assets are opened in GridFS at once, while the opened ones are written in
+        order from this thread. The content of each is streamed to output_fs (with setcontents) a
+        chunk at a time, so no asset is held in memory as a whole.
+        """
         policy = {}
         assets, __ = self.get_all_content_for_course(course_key)
 
-        for asset in assets:
+        for asset, content in self._fetch_ahead(assets, workers):
             # TODO: On 6/19/14, I had to put a try/except around this
             # to export a course. The course failed on JSON files in
             # the /static/ directory placed in it with an import.
@@ -170,13 +386,40 @@ class MongoContentStore(ContentStore):
             #
             # When debugging course exports, this might be a good place
             # to look. -- pmitros
-            self.export(asset['asset_key'], output_directory)
+            output_path = os.path.dirname(content.import_path) if content.import_path is not None else ''
+            if output_path:
+                output_fs.makedir(output_path, recursive=True, allow_recreate=True)
+            # Escape invalid char from filename.
+            export_name = escape_invalid_characters(name=content.name, invalid_char_list=['/', '\\'])
+            try:
+                output_fs.setcontents(os.path.join(output_path, export_name), content)
+            finally:
+                content.close()
+
             for attr, value in asset.iteritems():
-                if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
+                if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key', 'content_hash']:
                     policy.setdefault(asset['asset_key'].name, {})[attr] = value
 
-        with open(assets_policy_file, 'w') as f:
-            json.dump(policy, f, sort_keys=True, indent=4)
+        return policy
+
+    def _fetch_ahead(self, assets, workers):
+        """
+        Yield each of assets with its content as a StaticContentStream, opening up to `workers` assets
+        ahead in a pool of threads.
+        """
+        pool = ThreadPool(workers)
+        try:
+            pending = deque()
+            for asset in assets:
+                pending.append((asset, pool.apply_async(partial(self.find, as_stream=True), (asset['asset_key'],))))
+                if len(pending) > workers:
+                    asset, result = pending.popleft()
+                    yield asset, result.get()
+            while pending:
+                asset, result = pending.popleft()
+                yield asset, result.get()
+        finally:
+            pool.terminate()
 
     def get_all_content_thumbnails_for_course(self, course_key):
         return self._get_all_content_for_course(course_key, get_thumbnails=True)[0]
@@ -198,10 +441,10 @@ class MongoContentStore(ContentStore):
                 ('{}.category'.format(prefix), 'asset'),
                 ('{}.name'.format(prefix), {'$regex': ASSET_IGNORE_REGEX}),
             ])
-            items = self.fs_files.find(query)
-            assets_to_delete = assets_to_delete + items.count()
-            for asset in items:
-                self.fs.delete(asset[prefix])
+            asset_ids = [self.make_id_son(asset) for asset in self.fs_files.find(query, {'_id': True})]
+            assets_to_delete = assets_to_delete + len(asset_ids)
+            for asset_id in asset_ids:
+                self._delete_asset(asset_id)
 
             self.fs_files.remove(query)
         return assets_to_delete
@@ -280,7 +523,7 @@ class MongoContentStore(ContentStore):
         :param location:  a c4x asset location
         """
         for attr in attr_dict.iterkeys():
-            if attr in ['_id', 'md5', 'uploadDate', 'length']:
+            if attr in ['_id', 'md5', 'uploadDate', 'length', 'content_hash']:
                 raise AttributeError("{} is a protected attribute.".format(attr))
         asset_db_key, __ = self.asset_db_key(location)
         # catch upsert error and raise NotFoundError if asset doesn't exist
@@ -308,14 +551,29 @@ class MongoContentStore(ContentStore):
         """
         See :meth:`.ContentStore.copy_all_course_assets`
 
-        This implementation fairly expensively copies all of the data
+        The copies share the content of the source assets by reference rather than copying it: the
+        content of each source asset is moved into a blob (unless it's already in one), which the copy
+        then references too. As assets' content is never modified in place (saving an asset replaces
+        it), the source and copy stay independent.
         """
         source_query = query_for_course(source_course_key)
-        # it'd be great to figure out how to do all of this on the db server and not pull the bits over
-        for asset in self.fs_files.find(source_query):
+        # Collect the ids up front, as sharing the assets' content changes the entries being iterated over
+        source_ids = [asset['_id'] for asset in self.fs_files.find(source_query, {'_id': True})]
+        for source_id in source_ids:
+            asset = self.fs_files.find_one({'_id': source_id})
+            if asset is not None and asset.get('content_hash') is None:
+                self._share_content(self.make_id_son(asset))
+                # the asset now references a blob, unless it was deleted meanwhile
+                asset = self.fs_files.find_one({'_id': source_id})
+            if asset is None or asset.get('content_hash') is None:
+                continue
+            content_hash = asset['content_hash']
+            # Reference the blob before inserting the copy, so that it can't be freed meanwhile
+            if self._add_blob_reference(content_hash) is None:
+                # the source asset was deleted, releasing the last reference to the blob, meanwhile
+                continue
+
             asset_key = self.make_id_son(asset)
-            # don't convert from string until fs access
-            source_content = self.fs.get(asset_key)
             if isinstance(asset_key, basestring):
                 asset_key = AssetKey.from_string(asset_key)
                 __, asset_key = self.asset_db_key(asset_key)
@@ -331,17 +589,15 @@ class MongoContentStore(ContentStore):
                     dest_course_key.make_asset_key(asset_key['category'], asset_key['name']).for_branch(None)
                 )
 
-            self.fs.put(
-                source_content.read(),
-                _id=asset_id, filename=asset['filename'], content_type=asset['contentType'],
-                displayname=asset['displayname'], content_son=asset_key,
-                # thumbnail is not technically correct but will be functionally correct as the code
-                # only looks at the name which is not course relative.
-                thumbnail_location=asset['thumbnail_location'],
-                import_path=asset['import_path'],
-                # getattr b/c caching may mean some pickled instances don't have attr
-                locked=asset.get('locked', False)
-            )
+            # The copy keeps all of the source's attributes, including the length and md5 of its content.
+            # thumbnail_location is not technically correct but will be functionally correct as the code
+            # only looks at the name which is not course relative.
+            asset.update(_id=asset_id, content_son=asset_key, uploadDate=datetime.utcnow())
+            try:
+                self.fs_files.insert(asset)
+            except Exception:
+                self._release_blob(content_hash)
+                raise
 
     def delete_all_course_assets(self, course_key):
         """
@@ -350,10 +606,9 @@ class MongoContentStore(ContentStore):
         :param course_key:
         """
         course_query = query_for_course(course_key)
-        matching_assets = self.fs_files.find(course_query)
-        for asset in matching_assets:
-            asset_key = self.make_id_son(asset)
-            self.fs.delete(asset_key)
+        asset_ids = [self.make_id_son(asset) for asset in self.fs_files.find(course_query, {'_id': True})]
+        for asset_id in asset_ids:
+            self._delete_asset(asset_id)
 
     # codifying the original order which pymongo used for the dicts coming out of location_to_dict
     # stability of order is more important than sanity of order as any changes to order make things
@@ -393,6 +648,8 @@ class MongoContentStore(ContentStore):
         return dbkey
 
     def ensure_indexes(self):
+        # Blobs are looked up by content_hash, and there must be only one blob for each content
+        self.blob_files.create_index('content_hash', unique=True, background=True)
         # Index needed thru 'category' by `_get_all_content_for_course` and others. That query also takes a sort
         # which can be `uploadDate`, `display_name`,
         self.fs_files.create_index(
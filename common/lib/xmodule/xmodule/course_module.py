@@ -1572,3 +1572,52 @@ class CourseDescriptor(CourseFields, SequenceDescriptor, LicenseMixin):
             if p.scheme != scheme
         ]
         self.user_partitions = other_partitions + partitions  # pylint: disable=attribute-defined-outside-init
+
+
+class CourseSummary(object):
+    """
+    A lightweight summary of a course, with the fields needed to list the course,
+    which a modulestore can construct without loading the course itself.
+    """
+    # The course settings fields that a summary holds.
+    course_info_fields = ['display_name', 'display_coursenumber', 'display_organization']
+
+    def __init__(self, location, display_name=u"Empty", display_coursenumber=None, display_organization=None):
+        """
+        Arguments:
+            location (UsageKey): The usage key of the course block.
+            display_name, display_coursenumber, display_organization: The course's values
+                of these fields, if they are set.
+        """
+        self.display_coursenumber = display_coursenumber
+        self.display_organization = display_organization
+        self.display_name = display_name
+
+        self.location = location
+
+    @property
+    def id(self):  # pylint: disable=invalid-name
+        """
+        Return the course's key.
+        """
+        return self.location.course_key
+
+    @property
+    def display_org_with_default(self):
+        """
+        Return a display organization if it has been specified, otherwise return the 'org' that
+        is in the location
+        """
+        if self.display_organization:
+            return self.display_organization
+        return self.location.org
+
+    @property
+    def display_number_with_default(self):
+        """
+        Return a display course number if it has been specified, otherwise return the 'course' that
+        is in the location
+        """
+        if self.display_coursenumber:
+            return self.display_coursenumber
+        return course_metadata_utils.number_for_course_location(self.location)
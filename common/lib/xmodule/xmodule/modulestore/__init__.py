@@ -1179,6 +1179,28 @@ class ModuleStoreReadBase(BulkOperationsMixin, ModuleStoreRead):
         """
         return {}
 
+    def get_course_summaries(self, **kwargs):
+        """
+        Returns a list of :class:`~xmodule.course_module.CourseSummary` objects for the courses
+        in this modulestore. This accepts the same optional 'org' argument as get_courses, and an
+        optional list of 'course_keys' to summarize only those courses.
+
+        Default impl--summarizes the loaded courses. Modulestores which can read the summary
+        fields without loading each course should override this.
+        """
+        from xmodule.course_module import CourseDescriptor, CourseSummary
+        course_keys = kwargs.pop('course_keys', None)
+        if course_keys is not None:
+            course_keys = set(course_keys)
+        return [
+            CourseSummary(
+                course.location,
+                **{field: getattr(course, field) for field in CourseSummary.course_info_fields}
+            )
+            for course in self.get_courses(**kwargs)
+            if isinstance(course, CourseDescriptor) and (course_keys is None or course.id in course_keys)
+        ]
+
     def get_course(self, course_id, depth=0, **kwargs):
         """
         See ModuleStoreRead.get_course
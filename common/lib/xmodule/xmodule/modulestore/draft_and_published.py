@@ -81,6 +81,17 @@ class ModuleStoreDraftAndPublished(BranchSettingMixin):
     def has_changes(self, xblock):
         raise NotImplementedError
 
+    @abstractmethod
+    def get_subtree_changes(self, xblock, published_versions=None):
+        """
+        Returns a dict mapping the (block type, block id) of each block in the subtree rooted at
+        xblock to whether that block has changes, as has_changes would return for it.
+
+        If a dict is passed as published_versions, it is filled in with whether each block in the
+        subtree has a published version, as has_published_version would return for it.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def publish(self, location, user_id):
         raise NotImplementedError
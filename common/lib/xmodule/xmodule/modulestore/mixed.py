@@ -280,6 +280,23 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
                     courses[course_id] = course
         return courses.values()
 
+    @strip_key
+    def get_course_summaries(self, **kwargs):
+        """
+        Returns a list containing the CourseSummary objects of the courses in this modulestore,
+        which are built without loading the courses. If a list of course_keys is given, only
+        those courses are summarized.
+        """
+        course_summaries = {}
+        for store in self.modulestores:
+            # filter out ones which were fetched from earlier stores but locations may not be ==
+            for course_summary in store.get_course_summaries(**kwargs):
+                course_id = self._clean_locator_for_mapping(course_summary.id)
+                if course_id not in course_summaries:
+                    # course is indeed unique. save it in result
+                    course_summaries[course_id] = course_summary
+        return course_summaries.values()
+
     @strip_key
     def get_libraries(self, **kwargs):
         """
@@ -474,12 +491,15 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
             with self.bulk_operations(dest_course_key):
                 # Get all the asset metadata in the source course.
                 all_assets = source_store.get_all_asset_metadata(source_course_key, 'asset')
-                # Store it all in the dest course.
+                # Store it all in the dest course, at once.
+                copied_assets = []
                 for asset in all_assets:
                     new_asset_key = dest_course_key.make_asset_key('asset', asset.asset_id.path)
                     copied_asset = AssetMetadata(new_asset_key)
                     copied_asset.from_storable(asset.to_storable())
-                    dest_store.save_asset_metadata(copied_asset, user_id)
+                    copied_assets.append(copied_asset)
+                if copied_assets:
+                    dest_store.save_asset_metadata_list(copied_assets, user_id)
         else:
             # Courses in the same modulestore can be handled by the modulestore itself.
             source_store.copy_all_asset_metadata(source_course_key, dest_course_key, user_id)
@@ -707,6 +727,15 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         store = self._verify_modulestore_support(course_key, 'import_xblock')
         return store.import_xblock(user_id, course_key, block_type, block_id, fields, runtime)
 
+    def import_xblocks(self, user_id, course_key, blocks, **kwargs):
+        """
+        See :py:meth `SplitMongoModuleStore.import_xblocks`
+
+        Defer to the course's modulestore if it supports this method
+        """
+        store = self._verify_modulestore_support(course_key, 'import_xblocks')
+        return store.import_xblocks(user_id, course_key, blocks)
+
     @strip_key
     def copy_from_template(self, source_keys, dest_key, user_id, **kwargs):
         """
@@ -854,6 +883,15 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         store = self._verify_modulestore_support(xblock.location.course_key, 'has_changes')
         return store.has_changes(xblock)
 
+    def get_subtree_changes(self, xblock, published_versions=None):
+        """
+        Returns a dict mapping the (block type, block id) of each block in the subtree rooted at
+        xblock to whether that block has unpublished changes. If a dict is passed as
+        published_versions, it is filled in with whether each block has a published version.
+        """
+        store = self._verify_modulestore_support(xblock.location.course_key, 'get_subtree_changes')
+        return store.get_subtree_changes(xblock, published_versions)
+
     def check_supports(self, course_key, method):
         """
         Verifies that the modulestore for a particular course supports a feature.
@@ -15,7 +15,6 @@ structure:
 import pymongo
 import sys
 import logging
-import copy
 import re
 from uuid import uuid4
 
@@ -39,6 +38,7 @@ from xblock.fields import Scope, ScopeIds, Reference, ReferenceList, ReferenceVa
 from xblock.runtime import KvsFieldData
 
 from xmodule.assetstore import AssetMetadata, CourseAssetsFromStorage
+from xmodule.course_module import CourseSummary
 from xmodule.error_module import ErrorDescriptor
 from xmodule.errortracker import null_error_tracker, exc_info_to_str
 from xmodule.exceptions import HeartbeatFailure
@@ -48,6 +48,7 @@ from xmodule.modulestore.draft_and_published import ModuleStoreDraftAndPublished
 from xmodule.modulestore.edit_info import EditInfoRuntimeMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError
 from xmodule.modulestore.inheritance import InheritanceMixin, inherit_metadata, InheritanceKeyValueStore
+from xmodule.modulestore.mongo.inheritance_tree import MetadataInheritanceTree
 from xmodule.modulestore.xml import CourseLocationManager
 from xmodule.services import SettingsService
 
@@ -182,7 +183,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
             unicode(self.course_id),
             [unicode(key) for key in self.module_data.keys()],
             self.default_class,
-            [unicode(key) for key in self.cached_metadata.keys()],
+            self.cached_metadata,
         ))
 
     def __init__(self, modulestore, course_key, module_data, default_class, cached_metadata, **kwargs):
@@ -197,7 +198,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         default_class: The default_class to use when loading an
             XModuleDescriptor from the module_data
 
-        cached_metadata: the cache for handling inheritance computation. internal use only
+        cached_metadata: the MetadataInheritanceTree for handling inheritance computation. internal use only
 
         resources_fs: a filesystem, as per MakoDescriptorSystem
 
@@ -261,7 +262,8 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 parent = None
                 if self.cached_metadata is not None:
                     # fish the parent out of here if it's available
-                    parent_url = self.cached_metadata.get(unicode(location), {}).get('parent', {}).get(
+                    parent_url = self.cached_metadata.parent(
+                        unicode(location),
                         ModuleStoreEnum.Branch.published_only if location.revision is None
                         else ModuleStoreEnum.Branch.draft_preferred
                     )
@@ -300,7 +302,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
 
                     # Convert the serialized fields values in self.cached_metadata
                     # to python values
-                    metadata_to_inherit = self.cached_metadata.get(unicode(non_draft_loc), {})
+                    metadata_to_inherit = self.cached_metadata.inherited_metadata(unicode(non_draft_loc))
                     inherit_metadata(module, metadata_to_inherit)
 
                 module._edit_info = json_data.get('edit_info')
@@ -676,21 +678,12 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             return ParentLocationCache()
 
-    def _compute_metadata_inheritance_tree(self, course_id):
-        '''
-        Find all inheritable fields from all xblocks in the course which may define inheritable data
-        '''
-        # get all collections in the course, this query should not return any leaf nodes
-        course_id = self.fill_in_run(course_id)
-        query = SON([
-            ('_id.tag', 'i4x'),
-            ('_id.org', course_id.org),
-            ('_id.course', course_id.course),
-            ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
-        ])
-        # if we're only dealing in the published branch, then only get published containers
-        if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
-            query['_id.revision'] = None
+    def _query_inheritable_metadata(self, course_id, query):
+        """
+        Return the inheritable metadata and children of the containers in course_id matching query,
+        as a dict of {location url: (metadata, list of child urls)} merging the draft and published
+        versions of each container, and the url of the course (or None if it didn't match).
+        """
         # we just want the Location, children, and inheritable metadata
         record_filter = {'_id': 1, 'definition.children': 1}
 
@@ -699,120 +692,162 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         for field_name in InheritanceMixin.fields:
             record_filter['metadata.{0}'.format(field_name)] = 1
 
-        # call out to the DB
-        resultset = self.collection.find(query, record_filter)
-
         # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
         # is a dictionary relative to that course
         results_by_url = {}
         root = None
-
-        # now go through the results and order them by the location url
-        for result in resultset:
+        for result in self.collection.find(query, record_filter):
             # manually pick it apart b/c the db has tag and we want as_published revision regardless
             location = as_published(Location._from_deprecated_son(result['_id'], course_id.run))
-
             location_url = unicode(location)
+            if location.category == 'course':
+                root = location_url
+            children = result.get('definition', {}).get('children', [])
             if location_url in results_by_url:
                 # found either draft or live to complement the other revision
                 # FIXME this is wrong. If the child was moved in draft from one parent to the other, it will
                 # show up under both in this logic: https://openedx.atlassian.net/browse/TNL-1075
-                existing_children = results_by_url[location_url].get('definition', {}).get('children', [])
-                additional_children = result.get('definition', {}).get('children', [])
-                total_children = existing_children + additional_children
-                # use set to get rid of duplicates. We don't care about order; so, it shouldn't matter.
-                results_by_url[location_url].setdefault('definition', {})['children'] = set(total_children)
+                existing_children = results_by_url[location_url][1]
+                existing_children.extend(child for child in children if child not in existing_children)
             else:
-                results_by_url[location_url] = result
-            if location.category == 'course':
-                root = location_url
+                results_by_url[location_url] = (result.get('metadata', {}), list(children))
+        return results_by_url, root
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
+    def _container_query(self, course_id):
+        """
+        Return a query for the containers in course_id in the current branch.
+        """
+        query = SON([
+            ('_id.tag', 'i4x'),
+            ('_id.org', course_id.org),
+            ('_id.course', course_id.course),
+            ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
+        ])
+        # if we're only dealing in the published branch, then only get published containers
+        if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
+            query['_id.revision'] = None
+        return query
 
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
+    def _compute_metadata_inheritance_tree(self, course_id):
+        '''
+        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        '''
+        # get all collections in the course, this query should not return any leaf nodes
+        course_id = self.fill_in_run(course_id)
+        results_by_url, root = self._query_inheritable_metadata(course_id, self._container_query(course_id))
+
+        # now add the containers to the tree, from the root down, so that only the containers
+        # in the course's tree are included
+        tree = MetadataInheritanceTree(self.get_branch_setting())
+        pending = [root] if root is not None else []
+        while pending:
+            url = pending.pop()
+            if url not in results_by_url:
+                # already added, as the child of another container
+                continue
+            metadata, children = results_by_url.pop(url)
+            tree.set_container(url, metadata, children)
+            pending.extend(child for child in children if child in results_by_url)
 
-        if root is not None:
-            _compute_inherited_metadata(root)
+        return tree
 
-        return metadata_to_inherit
+    def _update_metadata_inheritance_tree(self, tree, location):
+        """
+        Update the container at location in tree (a MetadataInheritanceTree for the current branch)
+        from the db, and return tree.
+        """
+        course_id = self.fill_in_run(location.course_key)
+        query = self._container_query(course_id)
+        query['_id.category'] = location.category
+        query['_id.name'] = location.name
+        url = unicode(as_published(location))
+        results_by_url, __ = self._query_inheritable_metadata(course_id, query)
+        metadata, children = results_by_url.get(url, ({}, []))
+        tree.set_container(url, metadata, children)
+        return tree
 
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
         Compute the metadata inheritance for the course.
         '''
-        tree = {}
+        tree = None
 
         course_id = self.fill_in_run(course_id)
         if not force_refresh:
-            # see if we are first in the request cache (if present)
-            if self.request_cache is not None and unicode(course_id) in self.request_cache.data.get('metadata_inheritance', {}):
-                return self.request_cache.data['metadata_inheritance'][unicode(course_id)]
+            tree = self._find_cached_metadata_inheritance_tree(course_id)
 
-            # then look in any caching subsystem (e.g. memcached)
-            if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
-            else:
-                logging.warning(
-                    'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
-                    OK in localdev and testing environment. Not OK in production.'
-                )
-
-        if not tree:
+        if tree is None:
             # if not in subsystem, or we are on force refresh, then we have to compute
             tree = self._compute_metadata_inheritance_tree(course_id)
+            self._cache_metadata_inheritance_tree(course_id, tree)
+
+        return tree
+
+    def _find_cached_metadata_inheritance_tree(self, course_id):
+        '''
+        Return the cached metadata inheritance tree for the course, or None if it isn't cached.
+        '''
+        # see if we are first in the request cache (if present)
+        if self.request_cache is not None and unicode(course_id) in self.request_cache.data.get('metadata_inheritance', {}):
+            return self.request_cache.data['metadata_inheritance'][unicode(course_id)]
+
+        # then look in any caching subsystem (e.g. memcached)
+        if self.metadata_inheritance_cache_subsystem is None:
+            logging.warning(
+                'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
+                OK in localdev and testing environment. Not OK in production.'
+            )
+            return None
+        tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id))
+        # trees cached by earlier releases are dicts, which are recomputed
+        if not isinstance(tree, MetadataInheritanceTree) or not tree:
+            return None
 
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+        # after a memcache hit, put it into the request_cache
+        if self.request_cache is not None:
+            self.request_cache.data.setdefault('metadata_inheritance', {})[unicode(course_id)] = tree
+        return tree
+
+    def _cache_metadata_inheritance_tree(self, course_id, tree):
+        '''
+        Store the metadata inheritance tree for the course in the caches.
+        '''
+        # write out the tree to caching subsystem (e.g. memcached), if available
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
 
-        # now populate a request_cache, if available. NOTE, we are outside of the
-        # scope of the above if: statement so that after a memcache hit, it'll get
-        # put into the request_cache
+        # now populate a request_cache, if available
         if self.request_cache is not None:
             # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
             # defined
-            if 'metadata_inheritance' not in self.request_cache.data:
-                self.request_cache.data['metadata_inheritance'] = {}
-            self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
-
-        return tree
+            self.request_cache.data.setdefault('metadata_inheritance', {})[unicode(course_id)] = tree
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, location=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
+        If given the location of the only xblock which changed, and the tree is cached, only that
+        xblock's entry in the cached tree is refreshed (which is a no-op unless it's a container);
+        otherwise, the whole tree is recomputed.
+
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
         """
         course_id = course_id.for_branch(None)
         if not self._is_in_bulk_operation(course_id):
-            # below is done for side effects when runtime is None
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+            cached_metadata = None
+            if location is not None:
+                course_id = self.fill_in_run(course_id)
+                cached_metadata = self._find_cached_metadata_inheritance_tree(course_id)
+                if cached_metadata is not None and cached_metadata.branch != self.get_branch_setting():
+                    cached_metadata = None
+                elif cached_metadata is not None and location.category in BLOCK_TYPES_WITH_CHILDREN:
+                    self._update_metadata_inheritance_tree(cached_metadata, location)
+                    self._cache_metadata_inheritance_tree(course_id, cached_metadata)
+            if cached_metadata is None:
+                # below is done for side effects when runtime is None
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
@@ -907,7 +942,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         root = self.fs_root / data_dir
         resource_fs = _OSFS_INSTANCE.setdefault(root, OSFS(root, create=True))
 
-        cached_metadata = {}
+        cached_metadata = MetadataInheritanceTree()
         if apply_cached_metadata:
             cached_metadata = self._get_cached_metadata_inheritance_tree(course_key)
 
@@ -943,7 +978,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             system = using_descriptor_system
             system.module_data.update(data_cache)
-            system.cached_metadata.update(cached_metadata)
+            if apply_cached_metadata:
+                system.cached_metadata = cached_metadata
 
         return system.load_item(location, for_parent=for_parent)
 
@@ -1012,6 +1048,39 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         )
         return [course for course in base_list if not isinstance(course, ErrorDescriptor)]
 
+    @autoretry_read()
+    def get_course_summaries(self, **kwargs):
+        """
+        Returns a list of CourseSummary objects for the courses in this modulestore, built from
+        the course records' metadata without loading the courses. This accepts the same optional
+        'org' argument as get_courses, and an optional list of 'course_keys' to summarize only those courses.
+        """
+        query = {'_id.category': 'course'}
+        if kwargs.get('org'):
+            query['_id.org'] = kwargs['org']
+        if kwargs.get('course_keys') is not None:
+            course_keys = list(kwargs['course_keys'])
+            if not course_keys:
+                return []
+            query['$or'] = [
+                {'_id.org': course_key.org, '_id.course': course_key.course, '_id.name': course_key.run}
+                for course_key in course_keys
+            ]
+        fields = {'_id': True}
+        fields.update(('metadata.{}'.format(field), True) for field in CourseSummary.course_info_fields)
+
+        course_summaries = []
+        for course in self.collection.find(query, fields):
+            if course['_id']['org'] == 'edx' and course['_id']['course'] == 'templates':
+                continue
+            course_key = SlashSeparatedCourseKey(course['_id']['org'], course['_id']['course'], course['_id']['name'])
+            metadata = course.get('metadata', {})
+            course_summaries.append(CourseSummary(
+                course_key.make_usage_key('course', course['_id']['name']),
+                **{field: metadata[field] for field in CourseSummary.course_info_fields if field in metadata}
+            ))
+        return course_summaries
+
     def _find_one(self, location):
         '''Look for a given location in the collection. If the item is not present, raise
         ItemNotFoundError.
@@ -1283,7 +1352,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 resources_fs=None,
                 error_tracker=self.error_tracker,
                 render_template=self.render_template,
-                cached_metadata={},
+                cached_metadata=MetadataInheritanceTree(),
                 mixins=self.xblock_mixins,
                 select=self.xblock_select,
                 services=services,
@@ -1474,7 +1543,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             xblock._edit_info = payload['edit_info']
 
             # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime, xblock.scope_ids.usage_id
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
@@ -0,0 +1,142 @@
+"""
+The metadata inheritance tree of a course in the old Mongo modulestore.
+"""
+from array import array
+import cPickle as pickle
+import zlib
+
+
+class MetadataInheritanceTree(object):
+    """
+    The parent of each xblock in a course, and the inheritable metadata each xblock inherits.
+
+    Rather than a copy of the inherited metadata for every xblock, this stores only the
+    inheritable metadata which each container sets itself (its overrides), and a pointer from
+    each xblock to its parent. The metadata an xblock inherits is found by following parent
+    pointers up the tree; it is resolved once per container and shared by all of the
+    container's children, so no metadata is copied for leaves or for containers which
+    don't override anything.
+
+    Xblocks are identified by the unicode of their published Location. The tree pickles to
+    a zlib compressed form, with each url stored once and the parent pointers as an array
+    of indexes into those urls.
+    """
+    # Bump this when changing the pickled form, so that trees cached in the old form are recomputed
+    VERSION = 1
+
+    def __init__(self, branch=None):
+        """
+        branch: the branch setting of the modulestore when the tree was computed. Parent
+            pointers are only returned for this branch.
+        """
+        self.branch = branch
+        # child url -> parent url
+        self._parents = {}
+        # container url -> list of child urls
+        self._children = {}
+        # container url -> the inheritable metadata the container sets
+        self._overrides = {}
+        # container url -> the metadata the container's children inherit; this isn't pickled
+        self._resolved = {}
+
+    def __nonzero__(self):
+        return bool(self._children)
+
+    def __len__(self):
+        return len(self._children)
+
+    def __repr__(self):
+        return "MetadataInheritanceTree<{!r}, {} containers, {} xblocks>".format(
+            self.branch, len(self._children), len(self._parents)
+        )
+
+    def set_container(self, url, metadata, children):
+        """
+        Set the inheritable metadata set by the container at `url`, and its children. Any
+        xblocks which were children of the container and aren't in `children` are detached
+        from it.
+        """
+        for child in self._children.get(url, ()):
+            if self._parents.get(child) == url:
+                del self._parents[child]
+        self._children[url] = list(children)
+        for child in self._children[url]:
+            self._parents[child] = url
+        if metadata:
+            self._overrides[url] = metadata
+        else:
+            self._overrides.pop(url, None)
+        # Resolution is lazy, so it's cheaper to forget all of it than to find the affected subtree.
+        self._resolved = {}
+
+    def parent(self, url, branch):
+        """
+        Return the url of the parent of the xblock at `url` in `branch`, or None if it isn't known.
+        """
+        if branch != self.branch:
+            return None
+        return self._parents.get(url)
+
+    def inherited_metadata(self, url):
+        """
+        Return the metadata that the xblock at `url` inherits from its ancestors. The returned
+        dict is shared with the xblock's siblings, so it mustn't be modified.
+        """
+        parent = self._parents.get(url)
+        if parent is None:
+            return {}
+        return self._resolve(parent)
+
+    def _resolve(self, url):
+        """
+        Return the metadata that the children of the container at `url` inherit.
+        """
+        resolved = self._resolved.get(url)
+        if resolved is not None:
+            return resolved
+
+        # Walk up to the nearest resolved ancestor (or the root), then resolve back down.
+        unresolved = []
+        node = url
+        while node is not None and node not in self._resolved and node not in unresolved:
+            unresolved.append(node)
+            node = self._parents.get(node)
+        resolved = self._resolved.get(node, {})
+        for node in reversed(unresolved):
+            overrides = self._overrides.get(node)
+            if overrides:
+                resolved = dict(resolved)
+                resolved.update(overrides)
+            self._resolved[node] = resolved
+        return resolved
+
+    def __getstate__(self):
+        urls = list(set(self._parents) | set(self._children))
+        index = {url: position for position, url in enumerate(urls)}
+        parents = array('l', [-1] * len(urls))
+        for child, parent in self._parents.iteritems():
+            parents[index[child]] = index[parent]
+        overrides = [(index[url], metadata) for url, metadata in self._overrides.iteritems()]
+        containers = [index[url] for url in self._children]
+        return zlib.compress(pickle.dumps(
+            (self.VERSION, self.branch, urls, parents.tostring(), containers, overrides),
+            pickle.HIGHEST_PROTOCOL
+        ))
+
+    def __setstate__(self, state):
+        state = pickle.loads(zlib.decompress(state))
+        self.__init__(state[1])
+        if state[0] != self.VERSION:
+            # Leave the tree empty, so that it's recomputed
+            return
+        urls, parents, containers, overrides = state[2:]
+        parent_indexes = array('l')
+        parent_indexes.fromstring(parents)
+        for position in containers:
+            self._children[urls[position]] = []
+        for position, parent in enumerate(parent_indexes):
+            if parent != -1:
+                self._parents[urls[position]] = urls[parent]
+                self._children[urls[parent]].append(urls[position])
+        for position, metadata in overrides:
+            self._overrides[urls[position]] = metadata
@@ -95,6 +95,14 @@ class QueryTimer(object):
         """
         self._metric_base = metric_base
         self._sample_rate = sample_rate
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """
+        Call ``listener(metric_name, duration)`` at the end of every block timed by this
+        :class:`QueryTimer`, for instance to attribute queries to the current request.
+        """
+        self._listeners.append(listener)
 
     @contextmanager
     def timer(self, metric_name, course_context):
@@ -140,6 +148,8 @@ class QueryTimer(object):
                 tags=tags,
                 sample_rate=tagger.sample_rate,
             )
+            for listener in self._listeners:
+                listener(metric_name, end - start)
 
 
 TIMER = QueryTimer(__name__, 0.01)
@@ -353,6 +363,30 @@ class MongoConnection(object):
             tagger.measure("structures", len(docs))
             return docs
 
+    @autoretry_read()
+    def find_root_blocks(self, ids, block_type, course_context=None):
+        """
+        Return the root block of each structure specified in ``ids``, without loading the
+        structures' other blocks, as a dict mapping structure id to a (BlockKey, fields) pair.
+
+        Arguments:
+            ids (list): A list of structure ids
+            block_type (str): The block type of the structures' root blocks, of which each
+                structure has exactly one
+        """
+        with TIMER.timer("find_root_blocks", course_context) as tagger:
+            tagger.measure("requested_ids", len(ids))
+            root_blocks = {}
+            for structure in self.structures.find(
+                    {'_id': {'$in': ids}},
+                    {'blocks': {'$elemMatch': {'block_type': block_type}}},
+            ):
+                if structure.get('blocks'):
+                    block = structure['blocks'][0]
+                    root_blocks[structure['_id']] = (BlockKey(block['block_type'], block['block_id']), block['fields'])
+            tagger.measure("structures", len(root_blocks))
+            return root_blocks
+
     @autoretry_read()
     def find_structures_derived_from(self, ids, course_context=None):
         """
@@ -423,7 +457,9 @@ class MongoConnection(object):
                 }
             return self.course_index.find_one(query)
 
-    def find_matching_course_indexes(self, branch=None, search_targets=None, org_target=None, course_context=None):
+    def find_matching_course_indexes(
+            self, branch=None, search_targets=None, org_target=None, course_context=None, course_keys=None
+    ):
         """
         Find the course_index matching particular conditions.
 
@@ -433,6 +469,8 @@ class MongoConnection(object):
                 that must exist in the search_targets of the returned courses
             org_target: If specified, this is an ORG filter so that only course_indexs are
                 returned for the specified ORG
+            course_keys: If specified, only the course_indexes of these (non-empty) course keys
+                are returned
         """
         with TIMER.timer("find_matching_course_indexes", course_context):
             query = {}
@@ -446,6 +484,12 @@ class MongoConnection(object):
             if org_target:
                 query['org'] = org_target
 
+            if course_keys is not None:
+                query['$or'] = [
+                    {'org': course_key.org, 'course': course_key.course, 'run': course_key.run}
+                    for course_key in course_keys
+                ]
+
             return self.course_index.find(query)
 
     def insert_course_index(self, course_index, course_context=None):
@@ -518,6 +562,14 @@ class MongoConnection(object):
             tagger.tag(block_type=definition['block_type'])
             self.definitions.insert(definition)
 
+    def insert_definitions(self, definitions, course_context=None):
+        """
+        Create the definitions in the db with a single batch insert
+        """
+        with TIMER.timer("insert_definitions", course_context) as tagger:
+            tagger.measure('definitions', len(definitions))
+            self.definitions.insert(definitions)
+
     def ensure_indexes(self):
         """
         Ensure that all appropriate indexes are created that are needed by this modulestore, or raise
@@ -56,6 +56,7 @@ Representation:
 import copy
 import datetime
 import hashlib
+import json
 import logging
 from contracts import contract, new_contract
 from importlib import import_module
@@ -82,9 +83,10 @@ from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
 from xmodule.error_module import ErrorDescriptor
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from types import NoneType
 from xmodule.assetstore import AssetMetadata
+from xmodule.course_module import CourseSummary
 
 
 log = logging.getLogger(__name__)
@@ -445,6 +447,21 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         else:
             self.db_connection.insert_definition(definition, course_key)
 
+    def insert_definitions(self, course_key, definitions):
+        """
+        Insert new definitions into the db in a single batch. Unlike update_definition, this doesn't
+        wait for the end of the bulk operation, so that the definitions aren't inserted one at a time
+        then; they're cached in the active bulk operation on course_key as already being in the db.
+        """
+        if not definitions:
+            return
+        self.db_connection.insert_definitions(definitions, course_key)
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        if bulk_write_record.active:
+            for definition in definitions:
+                bulk_write_record.definitions[definition['_id']] = definition
+                bulk_write_record.definitions_in_db.add(definition['_id'])
+
     def version_structure(self, course_key, structure, user_id):
         """
         Copy the structure and update the history info (edited_by, edited_on, previous_version)
@@ -489,16 +506,18 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
             block_data.edit_info.original_usage = original_usage
             block_data.edit_info.original_usage_version = original_usage_version
 
-    def find_matching_course_indexes(self, branch=None, search_targets=None, org_target=None):
+    def find_matching_course_indexes(self, branch=None, search_targets=None, org_target=None, course_keys=None):
         """
         Find the course_indexes which have the specified branch and search_targets. An optional org_target
         can be specified to apply an ORG filter to return only the courses that are part of
-        that ORG.
+        that ORG, and an optional (non-empty) list of course_keys to return only the indexes of those courses.
 
         Returns:
             a Cursor if there are no changes in flight or a list if some have changed in current bulk op
         """
-        indexes = self.db_connection.find_matching_course_indexes(branch, search_targets, org_target)
+        indexes = self.db_connection.find_matching_course_indexes(
+            branch, search_targets, org_target, course_keys=course_keys
+        )
 
         def _replace_or_append_index(altered_index):
             """
@@ -531,6 +550,13 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
                 if record.index['org'] != org_target:
                     continue
 
+            if course_keys is not None:
+                if not any(
+                    all(record.index[attr] == getattr(course_key, attr) for attr in ['org', 'course', 'run'])
+                    for course_key in course_keys
+                ):
+                    continue
+
             if not hasattr(indexes, 'append'):  # Just in time conversion to list from cursor
                 indexes = list(indexes)
 
@@ -561,6 +587,31 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         structures.extend(self.db_connection.find_structures_by_id(list(ids)))
         return structures
 
+    def find_root_blocks(self, ids, block_type):
+        """
+        Return the root block of each structure specified in ``ids``, without loading the
+        structures' other blocks, as a dict mapping structure id to a (BlockKey, fields) pair.
+
+        If a structure with the same id is in both the cache and the database,
+        the cached version will be preferred.
+
+        Arguments:
+            ids (list): A list of structure ids
+            block_type (str): The block type of the structures' root blocks
+        """
+        root_blocks = {}
+        ids = set(ids)
+
+        for _, record in self._active_records:
+            for structure in record.structures.values():
+                structure_id = structure.get('_id')
+                if structure_id in ids:
+                    ids.remove(structure_id)
+                    root_blocks[structure_id] = (structure['root'], structure['blocks'][structure['root']].fields)
+
+        root_blocks.update(self.db_connection.find_root_blocks(list(ids), block_type))
+        return root_blocks
+
     def find_structures_derived_from(self, ids):
         """
         Return all structures that were immediately derived from a structure listed in ``ids``.
@@ -931,6 +982,48 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # get the blocks for each course index (s/b the root)
         return self._get_structures_for_branch_and_locator(branch, self._create_course_locator, **kwargs)
 
+    @autoretry_read()
+    def get_course_summaries(self, branch, **kwargs):
+        """
+        Returns a list of CourseSummary objects for the courses matching any given qualifiers, built
+        from the course indexes and the root blocks of their structures without loading the courses.
+
+        qualifiers should be a dict of keywords matching the db fields or any
+        legal query for mongo to use against the active_versions collection.
+        If a list of course_keys is given, only those courses are summarized.
+
+        :param branch: the branch for which to return course summaries.
+        """
+        course_keys = kwargs.get('course_keys')
+        if course_keys is not None:
+            course_keys = list(course_keys)
+            if not course_keys:
+                return []
+        matching_indexes = self.find_matching_course_indexes(
+            branch,
+            search_targets=None,
+            org_target=kwargs.get('org'),
+            course_keys=course_keys,
+        )
+        # Several courses can share a structure version (e.g. a course and its reruns), so map each
+        # version to all of the indexes pointing at it
+        id_version_map = defaultdict(list)
+        for course_index in matching_indexes:
+            id_version_map[course_index['versions'][branch]].append(course_index)
+        if not id_version_map:
+            return []
+
+        course_summaries = []
+        root_blocks = self.find_root_blocks(id_version_map.keys(), 'course')
+        for version_guid, (root, fields) in root_blocks.iteritems():
+            for course_index in id_version_map[version_guid]:
+                locator = self._create_course_locator(course_index, branch)
+                course_summaries.append(CourseSummary(
+                    locator.make_usage_key(root.type, root.id),
+                    **{field: fields[field] for field in CourseSummary.course_info_fields if field in fields}
+                ))
+        return course_summaries
+
     def get_libraries(self, branch="library", **kwargs):
         """
         Returns a list of "library" root blocks matching any given qualifiers.
@@ -1610,8 +1703,9 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         """
         See :meth: `.ModuleStoreWrite.clone_course` for documentation.
 
-        In split, other than copying the assets, this is cheap as it merely creates a new version of the
-        existing course.
+        In split, this is cheap as it merely creates a new course index pointing at the existing course's
+        structures, so the two courses share their structures and definitions until either is changed. The
+        assets' content is shared by reference too (see :meth:`.MongoContentStore.copy_all_course_assets`).
         """
         source_index = self.get_course_index_info(source_course_id)
         if source_index is None:
@@ -1916,6 +2010,119 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             else:
                 return None
 
+    def import_xblocks(self, user_id, course_key, blocks, **kwargs):
+        """
+        Import many xblocks into the course's branch at once, as a single new version of its structure.
+
+        Each of `blocks` is a (block_type, block_id, fields) tuple, and the block completely overwrites any
+        existing block of the same id, as import_xblock does. Rather than creating or updating the blocks one
+        at a time, this builds the new structure and all of the new definitions in memory. A block whose content
+        hasn't changed keeps its definition, and content which matches the definition of another of the
+        existing blocks (by a hash of the content) shares it; the remaining new definitions are inserted in a
+        single batch. If no block changed, no new version is made.
+
+        Returns the BlockKeys of the imported blocks, in the order given.
+        """
+        with self.bulk_operations(course_key):
+            index_entry = self._get_index_if_valid(course_key, force=True)
+            original_structure = self._lookup_course(course_key).structure
+            original_blocks = original_structure['blocks']
+
+            imported = OrderedDict()
+            for block_type, block_id, fields in blocks:
+                block_key = BlockKey(block_type, block_id)
+                # the same block may occur under 2 parents
+                if block_key not in imported:
+                    imported[block_key] = self.partition_fields_by_scope(block_type, fields)
+
+            # find the definitions of the existing blocks in a single query, by the hash of their content
+            definition_hashes = {
+                definition['_id']: self._definition_hash(definition['block_type'], definition['fields'])
+                for definition in self.get_definitions(course_key, [
+                    original_blocks[block_key].definition for block_key in imported if block_key in original_blocks
+                ])
+            }
+            definitions_by_hash = {content_hash: _id for _id, content_hash in definition_hashes.iteritems()}
+
+            new_definitions = []
+            changed_blocks = OrderedDict()
+            for block_key, partitioned_fields in imported.iteritems():
+                original_entry = original_blocks.get(block_key)
+                definition_fields = self._serialize_fields(block_key.type, partitioned_fields[Scope.content])
+                settings = self._serialize_fields(block_key.type, partitioned_fields[Scope.settings])
+
+                if original_entry is not None and not definition_fields:
+                    definition_id = original_entry.definition
+                else:
+                    content_hash = self._definition_hash(block_key.type, definition_fields)
+                    if original_entry is not None and definition_hashes.get(original_entry.definition) == content_hash:
+                        definition_id = original_entry.definition
+                    else:
+                        definition_id = definitions_by_hash.get(content_hash)
+                    if definition_id is None:
+                        definition_id = ObjectId()
+                        previous_version = original_entry.definition if original_entry is not None else None
+                        new_definitions.append({
+                            '_id': definition_id,
+                            'block_type': block_key.type,
+                            'fields': definition_fields,
+                            'edit_info': {
+                                'edited_by': user_id,
+                                'edited_on': datetime.datetime.now(UTC),
+                                'previous_version': previous_version,
+                                'original_version': previous_version or definition_id,
+                            },
+                            'schema_version': self.SCHEMA_VERSION,
+                        })
+                        definitions_by_hash[content_hash] = definition_id
+
+                # as in _update_item_from_fields and create_item, the children are only set if given
+                has_children = 'children' in partitioned_fields[Scope.children]
+                children = [
+                    BlockKey.from_usage_key(child) for child in partitioned_fields[Scope.children].get('children', [])
+                ]
+                if original_entry is None:
+                    is_updated = True
+                else:
+                    is_updated = (
+                        definition_id != original_entry.definition or
+                        self._compare_settings(settings, original_entry.fields) or
+                        (has_children and original_entry.fields.get('children', []) != children)
+                    )
+                if is_updated:
+                    if has_children:
+                        settings['children'] = children
+                    changed_blocks[block_key] = (definition_id, settings)
+                    if index_entry is not None:
+                        self._update_search_targets(index_entry, definition_fields)
+                        self._update_search_targets(index_entry, settings)
+
+            if changed_blocks:
+                self.insert_definitions(course_key, new_definitions)
+
+                new_structure = self.version_structure(course_key, original_structure, user_id)
+                new_id = new_structure['_id']
+                for block_key, (definition_id, block_fields) in changed_blocks.iteritems():
+                    block_data = self._get_block_from_structure(new_structure, block_key)
+                    if block_data is None:
+                        self._update_block_in_structure(new_structure, block_key, self._new_block(
+                            user_id, block_key.type, block_fields, definition_id, new_id, raw=True
+                        ))
+                    else:
+                        block_data.definition = definition_id
+                        block_data.fields = block_fields
+                        # the block is no longer a direct copy, as in _update_item_from_fields
+                        block_data.edit_info.source_version = None
+                        self.version_block(block_data, user_id, new_id)
+
+                self.update_structure(course_key, new_structure)
+                if index_entry is not None:
+                    self._update_head(course_key, index_entry, course_key.branch, new_id)
+                if isinstance(course_key, LibraryLocator):
+                    self._flag_library_updated_event(course_key)
+
+            return imported.keys()
+
     # pylint: disable=unused-argument
     def create_xblock(
             self, runtime, course_key, block_type, block_id=None, fields=None,
@@ -2693,6 +2900,12 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         source_structure = self._lookup_course(source_course_key).structure
         with self.bulk_operations(dest_course_key):
             original_structure = self._lookup_course(dest_course_key).structure
+            if (
+                    original_structure.get('assets', {}) == source_structure.get('assets', {}) and
+                    original_structure.get('thumbnails', []) == source_structure.get('thumbnails', [])
+            ):
+                # e.g. a rerun, which still shares the source's structure; don't version it for nothing
+                return
             index_entry = self._get_index_if_valid(dest_course_key)
             new_structure = self.version_structure(dest_course_key, original_structure, user_id)
 
@@ -2887,6 +3100,13 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                     fields[field_name] = xblock_class.fields[field_name].to_json(value)
         return fields
 
+    def _definition_hash(self, block_type, fields):
+        """
+        Return a hash of the content of a definition, from its block_type and its serialized fields,
+        so that definitions with the same content can be found without comparing their fields.
+        """
+        return hashlib.sha1(json.dumps([block_type, fields], sort_keys=True, default=unicode)).hexdigest()
+
     def _new_structure(self, user_id, root_block_key, block_fields=None, definition_id=None):
         """
         Internal function: create a structure element with no previous version. Must provide the root id
@@ -2,6 +2,8 @@
 Module for the dual-branch fall-back Draft->Published Versioning ModuleStore
 """
 
+from collections import defaultdict
+
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore, EXCLUDE_ALL
 from xmodule.exceptions import InvalidVersionError
 from xmodule.modulestore import ModuleStoreEnum
@@ -86,6 +88,22 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
         else:
             raise InsufficientSpecificationError()
 
+    def get_course_summaries(self, **kwargs):
+        """
+        Returns summaries of all the courses on the Draft or Published branch depending on the branch setting.
+        """
+        branch_setting = self.get_branch_setting()
+        if branch_setting == ModuleStoreEnum.Branch.draft_preferred:
+            return super(DraftVersioningModuleStore, self).get_course_summaries(
+                ModuleStoreEnum.BranchName.draft, **kwargs
+            )
+        elif branch_setting == ModuleStoreEnum.Branch.published_only:
+            return super(DraftVersioningModuleStore, self).get_course_summaries(
+                ModuleStoreEnum.BranchName.published, **kwargs
+            )
+        else:
+            raise InsufficientSpecificationError()
+
     def _auto_publish_no_children(self, location, category, user_id, **kwargs):
         """
         Publishes item if the category is DIRECT_ONLY. This assumes another method has checked that
@@ -348,6 +366,55 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
 
         return has_changes_subtree(BlockKey.from_usage_key(xblock.location))
 
+    def get_subtree_changes(self, xblock, published_versions=None):
+        """
+        Returns a dict mapping the BlockKey of each block in the subtree rooted at xblock to whether
+        that block has unpublished changes. Unlike calling has_changes for each block, this looks
+        up the draft and published structures once, and compares each block only once.
+
+        If a dict is passed as published_versions, it is filled in with whether each block has a
+        published version, from the same published structure.
+        """
+        draft_course = self._lookup_course(
+            xblock.location.course_key.for_branch(ModuleStoreEnum.BranchName.draft)
+        ).structure
+        published_course = self._lookup_course(
+            xblock.location.course_key.for_branch(ModuleStoreEnum.BranchName.published)
+        ).structure
+        changes = {}
+
+        def has_changes_subtree(block_key):
+            """
+            Record whether the block and each of its descendants has changes, and return the block's.
+            """
+            if block_key in changes:
+                return changes[block_key]
+
+            draft_block = self._get_block_from_structure(draft_course, block_key)
+            if draft_block is None:  # temporary fix for bad pointers TNL-1141
+                if published_versions is not None:
+                    published_versions[block_key] = (
+                        self._get_block_from_structure(published_course, block_key) is not None
+                    )
+                changes[block_key] = True
+                return True
+            published_block = self._get_block_from_structure(published_course, block_key)
+            if published_versions is not None:
+                published_versions[block_key] = published_block is not None
+            block_changed = (
+                published_block is None or
+                self._get_version(draft_block) != self._get_version(published_block)
+            )
+            # visit every child, so that each descendant's changes are recorded too
+            for child_block_key in draft_block.fields.get('children', []):
+                if has_changes_subtree(child_block_key):
+                    block_changed = True
+            changes[block_key] = block_changed
+            return block_changed
+
+        has_changes_subtree(BlockKey.from_usage_key(xblock.location))
+        return changes
+
     def publish(self, location, user_id, blacklist=None, **kwargs):
         """
         Publishes the subtree under location from the draft branch to the published branch
@@ -541,6 +608,90 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
                 user_id, course_key, BlockKey(block_type, block_id), partitioned_fields, None, allow_not_found=True, force=True
             ) or self.get_item(new_usage_key)
 
+    def import_xblocks(self, user_id, course_key, blocks, **kwargs):
+        """
+        Split-based modulestores need to import published blocks to both branches. See
+        :py:meth `SplitMongoModuleStore.import_xblocks`
+        """
+        with self.bulk_operations(course_key):
+            # hardcode root block ids, as import_xblock does
+            root_block_ids = {
+                'course': self.DEFAULT_ROOT_COURSE_BLOCK_ID,
+                'library': self.DEFAULT_ROOT_LIBRARY_BLOCK_ID,
+            }
+            blocks = [
+                (block_type, root_block_ids.get(block_type, block_id), fields)
+                for block_type, block_id, fields in blocks
+            ]
+
+            if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
+                # Override any existing drafts, and publish the blocks, as import_xblock does.
+                draft_course = course_key.for_branch(ModuleStoreEnum.BranchName.draft)
+                block_keys = super(DraftVersioningModuleStore, self).import_xblocks(user_id, draft_course, blocks)
+                self._publish_imported_blocks(user_id, course_key, block_keys)
+                return block_keys
+
+            course_key = self._map_revision_to_branch(course_key)  # cast to branch_setting
+            return super(DraftVersioningModuleStore, self).import_xblocks(user_id, course_key, blocks)
+
+    def _publish_imported_blocks(self, user_id, course_key, block_keys):
+        """
+        Publish each of the blocks (but not their children), which must be in top-down order, as a
+        single new version of the published branch. This has the same result as publishing each block
+        with blacklist=EXCLUDE_ALL, but skips the blocks whose draft and published versions are the same,
+        and finds the blocks' parents once rather than once per block.
+        """
+        draft_course = course_key.for_branch(ModuleStoreEnum.BranchName.draft)
+        published_course = course_key.for_branch(ModuleStoreEnum.BranchName.published)
+        draft_structure = self._lookup_course(draft_course).structure
+        published_structure = self._lookup_course(published_course).structure
+        draft_blocks = draft_structure['blocks']
+
+        to_publish = []
+        for block_key in block_keys:
+            published_block = self._get_block_from_structure(published_structure, block_key)
+            if published_block is None or (
+                    self._get_version(draft_blocks[block_key]) != self._get_version(published_block)
+            ):
+                to_publish.append(block_key)
+        if not to_publish:
+            return
+
+        parents = defaultdict(list)
+        for parent_key, parent in draft_blocks.iteritems():
+            for child in parent.fields.get('children', []):
+                parents[BlockKey(*child)].append(parent_key)
+
+        index_entry = self.get_course_index(published_course)
+        published_structure = self.version_structure(published_course, published_structure, user_id)
+        published_blocks = published_structure['blocks']
+        orphans = set()
+        for block_key in to_publish:
+            # as in copy: put the block in the right place in its parents, then copy it
+            if block_key != draft_structure['root']:
+                block_parents = parents[block_key]
+                parent_found = False
+                for parent_key in block_parents:
+                    if parent_key in published_blocks:
+                        parent_found = True
+                        orphans.update(
+                            self._sync_children(draft_blocks[parent_key], published_blocks[parent_key], block_key)
+                        )
+                if block_parents and not parent_found:
+                    raise ItemNotFoundError(block_parents)
+            orphans.update(
+                self._copy_subdag(
+                    user_id, published_structure['_id'], block_key, draft_blocks, published_blocks, EXCLUDE_ALL
+                )
+            )
+        for orphan in orphans:
+            # orphans will include moved as well as deleted xblocks. Only delete the deleted ones.
+            self._delete_if_true_orphan(orphan, published_structure)
+
+        self.update_structure(published_course, published_structure)
+        self._update_head(published_course, index_entry, published_course.branch, published_structure['_id'])
+        self._flag_publish_event(course_key)
+
     def compute_published_info_internal(self, xblock):
         """
         Get the published branch and find when it was published if it was. Cache the results in the xblock
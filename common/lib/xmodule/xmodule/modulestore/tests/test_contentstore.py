@@ -1,6 +1,7 @@
 """
  Test contentstore.mongo functionality
 """
+from datetime import datetime, timedelta
 import logging
 from uuid import uuid4
 import unittest
@@ -197,6 +198,141 @@ class TestContentstore(unittest.TestCase):
         __, count = self.contentstore.get_all_content_for_course(dest_course)
         self.assertEqual(count, len(self.course1_files))
 
+    @ddt.data(True, False)
+    def test_copy_assets_shares_content(self, deprecated):
+        """
+        copy_all_course_assets shares the assets' content, which outlives either copy
+        """
+        self.set_up_assets(deprecated)
+        dest_course = CourseLocator('test', 'destination', 'copy')
+        rerun_course = CourseLocator('test', 'destination', 'rerun')
+        self.contentstore.copy_all_course_assets(self.course1_key, dest_course)
+        self.contentstore.copy_all_course_assets(dest_course, rerun_course)
+
+        for filename in self.course1_files:
+            keys = [
+                course.make_asset_key('asset', filename) for course in [self.course1_key, dest_course, rerun_course]
+            ]
+            self.assertEqual(len(set(self.contentstore.find(key).content_hash for key in keys)), 1)
+
+        source_key = self.course1_key.make_asset_key('asset', self.course1_files[0])
+        dest_key = dest_course.make_asset_key('asset', self.course1_files[0])
+        source = self.contentstore.find(source_key)
+        source_data = source.data
+        self.contentstore.delete_all_course_assets(self.course1_key)
+        self.contentstore.delete(rerun_course.make_asset_key('asset', self.course1_files[0]))
+        self.assertEqual(self.contentstore.find(dest_key).data, source_data)
+        self.assertEqual(
+            ''.join(self.contentstore.find(dest_key, as_stream=True).stream_data()), source_data
+        )
+
+        # the blob is deleted with its last reference
+        self.contentstore.delete(dest_key)
+        self.assertIsNone(self.contentstore.blob_files.find_one({'content_hash': source.content_hash}))
+
+    @ddt.data(True, False)
+    def test_save_shares_identical_content(self, deprecated):
+        """
+        Identical content saved at several locations is stored once
+        """
+        self.set_up_assets(deprecated)
+        shared = self.course1_key.make_asset_key('asset', 'picture1.jpg')
+        other = self.course2_key.make_asset_key('asset', 'picture1.jpg')
+        content_hash = self.contentstore.find(shared).content_hash
+        self.assertEqual(self.contentstore.find(other).content_hash, content_hash)
+        self.assertEqual(self.contentstore.get_attrs(other)['md5'], self.contentstore.get_attrs(shared)['md5'])
+        self.assertEqual(
+            self.contentstore.blob_files.find_one({'content_hash': content_hash})['refcount'], 2
+        )
+        self.assertEqual(self.contentstore.blob_files.count(), len(set(self.course1_files + self.course2_files)))
+
+        # replacing the content of one location leaves the other alone
+        self.save_asset('picture2.jpg', other, 'picture1.jpg', False)
+        self.assertNotEqual(self.contentstore.find(other).content_hash, content_hash)
+        self.assertEqual(
+            self.contentstore.blob_files.find_one({'content_hash': content_hash})['refcount'], 1
+        )
+
+    @ddt.data(True, False)
+    def test_delete_twice_releases_once(self, deprecated):
+        """
+        Deleting an asset again (as concurrent deletes may) doesn't release its blob again
+        """
+        self.set_up_assets(deprecated)
+        shared = self.course1_key.make_asset_key('asset', 'picture1.jpg')
+        other = self.course2_key.make_asset_key('asset', 'picture1.jpg')
+        content_hash = self.contentstore.find(shared).content_hash
+
+        self.contentstore.delete(shared)
+        self.contentstore.delete(shared)
+        self.assertEqual(
+            self.contentstore.blob_files.find_one({'content_hash': content_hash})['refcount'], 1
+        )
+        self.assertIsNotNone(self.contentstore.find(other).data)
+
+    @ddt.data(True, False)
+    def test_move_content_to_blobs(self, deprecated):
+        """
+        Assets stored in their own GridFS files are moved into shared blobs
+        """
+        self.set_up_assets(deprecated)
+        asset_key = self.course1_key.make_asset_key('asset', 'legacy.jpg')
+        content_id, content_son = self.contentstore.asset_db_key(asset_key)
+        with open("{}/static/picture1.jpg".format(DATA_DIR), "rb") as f:
+            data = f.read()
+        self.contentstore.fs.put(
+            data, _id=content_id, filename=unicode(asset_key), content_type='image/jpeg',
+            displayname='legacy.jpg', content_son=content_son, thumbnail_location=None, import_path=None,
+        )
+        self.assertIsNone(self.contentstore.find(asset_key).content_hash)
+
+        self.assertEqual(self.contentstore.move_content_to_blobs(), 1)
+        self.assertEqual(self.contentstore.move_content_to_blobs(), 0)
+        legacy = self.contentstore.find(asset_key)
+        self.assertEqual(legacy.data, data)
+        picture = self.contentstore.find(self.course1_key.make_asset_key('asset', 'picture1.jpg'))
+        self.assertEqual(legacy.content_hash, picture.content_hash)
+
+    @ddt.data(True, False)
+    def test_collect_blobs(self, deprecated):
+        """
+        collect_blobs corrects reference counts and deletes unreferenced blobs
+        """
+        self.set_up_assets(deprecated)
+        asset_key = self.course1_key.make_asset_key('asset', self.course1_files[0])
+        content_hash = self.contentstore.find(asset_key).content_hash
+        # lose the reference count, and the asset entry of another blob
+        self.contentstore.blob_files.update({'content_hash': content_hash}, {'$set': {'refcount': 5}})
+        self.contentstore.fs_files.remove({'_id': self.contentstore.asset_db_key(
+            self.course2_key.make_asset_key('asset', 'door_2.ogg')
+        )[0]})
+        blob_count = self.contentstore.blob_files.count()
+
+        self.assertEqual(self.contentstore.collect_blobs(), 0)
+        self.assertEqual(self.contentstore.collect_blobs(grace_period=timedelta(0)), 1)
+        self.assertEqual(self.contentstore.blob_files.count(), blob_count - 1)
+        self.assertEqual(self.contentstore.blob_files.find_one({'content_hash': content_hash})['refcount'], 1)
+        self.assertIsNotNone(self.contentstore.find(asset_key))
+
+    @ddt.data(True, False)
+    def test_collect_blobs_skips_new_references(self, deprecated):
+        """
+        collect_blobs leaves alone an old blob which was referenced recently, as its asset may not be saved yet
+        """
+        self.set_up_assets(deprecated)
+        content_hash = self.contentstore.find(
+            self.course1_key.make_asset_key('asset', self.course1_files[0])
+        ).content_hash
+        long_ago = datetime.utcnow() - timedelta(days=1)
+        self.contentstore.blob_files.update(
+            {}, {'$set': {'uploadDate': long_ago, 'referencedAt': long_ago}}, multi=True
+        )
+        # a save in flight, which has counted its reference but not inserted its asset entry yet
+        self.contentstore._add_blob_reference(content_hash)  # pylint: disable=protected-access
+
+        self.contentstore.collect_blobs()
+        self.assertEqual(self.contentstore.blob_files.find_one({'content_hash': content_hash})['refcount'], 2)
+
     @ddt.data(True, False)
     def test_delete_assets(self, deprecated):
         """
@@ -706,6 +706,58 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
         for key in locations:
             self.assertFalse(self._has_changes(locations[key]))
 
+    @ddt.data('draft', 'split')
+    def test_get_subtree_changes(self, default_ms):
+        """
+        Tests that get_subtree_changes() agrees with has_changes() for every block in the subtree
+        """
+        locations = self.setup_has_changes(default_ms)
+
+        def subtree_changes():
+            """Return the changes of the grandparent's subtree, by location."""
+            with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred):
+                grandparent = self.store.get_item(locations['grandparent'], depth=None)
+            changes = self.store.get_subtree_changes(grandparent)
+            return {
+                key: changes[(location.block_type, location.block_id)]
+                for key, location in locations.iteritems()
+            }
+
+        self.assertEqual(subtree_changes(), {key: False for key in locations})
+
+        # Change the child
+        child = self.store.get_item(locations['child'])
+        child.display_name = 'Changed Display Name'
+        self.store.update_item(child, self.user_id)
+
+        changes = subtree_changes()
+        self.assertEqual(changes, {key: self._has_changes(locations[key]) for key in locations})
+        self.assertEqual(
+            changes,
+            {'grandparent': True, 'parent': True, 'child': True, 'parent_sibling': False, 'child_sibling': False}
+        )
+
+    @ddt.data('draft', 'split')
+    def test_get_subtree_changes_published_versions(self, default_ms):
+        """
+        Tests that the published versions found by get_subtree_changes() agree with has_published_version()
+        """
+        locations = self.setup_has_changes(default_ms)
+        # Add an unpublished block to the subtree
+        new_child = self.store.create_child(self.user_id, locations['child'], 'html', block_id='new_child')
+
+        with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred):
+            grandparent = self.store.get_item(locations['grandparent'], depth=None)
+            published_versions = {}
+            self.store.get_subtree_changes(grandparent, published_versions)
+            locations['new_child'] = new_child.location
+            for location in locations.itervalues():
+                self.assertEqual(
+                    published_versions[(location.block_type, location.block_id)],
+                    self.store.has_published_version(self.store.get_item(location)),
+                )
+        self.assertFalse(published_versions[(new_child.location.block_type, new_child.location.block_id)])
+
     @ddt.data('draft', 'split')
     def test_has_changes_publish_ancestors(self, default_ms):
         """
@@ -989,6 +1041,60 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
             published_courses = self.store.get_courses(remove_branch=True)
         self.assertEquals([c.id for c in draft_courses], [c.id for c in published_courses])
 
+    # Draft:
+    #   1) find all course records (wildcard), fetching only their summary fields
+    #   2) wildcard split course indexes, of which there are none
+    # Split:
+    #   1) wildcard split course indexes,
+    #   2) the root blocks of their structures
+    #   3) wildcard draft mongo which has none
+    @ddt.data(('draft', 2, 0), ('split', 3, 0))
+    @ddt.unpack
+    def test_get_course_summaries(self, default_ms, max_find, max_send):
+        self.initdb(default_ms)
+        with check_mongo_calls(max_find, max_send):
+            course_summaries = self.store.get_course_summaries()
+        summary_locations = [course_summary.location for course_summary in course_summaries]
+        self.assertEqual(len(course_summaries), 3, "Not 3 courses: {}".format(summary_locations))
+        self.assertIn(self.course_locations[self.MONGO_COURSEID], summary_locations)
+        self.assertIn(self.course_locations[self.XML_COURSEID1], summary_locations)
+        self.assertIn(self.course_locations[self.XML_COURSEID2], summary_locations)
+
+        courses = {course.id: course for course in self.store.get_courses()}
+        for course_summary in course_summaries:
+            course = courses[course_summary.id]
+            self.assertEqual(course_summary.display_name, course.display_name)
+            self.assertEqual(course_summary.display_org_with_default, course.display_org_with_default)
+            self.assertEqual(course_summary.display_number_with_default, course.display_number_with_default)
+
+    def test_get_course_summaries_with_rerun(self):
+        """
+        A split course and its rerun, which shares the course's structures, are both summarized
+        """
+        self.initdb('split')
+        rerun_id = self.store.make_course_key(self.course.id.org, self.course.id.course, 'rerun')
+        self.store.clone_course(self.course.id, rerun_id, self.user_id)
+
+        for branch_setting in [ModuleStoreEnum.Branch.draft_preferred, ModuleStoreEnum.Branch.published_only]:
+            with self.store.branch_setting(branch_setting):
+                summary_ids = [course_summary.id for course_summary in self.store.get_course_summaries()]
+            self.assertEqual(len(summary_ids), 4, "Not 4 courses: {}".format(summary_ids))
+            self.assertIn(self.course.id, summary_ids)
+            self.assertIn(rerun_id, summary_ids)
+
+    @ddt.data('draft', 'split')
+    def test_get_course_summaries_for_course_keys(self, default_ms):
+        """
+        Only the courses whose keys are given are summarized
+        """
+        self.initdb(default_ms)
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        summary_ids = [
+            course_summary.id for course_summary in self.store.get_course_summaries(course_keys=[course_key])
+        ]
+        self.assertEqual(summary_ids, [course_key])
+        self.assertEqual(self.store.get_course_summaries(course_keys=[]), [])
+
     @ddt.data('draft', 'split')
     def test_create_child_detached_tabs(self, default_ms):
         """
@@ -2792,3 +2898,55 @@ class TestPublishOverExportImport(CommonMixedModuleStoreSetup):
             with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, source_course_key):
                 component = self.store.get_item(unit.location)
                 self.assertEqual(component.display_name, updated_display_name)
+
+    def test_split_reimport_shares_unchanged_definitions(self):
+        """
+        Tests that re-importing a course into split keeps the definitions of unchanged blocks, and that
+        blocks with the same content imported into a new course share a definition.
+        """
+        with self._build_store(ModuleStoreEnum.Type.split) as (contentstore, source_course_key):
+            chapter = self.store.create_child(
+                self.user_id, self.course.location, 'chapter', block_id='section_one'
+            )
+            for block_id in ('html_one', 'html_two'):
+                self.store.create_child(
+                    self.user_id, chapter.location, 'html', block_id=block_id, fields={'data': '<p>Same</p>'}
+                )
+            self.store.publish(chapter.location, self.user_id)
+            html_locations = [source_course_key.make_usage_key('html', name) for name in ('html_one', 'html_two')]
+
+            self._export_import_course_round_trip(
+                self.store, contentstore, source_course_key, self.export_dir
+            )
+            definition_ids = [
+                self.store.get_item(location).definition_locator.definition_id for location in html_locations
+            ]
+
+            self._export_import_course_round_trip(
+                self.store, contentstore, source_course_key, self.export_dir
+            )
+            self.assertEqual(
+                [self.store.get_item(location).definition_locator.definition_id for location in html_locations],
+                definition_ids
+            )
+            self.assertFalse(self._has_changes(chapter.location))
+
+            dest_course_key = self.store.make_course_key('org.dest', 'course.dest', 'run.dest')
+            import_course_from_xml(
+                self.store,
+                'test_user',
+                self.export_dir,
+                source_dirs=['exported_source_course'],
+                static_content_store=contentstore,
+                target_id=dest_course_key,
+                create_if_not_present=True,
+                raise_on_failure=True,
+            )
+            dest_html = [
+                self.store.get_item(location.map_into_course(dest_course_key)) for location in html_locations
+            ]
+            self.assertEqual(dest_html[0].data, '<p>Same</p>')
+            self.assertEqual(
+                dest_html[0].definition_locator.definition_id, dest_html[1].definition_locator.definition_id
+            )
+            self.assertFalse(self._has_changes(dest_html[0].location))
@@ -0,0 +1,78 @@
+"""
+Tests of the metadata inheritance tree of the old Mongo modulestore.
+"""
+import pickle
+import unittest
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.mongo.inheritance_tree import MetadataInheritanceTree
+
+COURSE = u'i4x://org/course/course/run'
+CHAPTER = u'i4x://org/course/chapter/chapter'
+SEQUENTIAL = u'i4x://org/course/sequential/sequential'
+OTHER_SEQUENTIAL = u'i4x://org/course/sequential/other'
+PROBLEM = u'i4x://org/course/problem/problem'
+
+PUBLISHED = ModuleStoreEnum.Branch.published_only
+
+
+class TestMetadataInheritanceTree(unittest.TestCase):
+    """
+    Tests of MetadataInheritanceTree.
+    """
+    def setUp(self):
+        super(TestMetadataInheritanceTree, self).setUp()
+        self.tree = MetadataInheritanceTree(PUBLISHED)
+        self.tree.set_container(COURSE, {'graceperiod': '1 day', 'due': 'course due'}, [CHAPTER])
+        self.tree.set_container(CHAPTER, {}, [SEQUENTIAL, OTHER_SEQUENTIAL])
+        self.tree.set_container(SEQUENTIAL, {'due': 'sequential due'}, [PROBLEM])
+
+    def assert_tree(self, tree):
+        """
+        Assert that tree has the parents and metadata set in setUp.
+        """
+        self.assertEqual(tree.parent(PROBLEM, PUBLISHED), SEQUENTIAL)
+        self.assertEqual(tree.parent(OTHER_SEQUENTIAL, PUBLISHED), CHAPTER)
+        self.assertIsNone(tree.parent(COURSE, PUBLISHED))
+        self.assertEqual(tree.inherited_metadata(COURSE), {})
+        self.assertEqual(tree.inherited_metadata(SEQUENTIAL), {'graceperiod': '1 day', 'due': 'course due'})
+        self.assertEqual(tree.inherited_metadata(PROBLEM), {'graceperiod': '1 day', 'due': 'sequential due'})
+
+    def test_inherited_metadata(self):
+        self.assert_tree(self.tree)
+        self.assertEqual(self.tree.inherited_metadata(u'i4x://org/course/problem/orphan'), {})
+        # Containers which don't override anything share their parent's metadata
+        self.assertIs(self.tree.inherited_metadata(SEQUENTIAL), self.tree.inherited_metadata(CHAPTER))
+
+    def test_other_branch(self):
+        self.assertIsNone(self.tree.parent(PROBLEM, ModuleStoreEnum.Branch.draft_preferred))
+
+    def test_set_container(self):
+        self.assertEqual(self.tree.inherited_metadata(PROBLEM)['graceperiod'], '1 day')
+        self.tree.set_container(COURSE, {'graceperiod': '2 days'}, [CHAPTER])
+        self.assertEqual(self.tree.inherited_metadata(PROBLEM), {'graceperiod': '2 days', 'due': 'sequential due'})
+
+        # Move the problem from one sequential to the other
+        self.tree.set_container(SEQUENTIAL, {'due': 'sequential due'}, [])
+        self.assertIsNone(self.tree.parent(PROBLEM, PUBLISHED))
+        self.tree.set_container(OTHER_SEQUENTIAL, {}, [PROBLEM])
+        self.assertEqual(self.tree.parent(PROBLEM, PUBLISHED), OTHER_SEQUENTIAL)
+        self.assertEqual(self.tree.inherited_metadata(PROBLEM), {'graceperiod': '2 days'})
+
+    def test_pickle(self):
+        tree = pickle.loads(pickle.dumps(self.tree, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(tree.branch, PUBLISHED)
+        self.assertEqual(len(tree), 3)
+        self.assert_tree(tree)
+
+        # The children are restored, so that the unpickled tree can be updated
+        tree.set_container(SEQUENTIAL, {}, [])
+        self.assertIsNone(tree.parent(PROBLEM, PUBLISHED))
+
+    def test_pickled_version(self):
+        MetadataInheritanceTree.VERSION += 1
+        try:
+            pickled = pickle.dumps(self.tree)
+        finally:
+            MetadataInheritanceTree.VERSION -= 1
+        self.assertFalse(pickle.loads(pickled))
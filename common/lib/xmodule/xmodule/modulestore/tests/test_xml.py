@@ -3,6 +3,8 @@ Tests around our XML modulestore, including importing
 well-formed and not-well-formed XML.
 """
 import os.path
+import shutil
+import tempfile
 import unittest
 from glob import glob
 from mock import patch, Mock
@@ -148,3 +150,51 @@ class TestXMLModuleStore(unittest.TestCase):
         other_parent = store.get_item(other_parent_loc)
         # children rather than get_children b/c the instance returned by get_children != shared_item
         self.assertIn(shared_item_loc, other_parent.children)
+
+    def assert_same_courses(self, store, expected_store):
+        """
+        Assert that store has loaded the same courses, blocks and field values as expected_store.
+        """
+        self.assertEqual(sorted(store.courses), sorted(expected_store.courses))
+        for course_id, modules in expected_store.modules.iteritems():
+            self.assertEqual(sorted(store.modules[course_id]), sorted(modules))
+            for usage_id, expected_block in modules.iteritems():
+                block = store.modules[course_id][usage_id]
+                self.assertEqual(type(block), type(expected_block))
+                for field_name, field in expected_block.fields.iteritems():
+                    self.assertEqual(field.read_from(block), field.read_from(expected_block), field_name)
+            self.assertEqual(store.get_course_errors(course_id), expected_store.get_course_errors(course_id))
+
+    @patch('xmodule.tabs.CourseTabList.initialize_default', Mock())
+    def test_course_cache(self):
+        """
+        Test restoring courses from the course cache
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        source_dirs = ['toy', 'simple']
+        expected_store = XMLModuleStore(DATA_DIR, source_dirs=source_dirs, xblock_mixins=(XModuleMixin,))
+
+        XMLModuleStore(DATA_DIR, source_dirs=source_dirs, xblock_mixins=(XModuleMixin,), course_cache_dir=cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+        with patch('xmodule.modulestore.xml.XMLModuleStore.load_course') as mock_load_course:
+            store = XMLModuleStore(
+                DATA_DIR, source_dirs=source_dirs, xblock_mixins=(XModuleMixin,), course_cache_dir=cache_dir
+            )
+            self.assertFalse(mock_load_course.called)
+        self.assert_same_courses(store, expected_store)
+
+        toy_course = store.get_course(SlashSeparatedCourseKey('edX', 'toy', '2012_Fall'))
+        self.assertEqual(toy_course.data_dir, 'toy')
+        self.assertEqual(toy_course.get_children()[0].get_parent().location, toy_course.location)
+
+    @patch('xmodule.tabs.CourseTabList.initialize_default', Mock())
+    def test_load_workers(self):
+        """
+        Test parsing courses in worker processes
+        """
+        source_dirs = ['toy', 'simple']
+        expected_store = XMLModuleStore(DATA_DIR, source_dirs=source_dirs, xblock_mixins=(XModuleMixin,))
+        store = XMLModuleStore(DATA_DIR, source_dirs=source_dirs, xblock_mixins=(XModuleMixin,), load_workers=2)
+        self.assert_same_courses(store, expected_store)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of streaming an export into a tar file.
+"""
+from io import BytesIO
+import tarfile
+import unittest
+
+from xmodule.modulestore.xml_exporter import TarExportFS
+
+
+class TestTarExportFS(unittest.TestCase):
+    """
+    Tests of TarExportFS.
+    """
+    def setUp(self):
+        super(TestTarExportFS, self).setUp()
+        self.output = BytesIO()
+        self.tar_file = tarfile.open(fileobj=self.output, mode='w:gz')
+        self.export_fs = TarExportFS(self.tar_file).makeopendir('course')
+
+    def read_tar(self):
+        """
+        Close the tar file, and return a dict of the contents of each file in it by name, with
+        None for directories.
+        """
+        self.tar_file.close()
+        self.output.seek(0)
+        with tarfile.open(fileobj=self.output, mode='r:gz') as tar_file:
+            return {
+                member.name: tar_file.extractfile(member).read() if member.isfile() else None
+                for member in tar_file.getmembers()
+            }
+
+    def test_write_files(self):
+        with self.export_fs.open('course.xml', 'w') as course_xml:
+            course_xml.write('<course/>')
+        self.export_fs.makedir('html/nested', recursive=True, allow_recreate=True)
+        self.export_fs.makedir('html', recursive=True, allow_recreate=True)
+        with self.export_fs.open('html/nested/intro.html', 'w') as html_file:
+            html_file.write(u'<p>été</p>')
+        policies = self.export_fs.makeopendir('policies')
+        with policies.makeopendir('run').open('policy.json', 'w') as policy_file:
+            policy_file.write('{}')
+
+        self.assertEqual(self.read_tar(), {
+            'course': None,
+            'course/course.xml': '<course/>',
+            'course/html': None,
+            'course/html/nested': None,
+            'course/html/nested/intro.html': u'<p>été</p>'.encode('utf-8'),
+            'course/policies': None,
+            'course/policies/run': None,
+            'course/policies/run/policy.json': '{}',
+        })
+
+    def test_setcontents(self):
+        asset = BytesIO('a' * 100000)
+        asset.length = 100000
+        self.export_fs.makeopendir('static').setcontents('big.bin', asset)
+        self.export_fs.setcontents('course.xml', '<course/>')
+
+        self.assertEqual(self.read_tar(), {
+            'course': None,
+            'course/static': None,
+            'course/static/big.bin': 'a' * 100000,
+            'course/course.xml': '<course/>',
+        })
+
+    def test_file_not_added_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.export_fs.open('course.xml', 'w') as course_xml:
+                course_xml.write('<cour')
+                raise ValueError()
+        self.assertEqual(self.read_tar(), {'course': None})
+
+    def test_read_unsupported(self):
+        with self.assertRaises(ValueError):
+            self.export_fs.open('course.xml')
@@ -1,11 +1,14 @@
+import cPickle as pickle
 import hashlib
 import itertools
 import json
 import logging
+import multiprocessing
 import os
 import re
 import sys
 import glob
+import time
 
 from collections import defaultdict
 from cStringIO import StringIO
@@ -30,13 +33,15 @@ from opaque_keys.edx.locations import SlashSeparatedCourseKey, Location
 from opaque_keys.edx.locator import CourseLocator, LibraryLocator
 
 from xblock.field_data import DictFieldData
-from xblock.runtime import DictKeyValueStore
+from xblock.runtime import DictKeyValueStore, KvsFieldData
 from xblock.fields import ScopeIds
 
 import dogstats_wrapper as dog_stats_api
 
 from .exceptions import ItemNotFoundError
-from .inheritance import compute_inherited_metadata, inheriting_field_data, InheritanceKeyValueStore
+from .inheritance import (
+    compute_inherited_metadata, inheriting_field_data, InheritanceKeyValueStore, InheritingFieldData
+)
 
 
 edx_xml_parser = etree.XMLParser(dtd_validation=False, load_dtd=False,
@@ -46,6 +51,12 @@ etree.set_default_parser(edx_xml_parser)
 
 log = logging.getLogger(__name__)
 
+# Bump this when a change to how courses are parsed would make the courses in course caches out of date
+COURSE_CACHE_VERSION = 1
+
+# The XMLModuleStore whose courses are being loaded by worker processes
+_WORKER_STORE = None
+
 
 # VS[compat]
 # TODO (cpennington): Remove this once all fall 2012 courses have been imported
@@ -335,7 +346,8 @@ class XMLModuleStore(ModuleStoreReadBase):
     def __init__(
             self, data_dir, default_class=None, source_dirs=None, course_ids=None,
             load_error_modules=True, i18n_service=None, fs_service=None, user_service=None,
-            signal_handler=None, target_course_id=None, **kwargs   # pylint: disable=unused-argument
+            signal_handler=None, target_course_id=None, course_cache_dir=None, load_workers=1,
+            **kwargs   # pylint: disable=unused-argument
     ):
         """
         Initialize an XMLModuleStore from data_dir
@@ -348,6 +360,13 @@ class XMLModuleStore(ModuleStoreReadBase):
 
             source_dirs or course_ids (list of str): If specified, the list of source_dirs or course_ids to load.
                 Otherwise, load all courses. Note, providing both
+
+            course_cache_dir (str): If specified, a directory in which to cache the parsed blocks of each
+                course, keyed by a hash of the contents of the course's directory, so that courses which
+                haven't changed are restored rather than parsed again.
+
+            load_workers (int): The number of worker processes to parse course directories with.
+                By default, courses are parsed in this process.
         """
         super(XMLModuleStore, self).__init__(**kwargs)
 
@@ -355,6 +374,7 @@ class XMLModuleStore(ModuleStoreReadBase):
         self.modules = defaultdict(dict)  # course_id -> dict(location -> XBlock)
         self.courses = {}  # course_dir -> XBlock for the course
         self.errored_courses = {}  # course_dir -> errorlog, for dirs that failed to load
+        self.course_cache_dir = path(course_cache_dir) if course_cache_dir else None
 
         if course_ids is not None:
             course_ids = [SlashSeparatedCourseKey.from_deprecated_string(course_id) for course_id in course_ids]
@@ -369,7 +389,8 @@ class XMLModuleStore(ModuleStoreReadBase):
             self.default_class = class_
 
         # All field data will be stored in an inheriting field data.
-        self.field_data = inheriting_field_data(kvs=DictKeyValueStore())
+        self._field_values = {}
+        self.field_data = inheriting_field_data(kvs=DictKeyValueStore(self._field_values))
 
         self.i18n_service = i18n_service
         self.fs_service = fs_service
@@ -384,14 +405,94 @@ class XMLModuleStore(ModuleStoreReadBase):
         if source_dirs is None:
             source_dirs = sorted([d for d in os.listdir(self.data_dir) if
                                   os.path.exists(self.data_dir / d / self.parent_xml)])
-        for course_dir in source_dirs:
-            self.try_load_course(course_dir, course_ids, target_course_id)
+        if load_workers > 1 and len(source_dirs) > 1:
+            self._load_courses_in_workers(source_dirs, course_ids, target_course_id, load_workers)
+        else:
+            for course_dir in source_dirs:
+                self.try_load_course(course_dir, course_ids, target_course_id)
 
     def try_load_course(self, course_dir, course_ids=None, target_course_id=None):
         '''
         Load a course, keeping track of errors as we go along. If course_ids is not None,
         then reject the course unless its id is in course_ids.
+
+        If the store has a course cache, the course is restored from it if the course's
+        directory hasn't changed, and is cached once it's parsed otherwise.
+        '''
+        start = time.time()
+        cache_path = self._course_cache_path(course_dir, target_course_id)
+        snapshot = self._read_course_cache(cache_path)
+        if snapshot is not None:
+            self._restore_course(course_dir, snapshot, course_ids, target_course_id)
+            self._log_load_time(course_dir, start, cached=True)
+            return
+
+        snapshot = self._try_load_course(course_dir, course_ids, target_course_id, snapshot=cache_path is not None)
+        if snapshot is not None:
+            self._write_course_cache(cache_path, course_dir, self._pickle_snapshot(course_dir, snapshot))
+        self._log_load_time(course_dir, start)
+
+    def _load_courses_in_workers(self, source_dirs, course_ids, target_course_id, workers):
+        '''
+        Load the courses in source_dirs, parsing those which aren't in the course cache in
+        (at most) `workers` worker processes.
+        '''
+        global _WORKER_STORE  # pylint: disable=global-statement
+
+        to_parse = []
+        for course_dir in source_dirs:
+            start = time.time()
+            cache_path = self._course_cache_path(course_dir, target_course_id)
+            snapshot = self._read_course_cache(cache_path)
+            if snapshot is None:
+                to_parse.append((course_dir, cache_path))
+            else:
+                self._restore_course(course_dir, snapshot, course_ids, target_course_id)
+                self._log_load_time(course_dir, start, cached=True)
+
+        if not to_parse:
+            return
+
+        # The workers are forked, so they find this store in _WORKER_STORE
+        _WORKER_STORE = self
+        pool = multiprocessing.Pool(min(workers, len(to_parse)))
+        try:
+            results = pool.map(
+                _load_course_in_worker,
+                [(course_dir, course_ids, target_course_id) for course_dir, __ in to_parse]
+            )
+        finally:
+            pool.close()
+            pool.join()
+            _WORKER_STORE = None
+
+        for (course_dir, cache_path), pickled_snapshot in zip(to_parse, results):
+            if pickled_snapshot is None:
+                # The course failed to load, or can't be pickled, so load it here to keep its errors
+                self.try_load_course(course_dir, course_ids, target_course_id)
+            elif pickled_snapshot:
+                self._restore_course(course_dir, pickle.loads(pickled_snapshot), course_ids, target_course_id)
+                self._write_course_cache(cache_path, course_dir, pickled_snapshot)
+
+    def _log_load_time(self, course_dir, start, cached=False):
+        '''
+        Log the time taken to load the course in course_dir since start.
+        '''
+        log.info(
+            u'Loaded courselike %s in %.3fs%s',
+            course_dir, time.time() - start, u' from the course cache' if cached else u''
+        )
+
+    def _try_load_course(self, course_dir, course_ids=None, target_course_id=None, snapshot=False):
+        '''
+        Parse and load a course, keeping track of errors as we go along. If course_ids is not None,
+        then reject the course unless its id is in course_ids.
+
+        If snapshot is True, returns the snapshot of the course to cache (see _snapshot_course), or
+        None if the course wasn't loaded.
         '''
+        shared_keys = set(self._field_values) if snapshot else None
+
         # Special-case code here, since we don't have a location for the
         # course before it loads.
         # So, make a tracker to track load-time errors, then put in the right
@@ -418,6 +519,151 @@ class XMLModuleStore(ModuleStoreReadBase):
             course_descriptor.parent = None
             course_id = self.id_from_descriptor(course_descriptor)
             self._course_errors[course_id] = errorlog
+            if snapshot:
+                return self._snapshot_course(course_descriptor, errorlog, shared_keys)
+        return None
+
+    def _snapshot_course(self, course_descriptor, errorlog, shared_keys):
+        '''
+        Return the data needed to restore the just loaded course course_descriptor without parsing
+        it again, or None if some of its blocks store their fields in a way that can't be restored.
+
+        shared_keys is the set of the keys in the store's shared field data before the course was loaded.
+        '''
+        # Find the course's blocks. They're keyed by the course's id before any target_course_id is applied.
+        course_id, modules = next(
+            (course_id, modules) for course_id, modules in self.modules.iteritems()
+            if modules.get(course_descriptor.scope_ids.usage_id) is course_descriptor
+        )
+        blocks = []
+        for block in modules.itervalues():
+            block.save()
+            field_data = block._field_data  # pylint: disable=protected-access
+            if field_data is self.field_data:
+                data = ('shared',)
+            elif type(field_data) is DictFieldData:
+                data = ('dict', field_data._data)  # pylint: disable=protected-access
+            elif (
+                    type(field_data) in (KvsFieldData, InheritingFieldData) and
+                    type(field_data._kvs) is InheritanceKeyValueStore  # pylint: disable=protected-access
+            ):
+                kvs = field_data._kvs  # pylint: disable=protected-access
+                data = (
+                    'inheriting' if type(field_data) is InheritingFieldData else 'kvs',
+                    kvs._fields,  # pylint: disable=protected-access
+                    kvs.inherited_settings,
+                )
+            else:
+                return None
+            blocks.append((block.unmixed_class, block.scope_ids, data, getattr(block, 'data_dir', None)))
+
+        return {
+            'course_id': course_id,
+            'course_usage_id': course_descriptor.scope_ids.usage_id,
+            'blocks': blocks,
+            'field_values': {key: self._field_values[key] for key in set(self._field_values) - shared_keys},
+            'errors': errorlog.errors,
+        }
+
+    def _restore_course(self, course_dir, snapshot, course_ids=None, target_course_id=None):
+        '''
+        Load the course in course_dir from a snapshot made by _snapshot_course. If course_ids is
+        not None, then reject the course unless its id is in course_ids.
+        '''
+        course_id = snapshot['course_id']
+        if course_ids is not None and course_id not in course_ids:
+            return
+
+        errorlog = make_error_tracker()
+        errorlog.errors.extend(snapshot['errors'])
+        # The policy has already been applied to the snapshotted blocks
+        system = self._import_system(course_dir, course_id, errorlog.tracker, lambda usage_id: {}, target_course_id)
+
+        self._field_values.update(snapshot['field_values'])
+        for block_class, scope_ids, data, data_dir in snapshot['blocks']:
+            if data[0] == 'shared':
+                field_data = self.field_data
+            elif data[0] == 'dict':
+                field_data = DictFieldData(data[1])
+            elif data[0] == 'inheriting':
+                field_data = inheriting_field_data(InheritanceKeyValueStore(data[1], data[2]))
+            else:
+                field_data = KvsFieldData(InheritanceKeyValueStore(data[1], data[2]))
+            block = system.construct_xblock_from_class(block_class, scope_ids, field_data)
+            if data_dir is not None:
+                block.data_dir = data_dir
+            self.modules[course_id][scope_ids.usage_id] = block
+
+        course_descriptor = self.modules[course_id][snapshot['course_usage_id']]
+        self.courses[course_dir] = course_descriptor
+        self._course_errors[self.id_from_descriptor(course_descriptor)] = errorlog
+
+    def _course_cache_path(self, course_dir, target_course_id=None):
+        '''
+        Return the path of the course cache entry for course_dir as it is now, or None if the store
+        has no course cache.
+        '''
+        if self.course_cache_dir is None:
+            return None
+
+        digest = hashlib.sha1(repr((
+            COURSE_CACHE_VERSION, type(self).__name__, unicode(target_course_id), self.load_error_modules,
+            self.default_class, [mixin.__name__ for mixin in self.xblock_mixins or ()],
+            getattr(self.xblock_select, '__name__', None),
+        )))
+        course_path = self.data_dir / course_dir
+        for dirpath, dirnames, filenames in os.walk(course_path):
+            dirnames.sort()
+            if dirpath == course_path and 'static' in dirnames:
+                # static files aren't parsed
+                dirnames.remove('static')
+            for filename in sorted(filenames):
+                file_path = os.path.join(dirpath, filename)
+                digest.update(repr(os.path.relpath(file_path, course_path)))
+                with open(file_path, 'rb') as course_file:
+                    for chunk in iter(lambda: course_file.read(1 << 16), ''):
+                        digest.update(chunk)
+        return self.course_cache_dir / u'{}-{}.pickle'.format(course_dir, digest.hexdigest())
+
+    def _read_course_cache(self, cache_path):
+        '''
+        Return the snapshot of a course in the course cache entry at cache_path, or None if there isn't one.
+        '''
+        if cache_path is None or not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                return pickle.load(cache_file)
+        except Exception:  # pylint: disable=broad-except
+            log.warning(u"Couldn't read the course cache entry %s", cache_path, exc_info=True)
+            return None
+
+    def _pickle_snapshot(self, course_dir, snapshot):
+        '''
+        Return the pickled snapshot of the course in course_dir, or None if it can't be pickled.
+        '''
+        try:
+            return pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)
+        except Exception:  # pylint: disable=broad-except
+            log.warning(u"Can't cache courselike %s", course_dir, exc_info=True)
+            return None
+
+    def _write_course_cache(self, cache_path, course_dir, pickled_snapshot):
+        '''
+        Write pickled_snapshot to the course cache entry at cache_path, replacing any older entries
+        for course_dir.
+        '''
+        if cache_path is None or pickled_snapshot is None:
+            return
+        if not os.path.isdir(self.course_cache_dir):
+            os.makedirs(self.course_cache_dir)
+        for old_path in glob.glob(self.course_cache_dir / u'{}-{}.pickle'.format(course_dir, '[0-9a-f]' * 40)):
+            os.remove(old_path)
+        # Write to a temporary file first, so that a partially written entry is never read
+        temp_path = u'{}.{}'.format(cache_path, os.getpid())
+        with open(temp_path, 'wb') as cache_file:
+            cache_file.write(pickled_snapshot)
+        os.rename(temp_path, cache_path)
 
     def __unicode__(self):
         '''
@@ -549,30 +795,7 @@ class XMLModuleStore(ModuleStoreReadBase):
                 """
                 return policy.get(policy_key(usage_id), {})
 
-            services = {}
-            if self.i18n_service:
-                services['i18n'] = self.i18n_service
-
-            if self.fs_service:
-                services['fs'] = self.fs_service
-
-            if self.user_service:
-                services['user'] = self.user_service
-
-            system = ImportSystem(
-                xmlstore=self,
-                course_id=course_id,
-                course_dir=course_dir,
-                error_tracker=tracker,
-                load_error_modules=self.load_error_modules,
-                get_policy=get_policy,
-                mixins=self.xblock_mixins,
-                default_class=self.default_class,
-                select=self.xblock_select,
-                field_data=self.field_data,
-                services=services,
-                target_course_id=target_course_id,
-            )
+            system = self._import_system(course_dir, course_id, tracker, get_policy, target_course_id)
             course_descriptor = system.process_xml(etree.tostring(course_data, encoding='unicode'))
             # If we fail to load the course, then skip the rest of the loading steps
             if isinstance(course_descriptor, ErrorDescriptor):
@@ -583,6 +806,35 @@ class XMLModuleStore(ModuleStoreReadBase):
             log.debug('========> Done with courselike import from %s', course_dir)
             return course_descriptor
 
+    def _import_system(self, course_dir, course_id, tracker, get_policy, target_course_id=None):
+        """
+        Return an ImportSystem for loading the course course_id from course_dir.
+        """
+        services = {}
+        if self.i18n_service:
+            services['i18n'] = self.i18n_service
+
+        if self.fs_service:
+            services['fs'] = self.fs_service
+
+        if self.user_service:
+            services['user'] = self.user_service
+
+        return ImportSystem(
+            xmlstore=self,
+            course_id=course_id,
+            course_dir=course_dir,
+            error_tracker=tracker,
+            load_error_modules=self.load_error_modules,
+            get_policy=get_policy,
+            mixins=self.xblock_mixins,
+            default_class=self.default_class,
+            select=self.xblock_select,
+            field_data=self.field_data,
+            services=services,
+            target_course_id=target_course_id,
+        )
+
     def content_importers(self, system, course_descriptor, course_dir, url_name):
         """
         Load all extra non-course content, and calculate metadata inheritance.
@@ -911,6 +1163,27 @@ class XMLModuleStore(ModuleStoreReadBase):
         return []
 
 
+def _load_course_in_worker(args):
+    """
+    Parse a course directory in a worker process forked by XMLModuleStore._load_courses_in_workers.
+
+    Returns the pickled snapshot of the course, '' if the course was rejected by course_ids, or
+    None if the course has to be loaded by the parent process instead.
+    """
+    course_dir, course_ids, target_course_id = args
+    store = _WORKER_STORE
+    start = time.time()
+    snapshot = store._try_load_course(  # pylint: disable=protected-access
+        course_dir, course_ids, target_course_id, snapshot=True
+    )
+    store._log_load_time(course_dir, start)  # pylint: disable=protected-access
+    if snapshot is not None:
+        return store._pickle_snapshot(course_dir, snapshot)  # pylint: disable=protected-access
+    elif course_dir in store.courses or course_dir in store.errored_courses:
+        return None
+    return ''
+
+
 class LibraryXMLModuleStore(XMLModuleStore):
     """
     A modulestore for importing Libraries from XML.
@@ -4,7 +4,11 @@ Methods for exporting course data to XML
 
 import logging
 from abc import abstractmethod
+from io import BytesIO
 import lxml.etree
+import posixpath
+import tarfile
+import time
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
 from xmodule.contentstore.content import StaticContent
 from xmodule.exceptions import NotFoundError
@@ -107,7 +111,7 @@ class ExportManager(object):
     """
     Manages XML exporting for courselike objects.
     """
-    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir):
+    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir, root_fs=None):
         """
         Export all modules from `modulestore` and content from `contentstore` as xml to `root_dir`.
 
@@ -116,12 +120,15 @@ class ExportManager(object):
         `courselike_key`: The Locator of the Descriptor to export
         `root_dir`: The directory to write the exported xml to
         `target_dir`: The name of the directory inside `root_dir` to write the content to
+        `root_fs`: The filesystem to write the exported xml to instead of `root_dir`, such as a
+            `TarExportFS`; `root_dir` may be None if this is given
         """
         self.modulestore = modulestore
         self.contentstore = contentstore
         self.courselike_key = courselike_key
         self.root_dir = root_dir
         self.target_dir = target_dir
+        self.root_fs = root_fs
 
     @abstractmethod
     def get_key(self):
@@ -157,7 +164,7 @@ class ExportManager(object):
         """
         with self.modulestore.bulk_operations(self.courselike_key):
 
-            fsm = OSFS(self.root_dir)
+            fsm = self.root_fs if self.root_fs is not None else OSFS(self.root_dir)
             root = lxml.etree.Element('unknown')  # pylint: disable=no-member
 
             # export only the published content
@@ -174,7 +181,7 @@ class ExportManager(object):
             self.process_root(root, export_fs)
 
             # Process extra items-- drafts, assets, etc
-            root_courselike_dir = self.root_dir + '/' + self.target_dir
+            root_courselike_dir = self.root_dir + '/' + self.target_dir if self.root_dir is not None else None
             self.process_extra(root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs)
 
             # Any last pass adjustments
@@ -204,26 +211,20 @@ class CourseExportManager(ExportManager):
 
     def process_extra(self, root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs):
         # Export the modulestore's asset metadata.
-        asset_dir = root_courselike_dir + '/' + AssetMetadata.EXPORTED_ASSET_DIR + '/'
-        if not os.path.isdir(asset_dir):
-            os.makedirs(asset_dir)
         asset_root = lxml.etree.Element(AssetMetadata.ALL_ASSETS_XML_TAG)
         course_assets = self.modulestore.get_all_asset_metadata(self.courselike_key, None)
         for asset_md in course_assets:
             # All asset types are exported using the "asset" tag - but their asset type is specified in each asset key.
             asset = lxml.etree.SubElement(asset_root, AssetMetadata.ASSET_XML_TAG)  # pylint: disable=no-member
             asset_md.to_xml(asset)
-        with OSFS(asset_dir).open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'w') as asset_xml_file:
+        asset_dir = export_fs.makeopendir(AssetMetadata.EXPORTED_ASSET_DIR)
+        with asset_dir.open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'w') as asset_xml_file:
             lxml.etree.ElementTree(asset_root).write(asset_xml_file)  # pylint: disable=no-member
 
         # export the static assets
         policies_dir = export_fs.makeopendir('policies')
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                root_courselike_dir + '/static/',
-                root_courselike_dir + '/policies/assets.json',
-            )
+            export_static_content(self.contentstore, self.courselike_key, export_fs, policies_dir)
 
             # If we are using the default course image, export it to the
             # legacy location to support backwards compatibility.
@@ -238,10 +239,8 @@ class CourseExportManager(ExportManager):
                 except NotFoundError:
                     pass
                 else:
-                    output_dir = root_courselike_dir + '/static/images/'
-                    if not os.path.isdir(output_dir):
-                        os.makedirs(output_dir)
-                    with OSFS(output_dir).open('course_image.jpg', 'wb') as course_image_file:
+                    export_fs.makedir('static/images', recursive=True, allow_recreate=True)
+                    with export_fs.open('static/images/course_image.jpg', 'wb') as course_image_file:
                         course_image_file.write(course_image.data)
 
         # export the static tabs
@@ -320,14 +319,10 @@ class LibraryExportManager(ExportManager):
         to ease in duck typing during import. This may be expanded as a useful feature eventually.
         """
         # export the static assets
-        export_fs.makeopendir('policies')
+        policies_dir = export_fs.makeopendir('policies')
 
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                self.root_dir + '/' + self.target_dir + '/static/',
-                self.root_dir + '/' + self.target_dir + '/policies/assets.json',
-            )
+            export_static_content(self.contentstore, self.courselike_key, export_fs, policies_dir)
 
     def post_process(self, root, export_fs):
         """
@@ -357,6 +352,158 @@ def export_library_to_xml(modulestore, contentstore, library_key, root_dir, libr
     LibraryExportManager(modulestore, contentstore, library_key, root_dir, library_dir).export()
 
 
+def export_course_to_tar(modulestore, contentstore, course_key, tar_file, course_dir):
+    """
+    Export the course into `course_dir` in the open TarFile `tar_file`, adding each file to it as it's
+    exported rather than writing the export to disk first. See ExportManager for details.
+    """
+    CourseExportManager(modulestore, contentstore, course_key, None, course_dir, root_fs=TarExportFS(tar_file)).export()
+
+
+def export_library_to_tar(modulestore, contentstore, library_key, tar_file, library_dir):
+    """
+    Export the library into `library_dir` in the open TarFile `tar_file`. See export_course_to_tar.
+    """
+    LibraryExportManager(
+        modulestore, contentstore, library_key, None, library_dir, root_fs=TarExportFS(tar_file)
+    ).export()
+
+
+def export_static_content(contentstore, courselike_key, export_fs, policies_dir):
+    """
+    Export the static assets of the course or library to the static directory of `export_fs`, and
+    their attributes to assets.json in `policies_dir`.
+    """
+    policy = contentstore.export_all_for_course_to_fs(courselike_key, export_fs.makeopendir('static'))
+    with policies_dir.open('assets.json', 'w') as assets_policy:
+        assets_policy.write(dumps(policy, sort_keys=True, indent=4))
+
+
+class TarExportFS(object):
+    """
+    A write only stand-in for the filesystem an export is written to, which adds each file to a tar
+    file as soon as it's written and closed. Only the parts of the pyfilesystem interface which the
+    exporters use are implemented.
+    """
+    def __init__(self, tar_file, root=''):
+        self.tar_file = tar_file
+        self.root = root
+        # directory entries already added to the tar file, shared with the sub-directory filesystems
+        self._dirs = set()
+
+    def _tar_path(self, path):
+        """
+        Return the name of `path` in the tar file.
+        """
+        tar_path = posixpath.normpath(posixpath.join(self.root, path.lstrip('/')))
+        return '' if tar_path == '.' else tar_path
+
+    def makedir(self, path, recursive=False, allow_recreate=False):  # pylint: disable=unused-argument
+        """
+        Add directory entries for `path` and any of its parents which haven't been added.
+        """
+        self._add_dir(self._tar_path(path))
+
+    def _add_dir(self, tar_path):
+        """
+        Add directory entries for `tar_path` and any of its parents which haven't been added.
+        """
+        if not tar_path or tar_path in self._dirs:
+            return
+        self._add_dir(posixpath.dirname(tar_path))
+        info = tarfile.TarInfo(tar_path.encode('utf-8') if isinstance(tar_path, unicode) else tar_path)
+        info.type = tarfile.DIRTYPE
+        info.mode = 0755
+        info.mtime = time.time()
+        self.tar_file.addfile(info)
+        self._dirs.add(tar_path)
+
+    def makeopendir(self, path, recursive=False):  # pylint: disable=unused-argument
+        """
+        Add the directory, and return a filesystem for writing within it.
+        """
+        self.makedir(path)
+        sub_fs = TarExportFS(self.tar_file, self._tar_path(path))
+        sub_fs._dirs = self._dirs  # pylint: disable=protected-access
+        return sub_fs
+
+    def open(self, path, mode='r', **kwargs):  # pylint: disable=unused-argument
+        """
+        Return a file to write `path` to. It's added to the tar file when it's closed.
+        """
+        if 'w' not in mode:
+            raise ValueError(u"Files can only be written to a TarExportFS, not opened with mode {}".format(mode))
+        tar_path = self._tar_path(path)
+        self._add_dir(posixpath.dirname(tar_path))
+        return _TarExportFile(self.tar_file, tar_path)
+
+    def setcontents(self, path, data=b'', chunk_size=None):  # pylint: disable=unused-argument
+        """
+        Add `path` to the tar file with the contents `data`: either a string, or a file-like object with
+        a `length` (such as a GridFS file or StaticContentStream), which is streamed into the tar file
+        rather than being held in memory.
+        """
+        if isinstance(data, basestring):
+            with self.open(path, 'wb') as tar_file:
+                tar_file.write(data)
+            return
+        tar_path = self._tar_path(path)
+        self._add_dir(posixpath.dirname(tar_path))
+        info = _file_info(tar_path)
+        info.size = data.length
+        self.tar_file.addfile(info, data)
+
+
+def _file_info(tar_path):
+    """
+    Return the TarInfo of a file added to a TarExportFS at `tar_path`.
+    """
+    info = tarfile.TarInfo(tar_path.encode('utf-8') if isinstance(tar_path, unicode) else tar_path)
+    info.mode = 0644
+    info.mtime = time.time()
+    return info
+
+
+class _TarExportFile(object):
+    """
+    A file being written to a TarExportFS, which is buffered until it's closed, as a tar entry needs its size.
+    Large files, such as assets, should be added with TarExportFS.setcontents instead.
+    """
+    def __init__(self, tar_file, tar_path):
+        self.tar_file = tar_file
+        self.tar_path = tar_path
+        self._buffer = BytesIO()
+        self.closed = False
+
+    def write(self, data):
+        """
+        Write data to the file, encoding unicode as utf-8.
+        """
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        self._buffer.write(data)
+
+    def close(self):
+        """
+        Add the file to the tar file.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        info = _file_info(self.tar_path)
+        info.size = self._buffer.tell()
+        self._buffer.seek(0)
+        self.tar_file.addfile(info, self._buffer)
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
 def adapt_references(subtree, destination_course_key, export_fs):
     """
     Map every reference in the subtree into destination_course_key and set it back into the xblock fields
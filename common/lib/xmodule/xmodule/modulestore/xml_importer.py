@@ -20,8 +20,10 @@ Modulestore virtual   |          XML physical (draft, published)
              (a, a)   |  (a, a) | (x, a) | (x, x) | (x, y) | (a, x)
              (a, b)   |  (a, b) | (x, b) | (x, x) | (x, y) | (a, x)
 """
+import hashlib
 import logging
 from abc import abstractmethod
+from multiprocessing.pool import ThreadPool
 from opaque_keys.edx.locator import LibraryLocator
 import os
 import mimetypes
@@ -35,7 +37,7 @@ from xblock.runtime import KvsFieldData, DictKeyValueStore
 from xmodule.x_module import XModuleDescriptor, XModuleMixin
 from opaque_keys.edx.keys import UsageKey
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
-from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.content import StaticContent, StaticContentStream, STREAM_DATA_CHUNK_SIZE
 from .inheritance import own_metadata
 from xmodule.errortracker import make_error_tracker
 from .store_utilities import rewrite_nonportable_content_links
@@ -53,10 +55,13 @@ from xmodule.util.misc import escape_invalid_characters
 
 log = logging.getLogger(__name__)
 
+# The number of static files import_static_content imports at once
+STATIC_CONTENT_IMPORT_WORKERS = 4
+
 
 def import_static_content(
         course_data_path, static_content_store,
-        target_id, subpath='static', verbose=False):
+        target_id, subpath='static', verbose=False, workers=STATIC_CONTENT_IMPORT_WORKERS):
 
     remap_dict = {}
 
@@ -76,56 +81,74 @@ def import_static_content(
     mimetypes.add_type('application/octet-stream', '.srt')
     mimetypes_list = mimetypes.types_map.values()
 
-    for dirname, _, filenames in os.walk(static_dir):
-        for filename in filenames:
-
-            content_path = os.path.join(dirname, filename)
-
-            if re.match(ASSET_IGNORE_REGEX, filename):
-                if verbose:
-                    log.debug('skipping static content %s...', content_path)
-                continue
-
-            if verbose:
-                log.debug('importing static content %s...', content_path)
-
-            try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
-            except IOError:
-                if filename.startswith('._'):
-                    # OS X "companion files". See
-                    # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
-                    continue
-                # Not a 'hidden file', then re-raise exception
-                raise
+    # the assets already in the course, so that re-importing an unchanged asset can be skipped
+    existing_assets, __ = static_content_store.get_all_content_for_course(target_id)
+    existing_assets = {asset['asset_key'].path: asset for asset in existing_assets}
 
-            # strip away leading path from the name
-            fullname_with_subpath = content_path.replace(static_dir, '')
-            if fullname_with_subpath.startswith('/'):
-                fullname_with_subpath = fullname_with_subpath[1:]
-            asset_key = StaticContent.compute_location(target_id, fullname_with_subpath)
-
-            policy_ele = policy.get(asset_key.path, {})
+    def _import_static_file(content_path):
+        """
+        Import the file at content_path, and return its path relative to static_dir and its asset
+        key, or None if it can't be read.
+        """
+        filename = os.path.basename(content_path)
+        if verbose:
+            log.debug('importing static content %s...', content_path)
 
-            # During export display name is used to create files, strip away slashes from name
-            displayname = escape_invalid_characters(
-                name=policy_ele.get('displayname', filename),
-                invalid_char_list=['/', '\\']
-            )
-            locked = policy_ele.get('locked', False)
-            mime_type = policy_ele.get('contentType')
-
-            # Check extracted contentType in list of all valid mimetypes
-            if not mime_type or mime_type not in mimetypes_list:
-                mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
-            content = StaticContent(
-                asset_key, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
+        try:
+            stream = open(content_path, 'rb')
+        except IOError:
+            if filename.startswith('._'):
+                # OS X "companion files". See
+                # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+                return None
+            # Not a 'hidden file', then re-raise exception
+            raise
+
+        # strip away leading path from the name
+        fullname_with_subpath = content_path.replace(static_dir, '')
+        if fullname_with_subpath.startswith('/'):
+            fullname_with_subpath = fullname_with_subpath[1:]
+        asset_key = StaticContent.compute_location(target_id, fullname_with_subpath)
+
+        policy_ele = policy.get(asset_key.path, {})
+
+        # During export display name is used to create files, strip away slashes from name
+        displayname = escape_invalid_characters(
+            name=policy_ele.get('displayname', filename),
+            invalid_char_list=['/', '\\']
+        )
+        locked = policy_ele.get('locked', False)
+        mime_type = policy_ele.get('contentType')
+
+        # Check extracted contentType in list of all valid mimetypes
+        if not mime_type or mime_type not in mimetypes_list:
+            mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
+
+        with stream:
+            length = os.fstat(stream.fileno()).st_size
+            existing = existing_assets.get(asset_key.path)
+            # The file is only read to compute its md5 when everything else about the asset is
+            # unchanged; otherwise it's read once, as it's saved (and the content store computes its md5)
+            if existing is not None and (
+                    existing.get('length'), existing.get('displayname'), existing.get('contentType'),
+                    existing.get('locked', False), existing.get('import_path'),
+            ) == (length, displayname, mime_type, locked, fullname_with_subpath):
+                if existing.get('md5') == _stream_md5(stream):
+                    if verbose:
+                        log.debug('skipping unchanged static content %s...', content_path)
+                    return fullname_with_subpath, asset_key
+                stream.seek(0)
+
+            content = StaticContentStream(
+                asset_key, displayname, mime_type, stream,
+                import_path=fullname_with_subpath, locked=locked,
+                length=length,
             )
 
             # first let's save a thumbnail so we can get back a thumbnail location
-            thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
+            thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(
+                content, tempfile_path=content_path
+            )
 
             if thumbnail_content is not None:
                 content.thumbnail_location = thumbnail_location
@@ -138,13 +161,47 @@ def import_static_content(
                     fullname_with_subpath, err
                 ))
 
-            # store the remapping information which will be needed
-            # to subsitute in the module data
-            remap_dict[fullname_with_subpath] = asset_key
+        return fullname_with_subpath, asset_key
+
+    content_paths = []
+    for dirname, _, filenames in os.walk(static_dir):
+        for filename in filenames:
+
+            content_path = os.path.join(dirname, filename)
+
+            if re.match(ASSET_IGNORE_REGEX, filename):
+                if verbose:
+                    log.debug('skipping static content %s...', content_path)
+                continue
+
+            content_paths.append(content_path)
+
+    # the files are streamed into the content store, so a bounded number are in memory at once
+    pool = ThreadPool(workers)
+    try:
+        for imported in pool.imap_unordered(_import_static_file, content_paths):
+            if imported is not None:
+                # store the remapping information which will be needed
+                # to subsitute in the module data
+                fullname_with_subpath, asset_key = imported
+                remap_dict[fullname_with_subpath] = asset_key
+    finally:
+        pool.terminate()
+        pool.join()
 
     return remap_dict
 
 
+def _stream_md5(stream):
+    """
+    Return the hex md5 of the rest of the file stream (as GridFS computes it), reading it in chunks.
+    """
+    md5 = hashlib.md5()
+    for chunk in iter(lambda: stream.read(STREAM_DATA_CHUNK_SIZE * 64), ''):
+        md5.update(chunk)
+    return md5.hexdigest()
+
+
 class ImportManager(object):
     """
     Import xml-based courselikes from data_dir into modulestore.
@@ -379,6 +436,30 @@ class ImportManager(object):
         all_locs = set(self.xml_module_store.modules[courselike_key].keys())
         all_locs.remove(source_courselike.location)
 
+        # Stores which can import all of the blocks at once (split) are given them all at the end,
+        # rather than importing them one at a time.
+        bulk_import = self.store.check_supports(dest_id, 'import_xblocks')
+        imported_blocks = []
+
+        def import_module(module):
+            """
+            Import the module, or save it to import with the others if the store imports them all at once.
+            """
+            if bulk_import:
+                imported_blocks.append(_update_module_for_import(
+                    module, courselike_key, dest_id, do_import_static=self.do_import_static,
+                ))
+            else:
+                _update_and_import_module(
+                    module,
+                    self.store,
+                    self.user_id,
+                    courselike_key,
+                    dest_id,
+                    do_import_static=self.do_import_static,
+                    runtime=courselike.runtime,
+                )
+
         def depth_first(subtree):
             """
             Import top down just so import code can make assumptions about parents always being available
@@ -394,15 +475,7 @@ class ImportManager(object):
                     if self.verbose:
                         log.debug('importing module location %s', child.location)
 
-                    _update_and_import_module(
-                        child,
-                        self.store,
-                        self.user_id,
-                        courselike_key,
-                        dest_id,
-                        do_import_static=self.do_import_static,
-                        runtime=courselike.runtime,
-                    )
+                    import_module(child)
 
                     depth_first(child)
 
@@ -412,15 +485,10 @@ class ImportManager(object):
             if self.verbose:
                 log.debug('importing module location %s', leftover)
 
-            _update_and_import_module(
-                self.xml_module_store.get_item(leftover),
-                self.store,
-                self.user_id,
-                courselike_key,
-                dest_id,
-                do_import_static=self.do_import_static,
-                runtime=courselike.runtime,
-            )
+            import_module(self.xml_module_store.get_item(leftover))
+
+        if imported_blocks:
+            self.store.import_xblocks(self.user_id, dest_id, imported_blocks)
 
     def run_imports(self):
         """
@@ -672,6 +740,17 @@ def _update_and_import_module(
     Update all the module reference fields to the destination course id,
     then import the module into the destination course.
     """
+    block_type, block_id, fields = _update_module_for_import(
+        module, source_course_id, dest_course_id, do_import_static
+    )
+    return store.import_xblock(user_id, dest_course_id, block_type, block_id, fields, runtime)
+
+
+def _update_module_for_import(module, source_course_id, dest_course_id, do_import_static=True):
+    """
+    Update all the module reference fields to the destination course id, and return
+    the module's (block_type, block_id, fields) to import into the destination course.
+    """
     logging.debug(u'processing import of module %s...', unicode(module.location))
 
     def _update_module_references(module, source_course_id, dest_course_id):
@@ -737,10 +816,7 @@ def _update_and_import_module(
 
     fields = _update_module_references(module, source_course_id, dest_course_id)
 
-    return store.import_xblock(
-        user_id, dest_course_id, module.location.category,
-        module.location.block_id, fields, runtime
-    )
+    return module.location.category, module.location.block_id, fields
 
 
 def _import_course_draft(
@@ -10,14 +10,28 @@ from xmodule.tests import DATA_DIR
 
 class IgnoredFilesTestCase(unittest.TestCase):
     "Tests for ignored files"
-    def test_ignore_tilde_static_files(self):
-        course_dir = DATA_DIR / "tilde"
-        course_id = SlashSeparatedCourseKey("edX", "tilde", "Fall_2012")
+    def import_static(self, course_dir, course_id, existing_assets=()):
+        """
+        Import the static content of course_dir into a mock content store holding existing_assets,
+        and return a dict of the data of the saved content by name.
+        """
         content_store = Mock()
         content_store.generate_thumbnail.return_value = ("content", "location")
+        content_store.get_all_content_for_course.return_value = (list(existing_assets), len(existing_assets))
+        name_val = {}
+
+        def save(content):
+            """The content is streamed from the file, so it must be read while saving."""
+            name_val[content.name] = ''.join(content.stream_data())
+        content_store.save.side_effect = save
+
         import_static_content(course_dir, content_store, course_id)
-        saved_static_content = [call[0][0] for call in content_store.save.call_args_list]
-        name_val = {sc.name: sc.data for sc in saved_static_content}
+        return name_val
+
+    def test_ignore_tilde_static_files(self):
+        course_dir = DATA_DIR / "tilde"
+        course_id = SlashSeparatedCourseKey("edX", "tilde", "Fall_2012")
+        name_val = self.import_static(course_dir, course_id)
         self.assertIn("example.txt", name_val)
         self.assertNotIn("example.txt~", name_val)
         self.assertIn("GREEN", name_val["example.txt"])
@@ -28,14 +42,33 @@ class IgnoredFilesTestCase(unittest.TestCase):
         """
         course_dir = DATA_DIR / "dot-underscore"
         course_id = SlashSeparatedCourseKey("edX", "dot-underscore", "2014_Fall")
-        content_store = Mock()
-        content_store.generate_thumbnail.return_value = ("content", "location")
-        import_static_content(course_dir, content_store, course_id)
-        saved_static_content = [call[0][0] for call in content_store.save.call_args_list]
-        name_val = {sc.name: sc.data for sc in saved_static_content}
+        name_val = self.import_static(course_dir, course_id)
         self.assertIn("example.txt", name_val)
         self.assertIn(".example.txt", name_val)
         self.assertNotIn("._example.txt", name_val)
         self.assertNotIn(".DS_Store", name_val)
         self.assertIn("GREEN", name_val["example.txt"])
         self.assertIn("BLUE", name_val[".example.txt"])
+
+    def test_skip_unchanged_static_files(self):
+        """
+        Test that re-importing an asset with the same content and metadata doesn't save it again
+        """
+        course_dir = DATA_DIR / "tilde"
+        course_id = SlashSeparatedCourseKey("edX", "tilde", "Fall_2012")
+        asset_key = course_id.make_asset_key('asset', 'example.txt')
+        unchanged = {
+            'asset_key': asset_key,
+            'md5': '085d5d450c9c61aa9cdd6b9252cdee1e',
+            'length': 6,
+            'displayname': 'example.txt',
+            'contentType': 'text/plain',
+            'import_path': 'example.txt',
+        }
+        self.assertNotIn("example.txt", self.import_static(course_dir, course_id, [unchanged]))
+
+        changed = dict(unchanged, md5='0' * 32)
+        self.assertIn("example.txt", self.import_static(course_dir, course_id, [changed]))
+
+        resized = dict(unchanged, length=7)
+        self.assertEqual(self.import_static(course_dir, course_id, [resized])["example.txt"], "GREEN\n")
@@ -1,43 +1,43 @@
-from xmodule.modulestore.django import modulestore
-from xmodule.course_module import CourseDescriptor
 from django.conf import settings
 
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from microsite_configuration import microsite
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from staticfiles.storage import staticfiles_storage
 
 
-def get_visible_courses():
+def get_visible_courses_filter():
     """
-    Return the set of CourseDescriptors that should be visible in this branded instance
+    Return the keyword arguments to CourseOverview.get_catalog_courses that select
+    the courses visible in this branded instance.
     """
-
     filtered_by_org = microsite.get_value('course_org_filter')
-
-    _courses = modulestore().get_courses(org=filtered_by_org)
-
-    courses = [c for c in _courses
-               if isinstance(c, CourseDescriptor)]
-    courses = sorted(courses, key=lambda course: course.number)
+    if filtered_by_org:
+        return {'org': filtered_by_org}
 
     subdomain = microsite.get_value('subdomain', 'default')
 
-    # See if we have filtered course listings in this domain
-    filtered_visible_ids = None
-
     # this is legacy format which is outside of the microsite feature -- also handle dev case, which should not filter
     if hasattr(settings, 'COURSE_LISTINGS') and subdomain in settings.COURSE_LISTINGS and not settings.DEBUG:
-        filtered_visible_ids = frozenset([SlashSeparatedCourseKey.from_deprecated_string(c) for c in settings.COURSE_LISTINGS[subdomain]])
+        course_listing = settings.COURSE_LISTINGS[subdomain]
+        if course_listing:
+            return {
+                'course_keys': sorted(SlashSeparatedCourseKey.from_deprecated_string(c) for c in course_listing)
+            }
 
-    if filtered_by_org:
-        return [course for course in courses if course.location.org == filtered_by_org]
-    if filtered_visible_ids:
-        return [course for course in courses if course.id in filtered_visible_ids]
-    else:
-        # Let's filter out any courses in an "org" that has been declared to be
-        # in a Microsite
-        org_filter_out_set = microsite.get_all_orgs()
-        return [course for course in courses if course.location.org not in org_filter_out_set]
+    # Let's filter out any courses in an "org" that has been declared to be
+    # in a Microsite
+    return {'excluded_orgs': sorted(microsite.get_all_orgs())}
+
+
+def get_visible_courses(order='number'):
+    """
+    Return the list of CourseOverviews of courses that should be visible in this branded instance.
+
+    Arguments:
+        order (str): One of CourseOverview.CATALOG_ORDERINGS.
+    """
+    return list(CourseOverview.get_catalog_courses(order=order, **get_visible_courses_filter()))
 
 
 def get_university_for_request():
@@ -5,7 +5,10 @@ from datetime import datetime
 import logging
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils.timezone import UTC
 
 from lazy import lazy
@@ -17,6 +20,13 @@ from xmodule.modulestore.django import modulestore
 log = logging.getLogger("edx.ccx")
 
 
+def overrides_version_cache_key(ccx_id):
+    """
+    The cache key of the version counter of the CcxFieldOverrides of the CCX with id `ccx_id`.
+    """
+    return u'ccx.overrides.version.{}'.format(ccx_id)
+
+
 class CustomCourseForEdX(models.Model):
     """
     A Custom Course.
@@ -107,3 +117,13 @@ class CcxFieldOverride(models.Model):
         unique_together = (('ccx', 'location', 'field'),)
 
     value = models.TextField(default='null')
+
+
+@receiver(post_save, sender=CustomCourseForEdX)
+def reset_overrides_version(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Make sure that a new CCX never sees cached overrides of an earlier CCX
+    that had the same id.
+    """
+    if created:
+        cache.delete(overrides_version_cache_key(instance.id))
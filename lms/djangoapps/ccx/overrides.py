@@ -4,20 +4,32 @@ by the individual custom courses feature.
 """
 import json
 import logging
+import time
+from collections import defaultdict
 
+from django.core.cache import cache
 from django.db import transaction, IntegrityError
 
 import request_cache
 
-from courseware.field_overrides import FieldOverrideProvider  # pylint: disable=import-error
+from courseware.field_overrides import FieldOverrideProvider, clear_resolved_overrides  # pylint: disable=import-error
 from opaque_keys.edx.keys import CourseKey, UsageKey
 from ccx_keys.locator import CCXLocator, CCXBlockUsageLocator
 
-from .models import CcxFieldOverride, CustomCourseForEdX
+from .models import CcxFieldOverride, CustomCourseForEdX, overrides_version_cache_key
 
 
 log = logging.getLogger(__name__)
 
+# Sentinel for fields that have no override, in the cache of deserialized values
+NOTSET = object()
+
+# Seconds the overrides of a CCX are kept in the shared cache.  The version is
+# bumped inside the transaction that changes the overrides, so a concurrent
+# request can still cache the uncommitted (old) overrides under the new
+# version; keeping the entries short-lived bounds how long that can be served.
+OVERRIDES_CACHE_TIMEOUT = 60
+
 
 class CustomCoursesForEdxOverrideProvider(FieldOverrideProvider):
     """
@@ -25,6 +37,8 @@ class CustomCoursesForEdxOverrideProvider(FieldOverrideProvider):
     :class:`~courseware.field_overrides.FieldOverrideProvider` which allows for
     overrides to be made on a per user basis.
     """
+    request_cache_names = ('ccx', 'ccx-overrides', 'ccx-overrides-decoded')
+
     def get(self, block, name, default):
         """
         Just call the get_override_for_ccx method if there is a ccx
@@ -84,41 +98,100 @@ def get_override_for_ccx(ccx, block, name, default=None):
     specify the block and the name of the field.  If the field is not
     overridden for the given ccx, returns `default`.
     """
-    overrides = _get_overrides_for_ccx(ccx)
+    non_ccx_key = _non_ccx_location(block.location)
+
+    # Each override is only deserialized once per request
+    decoded_cache = request_cache.get_cache('ccx-overrides-decoded')
+    cache_key = (ccx.id, non_ccx_key, name)
+    if cache_key not in decoded_cache:
+        block_overrides = _get_overrides_for_ccx(ccx).get(non_ccx_key, {})
+        if name not in block_overrides:
+            value = NOTSET
+        else:
+            try:
+                value = block.fields[name].from_json(block_overrides[name])
+            except KeyError:
+                value = block_overrides[name]
+        decoded_cache[cache_key] = value
 
-    if isinstance(block.location, CCXBlockUsageLocator):
-        non_ccx_key = block.location.to_block_locator()
-    else:
-        non_ccx_key = block.location
+    value = decoded_cache[cache_key]
+    return default if value is NOTSET else value
 
-    block_overrides = overrides.get(non_ccx_key, {})
-    if name in block_overrides:
-        try:
-            return block.fields[name].from_json(block_overrides[name])
-        except KeyError:
-            return block_overrides[name]
-    else:
-        return default
+
+def _non_ccx_location(location):
+    """
+    Returns `location` without any CCX information.
+    """
+    if isinstance(location, CCXBlockUsageLocator):
+        return location.to_block_locator()
+    return location
+
+
+def _overrides_version_key(ccx):
+    """
+    The shared cache key of the version counter of the overrides for `ccx`.
+    """
+    return overrides_version_cache_key(ccx.id)
+
+
+def _get_overrides_version(ccx):
+    """
+    Returns the current version of the overrides for `ccx`.
+    """
+    version = cache.get(_overrides_version_key(ccx))
+    if version is None:
+        # Start from the clock, so that a version evicted from the cache is
+        # never reused for a different set of overrides.
+        cache.add(_overrides_version_key(ccx), int(time.time() * 1000))
+        version = cache.get(_overrides_version_key(ccx))
+    return version
+
+
+def _bump_overrides_version(ccx):
+    """
+    Mark the cached overrides for `ccx` as out of date, after they have been changed.
+    """
+    try:
+        cache.incr(_overrides_version_key(ccx))
+    except ValueError:
+        cache.set(_overrides_version_key(ccx), int(time.time() * 1000))
+    clear_resolved_overrides()
+
+
+def _forget_decoded_override(ccx, location, name):
+    """
+    Remove the deserialized value of field `name` of the block at `location`
+    from the cache of deserialized overrides for `ccx`.
+    """
+    request_cache.get_cache('ccx-overrides-decoded').pop((ccx.id, _non_ccx_location(location), name), None)
 
 
 def _get_overrides_for_ccx(ccx):
     """
-    Returns a dictionary mapping field name to overriden value for any
-    overrides set on this block for this CCX.
+    Returns a dictionary mapping block locations to dictionaries of the
+    decoded JSON override values for that block, keyed by field name.  The
+    id of each override is stored under the field name followed by "_id".
+
+    The map is kept in the request cache, and in the shared cache under the
+    current version of the overrides for this CCX.
     """
     overrides_cache = request_cache.get_cache('ccx-overrides')
 
     if ccx not in overrides_cache:
-        overrides = {}
-        query = CcxFieldOverride.objects.filter(
-            ccx=ccx,
-        )
+        cache_key = u'ccx.overrides.{}.{}'.format(ccx.id, _get_overrides_version(ccx))
+        overrides = cache.get(cache_key)
+        if overrides is None:
+            overrides = {}
+            query = CcxFieldOverride.objects.filter(
+                ccx=ccx,
+            )
 
-        for override in query:
-            block_overrides = overrides.setdefault(override.location, {})
-            block_overrides[override.field] = json.loads(override.value)
-            block_overrides[override.field + "_id"] = override.id
-            block_overrides[override.field + "_instance"] = override
+            for override in query:
+                block_overrides = overrides.setdefault(override.location, {})
+                block_overrides[override.field] = json.loads(override.value)
+                block_overrides[override.field + "_id"] = override.id
+
+            cache.set(cache_key, overrides, OVERRIDES_CACHE_TIMEOUT)
 
         overrides_cache[ccx] = overrides
 
@@ -135,13 +208,10 @@ def override_field_for_ccx(ccx, block, name, value):
     field = block.fields[name]
     value_json = field.to_json(value)
     serialized_value = json.dumps(value_json)
-    override_has_changes = False
-
-    override = get_override_for_ccx(ccx, block, name + "_instance")
-    if override:
-        override_has_changes = serialized_value != override.value
+    block_overrides = _get_overrides_for_ccx(ccx).setdefault(block.location, {})
+    override_id = block_overrides.get(name + "_id")
 
-    if not override:
+    if override_id is None:
         try:
             override = CcxFieldOverride.objects.create(
                 ccx=ccx,
@@ -149,19 +219,96 @@ def override_field_for_ccx(ccx, block, name, value):
                 field=name,
                 value=serialized_value
             )
-            _get_overrides_for_ccx(ccx).setdefault(block.location, {})[name + "_id"] = override.id
         except IntegrityError:
             transaction.commit()
             kwargs = {'ccx': ccx, 'location': block.location, 'field': name}
             override = CcxFieldOverride.objects.get(**kwargs)
-            override_has_changes = serialized_value != override.value
+            if serialized_value != override.value:
+                override.value = serialized_value
+                override.save()
+        block_overrides[name + "_id"] = override.id
+    elif block_overrides.get(name) != value_json:
+        CcxFieldOverride(
+            id=override_id,
+            ccx=ccx,
+            location=block.location,
+            field=name,
+            value=serialized_value,
+        ).save()
+    else:
+        return
+
+    block_overrides[name] = value_json
+    _forget_decoded_override(ccx, block.location, name)
+    _bump_overrides_version(ccx)
+
+
+@transaction.commit_on_success
+def bulk_override_fields_for_ccx(ccx, overrides):
+    """
+    Overrides many fields for the `ccx` at once.  `overrides` is an iterable
+    of (block, name, value) tuples, as would be passed to
+    :func:`override_field_for_ccx`.
+
+    New overrides are created with a single query, and changed overrides are
+    updated with one query per distinct value, so that schedule changes
+    touching every block in the course don't need a query per block.
+
+    If the cached overrides are out of date, so that some of the new overrides
+    already exist, those are updated instead.
+    """
+    ccx_overrides = _get_overrides_for_ccx(ccx)
+    to_create = {}
+    ids_by_value = defaultdict(list)
+
+    for block, name, value in overrides:
+        value_json = block.fields[name].to_json(value)
+        serialized_value = json.dumps(value_json)
+        block_overrides = ccx_overrides.setdefault(block.location, {})
+
+        if (block.location, name) in to_create:
+            to_create[(block.location, name)].value = serialized_value
+        elif name + "_id" not in block_overrides:
+            to_create[(block.location, name)] = CcxFieldOverride(
+                ccx=ccx,
+                location=block.location,
+                field=name,
+                value=serialized_value,
+            )
+        elif block_overrides.get(name) != value_json:
+            ids_by_value[serialized_value].append(block_overrides[name + "_id"])
+        else:
+            continue
+
+        block_overrides[name] = value_json
+        _forget_decoded_override(ccx, block.location, name)
+
+    if not to_create and not ids_by_value:
+        return
+
+    if to_create:
+        try:
+            CcxFieldOverride.objects.bulk_create(to_create.values())
+        except IntegrityError:
+            # Some of the overrides were created since the cached overrides were
+            # read: update those, and create the rest.
+            transaction.commit()
+            for override in CcxFieldOverride.objects.filter(ccx=ccx).only('id', 'location', 'field'):
+                existing = to_create.pop((override.location, override.field), None)
+                if existing is not None:
+                    ids_by_value[existing.value].append(override.id)
+                    ccx_overrides.setdefault(override.location, {})[override.field + "_id"] = override.id
+            if to_create:
+                CcxFieldOverride.objects.bulk_create(to_create.values())
+        # bulk_create doesn't set the ids of the new rows
+        for override in CcxFieldOverride.objects.filter(ccx=ccx).only('id', 'location', 'field'):
+            if (override.location, override.field) in to_create:
+                ccx_overrides.setdefault(override.location, {})[override.field + "_id"] = override.id
 
-    if override_has_changes:
-        override.value = serialized_value
-        override.save()
+    for serialized_value, ids in ids_by_value.iteritems():
+        CcxFieldOverride.objects.filter(id__in=ids).update(value=serialized_value)
 
-    _get_overrides_for_ccx(ccx).setdefault(block.location, {})[name] = value_json
-    _get_overrides_for_ccx(ccx).setdefault(block.location, {})[name + "_instance"] = override
+    _bump_overrides_version(ccx)
 
 
 def clear_override_for_ccx(ccx, block, name):
@@ -178,6 +325,7 @@ def clear_override_for_ccx(ccx, block, name):
             field=name).delete()
 
         clear_ccx_field_info_from_ccx_map(ccx, block, name)
+        _bump_overrides_version(ccx)
 
     except CcxFieldOverride.DoesNotExist:
         pass
@@ -191,9 +339,9 @@ def clear_ccx_field_info_from_ccx_map(ccx, block, name):  # pylint: disable=inva
         ccx_override_map = _get_overrides_for_ccx(ccx).setdefault(block.location, {})
         ccx_override_map.pop(name)
         ccx_override_map.pop(name + "_id")
-        ccx_override_map.pop(name + "_instance")
     except KeyError:
         pass
+    _forget_decoded_override(ccx, block.location, name)
 
 
 def bulk_delete_ccx_override_fields(ccx, ids):
@@ -204,3 +352,4 @@ def bulk_delete_ccx_override_fields(ccx, ids):
     ids = list(set(ids))
     if ids:
         CcxFieldOverride.objects.filter(ccx=ccx, id__in=ids).delete()
+        _bump_overrides_version(ccx)
@@ -3,6 +3,7 @@
 tests for overrides
 """
 import datetime
+import json
 import mock
 import pytz
 from nose.plugins.attrib import attr
@@ -16,8 +17,8 @@ from xmodule.modulestore.tests.django_utils import (
     TEST_DATA_SPLIT_MODULESTORE)
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
-from ..models import CustomCourseForEdX
-from ..overrides import override_field_for_ccx
+from ..models import CcxFieldOverride, CustomCourseForEdX
+from ..overrides import bulk_override_fields_for_ccx, get_override_for_ccx, override_field_for_ccx
 
 from .test_views import flatten, iter_blocks
 
@@ -155,3 +156,74 @@ class TestFieldOverrides(ModuleStoreTestCase):
         override_field_for_ccx(self.ccx, chapter, 'due', ccx_due)
         vertical = chapter.get_children()[0].get_children()[0]
         self.assertEqual(vertical.due, ccx_due)
+
+    def test_overrides_cached_across_requests(self):
+        """
+        Test that overrides are loaded from the shared cache in later requests,
+        until they are changed.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        new_ccx_start = datetime.datetime(2015, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        chapter = self.ccx.course.get_children()[0]
+        override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
+
+        RequestCache.clear_request_cache()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_override_for_ccx(self.ccx, chapter, 'start'), ccx_start)
+
+        RequestCache.clear_request_cache()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_override_for_ccx(self.ccx, chapter, 'start'), ccx_start)
+
+        override_field_for_ccx(self.ccx, chapter, 'start', new_ccx_start)
+        RequestCache.clear_request_cache()
+        self.assertEqual(get_override_for_ccx(self.ccx, chapter, 'start'), new_ccx_start)
+
+    def test_bulk_override(self):
+        """
+        Test that overrides of many blocks are created, and changed, with a
+        constant number of queries.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        new_ccx_start = datetime.datetime(2015, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        chapters = self.ccx.course.get_children()
+
+        # Create the overrides, then read back their ids
+        with self.assertNumQueries(2):
+            bulk_override_fields_for_ccx(self.ccx, [(chapter, 'start', ccx_start) for chapter in chapters])
+        self.assertEqual([chapter.start for chapter in chapters], [ccx_start] * len(chapters))
+        self.assertTrue(all(get_override_for_ccx(self.ccx, chapter, 'start_id') for chapter in chapters))
+
+        with self.assertNumQueries(1):
+            bulk_override_fields_for_ccx(self.ccx, [(chapter, 'start', new_ccx_start) for chapter in chapters])
+        RequestCache.clear_request_cache()
+        self.assertEqual(
+            [get_override_for_ccx(self.ccx, chapter, 'start') for chapter in chapters],
+            [new_ccx_start] * len(chapters)
+        )
+
+    def test_bulk_override_with_stale_cache(self):
+        """
+        Test that overrides created since the cached overrides were read are
+        updated, rather than created again.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        new_ccx_start = datetime.datetime(2015, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        chapters = self.ccx.course.get_children()
+
+        # Cache the (empty) overrides, then create one behind the cache's back
+        self.assertIsNone(get_override_for_ccx(self.ccx, chapters[0], 'start'))
+        CcxFieldOverride.objects.create(
+            ccx=self.ccx,
+            location=chapters[0].location,
+            field='start',
+            value=json.dumps(chapters[0].fields['start'].to_json(ccx_start)),
+        )
+
+        bulk_override_fields_for_ccx(self.ccx, [(chapter, 'start', new_ccx_start) for chapter in chapters])
+        RequestCache.clear_request_cache()
+        self.assertEqual(
+            [get_override_for_ccx(self.ccx, chapter, 'start') for chapter in chapters],
+            [new_ccx_start] * len(chapters)
+        )
+        self.assertEqual(CcxFieldOverride.objects.filter(ccx=self.ccx, field='start').count(), len(chapters))
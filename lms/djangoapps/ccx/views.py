@@ -55,6 +55,7 @@ from .overrides import (
     override_field_for_ccx,
     clear_ccx_field_info_from_ccx_map,
     bulk_delete_ccx_override_fields,
+    bulk_override_fields_for_ccx,
 )
 
 
@@ -176,12 +177,14 @@ def create_ccx(request, course, ccx=None):
 
     # Hide anything that can show up in the schedule
     hidden = 'visible_to_staff_only'
+    hidden_overrides = []
     for chapter in course.get_children():
-        override_field_for_ccx(ccx, chapter, hidden, True)
+        hidden_overrides.append((chapter, hidden, True))
         for sequential in chapter.get_children():
-            override_field_for_ccx(ccx, sequential, hidden, True)
+            hidden_overrides.append((sequential, hidden, True))
             for vertical in sequential.get_children():
-                override_field_for_ccx(ccx, vertical, hidden, True)
+                hidden_overrides.append((vertical, hidden, True))
+    bulk_override_fields_for_ccx(ccx, hidden_overrides)
 
     ccx_id = CCXLocator.from_course_locator(course.id, ccx.id)  # pylint: disable=no-member
     url = reverse('ccx_coach_dashboard', kwargs={'course_id': ccx_id})
@@ -198,35 +201,36 @@ def save_ccx(request, course, ccx=None):
     if not ccx:
         raise Http404
 
-    def override_fields(parent, data, graded, earliest=None, ccx_ids_to_delete=None):
+    def override_fields(parent, data, graded, earliest=None, ccx_ids_to_delete=None, overrides=None):
         """
-        Recursively apply CCX schedule data to CCX by overriding the
-        `visible_to_staff_only`, `start` and `due` fields for units in the
-        course.
+        Recursively collect CCX schedule data to apply to the CCX, by
+        overriding the `visible_to_staff_only`, `start` and `due` fields for
+        units in the course.
         """
         if ccx_ids_to_delete is None:
             ccx_ids_to_delete = []
+        if overrides is None:
+            overrides = []
         blocks = {
             str(child.location): child
             for child in parent.get_children()}
 
         for unit in data:
             block = blocks[unit['location']]
-            override_field_for_ccx(
-                ccx, block, 'visible_to_staff_only', unit['hidden'])
+            overrides.append((block, 'visible_to_staff_only', unit['hidden']))
 
             start = parse_date(unit['start'])
             if start:
                 if not earliest or start < earliest:
                     earliest = start
-                override_field_for_ccx(ccx, block, 'start', start)
+                overrides.append((block, 'start', start))
             else:
                 ccx_ids_to_delete.append(get_override_for_ccx(ccx, block, 'start_id'))
                 clear_ccx_field_info_from_ccx_map(ccx, block, 'start')
 
             due = parse_date(unit['due'])
             if due:
-                override_field_for_ccx(ccx, block, 'due', due)
+                overrides.append((block, 'due', due))
             else:
                 ccx_ids_to_delete.append(get_override_for_ccx(ccx, block, 'due_id'))
                 clear_ccx_field_info_from_ccx_map(ccx, block, 'due')
@@ -236,11 +240,12 @@ def save_ccx(request, course, ccx=None):
 
             children = unit.get('children', None)
             if children:
-                override_fields(block, children, graded, earliest, ccx_ids_to_delete)
-        return earliest, ccx_ids_to_delete
+                override_fields(block, children, graded, earliest, ccx_ids_to_delete, overrides)
+        return earliest, ccx_ids_to_delete, overrides
 
     graded = {}
-    earliest, ccx_ids_to_delete = override_fields(course, json.loads(request.body), graded, [])
+    earliest, ccx_ids_to_delete, overrides = override_fields(course, json.loads(request.body), graded, [])
+    bulk_override_fields_for_ccx(ccx, overrides)
     bulk_delete_ccx_override_fields(ccx, ccx_ids_to_delete)
     if earliest:
         override_field_for_ccx(ccx, course, 'start', earliest)
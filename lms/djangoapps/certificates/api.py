@@ -81,7 +81,7 @@ def get_certificates_for_user(username):
 
 
 def generate_user_certificates(student, course_key, course=None, insecure=False, generation_mode='batch',
-                               forced_grade=None):
+                               forced_grade=None, xqueue=None, scores_client=None):
     """
     It will add the add-cert request into the xqueue.
 
@@ -102,15 +102,21 @@ def generate_user_certificates(student, course_key, course=None, insecure=False,
         in case of django command and `self` if student initiated the request.
         forced_grade - a string indicating to replace grade parameter. if present grading
                        will be skipped.
+        xqueue - (XQueueCertInterface) Optionally provide the interface to use, so that
+                 callers generating many certificates can share one xqueue connection.
+        scores_client - (ScoresClient) Optionally provide the student's prefetched scores
+                 to grade them with.
     """
-    xqueue = XQueueCertInterface()
+    if xqueue is None:
+        xqueue = XQueueCertInterface()
     if insecure:
         xqueue.use_https = False
     generate_pdf = not has_html_certificates_enabled(course_key, course)
     status, cert = xqueue.add_cert(student, course_key,
                                    course=course,
                                    generate_pdf=generate_pdf,
-                                   forced_grade=forced_grade)
+                                   forced_grade=forced_grade,
+                                   scores_client=scores_client)
     if status in [CertificateStatuses.generating, CertificateStatuses.downloadable]:
         emit_certificate_event('created', student, course_key, course, {
             'user_id': student.id,
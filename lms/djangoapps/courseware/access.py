@@ -417,6 +417,26 @@ def _can_load_course_overview(user, course_overview):
         else response
     )
 
+
+def _can_see_course_overview_exists(user, course_overview):
+    """
+    Check if a user can see that the course of a course overview exists.
+
+    This is the same check as 'see_exists' for a course descriptor: the user
+    can see a course if they can enroll in it or load it.
+    """
+    if settings.FEATURES.get('ACCESS_REQUIRE_STAFF_FOR_COURSE'):
+        if course_overview.ispublic:
+            debug("Allow: ACCESS_REQUIRE_STAFF_FOR_COURSE and ispublic")
+            return ACCESS_GRANTED
+        return _has_staff_access_to_descriptor(user, course_overview, course_overview.id)
+
+    return (
+        ACCESS_GRANTED
+        if (_can_enroll_courselike(user, course_overview) or _can_load_course_overview(user, course_overview))
+        else ACCESS_DENIED
+    )
+
 _COURSE_OVERVIEW_CHECKERS = {
     'enroll': _can_enroll_courselike,
     'load': _can_load_course_overview,
@@ -424,7 +444,17 @@ _COURSE_OVERVIEW_CHECKERS = {
         _can_load_course_overview(user, course_overview)
         and _can_load_course_on_mobile(user, course_overview)
     ),
-    'view_courseware_with_prerequisites': _can_view_courseware_with_prerequisites
+    'view_courseware_with_prerequisites': _can_view_courseware_with_prerequisites,
+    'see_exists': _can_see_course_overview_exists,
+    'see_in_catalog': lambda user, course_overview: (
+        _has_catalog_visibility(course_overview, CATALOG_VISIBILITY_CATALOG_AND_ABOUT)
+        or _has_staff_access_to_descriptor(user, course_overview, course_overview.id)
+    ),
+    'see_about_page': lambda user, course_overview: (
+        _has_catalog_visibility(course_overview, CATALOG_VISIBILITY_CATALOG_AND_ABOUT)
+        or _has_catalog_visibility(course_overview, CATALOG_VISIBILITY_ABOUT)
+        or _has_staff_access_to_descriptor(user, course_overview, course_overview.id)
+    ),
 }
 COURSE_OVERVIEW_SUPPORTED_ACTIONS = _COURSE_OVERVIEW_CHECKERS.keys()  # pylint: disable=invalid-name
 
@@ -1,11 +1,15 @@
 from collections import defaultdict
 from fs.errors import ResourceNotFoundError
+import hashlib
 import logging
 import inspect
 
 from path import Path as path
 from django.http import Http404
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import Q
 
 from edxmako.shortcuts import render_to_string
 from xmodule.modulestore import ModuleStoreEnum
@@ -22,7 +26,9 @@ from courseware.access import has_access
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module
 from lms.djangoapps.courseware.courseware_access_exception import CoursewareAccessException
-from student.models import CourseEnrollment
+from student.models import CourseAccessRole, CourseEnrollment, CourseEnrollmentAllowed
+from student.roles import GlobalStaff
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 import branding
 
 from opaque_keys.edx.keys import UsageKey
@@ -357,48 +363,119 @@ def get_courses_by_university(user, domain=None):
     return universities
 
 
-def get_courses(user, domain=None):
-    '''
-    Returns a list of courses available, sorted by course.number
-    '''
-    courses = branding.get_visible_courses()
+def get_catalog_order():
+    """
+    Return the order that the course catalog is listed in for this branded instance,
+    one of CourseOverview.CATALOG_ORDERINGS.
+    """
+    if microsite.get_value(
+            "ENABLE_COURSE_SORTING_BY_START_DATE",
+            settings.FEATURES["ENABLE_COURSE_SORTING_BY_START_DATE"]
+    ):
+        return 'start'
+    return 'announcement'
+
 
+def get_courses(user, domain=None, order='number', offset=0, limit=None):  # pylint: disable=unused-argument
+    """
+    Returns a list of the CourseOverviews of the courses available to `user`, in
+    `order` (one of CourseOverview.CATALOG_ORDERINGS).
+
+    The catalog visible to anonymous users is built in the database, and cached per
+    branded instance until a course is published or deleted. Only the courses that
+    `user` could see despite anonymous users not seeing them are checked per call.
+
+    Arguments:
+        offset (int), limit (int): Return at most `limit` courses, starting at `offset`.
+    """
     permission_name = microsite.get_value(
         'COURSE_CATALOG_VISIBILITY_PERMISSION',
         settings.COURSE_CATALOG_VISIBILITY_PERMISSION
     )
+    visible_filter = branding.get_visible_courses_filter()
+    public_ids = _get_public_catalog_ids(permission_name, visible_filter, order)
+    extra_keys = _get_extra_catalog_keys(user, permission_name, visible_filter, frozenset(public_ids))
+    stop = None if limit is None else offset + limit
 
-    courses = [c for c in courses if has_access(user, permission_name, c)]
+    if extra_keys:
+        course_keys = [CourseKey.from_string(course_id) for course_id in public_ids] + extra_keys
+        return list(CourseOverview.get_catalog_courses(course_keys=course_keys, order=order)[offset:stop])
 
-    courses = sorted(courses, key=lambda course: course.number)
+    page_keys = [CourseKey.from_string(course_id) for course_id in public_ids[offset:stop]]
+    overviews = {overview.id: overview for overview in CourseOverview.objects.filter(id__in=page_keys)}
+    return [overviews[course_key] for course_key in page_keys if course_key in overviews]
 
-    return courses
 
-
-def sort_by_announcement(courses):
+def _get_public_catalog_ids(permission_name, visible_filter, order):
     """
-    Sorts a list of courses by their announcement date. If the date is
-    not available, sort them by their start date.
+    Return the ids (as strings) of the courses matching `visible_filter` that anonymous
+    users have `permission_name` access to, in `order`.
     """
+    cache_key = u'courseware.catalog.{version}.{permission}.{order}.{filter}'.format(
+        version=CourseOverview.get_catalog_version(),
+        permission=permission_name,
+        order=order,
+        filter=hashlib.md5(repr(sorted(visible_filter.items()))).hexdigest(),
+    )
+    course_ids = cache.get(cache_key)
+    if course_ids is None:
+        anonymous_user = AnonymousUser()
+        course_ids = [
+            unicode(overview.id)
+            for overview in _refresh_outdated(CourseOverview.get_catalog_courses(order=order, **visible_filter))
+            if has_access(anonymous_user, permission_name, overview)
+        ]
+        cache.set(cache_key, course_ids, settings.COURSE_CATALOG_CACHE_TIMEOUT)
+    return course_ids
+
+
+def _get_extra_catalog_keys(user, permission_name, visible_filter, public_ids):
+    """
+    Return the keys of the courses matching `visible_filter` that `user` has
+    `permission_name` access to, but which aren't in `public_ids`.
 
-    # Sort courses by how far are they from they start day
-    key = lambda course: course.sorting_score
-    courses = sorted(courses, key=key)
-
-    return courses
-
-
-def sort_by_start_date(courses):
+    Beyond the courses anonymous users can see, a user can only see courses they
+    have a role in, are allowed to enroll in, or (if enrollment is restricted by
+    registration method) that have an enrollment domain.
     """
-    Returns a list of courses sorted by their start date, latest first.
+    if user is None or not user.is_authenticated():
+        return []
+
+    candidates = CourseOverview.get_catalog_courses(**visible_filter)
+    if not GlobalStaff().has_user(user):
+        course_keys = set()
+        orgs = set()
+        for role in CourseAccessRole.objects.filter(user=user):
+            if role.course_id:
+                course_keys.add(role.course_id)
+            elif role.org:
+                orgs.add(role.org)
+        course_keys.update(
+            allowed.course_id for allowed in CourseEnrollmentAllowed.objects.filter(email=user.email)
+        )
+        query = Q(id__in=list(course_keys)) | Q(org__in=list(orgs))
+        if settings.FEATURES.get('RESTRICT_ENROLL_BY_REG_METHOD'):
+            query |= ~Q(enrollment_domain=None) & ~Q(enrollment_domain='')
+        candidates = candidates.filter(query)
+
+    return [
+        overview.id
+        for overview in _refresh_outdated(candidates)
+        if unicode(overview.id) not in public_ids and has_access(user, permission_name, overview)
+    ]
+
+
+def _refresh_outdated(overviews):
     """
-    courses = sorted(
-        courses,
-        key=lambda course: (course.has_ended(), course.start is None, course.start),
-        reverse=False
-    )
-
-    return courses
+    Yield each of `overviews`, reloading any that were stored by an older version of CourseOverview.
+    """
+    for overview in overviews:
+        if overview.version != CourseOverview.VERSION:
+            try:
+                overview = CourseOverview.get_from_id(overview.id)
+            except (CourseOverview.DoesNotExist, IOError):
+                continue
+        yield overview
 
 
 def get_cms_course_link(course, page='course'):
@@ -17,6 +17,7 @@ by `authored_data`, e.g. course content and settings stored in Mongo.
 import threading
 
 from abc import ABCMeta, abstractmethod
+from celery.signals import task_postrun
 from contextlib import contextmanager
 from django.conf import settings
 from request_cache.middleware import RequestCache
@@ -25,6 +26,8 @@ from xmodule.modulestore.inheritance import InheritanceMixin
 
 NOTSET = object()
 ENABLED_OVERRIDE_PROVIDERS_KEY = "courseware.field_overrides.enabled_providers"
+RESOLVED_OVERRIDES_KEY = "courseware.field_overrides.resolved_overrides"
+INHERITABLE_FIELDS = frozenset(InheritanceMixin.fields.keys())
 
 
 def resolve_dotted(name):
@@ -91,26 +94,25 @@ class OverrideFieldData(FieldData):
     def _providers_for_course(cls, course):
         """
         Return a filtered list of enabled providers based
-        on the course passed in. Cache this result per request to avoid
-        needing to call the provider filter api hundreds of times.
+        on the course passed in. Cache this result per request and course to
+        avoid needing to call the provider filter api hundreds of times.
 
         Arguments:
             course: The course XBlock
         """
-        request_cache = RequestCache.get_request_cache()
-        enabled_providers = request_cache.data.get(
-            ENABLED_OVERRIDE_PROVIDERS_KEY, NOTSET
-        )
+        providers_by_course = RequestCache.get_request_cache(ENABLED_OVERRIDE_PROVIDERS_KEY)
+        enabled_providers = providers_by_course.get(course.id, NOTSET)
         if enabled_providers == NOTSET:
             enabled_providers = tuple(
                 (provider_class for provider_class in cls.provider_classes if provider_class.enabled_for(course))
             )
-            request_cache.data[ENABLED_OVERRIDE_PROVIDERS_KEY] = enabled_providers
+            providers_by_course[course.id] = enabled_providers
 
         return enabled_providers
 
     def __init__(self, user, fallback, providers):
         self.fallback = fallback
+        self.user = user
         self.providers = tuple(provider(user) for provider in providers)
 
     def get_override(self, block, name):
@@ -146,11 +148,8 @@ class OverrideFieldData(FieldData):
             # If this is an inheritable field and an override is set above,
             # then we want to return False here, so the field_data uses the
             # override and not the original value for this block.
-            inheritable = InheritanceMixin.fields.keys()
-            if name in inheritable:
-                for ancestor in _lineage(block):
-                    if self.get_override(ancestor, name) is not NOTSET:
-                        return False
+            if name in INHERITABLE_FIELDS and self._inherited_override(block, name) is not NOTSET:
+                return False
 
         return has is not NOTSET or self.fallback.has(block, name)
 
@@ -161,14 +160,51 @@ class OverrideFieldData(FieldData):
         # The `default` method is overloaded by the field storage system to
         # also handle inheritance.
         if self.providers and not overrides_disabled():
-            inheritable = InheritanceMixin.fields.keys()
-            if name in inheritable:
-                for ancestor in _lineage(block):
-                    value = self.get_override(ancestor, name)
-                    if value is not NOTSET:
-                        return value
+            if name in INHERITABLE_FIELDS:
+                value = self._inherited_override(block, name)
+                if value is not NOTSET:
+                    return value
         return self.fallback.default(block, name)
 
+    def _inherited_override(self, block, name):
+        """
+        Return the override of the inheritable field `name` that `block`
+        inherits from its closest overridden ancestor, or `NOTSET`.
+
+        The effective override of each ancestor is resolved from the top of
+        the tree down and remembered for the rest of the request (or celery
+        task) while it's for the same user, so each ancestor is only looked up
+        in the providers once per user and field, however many descendants
+        are read.
+        """
+        if overrides_disabled():
+            return NOTSET
+
+        parent = block.get_parent()
+        if parent is None:
+            return NOTSET
+
+        resolved = self._resolved_overrides()
+        key = (parent.location, name)
+        if key not in resolved:
+            value = self.get_override(parent, name)
+            if value is NOTSET:
+                value = self._inherited_override(parent, name)
+            resolved[key] = value
+        return resolved[key]
+
+    def _resolved_overrides(self):
+        """
+        Return the map of the inherited overrides resolved so far for
+        `self.user`.  Only the map of the last user is kept, so that it doesn't
+        grow while a task, such as grading, goes through many students.
+        """
+        cache = RequestCache.get_request_cache(RESOLVED_OVERRIDES_KEY)
+        if 'user' not in cache or cache['user'] != self.user:
+            cache.clear()
+            cache.update(user=self.user, resolved={})
+        return cache['resolved']
+
 
 class _OverridesDisabled(threading.local):
     """
@@ -192,6 +228,40 @@ def disable_overrides():
     _OVERRIDES_DISABLED.disabled = prev
 
 
+def clear_resolved_overrides():
+    """
+    Forget the inherited overrides resolved so far in this request.
+    Override providers call this when overrides are changed.
+    """
+    RequestCache.get_request_cache(RESOLVED_OVERRIDES_KEY).clear()
+
+
+def _provider_subclasses(provider_class):
+    """
+    Return all of the subclasses of `provider_class`, recursively.
+    """
+    subclasses = []
+    for subclass in provider_class.__subclasses__():
+        subclasses.append(subclass)
+        subclasses.extend(_provider_subclasses(subclass))
+    return subclasses
+
+
+@task_postrun.connect
+def _clear_override_caches_after_task(**kwargs):  # pylint: disable=unused-argument
+    """
+    Forget the overrides cached by a celery task once it's done: the providers
+    enabled for each course, the resolved inherited overrides, and the request
+    caches of the providers themselves. There's no request to scope them to,
+    and they may be changed before the next task.
+    """
+    RequestCache.get_request_cache(ENABLED_OVERRIDE_PROVIDERS_KEY).clear()
+    clear_resolved_overrides()
+    for provider_class in _provider_subclasses(FieldOverrideProvider):
+        for cache_name in provider_class.request_cache_names:
+            RequestCache.get_request_cache(cache_name).clear()
+
+
 def overrides_disabled():
     """
     Checks to see whether overrides are disabled in the current context.
@@ -209,10 +279,16 @@ class FieldOverrideProvider(object):
 
     A `FieldOverrideProvider` implementation is only responsible for looking up
     field overrides. To set overrides, there will be a domain specific API for
-    the concrete override implementation being used.
+    the concrete override implementation being used. That API should call
+    :func:`clear_resolved_overrides` after changing overrides.
+
+    Providers which cache overrides in request caches should list their names
+    in `request_cache_names`, so that they're cleared after each celery task.
     """
     __metaclass__ = ABCMeta
 
+    request_cache_names = ()
+
     def __init__(self, user):
         self.user = user
 
@@ -235,13 +311,3 @@ class FieldOverrideProvider(object):
         """
         return False
 
-
-def _lineage(block):
-    """
-    Returns an iterator over all ancestors of the given block, starting with
-    its immediate parent and ending at the root of the block tree.
-    """
-    parent = block.get_parent()
-    while parent:
-        yield parent
-        parent = parent.get_parent()
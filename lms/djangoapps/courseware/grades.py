@@ -22,7 +22,6 @@ from util.module_utils import yield_dynamic_descriptor_descendants
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
-from xmodule.modulestore.exceptions import ItemNotFoundError
 from .models import StudentModule
 from .module_render import get_module_for_descriptor
 from opaque_keys import InvalidKeyError
@@ -202,7 +201,59 @@ def field_data_cache_for_grading(course, user):
     )
 
 
-def answer_distributions(course_key):
+def scorable_locations_for_grading(course):
+    """
+    Return the locations of the blocks of `course` which may have a score, as they are
+    found by the FieldDataCache of `field_data_cache_for_grading`.
+    """
+    descriptor_filter = partial(descriptor_affects_grading, course.block_types_affecting_grading)
+    locations = set()
+
+    def add_descendant_locations(descriptor):
+        """
+        Add the locations of `descriptor` and its descendants which may have a score.
+        """
+        if descriptor_filter(descriptor) and descriptor.has_score:
+            locations.add(descriptor.location)
+        for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
+            add_descendant_locations(child)
+
+    with modulestore().bulk_operations(course.id):
+        add_descendant_locations(course)
+    return locations
+
+
+def scores_clients_for_grading(course, students, scorable_locations=None):
+    """
+    Return a dict mapping the id of each of `students` to a ScoresClient for grading them
+    in `course`, so that the scores of many students are fetched with a single query
+    rather than one per student. The `scorable_locations` of the course can be passed in
+    when grading several batches of students.
+    """
+    if scorable_locations is None:
+        scorable_locations = scorable_locations_for_grading(course)
+    return ScoresClient.for_users(course.id, [student.id for student in students], scorable_locations)
+
+
+def _problem_info_for_course(course_key):
+    """
+    Return a dict mapping (block_type, block_id) -> (url_name, display_name) for
+    every problem in the course referenced by `course_key`.
+
+    All problems are fetched with a single bulk modulestore read instead of a
+    `get_item` call per usage key. This method ignores permissions.
+    """
+    store = modulestore()
+    with store.bulk_operations(course_key):
+        return {
+            (problem.location.block_type, problem.location.block_id): (
+                problem.url_name, problem.display_name_with_default
+            )
+            for problem in store.get_items(course_key, qualifiers={'category': 'problem'})
+        }
+
+
+def answer_distributions(course_key, progress_callback=None):
     """
     Given a course_key, return answer distributions in the form of a dictionary
     mapping:
@@ -229,46 +280,49 @@ def answer_distributions(course_key):
     not be aware of problems that are not visible to the user being used to
     generate the report.
 
+    StudentModule rows are streamed in primary key ordered chunks (see
+    `StudentModule.iter_submitted_problems_read_only`), so memory use is bounded
+    by the chunk size and the size of the resulting distribution rather than by
+    the number of submissions in the course. If `progress_callback` is given, it
+    is called with the number of rows processed after each chunk.
+
     This method will try to use a read-replica database if one is available.
     """
-    # dict: { module.module_state_key : (url_name, display_name) }
-    state_keys_to_problem_info = {}  # For caching, used by url_and_display_name
-
-    def url_and_display_name(usage_key):
-        """
-        For a given usage_key, return the problem's url and display_name.
-        Handle modulestore access and caching. This method ignores permissions.
+    # dict: { (block_type, block_id) : (url_name, display_name) }
+    problem_info = _problem_info_for_course(course_key)
 
-        Raises:
-            InvalidKeyError: if the usage_key does not parse
-            ItemNotFoundError: if there is no content that corresponds
-                to this usage_key.
-        """
-        problem_store = modulestore()
-        if usage_key not in state_keys_to_problem_info:
-            problem = problem_store.get_item(usage_key)
-            problem_info = (problem.url_name, problem.display_name_with_default)
-            state_keys_to_problem_info[usage_key] = problem_info
-
-        return state_keys_to_problem_info[usage_key]
-
-    # Iterate through all problems submitted for this course in no particular
+    # Iterate through all problems submitted for this course in primary key
     # order, and build up our answer_counts dict that we will eventually return
     answer_counts = defaultdict(lambda: defaultdict(int))
-    for module in StudentModule.all_submitted_problems_read_only(course_key):
-        try:
-            state_dict = json.loads(module.state) if module.state else {}
-            raw_answers = state_dict.get("student_answers", {})
-        except ValueError:
-            log.error(
-                u"Answer Distribution: Could not parse module state for StudentModule id=%s, course=%s",
-                module.id,
-                course_key,
-            )
-            continue
+    for chunk in StudentModule.iter_submitted_problems_read_only(course_key):
+        for module in chunk:
+            try:
+                state_dict = json.loads(module.state) if module.state else {}
+                raw_answers = state_dict.get("student_answers", {})
+            except ValueError:
+                log.error(
+                    u"Answer Distribution: Could not parse module state for StudentModule id=%s, course=%s",
+                    module.id,
+                    course_key,
+                )
+                continue
+
+            try:
+                usage_key = module.module_state_key.map_into_course(course_key)
+                url, display_name = problem_info[(usage_key.block_type, usage_key.block_id)]
+            except (KeyError, InvalidKeyError):
+                msg = (
+                    "Answer Distribution: Item {} referenced in StudentModule {} " +
+                    "for user {} in course {} not found; " +
+                    "This can happen if a student answered a question that " +
+                    "was later deleted from the course. This answer will be " +
+                    "omitted from the answer distribution CSV."
+                ).format(
+                    module.module_state_key, module.id, module.student_id, course_key
+                )
+                log.warning(msg)
+                continue
 
-        try:
-            url, display_name = url_and_display_name(module.module_state_key.map_into_course(course_key))
             # Each problem part has an ID that is derived from the
             # module.module_state_key (with some suffix appended)
             for problem_part_id, raw_answer in raw_answers.items():
@@ -279,18 +333,8 @@ def answer_distributions(course_key):
                 answer = unicode(raw_answer)
                 answer_counts[(url, display_name, problem_part_id)][answer] += 1
 
-        except (ItemNotFoundError, InvalidKeyError):
-            msg = (
-                "Answer Distribution: Item {} referenced in StudentModule {} " +
-                "for user {} in course {} not found; " +
-                "This can happen if a student answered a question that " +
-                "was later deleted from the course. This answer will be " +
-                "omitted from the answer distribution CSV."
-            ).format(
-                module.module_state_key, module.id, module.student_id, course_key
-            )
-            log.warning(msg)
-            continue
+        if progress_callback is not None:
+            progress_callback(len(chunk))
 
     return answer_counts
 
@@ -531,6 +575,85 @@ def get_weighted_scores(student, course, field_data_cache=None, scores_client=No
         return _progress_summary(student, request, course, field_data_cache, scores_client)
 
 
+@transaction.commit_manually
+def get_weighted_scores_for_subtree(student, course, usage_key):
+    """
+    Returns a ProgressSummary of the weighted scores of the student for only
+    the subtree of the course rooted at `usage_key`, so that
+    `score_for_module(usage_key)` can be read without grading the rest of
+    the course. Scores are computed with the same rules as
+    `get_weighted_scores`.
+
+    Returns None if the student can't load the block at `usage_key`.
+    """
+    with manual_transaction():
+        request = _get_mock_request(student)
+        return _subtree_progress_summary(student, request, course, usage_key)
+
+
+def _subtree_progress_summary(student, request, course, usage_key):
+    """
+    Unwrapped version of "get_weighted_scores_for_subtree".
+    """
+    with manual_transaction():
+        with modulestore().bulk_operations(course.id):
+            root_descriptor = modulestore().get_item(usage_key, depth=None)
+            field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+                course.id,
+                student,
+                root_descriptor,
+                depth=None,
+                descriptor_filter=partial(descriptor_affects_grading, course.block_types_affecting_grading),
+            )
+        scores_client = ScoresClient.from_field_data_cache(field_data_cache)
+
+        root_module = get_module_for_descriptor(
+            student, request, root_descriptor, field_data_cache, course.id, course=course
+        )
+        if not root_module:
+            return None
+
+        root_module = getattr(root_module, '_x_module', root_module)
+
+    # We need to import this here to avoid a circular dependency of the form:
+    # XBlock --> submissions --> Django Rest Framework error strings -->
+    # Django translation --> ... --> courseware --> submissions
+    from submissions import api as sub_api  # installed from the edx-submissions repository
+    submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
+
+    max_scores_cache = MaxScoresCache.create_for_course(course)
+    max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+
+    locations_to_children = defaultdict(list)
+    locations_to_weighted_scores = {}
+    module_creator = root_module.xmodule_runtime.get_module
+    with manual_transaction():
+        for module_descriptor in yield_dynamic_descriptor_descendants(root_module, student.id, module_creator):
+            locations_to_children[module_descriptor.parent].append(module_descriptor.location)
+            (correct, total) = get_score(
+                student,
+                module_descriptor,
+                module_creator,
+                scores_client,
+                submissions_scores,
+                max_scores_cache,
+            )
+            if correct is None and total is None:
+                continue
+
+            locations_to_weighted_scores[module_descriptor.location] = Score(
+                correct,
+                total,
+                module_descriptor.graded,
+                module_descriptor.display_name_with_default,
+                module_descriptor.location
+            )
+
+    max_scores_cache.push_to_remote()
+
+    return ProgressSummary([], locations_to_weighted_scores, locations_to_children)
+
+
 # TODO: This method is not very good. It was written in the old course style and
 # then converted over and performance is not good. Once the progress page is redesigned
 # to not have the progress summary this method should be deleted (so it won't be copied).
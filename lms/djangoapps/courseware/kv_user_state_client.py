@@ -0,0 +1,593 @@
+"""
+An implementation of :class:`XBlockUserStateClient` which stores XBlock Scope.user_state
+data in a key-value store that speaks the Redis protocol.
+
+Writes only append: setting fields writes them into a hash without reading the
+existing state. Like StudentModuleHistory, history is only kept for the block
+types in ``StudentModuleHistory.HISTORY_SAVING_TYPES``: the state of such a block
+is read back as it's written and appended to a history list, which is trimmed to
+the client's ``max_history`` entries. Each call to
+:meth:`~KeyValueXBlockUserStateClient.get_many`, :meth:`~KeyValueXBlockUserStateClient.set_many`
+and :meth:`~KeyValueXBlockUserStateClient.delete_many` is a single pipelined round trip,
+plus one more to append to the histories of any blocks that keep history.
+
+Two stores are provided:
+
+    RedisStore: a connection to a Redis (or Redis protocol compatible) server.
+    MemoryStore: a store held in the memory of the current process, for
+        development and tests.
+
+The layout of the keys, where ``prefix`` is configurable, is:
+
+    ``prefix:state:<username>:<block key>``
+        A hash of field name to JSON encoded value, and the time the state
+        was last modified (in the ``:modified`` field).
+    ``prefix:history:<username>:<block key>``
+        A list of the JSON encoded states after each change, oldest first.
+    ``prefix:block:<block key>``
+        A set of the usernames with state for the block.
+    ``prefix:course:<course key>``
+        A set of JSON encoded ``[username, block key]`` pairs with state in the course.
+"""
+
+from datetime import datetime
+import itertools
+import socket
+import threading
+from time import time
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from pytz import UTC
+from xblock.fields import Scope
+from edx_user_state_client.interface import XBlockUserStateClient, XBlockUserState
+from opaque_keys.edx.keys import UsageKey
+
+from courseware.models import StudentModuleHistory
+
+# The hash field holding the time that the state was last modified.
+# It can't collide with a field name, as it isn't a python identifier.
+MODIFIED_FIELD = ':modified'
+
+# The stores of each configuration, shared by all of the clients in the process,
+# so that each thread keeps one connection to each server for all of its requests.
+_SHARED_STORES = {}
+_SHARED_STORES_LOCK = threading.Lock()
+
+
+class StoreError(Exception):
+    """
+    An error reported by, or while communicating with, a store.
+    """
+    pass
+
+
+class StoreReplyError(StoreError):
+    """
+    An error reply to a command, after which the connection to the store is still usable.
+    """
+    pass
+
+
+class RedisStore(object):
+    """
+    A minimal client for the subset of the Redis protocol used by KeyValueXBlockUserStateClient.
+
+    Each thread keeps its own connection to the server, which is reused by all of
+    the commands the thread executes, until an error closes it.
+
+    Arguments:
+        host (str), port (int), db (int): The server, and the database on it, to use.
+        socket_timeout (float): Seconds to wait for the server before giving up.
+    """
+    def __init__(self, host='localhost', port=6379, db=0, socket_timeout=5):
+        self.address = (host, port)
+        self.db = db
+        self.socket_timeout = socket_timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        """
+        Return this thread's connection to the server, connecting if needed.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            sock = socket.create_connection(self.address, self.socket_timeout)
+            connection = self._local.connection = (sock, sock.makefile('rb'))
+            if self.db:
+                self._send(sock, [('SELECT', self.db)])
+                self._read_reply(connection[1])
+        return connection
+
+    def _disconnect(self):
+        """
+        Close this thread's connection to the server, if any.
+        """
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                connection[0].close()
+            except socket.error:
+                pass
+
+    @staticmethod
+    def _encode(arg):
+        """
+        Return `arg` as a bytestring.
+        """
+        if isinstance(arg, unicode):
+            return arg.encode('utf-8')
+        return str(arg)
+
+    def _send(self, sock, commands):
+        """
+        Send all of `commands` to the server in one write.
+        """
+        packed = []
+        for command in commands:
+            packed.append('*{}\r\n'.format(len(command)))
+            for arg in command:
+                arg = self._encode(arg)
+                packed.append('${}\r\n{}\r\n'.format(len(arg), arg))
+        sock.sendall(''.join(packed))
+
+    def _read_reply(self, reader):
+        """
+        Read and return one reply from the server.
+        """
+        line = reader.readline()
+        if not line:
+            raise StoreError("Connection closed by server")
+        kind, rest = line[0], line[1:-2]
+        if kind == '+':
+            return rest
+        if kind == '-':
+            raise StoreReplyError(rest)
+        if kind == ':':
+            return int(rest)
+        if kind == '$':
+            length = int(rest)
+            if length == -1:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == '*':
+            length = int(rest)
+            if length == -1:
+                return None
+            return [self._read_reply(reader) for __ in xrange(length)]
+        raise StoreError("Unexpected reply from server: {!r}".format(line))
+
+    def execute(self, commands):
+        """
+        Send `commands` to the server in a single pipeline, and return the list of their replies.
+
+        Each command is a sequence of the command name and its arguments.
+        """
+        if not commands:
+            return []
+        try:
+            sock, reader = self._connection()
+            self._send(sock, commands)
+            replies = []
+            error = None
+            for __ in commands:
+                try:
+                    replies.append(self._read_reply(reader))
+                except StoreReplyError as exc:
+                    # Keep reading, so that the connection is left in a usable state.
+                    error = error or exc
+                    replies.append(None)
+        except (socket.error, StoreError) as exc:
+            self._disconnect()
+            raise StoreError(unicode(exc))
+        if error is not None:
+            raise error
+        return replies
+
+
+class MemoryStore(object):
+    """
+    A store held in the memory of the current process, which executes the same
+    commands as :class:`RedisStore`.
+
+    Stores with the same `name` share their data within a process.
+    """
+    _data_by_name = {}
+    _locks_by_name = {}
+
+    def __init__(self, name='default'):
+        self._data = self._data_by_name.setdefault(name, {})
+        self._lock = self._locks_by_name.setdefault(name, threading.Lock())
+
+    def clear(self):
+        """
+        Delete everything in the store.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def execute(self, commands):
+        """
+        Execute `commands`, and return the list of their replies.
+        """
+        with self._lock:
+            return [
+                getattr(self, '_' + command[0].lower())(*[self._key(arg) for arg in command[1:]])
+                for command in commands
+            ]
+
+    @staticmethod
+    def _key(arg):
+        """
+        Return `arg` as the bytestring it would be sent to a server as.
+        """
+        return RedisStore._encode(arg)  # pylint: disable=protected-access
+
+    def _hgetall(self, key):  # pylint: disable=missing-docstring
+        return list(itertools.chain.from_iterable(self._data.get(key, {}).items()))
+
+    def _hmset(self, key, *args):  # pylint: disable=missing-docstring
+        self._data.setdefault(key, {}).update(zip(args[::2], args[1::2]))
+        return 'OK'
+
+    def _hdel(self, key, *fields):  # pylint: disable=missing-docstring
+        values = self._data.get(key, {})
+        deleted = [field for field in fields if values.pop(field, None) is not None]
+        if key in self._data and not values:
+            del self._data[key]
+        return len(deleted)
+
+    def _del(self, *keys):  # pylint: disable=missing-docstring
+        return len([key for key in keys if self._data.pop(key, None) is not None])
+
+    def _rpush(self, key, *values):  # pylint: disable=missing-docstring
+        entries = self._data.setdefault(key, [])
+        entries.extend(values)
+        return len(entries)
+
+    def _lrange(self, key, start, stop):  # pylint: disable=missing-docstring
+        start, stop = int(start), int(stop)
+        entries = self._data.get(key, [])
+        return entries[start:] if stop == -1 else entries[start:stop + 1]
+
+    def _sadd(self, key, *members):  # pylint: disable=missing-docstring
+        existing = self._data.setdefault(key, set())
+        added = set(members) - existing
+        existing.update(added)
+        return len(added)
+
+    def _ltrim(self, key, start, stop):  # pylint: disable=missing-docstring
+        start, stop = int(start), int(stop)
+        entries = self._data.get(key, [])
+        entries[:] = entries[start:] if stop == -1 else entries[start:stop + 1]
+        return 'OK'
+
+    def _sscan(self, key, cursor, _count_arg, count):  # pylint: disable=missing-docstring
+        members = sorted(self._data.get(key, ()))
+        start, stop = int(cursor), int(cursor) + int(count)
+        next_cursor = stop if stop < len(members) else 0
+        return [str(next_cursor), members[start:stop]]
+
+
+class KeyValueXBlockUserStateClient(XBlockUserStateClient):
+    """
+    An XBlockUserStateClient that stores state in a Redis protocol key-value store.
+
+    Arguments:
+        user: Accepted for compatibility with DjangoXBlockUserStateClient, and ignored.
+        store (str): 'redis' or 'memory'.
+        prefix (str): The prefix of every key written by this client.
+        store_options (dict): Keyword arguments for the :class:`RedisStore` or :class:`MemoryStore`.
+            A single store is built for each configuration, and shared by all clients.
+        max_history (int): The number of states kept in the history of each block.
+
+    This client can't be the primary client of the LMS (see
+    :func:`courseware.user_state_client.get_user_state_client`), as code such as the
+    instructor reports still reads StudentModule directly; use it as the secondary
+    client of a DualWriteXBlockUserStateClient.
+    """
+
+    # Default number of states read per round trip by iter_all_for_block and iter_all_for_course.
+    ITER_BATCH_SIZE = 1000
+
+    # Default number of states kept in the history of each block.
+    MAX_HISTORY = 1000
+
+    STORES = {
+        'redis': RedisStore,
+        'memory': MemoryStore,
+    }
+
+    class ServiceUnavailable(XBlockUserStateClient.ServiceUnavailable):
+        """
+        This error is raised if the service backing this client is currently unavailable.
+        """
+        pass
+
+    class PermissionDenied(XBlockUserStateClient.PermissionDenied):
+        """
+        This error is raised if the caller is not allowed to access the requested data.
+        """
+        pass
+
+    class DoesNotExist(XBlockUserStateClient.DoesNotExist):
+        """
+        This error is raised if the caller has requested data that does not exist.
+        """
+        pass
+
+    def __init__(
+            self, user=None, store='redis', prefix='xblock_user_state', store_options=None, max_history=None
+    ):  # pylint: disable=unused-argument
+        self.store = self._shared_store(store, store_options or {})
+        self.prefix = prefix
+        self.max_history = max_history or self.MAX_HISTORY
+
+    @classmethod
+    def _shared_store(cls, store, store_options):
+        """
+        Return the store of type `store` built with `store_options`, building it
+        the first time it's asked for.
+        """
+        key = (store, tuple(sorted(store_options.items())))
+        with _SHARED_STORES_LOCK:
+            if key not in _SHARED_STORES:
+                _SHARED_STORES[key] = cls.STORES[store](**store_options)
+            return _SHARED_STORES[key]
+
+    def _execute(self, commands):
+        """
+        Execute `commands` on the store, raising ServiceUnavailable if it fails.
+        """
+        try:
+            return self.store.execute(commands)
+        except StoreError as exc:
+            raise self.ServiceUnavailable(unicode(exc))
+
+    def _state_key(self, username, block_key):
+        """The key of the hash holding the state of `block_key` for `username`."""
+        return u'{}:state:{}:{}'.format(self.prefix, username, block_key)
+
+    def _history_key(self, username, block_key):
+        """The key of the list holding the history of `block_key` for `username`."""
+        return u'{}:history:{}:{}'.format(self.prefix, username, block_key)
+
+    def _block_key(self, block_key):
+        """The key of the set of usernames with state for `block_key`."""
+        return u'{}:block:{}'.format(self.prefix, block_key)
+
+    def _course_key(self, course_key):
+        """The key of the set of [username, block key] pairs with state in `course_key`."""
+        return u'{}:course:{}'.format(self.prefix, course_key)
+
+    @staticmethod
+    def _decode_state(reply):
+        """
+        Return the (state, modified) pair stored in an HGETALL `reply`.
+        """
+        state = {}
+        modified = None
+        for name, value in zip(reply[::2], reply[1::2]):
+            if name == MODIFIED_FIELD:
+                modified = datetime.fromtimestamp(float(value), UTC)
+            else:
+                state[name.decode('utf-8')] = json.loads(value)
+        return state, modified
+
+    def get_many(self, username, block_keys, scope=Scope.user_state, fields=None):
+        """
+        Retrieve the stored XBlock state for the specified XBlock usages.
+
+        Arguments:
+            username: The name of the user whose state should be retrieved
+            block_keys ([UsageKey]): A list of UsageKeys identifying which xblock states to load.
+            scope (Scope): The scope to load data from
+            fields: A list of field values to retrieve. If None, retrieve all stored fields.
+
+        Yields:
+            XBlockUserState tuples for each specified UsageKey in block_keys.
+            field_state is a dict mapping field names to values.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported, not {}".format(scope))
+
+        block_keys = list(block_keys)
+        replies = self._execute([('HGETALL', self._state_key(username, block_key)) for block_key in block_keys])
+        for block_key, reply in zip(block_keys, replies):
+            state, modified = self._decode_state(reply or [])
+
+            # If the state is empty, then it has been deleted, and so
+            # conformant UserStateClients should treat it as if it doesn't exist.
+            if not state:
+                continue
+
+            if fields is not None:
+                state = {
+                    field: state[field]
+                    for field in fields
+                    if field in state
+                }
+            yield XBlockUserState(username, block_key, state, modified, scope)
+
+    def set_many(self, username, block_keys_to_state, scope=Scope.user_state):
+        """
+        Set fields for a particular XBlock.
+
+        Arguments:
+            username: The name of the user whose state should be retrieved
+            block_keys_to_state (dict): A dict mapping UsageKeys to state dicts.
+                Each state dict maps field names to values. These state dicts
+                are overlaid over the stored state. To delete fields, use
+                :meth:`delete` or :meth:`delete_many`.
+            scope (Scope): The scope to load data from
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        modified = time()
+        commands = []
+        history_blocks = []
+        for block_key, state in block_keys_to_state.items():
+            state_key = self._state_key(username, block_key)
+            hmset = ['HMSET', state_key, MODIFIED_FIELD, repr(modified)]
+            for field, value in state.items():
+                hmset.extend([field, json.dumps(value)])
+            commands.extend([
+                hmset,
+                ('SADD', self._block_key(block_key), username),
+                ('SADD', self._course_key(block_key.course_key), json.dumps([username, unicode(block_key)])),
+            ])
+            if self._saves_history(block_key):
+                commands.append(('HGETALL', state_key))
+                history_blocks.append((block_key, len(commands) - 1))
+        replies = self._execute(commands)
+        self._append_history(username, [(block_key, replies[index]) for block_key, index in history_blocks], modified)
+
+    def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
+        """
+        Delete the stored XBlock state for a many xblock usages.
+
+        Arguments:
+            username: The name of the user whose state should be deleted
+            block_keys (list): The UsageKey identifying which xblock state to delete.
+            scope (Scope): The scope to delete data from
+            fields: A list of fields to delete. If None, delete all stored fields.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        modified = time()
+        commands = []
+        history_blocks = []
+        for block_key in block_keys:
+            state_key = self._state_key(username, block_key)
+            if fields is None:
+                commands.append(('DEL', state_key))
+            elif fields:
+                commands.append(['HDEL', state_key] + list(fields))
+                commands.append(('HMSET', state_key, MODIFIED_FIELD, repr(modified)))
+            if self._saves_history(block_key):
+                commands.append(('HGETALL', state_key))
+                history_blocks.append((block_key, len(commands) - 1))
+        replies = self._execute(commands)
+        self._append_history(username, [(block_key, replies[index]) for block_key, index in history_blocks], modified)
+
+    @staticmethod
+    def _saves_history(block_key):
+        """
+        Return whether the history of the state of `block_key` is kept.
+        """
+        return block_key.block_type in StudentModuleHistory.HISTORY_SAVING_TYPES
+
+    def _append_history(self, username, block_states, modified):
+        """
+        Append each of the (block key, HGETALL reply) pairs `block_states` to the block's history,
+        in one round trip, trimming the history to `max_history` entries.
+        """
+        commands = []
+        for block_key, reply in block_states:
+            state, __ = self._decode_state(reply or [])
+            history_key = self._history_key(username, block_key)
+            commands.extend([
+                ('RPUSH', history_key, json.dumps({'time': modified, 'state': state})),
+                ('LTRIM', history_key, -self.max_history, -1),
+            ])
+        self._execute(commands)
+
+    def get_history(self, username, block_key, scope=Scope.user_state):
+        """
+        Retrieve history of state changes for a given block for a given
+        student.
+
+        If the specified block doesn't exist, raise :class:`~DoesNotExist`.
+
+        Arguments:
+            username: The name of the user whose history should be retrieved.
+            block_key: The key identifying which xblock history to retrieve.
+            scope (Scope): The scope to load data from.
+
+        Yields:
+            XBlockUserState entries for each modification to the specified XBlock, from latest
+            to earliest.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        entries = self._execute([('LRANGE', self._history_key(username, block_key), 0, -1)])[0]
+        if not entries:
+            raise self.DoesNotExist()
+
+        for entry in reversed(entries):
+            entry = json.loads(entry)
+            # An empty state has been deleted, and so we list that entry as `None`.
+            yield XBlockUserState(
+                username,
+                block_key,
+                entry['state'] or None,
+                datetime.fromtimestamp(entry['time'], UTC),
+                scope,
+            )
+
+    def iter_all_for_block(self, block_key, scope=Scope.user_state, batch_size=None):
+        """
+        You get no ordering guarantees. Fetching will happen in batch_size
+        increments. If you're using this method, you should be running in an
+        async task.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+        return self._iter_all(
+            self._block_key(block_key),
+            lambda username: (username.decode('utf-8'), block_key),
+            batch_size,
+            scope,
+        )
+
+    def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
+        """
+        You get no ordering guarantees. Fetching will happen in batch_size
+        increments. If you're using this method, you should be running in an
+        async task.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported")
+
+        def parse_member(member):
+            """Return the (username, block key) pair stored in a course set member."""
+            username, block_key = json.loads(member)
+            block_key = UsageKey.from_string(block_key).map_into_course(course_key)
+            if block_type is not None and block_key.block_type != block_type:
+                return None
+            return username, block_key
+
+        return self._iter_all(self._course_key(course_key), parse_member, batch_size, scope)
+
+    def _iter_all(self, set_key, parse_member, batch_size, scope):
+        """
+        Yield an XBlockUserState for each (username, block key) pair in the set `set_key` that holds state.
+
+        The set is scanned `batch_size` members at a time, and the states of each batch
+        are read in one round trip. `parse_member` returns the (username, block key) pair
+        for a member of the set, or None to skip it. Like any SSCAN, a state may be
+        yielded more than once if the set grows while it is being scanned.
+        """
+        batch_size = batch_size or self.ITER_BATCH_SIZE
+        cursor = '0'
+        while True:
+            cursor, members = self._execute([('SSCAN', set_key, cursor, 'COUNT', batch_size)])[0]
+            pairs = [pair for pair in (parse_member(member) for member in members) if pair is not None]
+            replies = self._execute([
+                ('HGETALL', self._state_key(username, block_key))
+                for username, block_key in pairs
+            ])
+            for (username, block_key), reply in zip(pairs, replies):
+                state, modified = self._decode_state(reply)
+                if state:
+                    yield XBlockUserState(username, block_key, state, modified, scope)
+            if cursor == '0':
+                return
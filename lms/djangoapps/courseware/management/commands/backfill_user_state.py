@@ -0,0 +1,111 @@
+"""
+A command to copy existing user state into the secondary XBlockUserStateClient.
+
+While migrating between user state backends, settings.XBLOCK_USER_STATE_CLIENT
+is a DualWriteXBlockUserStateClient, which writes new state to both the primary
+and the secondary client. This command copies the state that was written to the
+primary client before dual writes were enabled.
+
+Only fields that are missing from the secondary client are copied, so state
+written through dual writes while the command runs is never overwritten with
+older values.
+"""
+
+from collections import defaultdict
+import itertools
+import logging
+import optparse
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from courseware.user_state_client import DualWriteXBlockUserStateClient, get_user_state_client
+
+
+class Command(BaseCommand):
+    """The backfill_user_state command."""
+
+    args = "<course_id> [<course_id> ...]"
+    help = "Copies user state of courses from the primary to the secondary dual-write user state client."
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--batch',
+            type='int',
+            default=1000,
+            help="Batch size, number of states to read from the primary client at a time.",
+        ),
+    )
+
+    def handle(self, *args, **options):
+        # We don't want to see the SQL output from the db layer.
+        logging.getLogger("django.db.backends").setLevel(logging.INFO)
+
+        if not args:
+            raise CommandError("At least one course id is required.")
+        try:
+            course_keys = [CourseKey.from_string(course_id) for course_id in args]
+        except InvalidKeyError as exc:
+            raise CommandError(u"Invalid course id: {}".format(exc))
+
+        client = get_user_state_client()
+        if not isinstance(client, DualWriteXBlockUserStateClient):
+            raise CommandError("settings.XBLOCK_USER_STATE_CLIENT is not a DualWriteXBlockUserStateClient.")
+
+        backfiller = UserStateBackfiller(client.primary, client.secondary)
+        for course_key in course_keys:
+            backfiller.backfill_course(course_key, batch_size=options['batch'])
+            self.stdout.write(u"{}: copied {} fields of {} states\n".format(
+                course_key, backfiller.fields_copied, backfiller.states_read
+            ))
+
+
+class UserStateBackfiller(object):
+    """Logic to copy user state that is missing from one client from another client."""
+
+    def __init__(self, source, destination):
+        self.source = source
+        self.destination = destination
+        self.states_read = 0
+        self.fields_copied = 0
+
+    def backfill_course(self, course_key, batch_size=1000):
+        """
+        Copy all of the state in `course_key` that is missing from the destination client.
+        """
+        self.states_read = self.fields_copied = 0
+        states = self.source.iter_all_for_course(course_key, batch_size=batch_size)
+        while True:
+            batch = list(itertools.islice(states, batch_size))
+            if not batch:
+                return
+            self.states_read += len(batch)
+            self.backfill_batch(batch)
+
+    def backfill_batch(self, user_states):
+        """
+        Copy the fields of `user_states` (a list of XBlockUserState) that are missing from the destination client.
+        """
+        by_username = defaultdict(dict)
+        for user_state in user_states:
+            by_username[user_state.username][user_state.block_key] = user_state.state
+
+        for username, states in by_username.iteritems():
+            existing = {
+                user_state.block_key: user_state.state
+                for user_state in self.destination.get_many(username, states.keys())
+            }
+            missing = {}
+            for block_key, state in states.iteritems():
+                existing_state = existing.get(block_key, {})
+                missing_fields = {
+                    field: value
+                    for field, value in state.iteritems()
+                    if field not in existing_state
+                }
+                if missing_fields:
+                    missing[block_key] = missing_fields
+            if missing:
+                self.destination.set_many(username, missing)
+                self.fields_copied += sum(len(fields) for fields in missing.itervalues())
@@ -0,0 +1,148 @@
+"""
+A command to benchmark bulk reads of StudentModule rows.
+
+This fills the StudentModule table with a synthetic course, then times reading
+one student's modules for that course with each of the strategies used by
+:class:`~courseware.user_state_client.DjangoXBlockUserStateClient`:
+
+    fixed: ``chunked_filter`` with the old fixed chunk size of 500
+    adaptive: ``chunked_filter`` with chunk sizes chosen from observed latency
+    scan: a single query for all of the student's modules in the course
+
+All synthetic rows are created inside a transaction that is rolled back when
+the benchmark finishes.
+"""
+
+import logging
+import optparse
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+
+from courseware.models import StudentModule
+
+
+class Command(NoArgsCommand):
+    """The benchmark_student_module_reads command."""
+
+    help = "Times chunked and scanning reads of StudentModule rows against a synthetic, rolled-back table."
+
+    option_list = NoArgsCommand.option_list + (
+        optparse.make_option(
+            '--students',
+            type='int',
+            default=20,
+            help="Number of synthetic students.",
+        ),
+        optparse.make_option(
+            '--blocks',
+            type='int',
+            default=5000,
+            help="Number of synthetic blocks each student has state for.",
+        ),
+        optparse.make_option(
+            '--repeat',
+            type='int',
+            default=3,
+            help="Number of times to time each strategy. The fastest run is reported.",
+        ),
+    )
+
+    def handle_noargs(self, **options):
+        # We don't want to see the SQL output from the db layer.
+        logging.getLogger("django.db.backends").setLevel(logging.INFO)
+
+        benchmark = StudentModuleReadBenchmark(options['students'], options['blocks'])
+        for strategy, seconds in benchmark.main(repeat=options['repeat']):
+            self.stdout.write("{:<10} {:.4f}s\n".format(strategy, seconds))
+
+
+class StudentModuleReadBenchmark(object):
+    """Logic to populate a synthetic StudentModule table and time reads from it."""
+
+    COURSE_KEY = SlashSeparatedCourseKey('benchmark', 'student_module', 'reads')
+    BATCH_SIZE = 500
+
+    def __init__(self, num_students, num_blocks):
+        self.num_students = num_students
+        self.num_blocks = num_blocks
+        self.usage_keys = [
+            self.COURSE_KEY.make_usage_key('problem', 'problem_{}'.format(index))
+            for index in xrange(num_blocks)
+        ]
+
+    def main(self, repeat=1):
+        """
+        Populate the table, and return a list of (strategy, fastest seconds) pairs.
+        """
+        transaction.enter_transaction_management()
+        transaction.managed(True)
+        try:
+            student = self.populate()
+            return [
+                (name, min(self.time_strategy(strategy, student) for __ in xrange(repeat)))
+                for name, strategy in self.strategies()
+            ]
+        finally:
+            transaction.rollback()
+            transaction.leave_transaction_management()
+
+    def populate(self):
+        """
+        Create the synthetic students and their modules, and return the student to read.
+        """
+        students = [
+            User.objects.create(username='student_module_benchmark_{}'.format(index))
+            for index in xrange(self.num_students)
+        ]
+        for student in students:
+            modules = [
+                StudentModule(
+                    student=student,
+                    course_id=self.COURSE_KEY,
+                    module_state_key=usage_key,
+                    module_type='problem',
+                    state='{"attempts": 1}',
+                )
+                for usage_key in self.usage_keys
+            ]
+            for start in xrange(0, len(modules), self.BATCH_SIZE):
+                StudentModule.objects.bulk_create(modules[start:start + self.BATCH_SIZE])
+        return students[0]
+
+    def strategies(self):
+        """
+        Return (name, callable) pairs, where each callable reads all of a student's modules.
+        """
+        def fixed(student):
+            """Chunked reads with the old fixed chunk size."""
+            return StudentModule.objects.chunked_filter(
+                'module_state_key__in', self.usage_keys,
+                student=student, course_id=self.COURSE_KEY, chunk_size=500,
+            )
+
+        def adaptive(student):
+            """Chunked reads with adaptive chunk sizes."""
+            return StudentModule.objects.chunked_filter(
+                'module_state_key__in', self.usage_keys,
+                student=student, course_id=self.COURSE_KEY,
+            )
+
+        def scan(student):
+            """A single scan of the student's modules in the course."""
+            return StudentModule.objects.filter(student=student, course_id=self.COURSE_KEY)
+
+        return [('fixed', fixed), ('adaptive', adaptive), ('scan', scan)]
+
+    def time_strategy(self, strategy, student):
+        """
+        Return the number of seconds `strategy` takes to read all of `student`'s modules.
+        """
+        start = time.time()
+        num_rows = sum(1 for __ in strategy(student))
+        seconds = time.time() - start
+        assert num_rows == self.num_blocks
+        return seconds
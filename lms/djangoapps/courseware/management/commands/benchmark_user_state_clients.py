@@ -0,0 +1,154 @@
+"""
+A command to compare the throughput of the user state clients.
+
+For each client, this writes state for a number of synthetic users and blocks
+with ``set_many``, applies a round of single block updates like a problem check
+does, and reads everything back with ``get_many``. It reports the number of
+block states handled per second by each phase.
+
+    django: :class:`~courseware.user_state_client.DjangoXBlockUserStateClient`
+    keyvalue: :class:`~courseware.kv_user_state_client.KeyValueXBlockUserStateClient`,
+        using the in-process memory store, or a Redis server if ``--redis-host`` is given.
+
+StudentModule rows are created inside a transaction that is rolled back when the
+benchmark finishes, and every key written to the key-value store is deleted.
+"""
+
+import logging
+import optparse
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+
+from courseware.kv_user_state_client import KeyValueXBlockUserStateClient
+from courseware.user_state_client import DjangoXBlockUserStateClient
+
+
+class Command(NoArgsCommand):
+    """The benchmark_user_state_clients command."""
+
+    help = "Compares the throughput of the Django and key-value user state clients."
+
+    option_list = NoArgsCommand.option_list + (
+        optparse.make_option(
+            '--users',
+            type='int',
+            default=50,
+            help="Number of synthetic users.",
+        ),
+        optparse.make_option(
+            '--blocks',
+            type='int',
+            default=200,
+            help="Number of synthetic blocks each user has state for.",
+        ),
+        optparse.make_option(
+            '--redis-host',
+            default=None,
+            help="Benchmark the key-value client against this Redis server, rather than the memory store.",
+        ),
+        optparse.make_option(
+            '--redis-port',
+            type='int',
+            default=6379,
+            help="Port of the Redis server.",
+        ),
+    )
+
+    def handle_noargs(self, **options):
+        # We don't want to see the SQL output from the db layer.
+        logging.getLogger("django.db.backends").setLevel(logging.INFO)
+
+        if options['redis_host']:
+            kv_options = {'store': 'redis', 'store_options': {'host': options['redis_host'], 'port': options['redis_port']}}
+        else:
+            kv_options = {'store': 'memory', 'store_options': {'name': 'benchmark_user_state_clients'}}
+
+        benchmark = UserStateClientBenchmark(options['users'], options['blocks'], kv_options)
+        for client_name, phase, per_second in benchmark.main():
+            self.stdout.write("{:<10} {:<10} {:>12.1f} states/s\n".format(client_name, phase, per_second))
+
+
+class UserStateClientBenchmark(object):
+    """Logic to time reads and writes of synthetic user state through each client."""
+
+    COURSE_KEY = SlashSeparatedCourseKey('benchmark', 'user_state', 'clients')
+
+    def __init__(self, num_users, num_blocks, kv_options):
+        self.usernames = ['user_state_benchmark_{}'.format(index) for index in xrange(num_users)]
+        self.block_keys = [
+            self.COURSE_KEY.make_usage_key('problem', 'problem_{}'.format(index))
+            for index in xrange(num_blocks)
+        ]
+        self.kv_options = dict(kv_options, prefix='user_state_benchmark_{}'.format(int(time.time())))
+
+    def main(self):
+        """
+        Run the benchmark, and return a list of (client, phase, states per second) tuples.
+        """
+        results = []
+        transaction.enter_transaction_management()
+        transaction.managed(True)
+        try:
+            for username in self.usernames:
+                User.objects.create(username=username)
+            results.extend(self.time_client('django', DjangoXBlockUserStateClient()))
+        finally:
+            transaction.rollback()
+            transaction.leave_transaction_management()
+
+        kv_client = KeyValueXBlockUserStateClient(**self.kv_options)
+        try:
+            results.extend(self.time_client('keyvalue', kv_client))
+        finally:
+            self.clean_up(kv_client)
+        return results
+
+    def time_client(self, client_name, client):
+        """
+        Return (client, phase, states per second) tuples for each phase run against `client`.
+        """
+        num_states = len(self.usernames) * len(self.block_keys)
+        state = {'attempts': 0, 'student_answers': {'1_2_1': 'choice_1'}, 'correct_map': {}}
+
+        start = time.time()
+        for username in self.usernames:
+            client.set_many(username, {block_key: state for block_key in self.block_keys})
+        set_many_seconds = time.time() - start
+
+        start = time.time()
+        for username in self.usernames:
+            for block_key in self.block_keys:
+                client.set(username, block_key, {'attempts': 1})
+        set_seconds = time.time() - start
+
+        start = time.time()
+        num_read = sum(
+            len(list(client.get_many(username, self.block_keys)))
+            for username in self.usernames
+        )
+        get_many_seconds = time.time() - start
+        assert num_read == num_states
+
+        return [
+            (client_name, 'set_many', num_states / set_many_seconds),
+            (client_name, 'set', num_states / set_seconds),
+            (client_name, 'get_many', num_states / get_many_seconds),
+        ]
+
+    def clean_up(self, client):
+        """
+        Delete every key written to the key-value store by the benchmark.
+        """
+        # pylint: disable=protected-access
+        keys = [client._course_key(self.COURSE_KEY)]
+        keys.extend(client._block_key(block_key) for block_key in self.block_keys)
+        for username in self.usernames:
+            for block_key in self.block_keys:
+                keys.append(client._state_key(username, block_key))
+                keys.append(client._history_key(username, block_key))
+        for start in xrange(0, len(keys), 1000):
+            client._execute([['DEL'] + keys[start:start + 1000]])
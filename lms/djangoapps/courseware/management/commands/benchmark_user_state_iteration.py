@@ -0,0 +1,107 @@
+"""
+A command to benchmark iterating over all of the user state in a course.
+
+This fills the StudentModule table with a synthetic course, then times reading
+every row of the course with
+:meth:`~courseware.user_state_client.DjangoXBlockUserStateClient.iter_all_for_course`
+at several batch sizes, and with a single queryset as the report code used to.
+The defaults create 2,000,000 rows.
+
+All synthetic rows are created inside a transaction that is rolled back when
+the benchmark finishes.
+"""
+
+import logging
+import optparse
+import time
+
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+
+from courseware.management.commands.benchmark_student_module_reads import StudentModuleReadBenchmark
+from courseware.models import StudentModule
+from courseware.user_state_client import DjangoXBlockUserStateClient
+
+
+class Command(NoArgsCommand):
+    """The benchmark_user_state_iteration command."""
+
+    help = "Times iterating over all StudentModule rows of a synthetic, rolled-back course."
+
+    option_list = NoArgsCommand.option_list + (
+        optparse.make_option(
+            '--students',
+            type='int',
+            default=1000,
+            help="Number of synthetic students.",
+        ),
+        optparse.make_option(
+            '--blocks',
+            type='int',
+            default=2000,
+            help="Number of synthetic blocks each student has state for.",
+        ),
+        optparse.make_option(
+            '--batch-sizes',
+            default='500,1000,5000',
+            help="Comma separated batch sizes to time iter_all_for_course with.",
+        ),
+    )
+
+    def handle_noargs(self, **options):
+        # We don't want to see the SQL output from the db layer.
+        logging.getLogger("django.db.backends").setLevel(logging.INFO)
+
+        batch_sizes = [int(batch_size) for batch_size in options['batch_sizes'].split(',')]
+        benchmark = UserStateIterationBenchmark(options['students'], options['blocks'])
+        for strategy, seconds in benchmark.main(batch_sizes):
+            self.stdout.write("{:<20} {:.4f}s\n".format(strategy, seconds))
+
+
+class UserStateIterationBenchmark(StudentModuleReadBenchmark):
+    """Logic to populate a synthetic StudentModule table and time iterating over all of it."""
+
+    def main(self, batch_sizes=(1000,)):  # pylint: disable=arguments-differ
+        """
+        Populate the table, and return a list of (strategy, seconds) pairs.
+        """
+        transaction.enter_transaction_management()
+        transaction.managed(True)
+        try:
+            self.populate()
+            return [(name, self.time_strategy(strategy)) for name, strategy in self.strategies(batch_sizes)]
+        finally:
+            transaction.rollback()
+            transaction.leave_transaction_management()
+
+    def strategies(self, batch_sizes):  # pylint: disable=arguments-differ
+        """
+        Return (name, callable) pairs, where each callable iterates over all of the course's state.
+        """
+        client = DjangoXBlockUserStateClient()
+
+        def queryset():
+            """A single queryset over the course, loading usernames per row."""
+            return (
+                (module.student.username, module.state)
+                for module in StudentModule.objects.filter(course_id=self.COURSE_KEY)
+            )
+
+        def iterate(batch_size):
+            """Keyset paginated iteration with `batch_size` rows per query."""
+            return lambda: client.iter_all_for_course(self.COURSE_KEY, batch_size=batch_size)
+
+        return [('queryset', queryset)] + [
+            ('batch_size={}'.format(batch_size), iterate(batch_size))
+            for batch_size in batch_sizes
+        ]
+
+    def time_strategy(self, strategy):  # pylint: disable=arguments-differ
+        """
+        Return the number of seconds `strategy` takes to read every row of the course.
+        """
+        start = time.time()
+        num_rows = sum(1 for __ in strategy())
+        seconds = time.time() - start
+        assert num_rows == self.num_students * self.num_blocks
+        return seconds
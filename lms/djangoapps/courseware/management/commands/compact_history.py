@@ -0,0 +1,185 @@
+"""A command to compact the StudentModuleHistory table.
+
+History rows used to store a full copy of the StudentModule state inline.
+New rows store their state by reference to a content-addressed
+StudentModuleHistoryState, so identical snapshots are only stored once.
+
+This command moves the inline state of existing rows into shared
+StudentModuleHistoryState rows, and then deletes the StudentModuleHistoryState
+rows which no history row references any more (such as those of deleted
+StudentModules).
+
+"""
+
+import logging
+import optparse
+import time
+
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+from courseware.models import StudentModuleHistory, StudentModuleHistoryState
+
+
+class Command(NoArgsCommand):
+    """The actual compact_history command to compact history rows."""
+
+    help = (
+        "Moves inline StudentModuleHistory state into shared, content-hashed StudentModuleHistoryState rows, "
+        "and deletes unreferenced StudentModuleHistoryState rows."
+    )
+
+    option_list = NoArgsCommand.option_list + (
+        optparse.make_option(
+            '--batch',
+            type='int',
+            default=1000,
+            help="Batch size, number of history rows to compact (or states to check) in a transaction.",
+        ),
+        optparse.make_option(
+            '--sleep',
+            type='float',
+            default=0,
+            help="Seconds to sleep between batches.",
+        ),
+    )
+
+    def handle_noargs(self, **options):
+        # We don't want to see the SQL output from the db layer.
+        logging.getLogger("django.db.backends").setLevel(logging.INFO)
+
+        compactor = StudentModuleHistoryCompactor()
+        compactor.main(batch_size=options["batch"], sleep=options["sleep"])
+
+
+class StudentModuleHistoryCompactor(object):
+    """Logic to move inline state from the StudentModuleHistory table into StudentModuleHistoryState."""
+
+    BATCH_SIZE = 1000
+
+    def __init__(self):
+        self.next_history_id = 0
+        self.rows_compacted = 0
+        self.next_state_id = 0
+        self.states_deleted = 0
+
+    def main(self, batch_size=None, sleep=0):
+        """Invoked from the management command to do all the work."""
+
+        batch_size = batch_size or self.BATCH_SIZE
+
+        transaction.enter_transaction_management()
+        try:
+            while True:
+                num_rows = self.compact_batch(batch_size)
+                transaction.commit()
+                if not num_rows:
+                    break
+                self.say("Compacted {} rows, up to history id {}".format(self.rows_compacted, self.next_history_id))
+                if sleep:
+                    time.sleep(sleep)
+            while True:
+                num_states = self.delete_unreferenced_batch(batch_size)
+                transaction.commit()
+                if not num_states:
+                    break
+                self.say("Deleted {} unreferenced states, up to state id {}".format(
+                    self.states_deleted, self.next_state_id
+                ))
+                if sleep:
+                    time.sleep(sleep)
+        finally:
+            transaction.leave_transaction_management()
+
+    def say(self, message):
+        """
+        Display a message to the user.
+
+        The message will have a trailing newline added to it.
+
+        """
+        print message
+
+    def compact_batch(self, batch_size):
+        """
+        Compact the next `batch_size` history rows that still hold inline state.
+
+        Returns the number of rows that were compacted.
+
+        """
+        rows = list(
+            StudentModuleHistory.objects.filter(
+                id__gte=self.next_history_id,
+                state__isnull=False,
+                state_blob__isnull=True,
+            ).order_by('id').values_list('id', 'state')[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        ids_by_hash = {}
+        state_by_hash = {}
+        for history_id, state in rows:
+            state_hash = StudentModuleHistoryState.hash_state(state)
+            ids_by_hash.setdefault(state_hash, []).append(history_id)
+            state_by_hash[state_hash] = state
+
+        blob_ids = dict(
+            StudentModuleHistoryState.objects.filter(
+                state_hash__in=state_by_hash.keys()
+            ).values_list('state_hash', 'id')
+        )
+        StudentModuleHistoryState.objects.bulk_create([
+            StudentModuleHistoryState(state_hash=state_hash, state=state)
+            for state_hash, state in state_by_hash.iteritems()
+            if state_hash not in blob_ids
+        ])
+        blob_ids = dict(
+            StudentModuleHistoryState.objects.filter(
+                state_hash__in=state_by_hash.keys()
+            ).values_list('state_hash', 'id')
+        )
+
+        for state_hash, history_ids in ids_by_hash.iteritems():
+            StudentModuleHistory.objects.filter(id__in=history_ids).update(
+                state_blob=blob_ids[state_hash],
+                state=None,
+            )
+
+        self.next_history_id = rows[-1][0] + 1
+        self.rows_compacted += len(rows)
+        return len(rows)
+
+    def delete_unreferenced_batch(self, batch_size):
+        """
+        Delete those of the next `batch_size` StudentModuleHistoryState rows
+        which no history row references.
+
+        The states are locked first, which waits for the transactions that
+        are about to reference them (`StudentModuleHistoryState.for_state`
+        holds a lock on the state it returns) to commit; and, as it's the
+        first read of the transaction, the references are then read from a
+        snapshot taken after those commits.
+
+        Returns the number of states that were checked.
+
+        """
+        state_ids = list(
+            StudentModuleHistoryState.objects.select_for_update().filter(
+                id__gte=self.next_state_id,
+            ).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not state_ids:
+            return 0
+
+        referenced = set(
+            StudentModuleHistory.objects.filter(
+                state_blob__in=state_ids,
+            ).values_list('state_blob', flat=True)
+        )
+        unreferenced = [state_id for state_id in state_ids if state_id not in referenced]
+        if unreferenced:
+            StudentModuleHistoryState.objects.filter(id__in=unreferenced).delete()
+
+        self.next_state_id = state_ids[-1] + 1
+        self.states_deleted += len(unreferenced)
+        return len(state_ids)
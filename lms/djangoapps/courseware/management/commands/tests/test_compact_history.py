@@ -0,0 +1,96 @@
+"""Test the compact_history management command."""
+
+import json
+
+from datetime import datetime
+from nose.plugins.attrib import attr
+from pytz import UTC
+
+from django.test import TransactionTestCase
+
+from courseware.management.commands.compact_history import StudentModuleHistoryCompactor
+from courseware.models import StudentModuleHistory, StudentModuleHistoryState
+from courseware.tests.factories import StudentModuleFactory, location
+
+
+class CompactorSayStubbed(StudentModuleHistoryCompactor):
+    """StudentModuleHistoryCompactor, but with .say() stubbed for testing."""
+    def __init__(self):
+        super(CompactorSayStubbed, self).__init__()
+        self.said_lines = []
+
+    def say(self, msg):
+        self.said_lines.append(msg)
+
+
+@attr('shard_1')
+class HistoryCompactorTest(TransactionTestCase):
+    """Tests of StudentModuleHistoryCompactor with a real db."""
+
+    def setUp(self):
+        super(HistoryCompactorTest, self).setUp()
+        # Use a module type that isn't recorded in history, so that the only
+        # history rows are the inline ones written by the tests.
+        self.student_module = StudentModuleFactory.create(module_type='html', module_state_key=location('html'))
+
+    def write_inline_history(self, states):
+        """Write StudentModuleHistory rows with inline `states`, as older code did."""
+        return [
+            StudentModuleHistory.objects.create(
+                student_module=self.student_module,
+                created=datetime.now(UTC),
+                state=state,
+            ).id
+            for state in states
+        ]
+
+    def test_compact(self):
+        first = json.dumps({'position': 1})
+        second = json.dumps({'position': 2})
+        history_ids = self.write_inline_history([first, second, first, None])
+
+        compactor = CompactorSayStubbed()
+        compactor.main(batch_size=2)
+
+        self.assertEqual(compactor.rows_compacted, 3)
+        self.assertEqual(StudentModuleHistoryState.objects.count(), 2)
+        self.assertFalse(StudentModuleHistory.objects.filter(state__isnull=False).exists())
+        self.assertEqual(
+            [StudentModuleHistory.objects.get(id=history_id).get_state() for history_id in history_ids],
+            [first, second, first, None]
+        )
+
+    def test_shares_existing_state(self):
+        state = json.dumps({'position': 1})
+        StudentModuleHistoryState.for_state(state)
+        self.write_inline_history([state])
+
+        CompactorSayStubbed().main()
+
+        self.assertEqual(StudentModuleHistoryState.objects.count(), 1)
+        self.assertEqual(StudentModuleHistory.objects.get().state_blob.state, state)
+
+    def test_deletes_unreferenced_states(self):
+        kept = json.dumps({'position': 1})
+        self.write_inline_history([kept])
+        for position in range(2, 5):
+            StudentModuleHistoryState.for_state(json.dumps({'position': position}))
+
+        compactor = CompactorSayStubbed()
+        compactor.main(batch_size=2)
+
+        self.assertEqual(compactor.states_deleted, 3)
+        self.assertEqual([blob.state for blob in StudentModuleHistoryState.objects.all()], [kept])
+        self.assertEqual(StudentModuleHistory.objects.get().get_state(), kept)
+
+    def test_for_state_shares_existing(self):
+        state = json.dumps({'position': 1})
+        blob = StudentModuleHistoryState.for_state(state)
+        self.assertEqual(StudentModuleHistoryState.for_state(state), blob)
+        self.assertEqual(StudentModuleHistoryState.objects.count(), 1)
+
+    def test_nothing_to_compact(self):
+        compactor = CompactorSayStubbed()
+        compactor.main()
+        self.assertEqual(compactor.rows_compacted, 0)
+        self.assertEqual(compactor.said_lines, [])
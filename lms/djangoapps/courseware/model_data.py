@@ -9,6 +9,9 @@ Classes to provide the LMS runtime data storage to XBlocks.
 :class:`FieldDataCache`: A object which provides a read-through prefetch cache
     of data to support XBlock fields within a limited set of scopes.
 
+:class:`PrefetchPlan`: A declaration of which scopes a :class:`FieldDataCache`
+    loads eagerly, for views that only need some of them.
+
 The remaining classes in this module provide read-through prefetch cache implementations
 for specific scopes. The individual classes provide the knowledge of what are the essential
 pieces of information for each scope, and thus how to cache, prefetch, and create new field data
@@ -21,9 +24,11 @@ UserInfoCache: A cache for Scope.user_info
 DjangoOrmFieldCache: A base-class for single-row-per-field caches.
 """
 
+import copy
 import json
 from abc import abstractmethod, ABCMeta
 from collections import defaultdict, namedtuple
+from contextlib import contextmanager
 from .models import (
     StudentModule,
     XModuleUserStateSummaryField,
@@ -38,12 +43,14 @@ from contracts import contract, new_contract
 
 from django.db import DatabaseError
 
+import dogstats_wrapper as dog_stats_api
+import request_cache
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
 from xblock.fields import Scope, UserScope
 from xmodule.modulestore.django import modulestore
 from xblock.core import XBlockAside
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.user_state_client import get_user_state_client
 
 from openedx.core.djangoapps.call_stack_manager import donottrack
 
@@ -57,6 +64,66 @@ class InvalidWriteError(Exception):
     """
 
 
+WRITE_BEHIND_CACHE_NAME = 'courseware.model_data.write_behind'
+
+
+@contextmanager
+def write_behind_user_state():
+    """
+    Defer all :class:`FieldDataCache` writes made in this context until it exits.
+
+    While the context is active, `FieldDataCache.set_many` records the new values
+    in memory (where they are visible to reads through the same cache) instead of
+    saving them immediately. When the outermost context exits, every dirty cache
+    is flushed once, so that repeated writes to the same fields and rows in a
+    request are coalesced into a single save per row.
+
+    Code which publishes side effects of the deferred state (such as grades or
+    tracking events) must call :func:`flush_write_behind_caches` first, so that
+    nothing is published for state that then fails to save.
+
+    Any `KeyValueMultiSaveError` raised while flushing propagates out of the
+    context. If the body itself raised, flush errors are logged and the original
+    exception is re-raised.
+    """
+    state = request_cache.get_cache(WRITE_BEHIND_CACHE_NAME)
+    outermost = not state.get('depth')
+    if outermost:
+        state['dirty_caches'] = []
+    state['depth'] = state.get('depth', 0) + 1
+
+    try:
+        yield
+    except Exception:
+        state['depth'] -= 1
+        if outermost:
+            try:
+                flush_write_behind_caches()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Error flushing deferred user state writes")
+        raise
+    else:
+        state['depth'] -= 1
+        if outermost:
+            flush_write_behind_caches()
+
+
+def _write_behind_active():
+    """
+    Return whether FieldDataCache writes are currently being deferred.
+    """
+    return bool(request_cache.get_cache(WRITE_BEHIND_CACHE_NAME).get('depth'))
+
+
+def flush_write_behind_caches():
+    """
+    Save all deferred writes held by FieldDataCaches in the current request.
+    """
+    dirty_caches = request_cache.get_cache(WRITE_BEHIND_CACHE_NAME).get('dirty_caches', [])
+    while dirty_caches:
+        dirty_caches.pop(0).flush()
+
+
 def _all_usage_keys(descriptors, aside_types):
     """
     Return a set of all usage_ids for the `descriptors` and for
@@ -354,7 +421,7 @@ class UserStateCache(object):
         self._cache = defaultdict(dict)
         self.course_id = course_id
         self.user = user
-        self._client = DjangoXBlockUserStateClient(self.user)
+        self._client = get_user_state_client(self.user)
 
     def cache_fields(self, fields, xblocks, aside_types):  # pylint: disable=unused-argument
         """
@@ -423,7 +490,7 @@ class UserStateCache(object):
                 self.user.username,
                 pending_updates
             )
-        except DatabaseError:
+        except (DatabaseError, self._client.ServiceUnavailable):
             log.exception("Saving user state failed for %s", self.user.username)
             raise KeyValueMultiSaveError([])
         finally:
@@ -682,12 +749,50 @@ class UserInfoCache(DjangoOrmFieldCache):
         return key.field_name
 
 
+class PrefetchPlan(object):
+    """
+    A declaration of which scopes a :class:`FieldDataCache` loads eagerly.
+
+    Views that know which scopes they will read can pass a plan to
+    :class:`FieldDataCache`, so that each of those scope tables is queried once
+    when the cache is populated. Fields in scopes that are not in the plan are
+    loaded lazily, in a single batch per scope, the first time any field in that
+    scope is read or written.
+
+    Arguments:
+        scopes: The scopes to load eagerly for every block.
+        block_type_scopes: A dict mapping block types to additional scopes to
+            load eagerly for blocks of that type.
+    """
+    def __init__(self, scopes=(), block_type_scopes=None):
+        self.scopes = frozenset(scopes)
+        self.block_type_scopes = dict(
+            (block_type, frozenset(block_scopes))
+            for block_type, block_scopes in (block_type_scopes or {}).iteritems()
+        )
+
+    def is_eager(self, scope, block_type):
+        """
+        Return whether fields in `scope` should be loaded eagerly for blocks of `block_type`.
+        """
+        return scope in self.scopes or scope in self.block_type_scopes.get(block_type, ())
+
+
+# Load every scope for every block as soon as it is added to the cache.
+PREFETCH_ALL = PrefetchPlan(scopes=(
+    Scope.user_state,
+    Scope.user_info,
+    Scope.preferences,
+    Scope.user_state_summary,
+))
+
+
 class FieldDataCache(object):
     """
     A cache of django model objects needed to supply the data
     for a module and its descendants
     """
-    def __init__(self, descriptors, course_id, user, select_for_update=False, asides=None):
+    def __init__(self, descriptors, course_id, user, select_for_update=False, asides=None, prefetch_plan=None):
         """
         Find any courseware.models objects that are needed by any descriptor
         in descriptors. Attempts to minimize the number of queries to the database.
@@ -700,6 +805,8 @@ class FieldDataCache(object):
         user: The user for which to cache data
         select_for_update: Ignored
         asides: The list of aside types to load, or None to prefetch no asides.
+        prefetch_plan: A :class:`PrefetchPlan` of the scopes to load eagerly,
+            or None to load all scopes eagerly.
         """
         if asides is None:
             self.asides = []
@@ -726,6 +833,13 @@ class FieldDataCache(object):
             ),
         }
         self.scorable_locations = set()
+        # Writes deferred by `write_behind_user_state`, by scope
+        self._pending_writes = defaultdict(dict)
+        self.prefetch_plan = prefetch_plan or PREFETCH_ALL
+        # (fields, descriptors) pairs not yet loaded because of the prefetch plan, by scope
+        self._lazy_loads = defaultdict(list)
+        # The number of times each scope's table has been loaded by this cache
+        self.query_counts = defaultdict(int)
         self.add_descriptors_to_cache(descriptors)
 
     def add_descriptors_to_cache(self, descriptors):
@@ -733,12 +847,54 @@ class FieldDataCache(object):
         Add all `descriptors` to this FieldDataCache.
         """
         if self.user.is_authenticated():
+            # Make sure that we read any state written earlier in this request.
+            flush_write_behind_caches()
             self.scorable_locations.update(desc.location for desc in descriptors if desc.has_score)
-            for scope, fields in self._fields_to_cache(descriptors).items():
-                if scope not in self.cache:
-                    continue
+            eager = defaultdict(list)
+            lazy = defaultdict(list)
+            for descriptor in descriptors:
+                block_type = descriptor.scope_ids.block_type
+                for scope in set(field.scope for field in descriptor.fields.values()):
+                    if scope not in self.cache:
+                        continue
+                    if self.prefetch_plan.is_eager(scope, block_type):
+                        eager[scope].append(descriptor)
+                    else:
+                        lazy[scope].append(descriptor)
+
+            for scope, scope_descriptors in eager.iteritems():
+                self._load_scope(scope, self._fields_to_cache(scope_descriptors)[scope], scope_descriptors)
+
+            for scope, scope_descriptors in lazy.iteritems():
+                self._lazy_loads[scope].append((self._fields_to_cache(scope_descriptors)[scope], scope_descriptors))
+
+    def _load_scope(self, scope, fields, descriptors, lazy=False):
+        """
+        Load `fields` in `scope` for `descriptors` into the cache for `scope`,
+        and record the load in `query_counts`.
+        """
+        self.cache[scope].cache_fields(fields, descriptors, self.asides)
+        self.query_counts[scope] += 1
+        dog_stats_api.increment(
+            'FieldDataCache.scope_load',
+            tags=[u'scope:{}'.format(scope.name), u'lazy:{}'.format(lazy)],
+        )
 
-                self.cache[scope].cache_fields(fields, descriptors, self.asides)
+    def _load_lazy_fields(self, scope):
+        """
+        Load all fields in `scope` that were left out of the prefetch plan,
+        in a single batch.
+        """
+        lazy_loads = self._lazy_loads.pop(scope, None)
+        if not lazy_loads:
+            return
+
+        fields = set()
+        descriptors = []
+        for lazy_fields, lazy_descriptors in lazy_loads:
+            fields.update(lazy_fields)
+            descriptors.extend(lazy_descriptors)
+        self._load_scope(scope, fields, descriptors, lazy=True)
 
     def add_descriptor_descendents(self, descriptor, depth=None, descriptor_filter=lambda descriptor: True):
         """
@@ -783,7 +939,7 @@ class FieldDataCache(object):
     @classmethod
     def cache_for_descriptor_descendents(cls, course_id, user, descriptor, depth=None,
                                          descriptor_filter=lambda descriptor: True,
-                                         select_for_update=False, asides=None):
+                                         select_for_update=False, asides=None, prefetch_plan=None):
         """
         course_id: the course in the context of which we want StudentModules.
         user: the django user for whom to load modules.
@@ -793,8 +949,9 @@ class FieldDataCache(object):
         descriptor_filter is a function that accepts a descriptor and return whether the field data
             should be cached
         select_for_update: Ignored
+        prefetch_plan: A :class:`PrefetchPlan` of the scopes to load eagerly, or None for all scopes
         """
-        cache = FieldDataCache([], course_id, user, select_for_update, asides=asides)
+        cache = FieldDataCache([], course_id, user, select_for_update, asides=asides, prefetch_plan=prefetch_plan)
         cache.add_descriptor_descendents(descriptor, depth, descriptor_filter)
         return cache
 
@@ -828,6 +985,11 @@ class FieldDataCache(object):
         if key.scope not in self.cache:
             raise KeyError(key.field_name)
 
+        if key in self._pending_writes[key.scope]:
+            return self._pending_writes[key.scope][key]
+
+        self._load_lazy_fields(key.scope)
+
         return self.cache[key.scope].get(key)
 
     @contract(kv_dict="dict(DjangoKeyValueStore_Key: *)")
@@ -836,12 +998,15 @@ class FieldDataCache(object):
         Set all of the fields specified by the keys of `kv_dict` to the values
         in that dict.
 
+        If called inside :func:`write_behind_user_state`, copies of the values
+        are only recorded in memory, and are saved when that context exits (or
+        when the caches are flushed before then).
+
         Arguments:
             kv_dict (dict): dict mapping from `DjangoKeyValueStore.Key`s to field values
         Raises: DatabaseError if any fields fail to save
         """
 
-        saved_fields = []
         by_scope = defaultdict(dict)
         for key, value in kv_dict.iteritems():
 
@@ -855,6 +1020,43 @@ class FieldDataCache(object):
 
             by_scope[key.scope][key] = value
 
+        for scope in by_scope:
+            # Saving needs to know which rows already exist.
+            self._load_lazy_fields(scope)
+
+        if _write_behind_active():
+            if not any(self._pending_writes.values()):
+                request_cache.get_cache(WRITE_BEHIND_CACHE_NAME)['dirty_caches'].append(self)
+            for scope, set_many_data in by_scope.iteritems():
+                # Copy the values, so that later changes to them by the caller aren't saved
+                self._pending_writes[scope].update(copy.deepcopy(set_many_data))
+            return
+
+        self._save_by_scope(by_scope)
+
+    def flush(self):
+        """
+        Save all writes that were deferred by :func:`write_behind_user_state`.
+
+        Raises: KeyValueMultiSaveError if any fields fail to save
+        """
+        by_scope = dict((scope, writes) for scope, writes in self._pending_writes.iteritems() if writes)
+        self._pending_writes = defaultdict(dict)
+        if not by_scope:
+            return
+
+        dog_stats_api.histogram(
+            'FieldDataCache.flush.rows',
+            sum(len(writes) for writes in by_scope.itervalues()),
+        )
+        self._save_by_scope(by_scope)
+
+    def _save_by_scope(self, by_scope):
+        """
+        Save the values in `by_scope`, a dict mapping each scope to a dict of
+        `DjangoKeyValueStore.Key`s and their values, to the per-scope caches.
+        """
+        saved_fields = []
         for scope, set_many_data in by_scope.iteritems():
             try:
                 self.cache[scope].set_many(set_many_data)
@@ -884,6 +1086,15 @@ class FieldDataCache(object):
         if key.scope not in self.cache:
             raise KeyError(key.field_name)
 
+        self._load_lazy_fields(key.scope)
+
+        pending_writes = self._pending_writes[key.scope]
+        if key in pending_writes:
+            del pending_writes[key]
+            if not self.cache[key.scope].has(key):
+                # The field was only ever written in memory
+                return
+
         self.cache[key.scope].delete(key)
 
     @contract(key=DjangoKeyValueStore.Key, returns=bool)
@@ -905,6 +1116,11 @@ class FieldDataCache(object):
         if key.scope not in self.cache:
             return False
 
+        if key in self._pending_writes[key.scope]:
+            return True
+
+        self._load_lazy_fields(key.scope)
+
         return self.cache[key.scope].has(key)
 
     @contract(key=DjangoKeyValueStore.Key, returns="datetime|None")
@@ -925,6 +1141,11 @@ class FieldDataCache(object):
         if key.scope not in self.cache:
             return None
 
+        if key in self._pending_writes[key.scope]:
+            self.flush()
+
+        self._load_lazy_fields(key.scope)
+
         return self.cache[key.scope].last_modified(key)
 
     def __len__(self):
@@ -990,6 +1211,32 @@ class ScoresClient(object):
         client.fetch_scores(fd_cache.scorable_locations)
         return client
 
+    @classmethod
+    def for_users(cls, course_key, user_ids, locations):
+        """
+        Create a ScoresClient for each of `user_ids`, with their scores at `locations`
+        fetched in a single query. Returns a dict mapping user id to ScoresClient.
+        """
+        clients = {}
+        for user_id in user_ids:
+            clients[user_id] = cls(course_key, user_id)
+            clients[user_id]._has_fetched = True  # pylint: disable=protected-access
+
+        if clients and locations:
+            scores_qset = StudentModule.objects.filter(
+                student_id__in=clients.keys(),
+                course_id=course_key,
+                module_state_key__in=set(locations),
+            )
+            for user_id, location, correct, total in scores_qset.values_list(
+                    'student_id', 'module_state_key', 'grade', 'max_grade'
+            ):
+                # pylint: disable=protected-access
+                clients[user_id]._locations_to_scores[
+                    UsageKey.from_string(location).map_into_course(course_key)
+                ] = cls.Score(correct, total)
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 @donottrack(StudentModule)
@@ -12,13 +12,16 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import hashlib
 import logging
 import itertools
+import time
 
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db import connections, models, router, transaction, IntegrityError
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver, Signal
 
 from model_utils.models import TimeStampedModel
@@ -44,7 +47,24 @@ class ChunkingManager(models.Manager):
     """
     :class:`~Manager` that adds an additional method :meth:`chunked_filter` to provide
     the ability to make select queries with specific chunk sizes.
+
+    Unless a fixed ``chunk_size`` is requested, chunk sizes are chosen from the
+    latency observed for earlier chunks of the same query, so that each query
+    takes about ``TARGET_CHUNK_SECONDS``. Chunks are never smaller than
+    ``DEFAULT_CHUNK_SIZE``, and never larger than the number of parameters the
+    database accepts in a single query.
     """
+    DEFAULT_CHUNK_SIZE = 500
+    TARGET_CHUNK_SECONDS = 0.05
+    # sqlite3 allows at most 999 parameters per query, and the other filters need a few
+    MAX_CHUNK_SIZE = {'sqlite': 900}
+    DEFAULT_MAX_CHUNK_SIZE = 5000
+    # Weight of the newest chunk when averaging observed latencies
+    LATENCY_SMOOTHING = 0.3
+
+    # Moving average of seconds per item, by (table, chunk_field), shared by all instances
+    _seconds_per_item = {}
+
     def chunked_filter(self, chunk_field, items, **kwargs):
         """
         Queries model_class with `chunk_field` set to chunks of size `chunk_size`,
@@ -59,14 +79,73 @@ class ChunkingManager(models.Manager):
                 chunks, and passed as the value for the ``chunk_field`` keyword argument to
                 :meth:`~Manager.filter`. This implies that ``chunk_field`` should be an
                 ``__in`` key.
-            chunk_size (int): The size of chunks to pass. Defaults to 500.
+            chunk_size (int): The size of chunks to pass. Defaults to a size chosen
+                from the latency of earlier queries, see :meth:`adaptive_chunk_size`.
         """
-        chunk_size = kwargs.pop('chunk_size', 500)
-        res = itertools.chain.from_iterable(
-            self.filter(**dict([(chunk_field, chunk)] + kwargs.items()))
-            for chunk in chunks(items, chunk_size)
-        )
-        return res
+        chunk_size = kwargs.pop('chunk_size', None)
+        return self._iter_chunked_filter(chunk_field, list(items), chunk_size, kwargs)
+
+    def _iter_chunked_filter(self, chunk_field, items, chunk_size, filter_kwargs):
+        """
+        Yield the results of :meth:`chunked_filter`, one chunk query at a time.
+        """
+        start = 0
+        while start < len(items):
+            size = chunk_size or self.adaptive_chunk_size(chunk_field)
+            chunk = items[start:start + size]
+            start += size
+
+            query_start = time.time()
+            rows = list(self.filter(**dict([(chunk_field, chunk)] + filter_kwargs.items())))
+            if chunk_size is None:
+                self._record_latency(chunk_field, len(chunk), time.time() - query_start)
+
+            for row in rows:
+                yield row
+
+    def _latency_key(self, chunk_field):
+        """
+        The key in `_seconds_per_item` for queries on `chunk_field`.
+        """
+        return (self.model._meta.db_table, chunk_field)
+
+    def _record_latency(self, chunk_field, num_items, seconds):
+        """
+        Fold the latency of a query for `num_items` items into the moving average.
+        """
+        if not num_items:
+            return
+        key = self._latency_key(chunk_field)
+        observed = seconds / num_items
+        previous = self._seconds_per_item.get(key)
+        if previous is None:
+            self._seconds_per_item[key] = observed
+        else:
+            self._seconds_per_item[key] = (
+                self.LATENCY_SMOOTHING * observed + (1 - self.LATENCY_SMOOTHING) * previous
+            )
+
+    def max_chunk_size(self):
+        """
+        The largest chunk size the database for this manager accepts.
+        """
+        return self.MAX_CHUNK_SIZE.get(connections[self.db].vendor, self.DEFAULT_MAX_CHUNK_SIZE)
+
+    def adaptive_chunk_size(self, chunk_field):
+        """
+        The chunk size to use for the next query on `chunk_field`.
+
+        This is the number of items that earlier queries suggest can be read
+        in ``TARGET_CHUNK_SECONDS``, clamped between ``DEFAULT_CHUNK_SIZE`` and
+        :meth:`max_chunk_size`.
+        """
+        seconds_per_item = self._seconds_per_item.get(self._latency_key(chunk_field))
+        if seconds_per_item is None:
+            return self.DEFAULT_CHUNK_SIZE
+        if seconds_per_item == 0:
+            return self.max_chunk_size()
+        target = int(self.TARGET_CHUNK_SECONDS / seconds_per_item)
+        return max(self.DEFAULT_CHUNK_SIZE, min(target, self.max_chunk_size()))
 
 
 class ChunkingCallStackManager(CallStackManager, ChunkingManager):
@@ -137,6 +216,28 @@ class StudentModule(CallStackMixin, models.Model):
         else:
             return queryset
 
+    @classmethod
+    def iter_submitted_problems_read_only(cls, course_id, chunk_size=1000):
+        """
+        Yield lists of at most `chunk_size` submitted problem instances for a
+        given course, as selected by :meth:`all_submitted_problems_read_only`.
+
+        Rows are fetched in primary key order using keyset pagination
+        (``id > last_seen_id``) rather than a single large query, so that the
+        database driver never buffers more than one chunk of rows at a time.
+        Only the columns needed to inspect the submitted state are loaded.
+        """
+        queryset = cls.all_submitted_problems_read_only(course_id).only(
+            'id', 'student', 'module_state_key', 'state'
+        ).order_by('id')
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1].id
+
     def __repr__(self):
         return 'StudentModule<%r>' % ({
             'course_id': self.course_id,
@@ -153,10 +254,82 @@ class StudentModule(CallStackMixin, models.Model):
         return unicode(repr(self))
 
 
+class StudentModuleHistoryState(models.Model):
+    """
+    A content-addressed copy of a serialized StudentModule state.
+
+    History rows that record identical states (for example, repeated saves of
+    a problem whose answers did not change) share a single
+    `StudentModuleHistoryState` row instead of each storing the full blob.
+    """
+    # SHA-1 hex digest of the utf-8 encoded state
+    state_hash = models.CharField(max_length=40, unique=True)
+    state = models.TextField()
+
+    @staticmethod
+    def hash_state(state):
+        """
+        Return the content hash used to identify `state`.
+        """
+        if isinstance(state, unicode):
+            state = state.encode('utf-8')
+        return hashlib.sha1(state).hexdigest()
+
+    @classmethod
+    def for_state(cls, state):
+        """
+        Return the `StudentModuleHistoryState` holding `state`, creating it if
+        no identical state has been recorded before. Returns None if `state`
+        is None.
+
+        A new state is inserted straight away, relying on the unique
+        `state_hash` to detect one that was recorded before, so saving a new
+        state takes a single query. The insert is made in a savepoint, so that
+        a duplicate doesn't abort the enclosing transaction.
+        """
+        if state is None:
+            return None
+        state_hash = cls.hash_state(state)
+        db = router.db_for_write(cls)
+        sid = transaction.savepoint(using=db)
+        try:
+            blob = cls.objects.using(db).create(state_hash=state_hash, state=state)
+        except IntegrityError:
+            transaction.savepoint_rollback(sid, using=db)
+            return cls._get_committed(db, state_hash)
+        transaction.savepoint_commit(sid, using=db)
+        return blob
+
+    @classmethod
+    def _get_committed(cls, db, state_hash):
+        """
+        Return the latest committed `StudentModuleHistoryState` with
+        `state_hash` from the database `db`.
+
+        The row may have been committed after the snapshot of a REPEATABLE
+        READ transaction was taken, so MySQL reads it with a locking read,
+        which sees the latest committed rows. Its shared lock is compatible
+        with the one InnoDB takes on the duplicate key, and it keeps
+        `compact_history` from deleting the row before this transaction ends.
+        """
+        if connections[db].vendor == 'mysql':
+            return list(cls.objects.db_manager(db).raw(
+                'SELECT * FROM {} WHERE state_hash = %s LOCK IN SHARE MODE'.format(cls._meta.db_table),
+                [state_hash]
+            ))[0]
+        return cls.objects.using(db).get(state_hash=state_hash)
+
+
 class StudentModuleHistory(CallStackMixin, models.Model):
     """Keeps a complete history of state changes for a given XModule for a given
     Student. Right now, we restrict this to problems so that the table doesn't
-    explode in size."""
+    explode in size.
+
+    New entries store their state by reference to a shared
+    `StudentModuleHistoryState`; entries written before that existed keep their
+    state inline in `state` until they are migrated by the
+    `compact_history` management command. Use `get_state` to read the state
+    regardless of how it is stored."""
     objects = CallStackManager()
     HISTORY_SAVING_TYPES = {'problem'}
 
@@ -169,9 +342,19 @@ class StudentModuleHistory(CallStackMixin, models.Model):
     # This should be populated from the modified field in StudentModule
     created = models.DateTimeField(db_index=True)
     state = models.TextField(null=True, blank=True)
+    state_blob = models.ForeignKey(StudentModuleHistoryState, null=True, blank=True, db_index=True)
     grade = models.FloatField(null=True, blank=True)
     max_grade = models.FloatField(null=True, blank=True)
 
+    def get_state(self):
+        """
+        Return the serialized state recorded by this entry, whether it is
+        stored inline or in a shared `StudentModuleHistoryState`.
+        """
+        if self.state_blob_id is not None:  # pylint: disable=no-member
+            return self.state_blob.state
+        return self.state
+
     @receiver(post_save, sender=StudentModule)
     def save_history(sender, instance, **kwargs):  # pylint: disable=no-self-argument, unused-argument
         """
@@ -183,7 +366,7 @@ class StudentModuleHistory(CallStackMixin, models.Model):
             history_entry = StudentModuleHistory(student_module=instance,
                                                  version=None,
                                                  created=instance.modified,
-                                                 state=instance.state,
+                                                 state_blob=StudentModuleHistoryState.for_state(instance.state),
                                                  grade=instance.grade,
                                                  max_grade=instance.max_grade)
             history_entry.save()
@@ -304,6 +487,54 @@ class StudentFieldOverride(TimeStampedModel):
     field = models.CharField(max_length=255)
     value = models.TextField(default='null')
 
+    # Seconds the course_has_overrides flag is cached.  The flag is updated
+    # before the changing transaction commits, so a concurrent request may
+    # still cache a stale answer; this bounds how long it is served.
+    HAS_OVERRIDES_CACHE_TIMEOUT = 60
+
+    @staticmethod
+    def has_overrides_cache_key(course_key):
+        """
+        The key used to cache whether `course_key` has any overrides.
+        """
+        return u'courseware.StudentFieldOverride.has_overrides.{}'.format(course_key)
+
+    @classmethod
+    def course_has_overrides(cls, course_key):
+        """
+        Return whether any student in the course `course_key` has an override.
+
+        The answer is cached across requests for HAS_OVERRIDES_CACHE_TIMEOUT
+        seconds.  Saving an override sets the cached flag, and deleting one
+        clears it.
+        """
+        cache_key = cls.has_overrides_cache_key(course_key)
+        has_overrides = cache.get(cache_key)
+        if has_overrides is None:
+            has_overrides = cls.objects.filter(course_id=course_key).exists()
+            cache.set(cache_key, has_overrides, cls.HAS_OVERRIDES_CACHE_TIMEOUT)
+        return has_overrides
+
+
+@receiver(post_save, sender=StudentFieldOverride)
+def set_course_has_overrides(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Set the cached StudentFieldOverride.course_has_overrides flag for the course of `instance`.
+    """
+    cache.set(
+        StudentFieldOverride.has_overrides_cache_key(instance.course_id),
+        True,
+        StudentFieldOverride.HAS_OVERRIDES_CACHE_TIMEOUT
+    )
+
+
+@receiver(post_delete, sender=StudentFieldOverride)
+def clear_course_has_overrides(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Clear the cached StudentFieldOverride.course_has_overrides flag for the course of `instance`.
+    """
+    cache.delete(StudentFieldOverride.has_overrides_cache_key(instance.course_id))
+
 
 # Signal that indicates that a user's score for a problem has been updated.
 # This signal is generated when a scoring event occurs either within the core
@@ -34,7 +34,13 @@ from courseware.masquerade import (
     is_masquerading_as_specific_student,
     setup_masquerade,
 )
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache, set_score
+from courseware.model_data import (
+    DjangoKeyValueStore,
+    FieldDataCache,
+    flush_write_behind_caches,
+    set_score,
+    write_behind_user_state,
+)
 from courseware.models import SCORE_CHANGED
 from courseware.entrance_exams import (
     get_entrance_exam_score,
@@ -45,6 +51,7 @@ from eventtracking import tracker
 from lms.djangoapps.lms_xblock.field_data import LmsFieldData
 from lms.djangoapps.lms_xblock.runtime import LmsModuleSystem, unquote_slashes, quote_slashes
 from lms.djangoapps.lms_xblock.models import XBlockAsidesConfig
+from performance.profiler import attribute_to
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import UsageKey, CourseKey
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
@@ -543,6 +550,9 @@ def get_module_system_for_user(user, student_data,  # TODO  # pylint: disable=to
 
     def publish(block, event_type, event):
         """A function that allows XModules to publish events."""
+        # Save any user state deferred by write_behind_user_state first, so that
+        # events aren't published (and grades recorded) for state that fails to save.
+        flush_write_behind_caches()
         if event_type == 'grade' and not is_masquerading_as_specific_student(user, course_id):
             handle_grade_event(block, event_type, event)
         else:
@@ -1060,8 +1070,12 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, course
         tracking_context_name = 'module_callback_handler'
         req = django_to_webob_request(request)
         try:
-            with tracker.get_tracker().context(tracking_context_name, tracking_context):
-                resp = instance.handle(handler, req, suffix)
+            # Coalesce all of the user state saved by the handler into a single
+            # write per row when the handler returns.
+            with write_behind_user_state():
+                with tracker.get_tracker().context(tracking_context_name, tracking_context):
+                    with attribute_to(instance.scope_ids.block_type, handler):
+                        resp = instance.handle(handler, req, suffix)
 
         except NoSuchHandlerError:
             log.exception("XBlock %s attempted to access missing handler %r", instance, handler)
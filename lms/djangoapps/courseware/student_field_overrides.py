@@ -4,9 +4,13 @@ by the individual due dates feature.
 """
 import json
 
-from .field_overrides import FieldOverrideProvider
+import request_cache
+
+from .field_overrides import FieldOverrideProvider, clear_resolved_overrides
 from .models import StudentFieldOverride
 
+OVERRIDES_CACHE_NAME = 'courseware.student_field_overrides'
+
 
 class IndividualStudentOverrideProvider(FieldOverrideProvider):
     """
@@ -14,13 +18,18 @@ class IndividualStudentOverrideProvider(FieldOverrideProvider):
     :class:`~courseware.field_overrides.FieldOverrideProvider` which allows for
     overrides to be made on a per user basis.
     """
+    request_cache_names = (OVERRIDES_CACHE_NAME,)
+
     def get(self, block, name, default):
         return get_override_for_user(self.user, block, name, default)
 
     @classmethod
     def enabled_for(cls, course):
-        """This simple override provider is always enabled"""
-        return True
+        """
+        This provider is enabled for courses in which any student has an
+        individual override.
+        """
+        return StudentFieldOverride.course_has_overrides(course.id)
 
 
 def get_override_for_user(user, block, name, default=None):
@@ -29,31 +38,49 @@ def get_override_for_user(user, block, name, default=None):
     specify the block and the name of the field.  If the field is not
     overridden for the given user, returns `default`.
     """
-    if not hasattr(block, '_student_overrides'):
-        block._student_overrides = {}  # pylint: disable=protected-access
-    overrides = block._student_overrides.get(user.id)  # pylint: disable=protected-access
-    if overrides is None:
-        overrides = _get_overrides_for_user(user, block)
-        block._student_overrides[user.id] = overrides  # pylint: disable=protected-access
-    return overrides.get(name, default)
+    block_overrides = _get_overrides_for_user(user, block.runtime.course_id).get(block.location, {})
+    if name not in block_overrides:
+        return default
+    return block.fields[name].from_json(json.loads(block_overrides[name]))
 
 
-def _get_overrides_for_user(user, block):
+def _get_overrides_for_user(user, course_key):
     """
-    Gets all of the individual student overrides for given user and block.
-    Returns a dictionary of field override values keyed by field name.
+    Gets all of the individual student overrides for given user and course,
+    with a single query that is cached for the rest of the request.
+    Returns a dictionary mapping block locations to dictionaries of
+    serialized field override values keyed by field name.
     """
-    query = StudentFieldOverride.objects.filter(
-        course_id=block.runtime.course_id,
-        location=block.location,
-        student_id=user.id,
-    )
-    overrides = {}
-    for override in query:
-        field = block.fields[override.field]
-        value = field.from_json(json.loads(override.value))
-        overrides[override.field] = value
-    return overrides
+    overrides_cache = request_cache.get_cache(OVERRIDES_CACHE_NAME)
+    cache_key = (user.id, course_key)
+    if cache_key not in overrides_cache:
+        overrides = {}
+        query = StudentFieldOverride.objects.filter(
+            course_id=course_key,
+            student_id=user.id,
+        )
+        for override in query:
+            # Locations from old mongo courses are stored without their course run.
+            location = override.location.map_into_course(course_key)
+            overrides.setdefault(location, {})[override.field] = override.value
+        overrides_cache[cache_key] = overrides
+    return overrides_cache[cache_key]
+
+
+def _update_cached_override(user, block, name, value):
+    """
+    Update the cached overrides for `user`, if they have been loaded in this
+    request, with the serialized `value` of field `name` on `block`, or remove
+    the override if `value` is None.
+    """
+    clear_resolved_overrides()
+    overrides = request_cache.get_cache(OVERRIDES_CACHE_NAME).get((user.id, block.runtime.course_id))
+    if overrides is None:
+        return
+    if value is None:
+        overrides.get(block.location, {}).pop(name, None)
+    else:
+        overrides.setdefault(block.location, {})[name] = value
 
 
 def override_field_for_user(user, block, name, value):
@@ -70,6 +97,7 @@ def override_field_for_user(user, block, name, value):
     field = block.fields[name]
     override.value = json.dumps(field.to_json(value))
     override.save()
+    _update_cached_override(user, block, name, override.value)
 
 
 def clear_override_for_user(user, block, name):
@@ -87,3 +115,4 @@ def clear_override_for_user(user, block, name):
             field=name).delete()
     except StudentFieldOverride.DoesNotExist:
         pass
+    _update_cached_override(user, block, name, None)
@@ -7,7 +7,10 @@ import itertools
 import mock
 from nose.plugins.attrib import attr
 
+import datetime
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.test.utils import override_settings
 from django.core.urlresolvers import reverse
 from django.test.client import RequestFactory
@@ -15,7 +18,8 @@ from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 from courseware.courses import (
     get_course_by_id, get_cms_course_link, course_image_url,
-    get_course_info_section, get_course_about_section, get_cms_block_link
+    get_course_info_section, get_course_about_section, get_cms_block_link,
+    get_courses
 )
 
 from courseware.courses import get_course_with_access
@@ -23,6 +27,9 @@ from courseware.module_render import get_module_for_descriptor
 from courseware.tests.helpers import get_request_for_user
 from courseware.model_data import FieldDataCache
 from lms.djangoapps.courseware.courseware_access_exception import CoursewareAccessException
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from pytz import UTC
+from student.roles import CourseStaffRole
 from student.tests.factories import UserFactory
 from xmodule.modulestore.django import _get_modulestore_branch_setting, modulestore
 from xmodule.modulestore import ModuleStoreEnum
@@ -67,6 +74,69 @@ class CoursesTest(ModuleStoreTestCase):
         self.assertFalse(error.exception.access_response.has_access)
 
 
+@attr('shard_1')
+class CourseCatalogTest(ModuleStoreTestCase):
+    """Test listing the course catalog from course overviews."""
+
+    def setUp(self):
+        super(CourseCatalogTest, self).setUp()
+        cache.clear()
+        now = datetime.datetime.now(UTC)
+        self.courses = [
+            CourseFactory.create(org='MITx', number='3', metadata={'start': now + datetime.timedelta(days=1)}),
+            CourseFactory.create(org='HarvardX', number='1', metadata={'start': now + datetime.timedelta(days=3)}),
+            CourseFactory.create(
+                org='MITx', number='2',
+                metadata={'start': now + datetime.timedelta(days=2), 'announcement': now},
+            ),
+        ]
+        self.hidden_course = CourseFactory.create(org='MITx', number='4', metadata={'catalog_visibility': 'none'})
+        for course in self.courses + [self.hidden_course]:
+            CourseOverview.get_from_id(course.id)
+
+    def catalog_ids(self, user=None, **kwargs):
+        """Return the ids of the courses listed in the catalog for `user`."""
+        return [overview.id for overview in get_courses(user or AnonymousUser(), **kwargs)]
+
+    @override_settings(COURSE_CATALOG_VISIBILITY_PERMISSION='see_in_catalog')
+    def test_orderings(self):
+        first, second, third = [course.id for course in self.courses]
+        self.assertEqual(self.catalog_ids(), [second, third, first])
+        self.assertEqual(self.catalog_ids(order='start'), [first, third, second])
+        self.assertEqual(self.catalog_ids(order='announcement'), [third, second, first])
+
+    @override_settings(COURSE_CATALOG_VISIBILITY_PERMISSION='see_in_catalog')
+    def test_pagination(self):
+        first, second, third = [course.id for course in self.courses]
+        self.assertEqual(self.catalog_ids(order='start', offset=1, limit=1), [third])
+        self.assertEqual(self.catalog_ids(order='start', offset=2), [second])
+
+    @override_settings(COURSE_CATALOG_VISIBILITY_PERMISSION='see_in_catalog')
+    @mock.patch('branding.microsite.get_value', lambda key, default=None: 'MITx' if key == 'course_org_filter' else default)
+    def test_org_filter(self):
+        self.assertEqual(self.catalog_ids(order='start'), [self.courses[0].id, self.courses[2].id])
+
+    @override_settings(COURSE_CATALOG_VISIBILITY_PERMISSION='see_in_catalog')
+    def test_catalog_visibility(self):
+        staff = UserFactory.create()
+        CourseStaffRole(self.hidden_course.id).add_users(staff)
+        self.assertNotIn(self.hidden_course.id, self.catalog_ids())
+        self.assertNotIn(self.hidden_course.id, self.catalog_ids(UserFactory.create()))
+        self.assertIn(self.hidden_course.id, self.catalog_ids(staff))
+
+    @override_settings(COURSE_CATALOG_VISIBILITY_PERMISSION='see_in_catalog')
+    def test_cached(self):
+        self.catalog_ids()
+        # Only the page of course overviews is read once the catalog is cached.
+        with self.assertNumQueries(1):
+            self.catalog_ids()
+
+        # Deleting a course invalidates the catalog.
+        CourseOverview.objects.filter(id=self.courses[0].id).delete()
+        CourseOverview.invalidate_catalog()
+        self.assertNotIn(self.courses[0].id, self.catalog_ids())
+
+
 @attr('shard_1')
 class ModuleStoreBranchSettingTest(ModuleStoreTestCase):
     """Test methods related to the modulestore branch setting."""
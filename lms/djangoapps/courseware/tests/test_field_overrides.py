@@ -2,6 +2,8 @@
 Tests for `field_overrides` module.
 """
 import unittest
+from celery.signals import task_postrun
+from mock import Mock
 from nose.plugins.attrib import attr
 
 from django.test.utils import override_settings
@@ -11,7 +13,10 @@ from xmodule.modulestore.tests.django_utils import (
     ModuleStoreTestCase,
 )
 
+from request_cache.middleware import RequestCache
+
 from ..field_overrides import (
+    clear_resolved_overrides,
     disable_overrides,
     FieldOverrideProvider,
     OverrideFieldData,
@@ -95,6 +100,77 @@ class OverrideFieldDataTests(ModuleStoreTestCase):
         self.assertIsInstance(data, DictFieldData)
 
 
+@attr('shard_1')
+class InheritedOverrideTests(unittest.TestCase):
+    """
+    Tests of how `OverrideFieldData` resolves overrides inherited from ancestors.
+    """
+    def setUp(self):
+        super(InheritedOverrideTests, self).setUp()
+        self.addCleanup(RequestCache.clear_request_cache)
+        self.chapter = self.make_block('chapter', None)
+        self.sequential = self.make_block('sequential', self.chapter)
+        self.verticals = [self.make_block('vertical_{}'.format(index), self.sequential) for index in range(3)]
+        TestInheritedOverrideProvider.overrides = {('chapter', 'due'): 'chapter due'}
+        TestInheritedOverrideProvider.lookups = []
+
+    def make_block(self, location, parent):
+        """
+        Return a mock block at `location` whose parent is `parent`.
+        """
+        return Mock(location=location, get_parent=Mock(return_value=parent))
+
+    def make_one(self):
+        """
+        Factory method.
+        """
+        return OverrideFieldData(TESTUSER, DictFieldData({}), [TestInheritedOverrideProvider])
+
+    def test_inherited_override(self):
+        for vertical in self.verticals:
+            data = self.make_one()
+            self.assertFalse(data.has(vertical, 'due'))
+            self.assertEqual(data.default(vertical, 'due'), 'chapter due')
+        with disable_overrides():
+            with self.assertRaises(KeyError):
+                self.make_one().default(self.verticals[0], 'due')
+
+        # Each ancestor is only looked up once, however many descendants are read.
+        self.assertItemsEqual(
+            TestInheritedOverrideProvider.lookups,
+            [
+                ('vertical_0', 'due'), ('vertical_1', 'due'), ('vertical_2', 'due'),
+                ('sequential', 'due'), ('chapter', 'due'),
+            ]
+        )
+
+    def test_clear_resolved_overrides(self):
+        data = self.make_one()
+        self.assertEqual(data.default(self.verticals[0], 'due'), 'chapter due')
+
+        TestInheritedOverrideProvider.overrides[('sequential', 'due')] = 'sequential due'
+        self.assertEqual(data.default(self.verticals[0], 'due'), 'chapter due')
+        clear_resolved_overrides()
+        self.assertEqual(data.default(self.verticals[0], 'due'), 'sequential due')
+
+    def test_resolved_for_last_user_only(self):
+        self.assertEqual(self.make_one().default(self.verticals[0], 'due'), 'chapter due')
+        other_data = OverrideFieldData('otheruser', DictFieldData({}), [TestInheritedOverrideProvider])
+        self.assertEqual(other_data.default(self.verticals[0], 'due'), 'chapter due')
+        self.assertEqual(self.make_one().default(self.verticals[0], 'due'), 'chapter due')
+
+        # The overrides resolved for the first user were forgotten when the other user's were resolved
+        self.assertEqual(TestInheritedOverrideProvider.lookups.count(('chapter', 'due')), 3)
+
+    def test_cleared_after_task(self):
+        data = self.make_one()
+        self.assertEqual(data.default(self.verticals[0], 'due'), 'chapter due')
+
+        TestInheritedOverrideProvider.overrides[('sequential', 'due')] = 'sequential due'
+        task_postrun.send(sender=None)
+        self.assertEqual(data.default(self.verticals[0], 'due'), 'sequential due')
+
+
 @attr('shard_1')
 class ResolveDottedTests(unittest.TestCase):
     """
@@ -132,3 +208,20 @@ class TestOverrideProvider(FieldOverrideProvider):
     @classmethod
     def enabled_for(cls, course):
         return True
+
+
+class TestInheritedOverrideProvider(FieldOverrideProvider):
+    """
+    A `FieldOverrideProvider` for testing that overrides fields of blocks
+    by location, and records its lookups.
+    """
+    overrides = {}
+    lookups = []
+
+    def get(self, block, name, default):
+        self.lookups.append((block.location, name))
+        return self.overrides.get((block.location, name), default)
+
+    @classmethod
+    def enabled_for(cls, course):
+        return True
@@ -10,7 +10,19 @@ from nose.plugins.attrib import attr
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from opaque_keys.edx.locator import CourseLocator, BlockUsageLocator
 
-from courseware.grades import field_data_cache_for_grading, grade, iterate_grades_for, MaxScoresCache, ProgressSummary
+from courseware.grades import (
+    field_data_cache_for_grading,
+    get_weighted_scores,
+    get_weighted_scores_for_subtree,
+    grade,
+    iterate_grades_for,
+    MaxScoresCache,
+    ProgressSummary,
+    scorable_locations_for_grading,
+    scores_clients_for_grading,
+)
+from courseware.model_data import ScoresClient
+from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory
 from student.models import CourseEnrollment
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
@@ -197,6 +209,99 @@ class TestFieldDataCacheScorableLocations(ModuleStoreTestCase):
         self.assertNotIn('discussion', block_types)
         self.assertIn('problem', block_types)
 
+    def test_scorable_locations_for_grading(self):
+        """The scorable locations of the course are those found by the FieldDataCache."""
+        fd_cache = field_data_cache_for_grading(self.course, self.student)
+        self.assertEqual(scorable_locations_for_grading(self.course), fd_cache.scorable_locations)
+
+
+class TestScoresClientsForGrading(ModuleStoreTestCase):
+    """
+    Tests of fetching the scores of many students for grading at once.
+    """
+    def setUp(self):
+        super(TestScoresClientsForGrading, self).setUp()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        sequential = ItemFactory.create(category='sequential', parent=chapter)
+        vertical = ItemFactory.create(category='vertical', parent=sequential)
+        self.problems = [ItemFactory.create(category='problem', parent=vertical) for __ in xrange(2)]
+        self.students = [UserFactory.create() for __ in xrange(3)]
+        for student_index, student in enumerate(self.students):
+            CourseEnrollment.enroll(student, self.course.id)
+            for problem in self.problems[:student_index]:
+                StudentModuleFactory.create(
+                    student=student,
+                    course_id=self.course.id,
+                    module_state_key=problem.location,
+                    grade=student_index,
+                    max_grade=2,
+                )
+
+    def test_matches_scores_client(self):
+        scorable_locations = scorable_locations_for_grading(self.course)
+        with self.assertNumQueries(1):
+            scores_clients = scores_clients_for_grading(self.course, self.students, scorable_locations)
+        for student in self.students:
+            scores_client = ScoresClient(self.course.id, student.id)
+            scores_client.fetch_scores(scorable_locations)
+            for problem in self.problems:
+                self.assertEqual(
+                    scores_clients[student.id].get(problem.location),
+                    scores_client.get(problem.location),
+                )
+
+    def test_grade_with_scores_client(self):
+        scores_clients = scores_clients_for_grading(self.course, self.students)
+        for student in self.students:
+            request = RequestFactory().get('/')
+            request.user = student
+            request.session = {}
+            self.assertEqual(
+                grade(student, request, self.course, scores_client=scores_clients[student.id]),
+                grade(student, request, self.course),
+            )
+
+
+class TestSubtreeWeightedScores(ModuleStoreTestCase):
+    """
+    Tests of scoring only a subtree of the course.
+    """
+    def setUp(self):
+        super(TestSubtreeWeightedScores, self).setUp()
+        self.student = UserFactory.create()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        sequential = ItemFactory.create(category='sequential', parent=chapter)
+        self.verticals = [ItemFactory.create(category='vertical', parent=sequential) for __ in xrange(2)]
+        self.problems = [
+            [ItemFactory.create(category='problem', parent=vertical) for __ in xrange(2)]
+            for vertical in self.verticals
+        ]
+        CourseEnrollment.enroll(self.student, self.course.id)
+        for problem, grade_value in zip(sum(self.problems, []), (1, 0, 1, 1)):
+            StudentModuleFactory.create(
+                student=self.student,
+                course_id=self.course.id,
+                module_state_key=problem.location,
+                grade=grade_value,
+                max_grade=1,
+            )
+
+    def test_matches_course_scores(self):
+        course_summary = get_weighted_scores(self.student, self.course)
+        for vertical, problems in zip(self.verticals, self.problems):
+            subtree_summary = get_weighted_scores_for_subtree(self.student, self.course, vertical.location)
+            self.assertEqual(
+                subtree_summary.score_for_module(vertical.location),
+                course_summary.score_for_module(vertical.location),
+            )
+            # Nothing outside the subtree is scored
+            self.assertEqual(
+                set(subtree_summary.weighted_scores),
+                set(problem.location for problem in problems),
+            )
+
 
 class TestProgressSummary(TestCase):
     """
@@ -0,0 +1,320 @@
+"""
+Black-box tests of the KeyValueXBlockUserStateClient against the semantics
+defined in edx_user_state_client, and tests of dual writes and backfilling
+between user state clients.
+"""
+
+import socket
+from StringIO import StringIO
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from django.test.utils import override_settings
+from mock import patch
+
+from edx_user_state_client.tests import UserStateClientTestBase
+from courseware.kv_user_state_client import KeyValueXBlockUserStateClient, MemoryStore, RedisStore, StoreError
+from courseware.management.commands.backfill_user_state import UserStateBackfiller
+from courseware.user_state_client import (
+    DjangoXBlockUserStateClient,
+    DualWriteXBlockUserStateClient,
+    get_user_state_client,
+)
+from courseware.tests.factories import UserFactory, course_id
+
+
+MEMORY_CLIENT = {
+    'class': 'courseware.kv_user_state_client.KeyValueXBlockUserStateClient',
+    'options': {'store': 'memory', 'store_options': {'name': 'test'}},
+}
+
+
+class MemoryStoreTestMixin(object):
+    """
+    Empties the shared 'test' MemoryStore before and after each test.
+    """
+    def setUp(self):
+        super(MemoryStoreTestMixin, self).setUp()
+        store = MemoryStore(name='test')
+        store.clear()
+        self.addCleanup(store.clear)
+
+
+class TestKeyValueUserStateClient(MemoryStoreTestMixin, UserStateClientTestBase, TestCase):
+    """
+    Tests of the KeyValueXBlockUserStateClient backend, using a memory store.
+    """
+    __test__ = True
+
+    def _user(self, user_idx):
+        return u'user_{}'.format(user_idx)
+
+    def _block_type(self, block):  # pylint: disable=unused-argument
+        # Like DjangoUserStateClient, history is only kept for problems
+        return 'problem'
+
+    def setUp(self):
+        super(TestKeyValueUserStateClient, self).setUp()
+        self.client = KeyValueXBlockUserStateClient(store='memory', store_options={'name': 'test'})
+
+
+class TestKeyValueUserStateClientHistory(MemoryStoreTestMixin, TestCase):
+    """
+    Tests of the history kept by the KeyValueXBlockUserStateClient.
+    """
+    def setUp(self):
+        super(TestKeyValueUserStateClientHistory, self).setUp()
+        self.client = KeyValueXBlockUserStateClient(store='memory', store_options={'name': 'test'}, max_history=2)
+
+    def test_history_is_trimmed(self):
+        block_key = course_id.make_usage_key('problem', 'problem_block')
+        for index in range(3):
+            self.client.set(u'user', block_key, {'index': index, 'field_{}'.format(index): index})
+        self.client.delete(u'user', block_key, fields=['field_2'])
+        self.assertEqual(
+            [entry.state for entry in self.client.get_history(u'user', block_key)],
+            [
+                {'index': 2, 'field_0': 0, 'field_1': 1},
+                {'index': 2, 'field_0': 0, 'field_1': 1, 'field_2': 2},
+            ]
+        )
+
+    def test_history_of_other_blocks_is_not_kept(self):
+        block_key = course_id.make_usage_key('html', 'html_block')
+        self.client.set(u'user', block_key, {'field': 'value'})
+        with self.assertRaises(self.client.DoesNotExist):
+            list(self.client.get_history(u'user', block_key))
+
+
+class FakeSocket(object):
+    """
+    A connected socket, which records what is sent to it and replies with canned `replies`.
+    """
+    def __init__(self, replies='', send_error=None):
+        self.sent = []
+        self.replies = StringIO(replies)
+        self.send_error = send_error
+        self.closed = False
+
+    def sendall(self, data):  # pylint: disable=missing-docstring
+        if self.send_error:
+            raise self.send_error
+        self.sent.append(data)
+
+    def makefile(self, mode):  # pylint: disable=unused-argument, missing-docstring
+        return self.replies
+
+    def close(self):  # pylint: disable=missing-docstring
+        self.closed = True
+
+
+class TestRedisStore(TestCase):
+    """
+    Tests of the Redis protocol spoken by RedisStore.
+    """
+    def connect(self, *sockets):
+        """
+        Make the store's successive connections to the server return `sockets`.
+        """
+        patcher = patch('courseware.kv_user_state_client.socket.create_connection', side_effect=sockets)
+        self.create_connection = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pipelining(self):
+        sock = FakeSocket('+OK\r\n:2\r\n$5\r\nvalue\r\n$-1\r\n*2\r\n$1\r\na\r\n:1\r\n')
+        self.connect(sock)
+        store = RedisStore(port=1234)
+        replies = store.execute([
+            ('HMSET', 'key', u'f\xe9', 1),
+            ('SADD', 'set', 'a', 'b'),
+            ('GET', 'key'),
+            ('GET', 'missing'),
+            ('HGETALL', 'key'),
+        ])
+        self.assertEqual(replies, ['OK', 2, 'value', None, ['a', 1]])
+        # all of the commands are sent at once
+        self.assertEqual(sock.sent, [
+            '*4\r\n$5\r\nHMSET\r\n$3\r\nkey\r\n$3\r\nf\xc3\xa9\r\n$1\r\n1\r\n'
+            '*4\r\n$4\r\nSADD\r\n$3\r\nset\r\n$1\r\na\r\n$1\r\nb\r\n'
+            '*2\r\n$3\r\nGET\r\n$3\r\nkey\r\n'
+            '*2\r\n$3\r\nGET\r\n$7\r\nmissing\r\n'
+            '*2\r\n$7\r\nHGETALL\r\n$3\r\nkey\r\n'
+        ])
+        self.create_connection.assert_called_once_with(('localhost', 1234), 5)
+
+    def test_select_db(self):
+        sock = FakeSocket('+OK\r\n:1\r\n')
+        self.connect(sock)
+        self.assertEqual(RedisStore(db=3).execute([('DEL', 'key')]), [1])
+        self.assertEqual(sock.sent[0], '*2\r\n$6\r\nSELECT\r\n$1\r\n3\r\n')
+
+    def test_error_reply(self):
+        sock = FakeSocket('+OK\r\n-WRONGTYPE wrong kind of value\r\n:1\r\n:1\r\n')
+        self.connect(sock)
+        store = RedisStore()
+        with self.assertRaisesRegexp(StoreError, 'WRONGTYPE'):
+            store.execute([('HMSET', 'key', 'f', 1), ('SADD', 'key', 'a'), ('DEL', 'other')])
+        # the rest of the replies were read, so the connection is still usable
+        self.assertEqual(store.execute([('DEL', 'key')]), [1])
+        self.assertEqual(self.create_connection.call_count, 1)
+        self.assertFalse(sock.closed)
+
+    def test_reconnect_after_close(self):
+        closed = FakeSocket(':1\r\n')
+        reconnected = FakeSocket(':1\r\n')
+        self.connect(closed, reconnected)
+        store = RedisStore()
+        self.assertEqual(store.execute([('DEL', 'key')]), [1])
+        with self.assertRaisesRegexp(StoreError, 'closed'):
+            store.execute([('DEL', 'key')])
+        self.assertTrue(closed.closed)
+        self.assertEqual(store.execute([('DEL', 'key')]), [1])
+        self.assertEqual(self.create_connection.call_count, 2)
+
+    def test_reconnect_after_socket_error(self):
+        broken = FakeSocket(send_error=socket.error('Broken pipe'))
+        reconnected = FakeSocket(':1\r\n')
+        self.connect(broken, reconnected)
+        store = RedisStore()
+        with self.assertRaisesRegexp(StoreError, 'Broken pipe'):
+            store.execute([('DEL', 'key')])
+        self.assertEqual(store.execute([('DEL', 'key')]), [1])
+
+    def test_clients_share_store(self):
+        options = {'host': 'redis.example.com', 'port': 1234}
+        self.assertIs(
+            KeyValueXBlockUserStateClient(store_options=options).store,
+            KeyValueXBlockUserStateClient(store_options=dict(options)).store,
+        )
+        self.assertIsNot(
+            KeyValueXBlockUserStateClient(store_options=options).store,
+            KeyValueXBlockUserStateClient(store_options=dict(options, db=1)).store,
+        )
+
+    def test_unavailable(self):
+        self.connect(socket.error('Connection refused'))
+        client = KeyValueXBlockUserStateClient(store='redis')
+        with self.assertRaises(client.ServiceUnavailable):
+            client.get(u'user', course_id.make_usage_key('problem', 'problem_block'))
+
+
+class TestKeyValueUserStateClientIteration(MemoryStoreTestMixin, TestCase):
+    """
+    Tests of iterating over all of the state of a block or course.
+    """
+    def setUp(self):
+        super(TestKeyValueUserStateClientIteration, self).setUp()
+        self.client = KeyValueXBlockUserStateClient(store='memory', store_options={'name': 'test'})
+        self.problem_key = course_id.make_usage_key('problem', 'problem_block')
+        self.html_key = course_id.make_usage_key('html', 'html_block')
+        for index in range(5):
+            username = u'user_{}'.format(index)
+            self.client.set(username, self.problem_key, {'index': index})
+            self.client.set(username, self.html_key, {'index': index})
+        self.client.delete(u'user_0', self.problem_key)
+
+    def test_iter_all_for_block(self):
+        states = list(self.client.iter_all_for_block(self.problem_key, batch_size=2))
+        self.assertItemsEqual(
+            [(state.username, state.state) for state in states],
+            [(u'user_{}'.format(index), {'index': index}) for index in range(1, 5)]
+        )
+
+    def test_iter_all_for_course_block_type(self):
+        states = list(self.client.iter_all_for_course(course_id, block_type='html', batch_size=3))
+        self.assertEqual(len(states), 5)
+        self.assertTrue(all(state.block_key == self.html_key for state in states))
+
+
+class TestDualWriteUserStateClient(MemoryStoreTestMixin, TestCase):
+    """
+    Tests of writing user state to two clients.
+    """
+    def setUp(self):
+        super(TestDualWriteUserStateClient, self).setUp()
+        self.user = UserFactory.create()
+        self.block_key = course_id.make_usage_key('problem', 'problem_block')
+        self.client = DualWriteXBlockUserStateClient(
+            self.user,
+            primary={'class': 'courseware.user_state_client.DjangoXBlockUserStateClient'},
+            secondary=MEMORY_CLIENT,
+        )
+        self.primary = self.client.primary
+        self.secondary = self.client.secondary
+
+    def test_writes_both(self):
+        self.client.set(self.user.username, self.block_key, {'field_a': 'value', 'field_b': 'value'})
+        self.client.delete(self.user.username, self.block_key, fields=['field_b'])
+
+        self.assertEqual(self.primary.get(self.user.username, self.block_key).state, {'field_a': 'value'})
+        self.assertEqual(self.secondary.get(self.user.username, self.block_key).state, {'field_a': 'value'})
+        self.assertEqual(self.client.get(self.user.username, self.block_key).state, {'field_a': 'value'})
+
+    def test_reads_primary(self):
+        self.secondary.set(self.user.username, self.block_key, {'field_a': 'secondary'})
+        with self.assertRaises(self.client.DoesNotExist):
+            self.client.get(self.user.username, self.block_key)
+
+    def test_secondary_failure(self):
+        with patch.object(self.secondary, 'set_many', side_effect=self.secondary.ServiceUnavailable()):
+            self.client.set(self.user.username, self.block_key, {'field_a': 'value'})
+        self.assertEqual(self.primary.get(self.user.username, self.block_key).state, {'field_a': 'value'})
+
+    @override_settings(XBLOCK_USER_STATE_CLIENT={
+        'class': 'courseware.user_state_client.DualWriteXBlockUserStateClient',
+        'options': {
+            'primary': {'class': 'courseware.user_state_client.DjangoXBlockUserStateClient'},
+            'secondary': MEMORY_CLIENT,
+        },
+    })
+    def test_get_user_state_client(self):
+        client = get_user_state_client(self.user)
+        self.assertIsInstance(client, DualWriteXBlockUserStateClient)
+        self.assertIsInstance(client.primary, DjangoXBlockUserStateClient)
+        self.assertIsInstance(client.secondary, KeyValueXBlockUserStateClient)
+
+    @override_settings(XBLOCK_USER_STATE_CLIENT=MEMORY_CLIENT)
+    def test_key_value_client_is_not_primary(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_user_state_client(self.user)
+
+
+class TestUserStateBackfiller(MemoryStoreTestMixin, TestCase):
+    """
+    Tests of copying user state missing from one client from another.
+    """
+    def setUp(self):
+        super(TestUserStateBackfiller, self).setUp()
+        self.source = DjangoXBlockUserStateClient()
+        self.destination = KeyValueXBlockUserStateClient(store='memory', store_options={'name': 'test'})
+        self.users = [UserFactory.create() for __ in range(3)]
+        self.block_keys = [course_id.make_usage_key('problem', 'problem_{}'.format(index)) for index in range(2)]
+        for user in self.users:
+            for block_key in self.block_keys:
+                self.source.set(user.username, block_key, {'field_a': 'old', 'field_b': 'old'})
+
+    def test_backfill_course(self):
+        # Written by dual writes after the source state, so it must not be overwritten.
+        self.destination.set(self.users[0].username, self.block_keys[0], {'field_a': 'new'})
+
+        backfiller = UserStateBackfiller(self.source, self.destination)
+        backfiller.backfill_course(course_id, batch_size=4)
+
+        self.assertEqual(backfiller.states_read, 6)
+        self.assertEqual(backfiller.fields_copied, 11)
+        self.assertEqual(
+            self.destination.get(self.users[0].username, self.block_keys[0]).state,
+            {'field_a': 'new', 'field_b': 'old'}
+        )
+        for user in self.users[1:]:
+            for block_key in self.block_keys:
+                self.assertEqual(
+                    self.destination.get(user.username, block_key).state,
+                    {'field_a': 'old', 'field_b': 'old'}
+                )
+
+    def test_backfill_is_idempotent(self):
+        backfiller = UserStateBackfiller(self.source, self.destination)
+        backfiller.backfill_course(course_id)
+        backfiller.backfill_course(course_id)
+        self.assertEqual(backfiller.fields_copied, 0)
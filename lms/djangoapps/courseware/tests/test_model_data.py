@@ -6,8 +6,9 @@ from mock import Mock, patch
 from nose.plugins.attrib import attr
 from functools import partial
 
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
-from courseware.models import StudentModule, XModuleUserStateSummaryField
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError, PrefetchPlan
+from courseware.model_data import write_behind_user_state
+from courseware.models import StudentModule, StudentModuleHistory, XModuleUserStateSummaryField
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
 from student.tests.factories import UserFactory
@@ -136,8 +137,9 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         # as well as courseware_studentmodule. We also need to read the database
         # to discover if something other than the DjangoXBlockUserStateClient
         # has written to the StudentModule (such as UserStateCache setting the score
-        # on the StudentModule).
-        with self.assertNumQueries(3):
+        # on the StudentModule). The new state is stored once in
+        # courseware_studentmodulehistorystate.
+        with self.assertNumQueries(4):
             self.kvs.set(user_state_key('a_field'), 'new_value')
         self.assertEquals(1, StudentModule.objects.all().count())
         self.assertEquals({'b_field': 'b_value', 'a_field': 'new_value'}, json.loads(StudentModule.objects.all()[0].state))
@@ -148,8 +150,9 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         # as well as courseware_studentmodule. We also need to read the database
         # to discover if something other than the DjangoXBlockUserStateClient
         # has written to the StudentModule (such as UserStateCache setting the score
-        # on the StudentModule).
-        with self.assertNumQueries(3):
+        # on the StudentModule). The new state is stored once in
+        # courseware_studentmodulehistorystate.
+        with self.assertNumQueries(4):
             self.kvs.set(user_state_key('not_a_field'), 'new_value')
         self.assertEquals(1, StudentModule.objects.all().count())
         self.assertEquals({'b_field': 'b_value', 'a_field': 'a_value', 'not_a_field': 'new_value'}, json.loads(StudentModule.objects.all()[0].state))
@@ -160,8 +163,9 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         # as well as courseware_studentmodule. We also need to read the database
         # to discover if something other than the DjangoXBlockUserStateClient
         # has written to the StudentModule (such as UserStateCache setting the score
-        # on the StudentModule).
-        with self.assertNumQueries(3):
+        # on the StudentModule). The new state is stored once in
+        # courseware_studentmodulehistorystate.
+        with self.assertNumQueries(4):
             self.kvs.delete(user_state_key('a_field'))
         self.assertEquals(1, StudentModule.objects.all().count())
         self.assertRaises(KeyError, self.kvs.get, user_state_key('not_a_field'))
@@ -200,8 +204,9 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         # We also are updating a problem, so we write to courseware student module history
         # We also need to read the database to discover if something other than the
         # DjangoXBlockUserStateClient has written to the StudentModule (such as
-        # UserStateCache setting the score on the StudentModule).
-        with self.assertNumQueries(3):
+        # UserStateCache setting the score on the StudentModule). The new state
+        # is stored once in courseware_studentmodulehistorystate.
+        with self.assertNumQueries(4):
             self.kvs.set_many(kv_dict)
 
         for key in kv_dict:
@@ -220,6 +225,34 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
                 self.kvs.set_many(kv_dict)
         self.assertEquals(exception_context.exception.saved_field_names, [])
 
+    def test_write_behind(self):
+        "Test that writes deferred by write_behind_user_state are saved to a single row"
+        # Both fields are saved with the queries needed for a single set
+        with self.assertNumQueries(4):
+            with write_behind_user_state():
+                self.kvs.set(user_state_key('a_field'), 'new_value')
+                self.kvs.set(user_state_key('not_a_field'), 'new_value')
+                self.kvs.set(user_state_key('a_field'), 'newer_value')
+                self.assertEquals('newer_value', self.kvs.get(user_state_key('a_field')))
+
+        student_module = StudentModule.objects.get()
+        self.assertEquals(
+            {'b_field': 'b_value', 'a_field': 'newer_value', 'not_a_field': 'new_value'},
+            json.loads(student_module.state)
+        )
+        # One history entry from the factory, and one from the deferred writes
+        self.assertEquals(2, StudentModuleHistory.objects.filter(student_module=student_module).count())
+
+    def test_write_behind_copies_values(self):
+        "Test that changing a value after it's written doesn't change the deferred write"
+        value = {'answers': ['first']}
+        with write_behind_user_state():
+            self.kvs.set(user_state_key('a_field'), value)
+            value['answers'].append('second')
+            self.assertEquals({'answers': ['first']}, self.kvs.get(user_state_key('a_field')))
+
+        self.assertEquals({'answers': ['first']}, json.loads(StudentModule.objects.get().state)['a_field'])
+
 
 @attr('shard_1')
 class TestMissingStudentModule(TestCase):
@@ -248,8 +281,9 @@ class TestMissingStudentModule(TestCase):
         # as well as courseware_studentmodule. We also need to read the database
         # to discover if something other than the DjangoXBlockUserStateClient
         # has written to the StudentModule (such as UserStateCache setting the score
-        # on the StudentModule).
-        with self.assertNumQueries(3):
+        # on the StudentModule). The new state is stored once in
+        # courseware_studentmodulehistorystate.
+        with self.assertNumQueries(4):
             self.kvs.set(user_state_key('a_field'), 'a_value')
 
         self.assertEquals(1, sum(len(cache) for cache in self.field_data_cache.cache.values()))
@@ -388,6 +422,67 @@ class StorageTestBase(object):
         exception = exception_context.exception
         self.assertEquals(exception.saved_field_names, ['existing_field', 'other_existing_field'])
 
+    def test_write_behind(self):
+        """Test that writes deferred by write_behind_user_state are saved once, on exit"""
+        with patch('courseware.model_data.dog_stats_api.histogram') as mock_histogram:
+            with self.assertNumQueries(1):
+                with write_behind_user_state():
+                    self.kvs.set(self.key_factory('existing_field'), 'new_value')
+                    self.kvs.set(self.key_factory('existing_field'), 'newer_value')
+                    self.assertEquals('newer_value', self.kvs.get(self.key_factory('existing_field')))
+        mock_histogram.assert_called_once_with('FieldDataCache.flush.rows', 1)
+        self.assertEquals('newer_value', json.loads(self.storage_class.objects.get(field_name='existing_field').value))
+
+    def test_write_behind_delete_unsaved_field(self):
+        """Test that deleting a field that was only written in memory never touches the database"""
+        with self.assertNumQueries(0):
+            with write_behind_user_state():
+                self.kvs.set(self.key_factory('missing_field'), 'new_value')
+                self.assertTrue(self.kvs.has(self.key_factory('missing_field')))
+                self.kvs.delete(self.key_factory('missing_field'))
+                self.assertFalse(self.kvs.has(self.key_factory('missing_field')))
+        self.assertEquals(1, self.storage_class.objects.all().count())
+
+    def test_write_behind_failure(self):
+        """Test that save errors are raised when deferred writes are flushed"""
+        with patch('django.db.models.Model.save', side_effect=DatabaseError):
+            with self.assertRaises(KeyValueMultiSaveError):
+                with write_behind_user_state():
+                    self.kvs.set(self.key_factory('existing_field'), 'new_value')
+
+    def test_prefetch_plan_lazy_load(self):
+        """Test that scopes left out of the prefetch plan are loaded in one batch on first access"""
+        with self.assertNumQueries(0):
+            field_data_cache = FieldDataCache([], course_id, self.user, prefetch_plan=PrefetchPlan())
+            field_data_cache.add_descriptors_to_cache([self.mock_descriptor])
+            field_data_cache.add_descriptors_to_cache([self.mock_descriptor])
+        kvs = DjangoKeyValueStore(field_data_cache)
+
+        with self.assertNumQueries(1):
+            self.assertEquals('old_value', kvs.get(self.key_factory('existing_field')))
+        with self.assertNumQueries(0):
+            self.assertFalse(kvs.has(self.key_factory('missing_field')))
+        self.assertEquals(field_data_cache.query_counts, {self.scope: 1})
+
+    def test_prefetch_plan_lazy_set(self):
+        """Test that setting a lazily loaded field updates the existing row"""
+        field_data_cache = FieldDataCache([self.mock_descriptor], course_id, self.user, prefetch_plan=PrefetchPlan())
+        kvs = DjangoKeyValueStore(field_data_cache)
+
+        with self.assertNumQueries(2):
+            kvs.set(self.key_factory('existing_field'), 'new_value')
+        self.assertEquals(1, self.storage_class.objects.all().count())
+        self.assertEquals('new_value', json.loads(self.storage_class.objects.get().value))
+
+    def test_prefetch_plan_block_type(self):
+        """Test that block type scopes in the prefetch plan are loaded eagerly"""
+        plan = PrefetchPlan(block_type_scopes={'mock_problem': [self.scope]})
+        with self.assertNumQueries(1):
+            field_data_cache = FieldDataCache([self.mock_descriptor], course_id, self.user, prefetch_plan=plan)
+        with self.assertNumQueries(0):
+            self.assertTrue(field_data_cache.has(self.key_factory('existing_field')))
+        self.assertEquals(field_data_cache.query_counts, {self.scope: 1})
+
 
 class TestUserStateSummaryStorage(StorageTestBase, TestCase):
     """Tests for UserStateSummaryStorage"""
@@ -0,0 +1,54 @@
+"""
+Tests for courseware.models.
+"""
+from django.test import TestCase
+from mock import patch
+from nose.plugins.attrib import attr
+
+from courseware.models import ChunkingManager, StudentModule
+from courseware.tests.factories import StudentModuleFactory, UserFactory, course_id, location
+
+
+@attr('shard_1')
+class ChunkingManagerTest(TestCase):
+    """
+    Tests of ChunkingManager.chunked_filter and its adaptive chunk sizes.
+    """
+    def setUp(self):
+        super(ChunkingManagerTest, self).setUp()
+        self.user = UserFactory.create()
+        self.usage_keys = [location('problem_{}'.format(index)) for index in range(5)]
+        for usage_key in self.usage_keys:
+            StudentModuleFactory.create(student=self.user, course_id=course_id, module_state_key=usage_key)
+        patcher = patch.object(ChunkingManager, '_seconds_per_item', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def chunked_filter(self, **kwargs):
+        """Read this test's modules with chunked_filter."""
+        return list(StudentModule.objects.chunked_filter(
+            'module_state_key__in', self.usage_keys, student=self.user, course_id=course_id, **kwargs
+        ))
+
+    def test_fixed_chunk_size(self):
+        with self.assertNumQueries(3):
+            modules = self.chunked_filter(chunk_size=2)
+        self.assertItemsEqual([module.module_state_key for module in modules], self.usage_keys)
+        # Fixed chunk sizes don't update the observed latency
+        self.assertEqual(ChunkingManager._seconds_per_item, {})  # pylint: disable=protected-access
+
+    def test_adaptive_chunk_size(self):
+        self.assertEqual(StudentModule.objects.adaptive_chunk_size('module_state_key__in'), 500)
+        with self.assertNumQueries(1):
+            self.chunked_filter()
+
+        # Fast queries grow the chunk size, up to the database limit
+        StudentModule.objects._record_latency('module_state_key__in', 1, 0)  # pylint: disable=protected-access
+        self.assertEqual(
+            StudentModule.objects.adaptive_chunk_size('module_state_key__in'),
+            StudentModule.objects.max_chunk_size()
+        )
+
+    def test_slow_queries_keep_default_chunk_size(self):
+        StudentModule.objects._record_latency('module_state_key__in', 10, 10)  # pylint: disable=protected-access
+        self.assertEqual(StudentModule.objects.adaptive_chunk_size('module_state_key__in'), 500)
@@ -0,0 +1,92 @@
+"""
+Tests for courseware.student_field_overrides.
+"""
+import datetime
+
+from celery.signals import task_postrun
+from django.utils.timezone import utc
+from mock import patch
+from nose.plugins.attrib import attr
+
+from courseware.field_overrides import OverrideFieldData
+from courseware.models import StudentFieldOverride
+from courseware.student_field_overrides import (
+    IndividualStudentOverrideProvider,
+    clear_override_for_user,
+    get_override_for_user,
+    override_field_for_user,
+)
+from request_cache.middleware import RequestCache
+from student.tests.factories import UserFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+@attr('shard_1')
+class IndividualStudentOverrideProviderTest(ModuleStoreTestCase):
+    """
+    Tests of loading individual student overrides.
+    """
+    def setUp(self):
+        super(IndividualStudentOverrideProviderTest, self).setUp()
+        self.course = CourseFactory.create()
+        self.chapter = ItemFactory.create(parent=self.course, category='chapter')
+        self.sections = [
+            ItemFactory.create(parent=self.chapter, category='sequential')
+            for __ in range(3)
+        ]
+        self.user = UserFactory.create()
+        self.due = datetime.datetime(2015, 1, 1, tzinfo=utc)
+
+    def test_disabled_without_overrides(self):
+        self.assertFalse(IndividualStudentOverrideProvider.enabled_for(self.course))
+        override_field_for_user(self.user, self.sections[0], 'due', self.due)
+        self.assertTrue(IndividualStudentOverrideProvider.enabled_for(self.course))
+        clear_override_for_user(self.user, self.sections[0], 'due')
+        self.assertFalse(IndividualStudentOverrideProvider.enabled_for(self.course))
+
+    def test_saving_override_caches_flag(self):
+        self.assertFalse(IndividualStudentOverrideProvider.enabled_for(self.course))
+        override_field_for_user(self.user, self.sections[0], 'due', self.due)
+        with self.assertNumQueries(0):
+            self.assertTrue(IndividualStudentOverrideProvider.enabled_for(self.course))
+
+    def test_one_query_per_course(self):
+        override_field_for_user(self.user, self.sections[1], 'due', self.due)
+        RequestCache.clear_request_cache()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                [get_override_for_user(self.user, section, 'due') for section in self.sections],
+                [None, self.due, None]
+            )
+            self.assertIsNone(get_override_for_user(self.user, self.chapter, 'due'))
+
+    def test_writes_update_loaded_overrides(self):
+        self.assertIsNone(get_override_for_user(self.user, self.sections[0], 'due'))
+
+        override_field_for_user(self.user, self.sections[0], 'due', self.due)
+        self.assertEqual(get_override_for_user(self.user, self.sections[0], 'due'), self.due)
+
+        clear_override_for_user(self.user, self.sections[0], 'due')
+        self.assertIsNone(get_override_for_user(self.user, self.sections[0], 'due'))
+
+    def test_enabled_per_course(self):
+        other_course = CourseFactory.create()
+        override_field_for_user(self.user, self.sections[0], 'due', self.due)
+        with patch.object(OverrideFieldData, 'provider_classes', (IndividualStudentOverrideProvider,)):
+            # pylint: disable=protected-access
+            self.assertEqual(OverrideFieldData._providers_for_course(other_course), ())
+            self.assertEqual(
+                OverrideFieldData._providers_for_course(self.course), (IndividualStudentOverrideProvider,)
+            )
+
+    def test_cache_cleared_after_task(self):
+        override_field_for_user(self.user, self.sections[0], 'due', self.due)
+        RequestCache.clear_request_cache()
+        self.assertEqual(get_override_for_user(self.user, self.sections[0], 'due'), self.due)
+        StudentFieldOverride.objects.all().delete()
+        self.assertEqual(get_override_for_user(self.user, self.sections[0], 'due'), self.due)
+
+        task_postrun.send(sender=None)
+        self.assertIsNone(get_override_for_user(self.user, self.sections[0], 'due'))
@@ -3,14 +3,16 @@ Black-box tests of the DjangoUserStateClient against the semantics
 defined in edx_user_state_client.
 """
 
+import json
 from collections import defaultdict
-from unittest import skip
 
 from django.test import TestCase
+from mock import patch
 
 from edx_user_state_client.tests import UserStateClientTestBase
+from courseware.models import StudentModuleHistory, StudentModuleHistoryState
 from courseware.user_state_client import DjangoXBlockUserStateClient
-from courseware.tests.factories import UserFactory
+from courseware.tests.factories import UserFactory, course_id, location
 
 
 class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
@@ -32,36 +34,91 @@ class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
 
-    # We're skipping these tests because the iter_all_by_block and iter_all_by_course
-    # are not implemented in the DjangoXBlockUserStateClient
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_deleted_block(self):
-        pass
 
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_empty(self):
-        pass
+class TestDjangoUserStateClientHistoryStorage(TestCase):
+    """
+    Tests of how the DjangoUserStateClient stores state history.
+    """
+    def setUp(self):
+        super(TestDjangoUserStateClientHistoryStorage, self).setUp()
+        self.client = DjangoXBlockUserStateClient()
+        self.user = UserFactory.create()
+        self.block_key = location('problem')
+
+    def test_identical_states_share_storage(self):
+        self.client.set(self.user.username, self.block_key, {'field_a': 'value'})
+        self.client.set(self.user.username, self.block_key, {'field_b': 'value'})
+        self.client.delete(self.user.username, self.block_key, fields=['field_b'])
+
+        self.assertEqual(StudentModuleHistory.objects.count(), 3)
+        self.assertEqual(StudentModuleHistoryState.objects.count(), 2)
+        self.assertFalse(StudentModuleHistory.objects.filter(state__isnull=False).exists())
+        self.assertEqual(
+            [entry.state for entry in self.client.get_history(self.user.username, self.block_key)],
+            [{'field_a': 'value'}, {'field_a': 'value', 'field_b': 'value'}, {'field_a': 'value'}]
+        )
+
+    def test_inline_history_state(self):
+        self.client.set(self.user.username, self.block_key, {'field_a': 'value'})
+        StudentModuleHistory.objects.update(state_blob=None, state=json.dumps({'field_a': 'inline'}))
+
+        self.assertEqual(
+            [entry.state for entry in self.client.get_history(self.user.username, self.block_key)],
+            [{'field_a': 'inline'}]
+        )
 
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_many_users(self):
-        pass
 
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_single_user(self):
-        pass
+class TestDjangoUserStateClientScan(TestCase):
+    """
+    Tests of reading many blocks by scanning all of a user's modules in a course.
+    """
+    def setUp(self):
+        super(TestDjangoUserStateClientScan, self).setUp()
+        self.client = DjangoXBlockUserStateClient()
+        self.user = UserFactory.create()
+        self.block_keys = [location('problem_{}'.format(index)) for index in range(3)]
+        for block_key in self.block_keys:
+            self.client.set(self.user.username, block_key, {'field_a': unicode(block_key)})
 
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_deleted_block(self):
-        pass
+    @patch.object(DjangoXBlockUserStateClient, 'SCAN_THRESHOLD', 1)
+    def test_scan_returns_requested_blocks(self):
+        requested = self.block_keys[:2]
+        with self.assertNumQueries(1):
+            states = list(self.client.get_many(self.user.username, requested))
 
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_empty(self):
-        pass
+        self.assertItemsEqual([state.block_key for state in states], requested)
+        self.assertItemsEqual(
+            [state.state for state in states],
+            [{'field_a': unicode(block_key)} for block_key in requested]
+        )
 
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_single_user(self):
-        pass
 
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_many_users(self):
-        pass
+class TestDjangoUserStateClientIteration(TestCase):
+    """
+    Tests of iterating over all of the state stored for a block or course.
+    """
+    def setUp(self):
+        super(TestDjangoUserStateClientIteration, self).setUp()
+        self.client = DjangoXBlockUserStateClient()
+        self.users = [UserFactory.create() for __ in range(5)]
+        self.block_key = location('problem')
+        for index, user in enumerate(self.users):
+            self.client.set(user.username, self.block_key, {'field_a': index})
+
+    def test_iter_all_for_block_in_batches(self):
+        with self.assertNumQueries(3):
+            states = list(self.client.iter_all_for_block(self.block_key, batch_size=2))
+
+        self.assertItemsEqual(
+            [(state.username, state.block_key, state.state) for state in states],
+            [(user.username, self.block_key, {'field_a': index}) for index, user in enumerate(self.users)]
+        )
+
+    def test_iter_all_for_course_block_type(self):
+        self.client.set(self.users[0].username, course_id.make_usage_key('html', 'html_block'), {'field_b': 'value'})
+
+        self.assertEqual(len(list(self.client.iter_all_for_course(self.block_key.course_key))), 6)
+        self.assertEqual(
+            len(list(self.client.iter_all_for_course(self.block_key.course_key, block_type='problem'))),
+            5
+        )
@@ -1,9 +1,14 @@
 """
 An implementation of :class:`XBlockUserStateClient`, which stores XBlock Scope.user_state
 data in a Django ORM model.
+
+The client used by the LMS is configured by settings.XBLOCK_USER_STATE_CLIENT,
+and created with :func:`get_user_state_client`.
 """
 
+from importlib import import_module
 import itertools
+import logging
 from operator import attrgetter
 from time import time
 
@@ -13,6 +18,8 @@ except ImportError:
     import json
 
 import dogstats_wrapper as dog_stats_api
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.contrib.auth.models import User
 from xblock.fields import Scope, ScopeBase
 from courseware.models import StudentModule, StudentModuleHistory
@@ -20,6 +27,45 @@ from edx_user_state_client.interface import XBlockUserStateClient, XBlockUserSta
 
 from openedx.core.djangoapps.call_stack_manager import donottrack
 
+log = logging.getLogger(__name__)
+
+
+def _load_client(config, user):
+    """
+    Return an XBlockUserStateClient for `user`, built from a config dict with a
+    dotted path to the client 'class', and optional keyword arguments in 'options'.
+    """
+    module_name, __, class_name = config['class'].rpartition('.')
+    client_class = getattr(import_module(module_name), class_name)
+    return client_class(user=user, **config.get('options', {}))
+
+
+def get_user_state_client(user=None):
+    """
+    Return the XBlockUserStateClient configured by settings.XBLOCK_USER_STATE_CLIENT.
+
+    The configured client must be a DjangoXBlockUserStateClient, or a DualWriteXBlockUserStateClient
+    with one as its primary: grading, answer distributions and the instructor tasks read
+    StudentModule directly, and would silently find no state if it weren't written there.
+
+    Arguments:
+        user (:class:`~User`): An already-loaded django user, passed on to the client.
+
+    Raises:
+        ImproperlyConfigured: if the configured client doesn't store state in StudentModule.
+    """
+    config = getattr(settings, 'XBLOCK_USER_STATE_CLIENT', None)
+    if config is None:
+        return DjangoXBlockUserStateClient(user)
+    client = _load_client(config, user)
+    primary = client.primary if isinstance(client, DualWriteXBlockUserStateClient) else client
+    if not isinstance(primary, DjangoXBlockUserStateClient):
+        raise ImproperlyConfigured(
+            "XBLOCK_USER_STATE_CLIENT must be a DjangoXBlockUserStateClient, or a "
+            "DualWriteXBlockUserStateClient with one as its primary, not {}".format(config['class'])
+        )
+    return client
+
 
 class DjangoXBlockUserStateClient(XBlockUserStateClient):
     """
@@ -44,6 +90,16 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
     # Use this sample rate for DataDog events.
     API_DATADOG_SAMPLE_RATE = 0.1
 
+    # If more blocks than this are requested from one course, read all of the
+    # user's StudentModules in that course with a single scan of the
+    # (student, module_state_key, course_id) index, rather than with many
+    # chunked module_state_key IN queries.
+    SCAN_THRESHOLD = 2000
+
+    # Default number of StudentModule rows loaded per query by iter_all_for_block
+    # and iter_all_for_course.
+    ITER_BATCH_SIZE = 1000
+
     class ServiceUnavailable(XBlockUserStateClient.ServiceUnavailable):
         """
         This error is raised if the service backing this client is currently unavailable.
@@ -87,15 +143,26 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         )
 
         for course_key, usage_keys in by_course:
-            query = StudentModule.objects.chunked_filter(
-                'module_state_key__in',
-                usage_keys,
-                student__username=username,
-                course_id=course_key,
-            )
+            usage_keys = list(usage_keys)
+            if len(usage_keys) > self.SCAN_THRESHOLD:
+                requested = set(usage_keys)
+                query = StudentModule.objects.filter(
+                    student__username=username,
+                    course_id=course_key,
+                )
+            else:
+                requested = None
+                query = StudentModule.objects.chunked_filter(
+                    'module_state_key__in',
+                    usage_keys,
+                    student__username=username,
+                    course_id=course_key,
+                )
 
             for student_module in query:
                 usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+                if requested is not None and usage_key not in requested:
+                    continue
                 yield (student_module, usage_key)
 
     def _ddog_increment(self, evt_time, evt_name):
@@ -198,16 +265,32 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
         evt_time = time()
 
+        # When saving several blocks at once, load all of the existing rows in
+        # one (chunked) query, rather than issuing a get_or_create per block.
+        # Rows that don't exist yet still go through get_or_create, in case
+        # they are created concurrently.
+        existing_modules = {}
+        if len(block_keys_to_state) > 1:
+            existing_modules = {
+                usage_key: student_module
+                for student_module, usage_key
+                in self._get_student_modules(username, block_keys_to_state.keys())
+            }
+
         for usage_key, state in block_keys_to_state.items():
-            student_module, created = StudentModule.objects.get_or_create(
-                student=user,
-                course_id=usage_key.course_key,
-                module_state_key=usage_key,
-                defaults={
-                    'state': json.dumps(state),
-                    'module_type': usage_key.block_type,
-                },
-            )
+            student_module = existing_modules.get(usage_key)
+            if student_module is not None:
+                created = False
+            else:
+                student_module, created = StudentModule.objects.get_or_create(
+                    student=user,
+                    course_id=usage_key.course_key,
+                    module_state_key=usage_key,
+                    defaults={
+                        'state': json.dumps(state),
+                        'module_type': usage_key.block_type,
+                    },
+                )
 
             num_fields_before = num_fields_after = num_new_fields_set = len(state)
             num_fields_updated = 0
@@ -311,7 +394,7 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if len(student_modules) == 0:
             raise self.DoesNotExist()
 
-        history_entries = StudentModuleHistory.objects.prefetch_related('student_module').filter(
+        history_entries = StudentModuleHistory.objects.select_related('student_module', 'state_blob').filter(
             student_module__in=student_modules
         ).order_by('-id')
 
@@ -320,7 +403,7 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
             raise self.DoesNotExist()
 
         for history_entry in history_entries:
-            state = history_entry.state
+            state = history_entry.get_state()
 
             # If the state is serialized json, then load it
             if state is not None:
@@ -347,7 +430,12 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+        return self._iter_all(
+            batch_size,
+            scope,
+            course_id=block_key.course_key,
+            module_state_key=block_key,
+        )
 
     @donottrack(StudentModule, StudentModuleHistory)
     def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
@@ -358,4 +446,103 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+        filters = {'course_id': course_key}
+        if block_type is not None:
+            filters['module_type'] = block_type
+        return self._iter_all(batch_size, scope, **filters)
+
+    def _iter_all(self, batch_size, scope, **filters):
+        """
+        Yield an XBlockUserState for each StudentModule matching `filters` that holds state.
+
+        Rows are read `batch_size` at a time (ITER_BATCH_SIZE by default) in primary
+        key order, paginated by ``id > last seen id``, so each query is an index range
+        scan and no more than one batch of rows is held in memory. The state of each
+        row is only decoded as that row is yielded.
+        """
+        batch_size = batch_size or self.ITER_BATCH_SIZE
+        queryset = StudentModule.objects.filter(**filters).select_related('student').order_by('id')
+        last_id = 0
+        while True:
+            student_modules = list(queryset.filter(id__gt=last_id)[:batch_size])
+            for student_module in student_modules:
+                if student_module.state is None:
+                    continue
+
+                state = json.loads(student_module.state)
+
+                # If the state is the empty dict, then it has been deleted, and so
+                # conformant UserStateClients should treat it as if it doesn't exist.
+                if state == {}:
+                    continue
+
+                yield XBlockUserState(
+                    student_module.student.username,
+                    student_module.module_state_key.map_into_course(student_module.course_id),
+                    state,
+                    student_module.modified,
+                    scope,
+                )
+
+            if len(student_modules) < batch_size:
+                return
+            last_id = student_modules[-1].id
+
+
+class DualWriteXBlockUserStateClient(XBlockUserStateClient):
+    """
+    An XBlockUserStateClient for copying state to a second backend, such as while migrating to it.
+
+    Reads are served by the `primary` client, and writes go to both clients.
+    Failures to write to the `secondary` client are logged, but don't fail the
+    write. State written before dual writes were enabled can be copied to the
+    secondary client with the ``backfill_user_state`` management command.
+
+    The secondary write is made straight after the primary one, within the
+    request, and so before the request's database transaction commits. Until
+    then (or for good, if the transaction rolls back) the secondary client may
+    hold state that the primary doesn't. As reads are only served by the
+    primary, that's only visible to code reading the secondary directly; rerun
+    ``backfill_user_state`` to reconcile the clients before switching reads.
+
+    Arguments:
+        user (:class:`~User`): An already-loaded django user, passed on to both clients.
+        primary (dict), secondary (dict): The configuration of each client, as a
+            dotted path to the client 'class', and keyword arguments in 'options'.
+    """
+    def __init__(self, user=None, primary=None, secondary=None):
+        self.primary = _load_client(primary, user)
+        self.secondary = _load_client(secondary, user)
+        self.ServiceUnavailable = self.primary.ServiceUnavailable  # pylint: disable=invalid-name
+        self.PermissionDenied = self.primary.PermissionDenied  # pylint: disable=invalid-name
+        self.DoesNotExist = self.primary.DoesNotExist  # pylint: disable=invalid-name
+
+    def get_many(self, username, block_keys, scope=Scope.user_state, fields=None):
+        return self.primary.get_many(username, block_keys, scope, fields=fields)
+
+    def _write_secondary(self, method, *args, **kwargs):
+        """
+        Call `method` of the secondary client, logging any error it raises.
+        """
+        try:
+            getattr(self.secondary, method)(*args, **kwargs)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Secondary user state client failed to %s", method)
+
+    def set_many(self, username, block_keys_to_state, scope=Scope.user_state):
+        self.primary.set_many(username, block_keys_to_state, scope)
+        self._write_secondary('set_many', username, block_keys_to_state, scope)
+
+    def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
+        block_keys = list(block_keys)
+        self.primary.delete_many(username, block_keys, scope, fields=fields)
+        self._write_secondary('delete_many', username, block_keys, scope, fields=fields)
+
+    def get_history(self, username, block_key, scope=Scope.user_state):
+        return self.primary.get_history(username, block_key, scope)
+
+    def iter_all_for_block(self, block_key, scope=Scope.user_state, batch_size=None):
+        return self.primary.iter_all_for_block(block_key, scope, batch_size=batch_size)
+
+    def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
+        return self.primary.iter_all_for_course(course_key, block_type, scope, batch_size=batch_size)
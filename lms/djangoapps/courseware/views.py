@@ -30,10 +30,8 @@ from courseware import grades
 from courseware.access import has_access, in_preview_mode, _adjust_start_date_for_beta_testers
 from courseware.access_response import StartDateError
 from courseware.courses import (
-    get_courses, get_course, get_course_by_id,
+    get_catalog_order, get_courses, get_course, get_course_by_id,
     get_studio_url, get_course_with_access,
-    sort_by_announcement,
-    sort_by_start_date,
     UserNotEnrolled)
 from courseware.masquerade import setup_masquerade
 from openedx.core.djangoapps.credit.api import (
@@ -42,7 +40,7 @@ from openedx.core.djangoapps.credit.api import (
     is_credit_course
 )
 from courseware.models import StudentModuleHistory
-from courseware.model_data import FieldDataCache, ScoresClient
+from courseware.model_data import FieldDataCache, PrefetchPlan, ScoresClient, write_behind_user_state
 from .module_render import toc_for_course, get_module_for_descriptor, get_module, get_module_by_usage_id
 from .entrance_exams import (
     course_has_entrance_exam,
@@ -51,7 +49,7 @@ from .entrance_exams import (
     user_must_complete_entrance_exam,
     user_has_passed_entrance_exam
 )
-from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.user_state_client import get_user_state_client
 from course_modes.models import CourseMode
 
 from open_ended_grading import open_ended_notifications
@@ -60,6 +58,7 @@ from student.models import UserTestGroup, CourseEnrollment
 from student.views import is_course_blocked
 from util.cache import cache, cache_if_anonymous
 from util.date_utils import strftime_localized
+from xblock.fields import Scope
 from xblock.fragment import Fragment
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError, NoPathToItem
@@ -92,6 +91,14 @@ template_imports = {'urllib': urllib}
 
 CONTENT_DEPTH = 2
 
+# The courseware index and the section it displays read the position and other
+# student state of every block, and videos read the student's preferences; the
+# other scopes are only loaded (in one batch) if a block asks for them.
+COURSEWARE_PREFETCH_PLAN = PrefetchPlan(
+    scopes=[Scope.user_state],
+    block_type_scopes={'video': [Scope.preferences]},
+)
+
 
 def user_groups(user):
     """
@@ -125,13 +132,7 @@ def courses(request):
     courses_list = []
     course_discovery_meanings = getattr(settings, 'COURSE_DISCOVERY_MEANINGS', {})
     if not settings.FEATURES.get('ENABLE_COURSE_DISCOVERY'):
-        courses_list = get_courses(request.user, request.META.get('HTTP_HOST'))
-
-        if microsite.get_value("ENABLE_COURSE_SORTING_BY_START_DATE",
-                               settings.FEATURES["ENABLE_COURSE_SORTING_BY_START_DATE"]):
-            courses_list = sort_by_start_date(courses_list)
-        else:
-            courses_list = sort_by_announcement(courses_list)
+        courses_list = get_courses(request.user, request.META.get('HTTP_HOST'), order=get_catalog_order())
 
     return render_to_response(
         "courseware/courses.html",
@@ -260,24 +261,26 @@ def save_positions_recursively_up(user, request, field_data_cache, xmodule, cour
     """
     current_module = xmodule
 
-    while current_module:
-        parent_location = modulestore().get_parent_location(current_module.location)
-        parent = None
-        if parent_location:
-            parent_descriptor = modulestore().get_item(parent_location)
-            parent = get_module_for_descriptor(
-                user,
-                request,
-                parent_descriptor,
-                field_data_cache,
-                current_module.location.course_key,
-                course=course
-            )
+    # Save the positions of all of the ancestors together, rather than one row at a time.
+    with write_behind_user_state():
+        while current_module:
+            parent_location = modulestore().get_parent_location(current_module.location)
+            parent = None
+            if parent_location:
+                parent_descriptor = modulestore().get_item(parent_location)
+                parent = get_module_for_descriptor(
+                    user,
+                    request,
+                    parent_descriptor,
+                    field_data_cache,
+                    current_module.location.course_key,
+                    course=course
+                )
 
-        if parent and hasattr(parent, 'position'):
-            save_child_position(parent, current_module.location.name)
+            if parent and hasattr(parent, 'position'):
+                save_child_position(parent, current_module.location.name)
 
-        current_module = parent
+            current_module = parent
 
 
 def chat_settings(course, user):
@@ -362,7 +365,7 @@ def index(request, course_id, chapter=None, section=None,
         return redirect(reverse('dashboard'))
 
     request.user = user  # keep just one instance of User
-    with modulestore().bulk_operations(course_key):
+    with modulestore().bulk_operations(course_key), write_behind_user_state():
         return _index_bulk_op(request, course_key, chapter, section, position)
 
 
@@ -415,7 +418,7 @@ def _index_bulk_op(request, course_key, chapter, section, position):
 
     try:
         field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course_key, user, course, depth=2)
+            course_key, user, course, depth=2, prefetch_plan=COURSEWARE_PREFETCH_PLAN)
 
         course_module = get_module_for_descriptor(
             user, request, course, field_data_cache, course_key, course=course
@@ -1106,10 +1109,10 @@ def submission_history(request, course_id, student_username, location):
     if (student_username != request.user.username) and (not staff_access):
         raise PermissionDenied
 
-    user_state_client = DjangoXBlockUserStateClient()
+    user_state_client = get_user_state_client()
     try:
         history_entries = list(user_state_client.get_history(student_username, usage_key))
-    except DjangoXBlockUserStateClient.DoesNotExist:
+    except user_state_client.DoesNotExist:
         return HttpResponse(escape(_(u'User {username} has never accessed problem {location}').format(
             username=student_username,
             location=location
@@ -1121,7 +1124,7 @@ def submission_history(request, course_id, student_username, location):
         student_module__module_state_key=usage_key,
         student_module__student__username=student_username,
         student_module__course_id=course_key
-    ).order_by('-id'))
+    ).defer('state').order_by('-id'))
 
     if len(scores) != len(history_entries):
         log.warning(
@@ -115,6 +115,12 @@ REPORTS_DATA = (
         'instructor_api_endpoint': 'get_problem_responses',
         'task_api_endpoint': 'instructor_task.api.submit_calculate_problem_responses_csv',
         'extra_instructor_api_kwargs': {},
+    },
+    {
+        'report_type': 'answer distribution',
+        'instructor_api_endpoint': 'answer_distribution_report',
+        'task_api_endpoint': 'instructor_task.api.submit_calculate_answer_distribution_csv',
+        'extra_instructor_api_kwargs': {},
     }
 )
 
@@ -243,6 +249,7 @@ class TestInstructorAPIDenyLevels(SharedModuleStoreTestCase, LoginEnrollmentTest
             ('get_exec_summary_report', {}),
             ('get_proctored_exam_results', {}),
             ('get_problem_responses', {}),
+            ('answer_distribution_report', {}),
         ]
         # Endpoints that only Instructors can access
         self.instructor_level_endpoints = [
@@ -12,6 +12,7 @@ from django.test.utils import override_settings
 from nose.plugins.attrib import attr
 
 from courseware.field_overrides import OverrideFieldData  # pylint: disable=import-error
+from request_cache.middleware import RequestCache
 from student.tests.factories import UserFactory  # pylint: disable=import-error
 from xmodule.fields import Date
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase, SharedModuleStoreTestCase
@@ -216,12 +217,26 @@ class TestSetDueDateExtension(ModuleStoreTestCase):
         self.week3 = week3
         self.user = user
 
+        self.original_field_data = [
+            (block, block._field_data)  # pylint: disable=protected-access
+            for block in (course, week1, week2, week3, homework, assignment)
+        ]
+        self._wrap_field_data()
+
+    def _wrap_field_data(self):
+        """
+        Wrap the field data of the xblocks under test with override field data,
+        as the start of a request would.
+        """
         # Apparently the test harness doesn't use LmsFieldStorage, and I'm not
         # sure if there's a way to poke the test harness to do so.  So, we'll
         # just inject the override field storage in this brute force manner.
-        for block in (course, week1, week2, week3, homework, assignment):
+        # The enabled providers are cached per request, and the individual due
+        # date provider is only enabled once the course has an override.
+        RequestCache.clear_request_cache()
+        for block, field_data in self.original_field_data:
             block._field_data = OverrideFieldData.wrap(  # pylint: disable=protected-access
-                user, course, block._field_data)  # pylint: disable=protected-access
+                self.user, self.course, field_data)
 
     def tearDown(self):
         super(TestSetDueDateExtension, self).tearDown()
@@ -240,6 +255,7 @@ class TestSetDueDateExtension(ModuleStoreTestCase):
     def test_set_due_date_extension(self):
         extended = datetime.datetime(2013, 12, 25, 0, 0, tzinfo=utc)
         tools.set_due_date_extension(self.course, self.week1, self.user, extended)
+        self._wrap_field_data()
         self._clear_field_data_cache()
         self.assertEqual(self.week1.due, extended)
         self.assertEqual(self.homework.due, extended)
@@ -2207,6 +2207,31 @@ def problem_grade_report(request, course_id):
         })
 
 
+@ensure_csrf_cookie
+@cache_control(no_cache=True, no_store=True, must_revalidate=True)
+@require_level('staff')
+def answer_distribution_report(request, course_id):
+    """
+    Request a CSV showing the distribution of submitted answers for all
+    problems in the course.
+
+    AlreadyRunningError is raised if the report is already being generated.
+    """
+    course_key = SlashSeparatedCourseKey.from_deprecated_string(course_id)
+    try:
+        instructor_task.api.submit_calculate_answer_distribution_csv(request, course_key)
+        success_status = _("The answer distribution report is being created."
+                           " To view the status of the report, see Pending Instructor Tasks below.")
+        return JsonResponse({"status": success_status})
+    except AlreadyRunningError:
+        already_running_status = _("An answer distribution report is already being generated."
+                                   " To view the status of the report, see Pending Instructor Tasks below."
+                                   " You will be able to download the report when it is complete.")
+        return JsonResponse({
+            "status": already_running_status
+        })
+
+
 @ensure_csrf_cookie
 @cache_control(no_cache=True, no_store=True, must_revalidate=True)
 @require_level('staff')
@@ -513,6 +513,9 @@ def _section_data_download(course, access):
         'list_report_downloads_url': reverse('list_report_downloads', kwargs={'course_id': unicode(course_key)}),
         'calculate_grades_csv_url': reverse('calculate_grades_csv', kwargs={'course_id': unicode(course_key)}),
         'problem_grade_report_url': reverse('problem_grade_report', kwargs={'course_id': unicode(course_key)}),
+        'answer_distribution_report_url': reverse(
+            'answer_distribution_report', kwargs={'course_id': unicode(course_key)}
+        ),
     }
     return section_data
 
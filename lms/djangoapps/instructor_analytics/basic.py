@@ -18,7 +18,7 @@ import xmodule.graders as xmgraders
 from microsite_configuration import microsite
 from student.models import CourseEnrollmentAllowed
 from edx_proctoring.api import get_all_exam_attempts
-from courseware.models import StudentModule
+from courseware.user_state_client import get_user_state_client
 
 
 STUDENT_FEATURES = ('id', 'username', 'first_name', 'last_name', 'is_staff', 'email')
@@ -344,7 +344,9 @@ def list_problem_responses(course_key, problem_location):
     ]
 
     where `state` represents a student's response to the problem
-    identified by `problem_location`.
+    identified by `problem_location`, serialized as JSON. Students who
+    have no state for the problem, or whose state has been deleted, are
+    not listed.
     """
     problem_key = UsageKey.from_string(problem_location)
     # Are we dealing with an "old-style" problem location?
@@ -354,15 +356,9 @@ def list_problem_responses(course_key, problem_location):
     if problem_key.course_key != course_key:
         return []
 
-    smdat = StudentModule.objects.filter(
-        course_id=course_key,
-        module_state_key=problem_key
-    )
-    smdat = smdat.order_by('student')
-
     return [
-        {'username': response.student.username, 'state': response.state}
-        for response in smdat
+        {'username': response.username, 'state': json.dumps(response.state)}
+        for response in get_user_state_client().iter_all_for_block(problem_key)
     ]
 
 
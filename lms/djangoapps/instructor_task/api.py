@@ -19,6 +19,7 @@ from instructor_task.tasks import (
     delete_problem_state,
     send_bulk_course_email,
     calculate_problem_responses_csv,
+    calculate_answer_distribution_csv,
     calculate_grades_csv,
     calculate_problem_grade_report,
     calculate_students_features_csv,
@@ -344,6 +345,21 @@ def submit_calculate_problem_responses_csv(request, course_key, problem_location
     return submit_task(request, task_type, task_class, course_key, task_input, task_key)
 
 
+def submit_calculate_answer_distribution_csv(request, course_key):  # pylint: disable=invalid-name
+    """
+    Submits a task to generate a CSV file containing the distribution of
+    submitted answers for all problems in the course.
+
+    Raises AlreadyRunningError if said file is already being updated.
+    """
+    task_type = 'answer_distribution_csv'
+    task_class = calculate_answer_distribution_csv
+    task_input = {}
+    task_key = ""
+
+    return submit_task(request, task_type, task_class, course_key, task_input, task_key)
+
+
 def submit_calculate_grades_csv(request, course_key):
     """
     AlreadyRunningError is raised if the course's grades are already being updated.
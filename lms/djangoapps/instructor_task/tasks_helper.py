@@ -17,9 +17,9 @@ import logging
 from celery import Task, current_task
 from celery.states import SUCCESS, FAILURE
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
-from django.db.models import Q
 import dogstats_wrapper as dog_stats_api
 from pytz import UTC
 from StringIO import StringIO
@@ -39,11 +39,15 @@ from django.utils.translation import ugettext as _
 from certificates.models import (
     CertificateWhitelist,
     certificate_info_for_user,
-    CertificateStatuses
+    CertificateStatuses,
+    GeneratedCertificate,
 )
 from certificates.api import generate_user_certificates
+from certificates.queue import XQueueCertInterface
 from courseware.courses import get_course_by_id, get_problems_in_section
-from courseware.grades import iterate_grades_for
+from courseware.grades import (
+    answer_distributions, iterate_grades_for, scorable_locations_for_grading, scores_clients_for_grading
+)
 from courseware.models import StudentModule
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
@@ -902,6 +906,47 @@ def upload_problem_responses_csv(_xmodule_instance_args, _entry_id, course_id, t
     return task_progress.update_task_state(extra_meta=current_step)
 
 
+def upload_answer_distribution_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+    """
+    For a given `course_id`, generate a CSV file containing the distribution
+    of submitted answers for every problem part in the course, and store it
+    using a `ReportStore`.
+
+    Submitted StudentModule rows are streamed in chunks, and task progress is
+    updated after each chunk.
+    """
+    start_time = time()
+    start_date = datetime.now(UTC)
+    task_progress = TaskProgress(
+        action_name,
+        StudentModule.all_submitted_problems_read_only(course_id).count(),
+        start_time
+    )
+    current_step = {'step': 'Calculating answer distributions'}
+    task_progress.update_task_state(extra_meta=current_step)
+
+    def update_progress(num_rows):
+        """Record a processed chunk of StudentModule rows."""
+        task_progress.attempted += num_rows
+        task_progress.succeeded += num_rows
+        task_progress.update_task_state(extra_meta=current_step)
+
+    distributions = answer_distributions(course_id, progress_callback=update_progress)
+
+    current_step = {'step': 'Uploading CSV'}
+    task_progress.update_task_state(extra_meta=current_step)
+
+    header = [[u'url_name', u'display name', u'answer id', u'answer', u'count']]
+    rows = (
+        [url_name, display_name, answer_id, answer, count]
+        for (url_name, display_name, answer_id), answers in sorted(distributions.iteritems())
+        for answer, count in answers.iteritems()
+    )
+    upload_csv_to_report_store(chain(header, rows), 'answer_distribution', course_id, start_date)
+
+    return task_progress.update_task_state(extra_meta=current_step)
+
+
 def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
     """
     Generate a CSV containing all students' problem grades within a given
@@ -1338,40 +1383,93 @@ def upload_proctored_exam_results_report(_xmodule_instance_args, _entry_id, cour
     return task_progress.update_task_state(extra_meta=current_step)
 
 
+# Number of students to load and generate certificates for between checkpoints.
+CERTIFICATE_GENERATION_CHUNK_SIZE = 100
+# How long a certificate generation checkpoint is kept for a task that has stopped.
+CERTIFICATE_GENERATION_CHECKPOINT_TIMEOUT = 60 * 60 * 24
+
+
+def _certificate_generation_checkpoint_key(entry_id):
+    """
+    Return the cache key holding the certificate generation progress of InstructorTask `entry_id`.
+    """
+    return u'instructor_task.certificate_generation.checkpoint.{}'.format(entry_id)
+
+
 def generate_students_certificates(
-        _xmodule_instance_args, _entry_id, course_id, task_input, action_name):  # pylint: disable=unused-argument
+        _xmodule_instance_args, entry_id, course_id, task_input, action_name):  # pylint: disable=unused-argument
     """
     For a given `course_id`, generate certificates for all students
     that are enrolled.
+
+    Students are processed in order of id, in chunks of
+    CERTIFICATE_GENERATION_CHUNK_SIZE. The scores of each chunk of students
+    are fetched for grading with a single query. After each chunk the progress
+    is checkpointed in the cache, so that if the worker is restarted the task
+    resumes after the last completed chunk instead of starting over.
     """
     start_time = time()
     enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id)
     task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
 
+    checkpoint_key = _certificate_generation_checkpoint_key(entry_id) if entry_id is not None else None
+    checkpoint = (cache.get(checkpoint_key) if checkpoint_key else None) or {}
+    last_user_id = checkpoint.get('last_user_id', 0)
+    task_progress.attempted = checkpoint.get('attempted', 0)
+    task_progress.succeeded = checkpoint.get('succeeded', 0)
+    task_progress.failed = checkpoint.get('failed', 0)
+
     current_step = {'step': 'Calculating students already have certificates'}
     task_progress.update_task_state(extra_meta=current_step)
 
-    students_require_certs = students_require_certificate(course_id, enrolled_students)
+    students_require_certs = students_require_certificate(course_id, enrolled_students).filter(
+        id__gt=last_user_id
+    ).order_by('id')
 
-    task_progress.skipped = task_progress.total - len(students_require_certs)
+    task_progress.skipped = task_progress.total - task_progress.attempted - students_require_certs.count()
 
     current_step = {'step': 'Generating Certificates'}
     task_progress.update_task_state(extra_meta=current_step)
 
     course = modulestore().get_course(course_id, depth=0)
-    # Generate certificate for each student
-    for student in students_require_certs:
-        task_progress.attempted += 1
-        status = generate_user_certificates(
-            student,
-            course_id,
-            course=course
-        )
+    scorable_locations = scorable_locations_for_grading(course)
+    # Share one xqueue connection between all of the students.
+    xqueue = XQueueCertInterface()
+    while True:
+        students = list(students_require_certs.filter(id__gt=last_user_id)[:CERTIFICATE_GENERATION_CHUNK_SIZE])
+        scores_clients = scores_clients_for_grading(course, students, scorable_locations)
+        # Generate certificate for each student
+        for student in students:
+            task_progress.attempted += 1
+            status = generate_user_certificates(
+                student,
+                course_id,
+                course=course,
+                xqueue=xqueue,
+                scores_client=scores_clients[student.id],
+            )
 
-        if status in [CertificateStatuses.generating, CertificateStatuses.downloadable]:
-            task_progress.succeeded += 1
-        else:
-            task_progress.failed += 1
+            if status in [CertificateStatuses.generating, CertificateStatuses.downloadable]:
+                task_progress.succeeded += 1
+            else:
+                task_progress.failed += 1
+
+        if students:
+            last_user_id = students[-1].id
+            if checkpoint_key:
+                cache.set(checkpoint_key, {
+                    'last_user_id': last_user_id,
+                    'attempted': task_progress.attempted,
+                    'succeeded': task_progress.succeeded,
+                    'failed': task_progress.failed,
+                }, CERTIFICATE_GENERATION_CHECKPOINT_TIMEOUT)
+            task_progress.update_task_state(extra_meta=current_step)
+
+        if len(students) < CERTIFICATE_GENERATION_CHUNK_SIZE:
+            break
+
+    if checkpoint_key:
+        cache.delete(checkpoint_key)
 
     return task_progress.update_task_state(extra_meta=current_step)
 
@@ -1462,14 +1560,17 @@ def cohort_students_and_upload(_xmodule_instance_args, _entry_id, course_id, tas
 
 
 def students_require_certificate(course_id, enrolled_students):
-    """ Returns list of students where certificates needs to be generated.
+    """ Returns a queryset of students where certificates needs to be generated.
     Removing those students who have their certificate already generated
-    from total enrolled students for given course.
+    from total enrolled students for given course. The exclusion is done
+    in the database, so no students are loaded until the queryset is evaluated.
     :param course_id:
     :param enrolled_students:
     """
     # compute those students where certificates already generated
-    students_already_have_certs = User.objects.filter(
-        ~Q(generatedcertificate__status=CertificateStatuses.unavailable),
-        generatedcertificate__course_id=course_id)
-    return list(set(enrolled_students) - set(students_already_have_certs))
+    students_already_have_certs = GeneratedCertificate.objects.filter(
+        course_id=course_id
+    ).exclude(
+        status=CertificateStatuses.unavailable
+    ).values('user')
+    return enrolled_students.exclude(id__in=students_already_have_certs)
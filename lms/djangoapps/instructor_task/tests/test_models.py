@@ -25,6 +25,10 @@ class MockKey(object):
         """ Expected method on a Key object. """
         self.bucket.store_key(self)
 
+    def set_contents_from_file(self, file_obj, headers, rewind):  # pylint: disable=unused-argument
+        """ Expected method on a Key object. """
+        self.bucket.store_key(self)
+
     def generate_url(self, expires_in):  # pylint: disable=unused-argument
         """ Expected method on a Key object. """
         return "http://fake-edx-s3.edx.org/"
@@ -84,6 +88,14 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def test_store_file(self):
+        """
+        Test that ReportStore.store_file() stores the contents of a file.
+        """
+        report_store = self.create_report_store()
+        report_store.store_file(self.course_id, 'export.tar.gz', StringIO('contents'), {'content_type': 'application/x-tgz'})
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['export.tar.gz'])
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     """
@@ -94,10 +106,10 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         return LocalFSReportStore.from_config(config_name='GRADES_DOWNLOAD')
 
 
-@mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
-@mock.patch('instructor_task.models.Key', new=MockKey)
-@mock.patch('instructor_task.models.settings.AWS_SECRET_ACCESS_KEY', create=True, new="access_key")
-@mock.patch('instructor_task.models.settings.AWS_ACCESS_KEY_ID', create=True, new="access_id")
+@mock.patch('openedx.core.lib.report_store.S3Connection', new=MockS3Connection)
+@mock.patch('openedx.core.lib.report_store.Key', new=MockKey)
+@mock.patch('openedx.core.lib.report_store.settings.AWS_SECRET_ACCESS_KEY', create=True, new="access_key")
+@mock.patch('openedx.core.lib.report_store.settings.AWS_ACCESS_KEY_ID', create=True, new="access_id")
 class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     """
     Test the S3ReportStore model.
@@ -11,6 +11,7 @@ from mock import Mock, patch
 import tempfile
 from openedx.core.djangoapps.course_groups import cohorts
 import unicodecsv
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.test.utils import override_settings
 
@@ -35,6 +36,7 @@ from instructor_task.models import ReportStore
 from instructor_task.tasks_helper import (
     cohort_students_and_upload,
     upload_problem_responses_csv,
+    upload_answer_distribution_csv,
     upload_grades_csv,
     upload_problem_grade_report,
     upload_students_csv,
@@ -42,6 +44,8 @@ from instructor_task.tasks_helper import (
     upload_enrollment_report,
     upload_exec_summary_report,
     generate_students_certificates,
+    students_require_certificate,
+    _certificate_generation_checkpoint_key,
 )
 from instructor_analytics.basic import UNAVAILABLE
 from openedx.core.djangoapps.util.testing import ContentGroupTestCase, TestConditionalContent
@@ -348,6 +352,52 @@ class TestProblemResponsesReport(TestReportMixin, InstructorTaskCourseTestCase):
         self.assertDictContainsSubset({'attempted': 3, 'succeeded': 3, 'failed': 0}, result)
 
 
+class TestAnswerDistributionReport(TestReportMixin, InstructorTaskModuleTestCase):
+    """
+    Tests that generation of the answer distribution CSV works.
+    """
+    def setUp(self):
+        super(TestAnswerDistributionReport, self).setUp()
+        self.initialize_course()
+        self.student_1 = self.create_student(u'student_1')
+        self.student_2 = self.create_student(u'student_2')
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_no_submissions(self, _get_current_task):
+        result = upload_answer_distribution_csv(None, None, self.course.id, None, 'generated')
+        self.assertDictContainsSubset({'attempted': 0, 'succeeded': 0, 'failed': 0, 'total': 0}, result)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_success(self, _get_current_task):
+        self.define_option_problem(u'Problem1')
+        self.submit_student_answer(self.student_1.username, u'Problem1', ['Option 1', 'Option 1'])
+        self.submit_student_answer(self.student_2.username, u'Problem1', ['Option 1', 'Option 2'])
+
+        result = upload_answer_distribution_csv(None, None, self.course.id, None, 'generated')
+        self.assertDictContainsSubset({'attempted': 2, 'succeeded': 2, 'failed': 0, 'total': 2}, result)
+        html_id = self.problem_location(u'Problem1', self.course.id).html_id()
+        expected_rows = [
+            (u'{}_2_1'.format(html_id), u'Option 1', u'2'),
+            (u'{}_3_1'.format(html_id), u'Option 1', u'1'),
+            (u'{}_3_1'.format(html_id), u'Option 2', u'1'),
+        ]
+        self.verify_rows_in_csv(
+            [
+                {
+                    u'url_name': u'Problem1',
+                    u'display name': u'Problem1',
+                    u'answer id': answer_id,
+                    u'answer': answer,
+                    u'count': count,
+                }
+                for answer_id, answer, count in expected_rows
+            ],
+            verify_order=False
+        )
+
+
 @ddt.ddt
 @patch.dict('django.conf.settings.FEATURES', {'ENABLE_PAID_COURSE_REGISTRATION': True})
 class TestInstructorDetailedEnrollmentReport(TestReportMixin, InstructorTaskCourseTestCase):
@@ -1527,3 +1577,61 @@ class TestCertificateGeneration(InstructorTaskModuleTestCase):
             },
             result
         )
+
+    def test_certificate_generation_resumes_from_checkpoint(self):
+        """
+        Verify that a restarted task resumes after the students it had already processed.
+        """
+        students = [self.create_student(username='student_{}'.format(i), email='student_{}@example.com'.format(i))
+                    for i in xrange(1, 5)]
+
+        # The first 2 students were processed before the worker was restarted.
+        for student in students[:2]:
+            GeneratedCertificateFactory.create(
+                user=student,
+                course_id=self.course.id,
+                status=CertificateStatuses.generating,
+                mode='honor'
+            )
+        for student in students[2:]:
+            CertificateWhitelistFactory.create(user=student, course_id=self.course.id, whitelist=True)
+
+        checkpoint_key = _certificate_generation_checkpoint_key(1)
+        cache.set(checkpoint_key, {'last_user_id': students[1].id, 'attempted': 2, 'succeeded': 2, 'failed': 0})
+
+        with patch('instructor_task.tasks_helper._get_current_task'):
+            with patch('capa.xqueue_interface.XQueueInterface.send_to_queue') as mock_queue:
+                mock_queue.return_value = (0, "Successfully queued")
+                result = generate_students_certificates(None, 1, self.course.id, None, 'certificates generated')
+
+        self.assertEqual(mock_queue.call_count, 2)
+        self.assertDictContainsSubset(
+            {
+                'total': 4,
+                'attempted': 4,
+                'succeeded': 4,
+                'failed': 0,
+                'skipped': 0
+            },
+            result
+        )
+        self.assertIsNone(cache.get(checkpoint_key))
+
+    def test_students_require_certificate(self):
+        """
+        Verify that students with a certificate that is not unavailable are excluded.
+        """
+        students = [self.create_student(username='student_{}'.format(i), email='student_{}@example.com'.format(i))
+                    for i in xrange(1, 4)]
+        GeneratedCertificateFactory.create(
+            user=students[0], course_id=self.course.id, status=CertificateStatuses.downloadable
+        )
+        GeneratedCertificateFactory.create(
+            user=students[1], course_id=self.course.id, status=CertificateStatuses.unavailable
+        )
+
+        enrolled_students = CourseEnrollment.objects.users_enrolled_in(self.course.id)
+        self.assertItemsEqual(
+            students_require_certificate(self.course.id, enrolled_students),
+            students[1:]
+        )
@@ -4,10 +4,11 @@ Asynchronous tasks for the LTI provider app.
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.dispatch import receiver
 import logging
 
-from courseware.grades import get_weighted_scores
+from courseware.grades import get_weighted_scores_for_subtree
 from courseware.models import SCORE_CHANGED
 from lms import CELERY_APP
 from lti_provider.models import GradedAssignment
@@ -18,6 +19,18 @@ from xmodule.modulestore.django import modulestore
 
 log = logging.getLogger("edx.lti_provider")
 
+# How long, beyond the passback delay, a scheduled composite outcome task is
+# assumed to be pending before other score changes may schedule another one.
+PENDING_OUTCOME_TIMEOUT_MARGIN = 5 * 60
+
+
+def _pending_outcome_key(assignment_id):
+    """
+    The cache key that records the version of the pending composite outcome
+    task for the GradedAssignment with id `assignment_id`.
+    """
+    return u'lti_provider.pending_composite_outcome.{}'.format(assignment_id)
+
 
 @receiver(SCORE_CHANGED)
 def score_changed_handler(sender, **kwargs):  # pylint: disable=unused-argument
@@ -40,10 +53,7 @@ def score_changed_handler(sender, **kwargs):  # pylint: disable=unused-argument
                     assignment.id, points_earned, points_possible
                 )
             else:
-                send_composite_outcome.apply_async(
-                    (user_id, course_id, assignment.id, assignment.version_number),
-                    countdown=settings.LTI_AGGREGATE_SCORE_PASSBACK_DELAY
-                )
+                schedule_composite_outcome(user_id, course_id, assignment)
     else:
         log.error(
             "Outcome Service: Required signal parameter is None. "
@@ -53,6 +63,25 @@ def score_changed_handler(sender, **kwargs):  # pylint: disable=unused-argument
         )
 
 
+def schedule_composite_outcome(user_id, course_id, assignment):
+    """
+    Schedule a send_composite_outcome task for `assignment`, unless one is
+    already pending. Bursts of score changes for the same assignment within
+    the passback delay are coalesced into a single task, which sends the
+    score for the latest version of the assignment.
+    """
+    delay = settings.LTI_AGGREGATE_SCORE_PASSBACK_DELAY
+    if cache.add(
+            _pending_outcome_key(assignment.id),
+            assignment.version_number,
+            delay + PENDING_OUTCOME_TIMEOUT_MARGIN
+    ):
+        send_composite_outcome.apply_async(
+            (user_id, course_id, assignment.id, assignment.version_number),
+            countdown=delay
+        )
+
+
 def increment_assignment_versions(course_key, usage_key, user_id):
     """
     Update the version numbers for all assignments that are affected by a score
@@ -79,9 +108,9 @@ def send_composite_outcome(user_id, course_id, assignment_id, version):
     vertical).
 
     A composite module may contain multiple problems, so we need to
-    calculate the total points earned and possible for all child problems. This
-    requires calculating the scores for the whole course, which is an expensive
-    operation.
+    calculate the total points earned and possible for all child problems. Only
+    the scores in the subtree of the course rooted at the module are
+    calculated.
 
     Callers should be aware that the score calculation code accesses the latest
     scores from the database. This can lead to a race condition between a view
@@ -97,19 +126,35 @@ def send_composite_outcome(user_id, course_id, assignment_id, version):
     Second, it prevents a race condition where two tasks calculate different
     scores for a single assignment, and may potentially update the campus LMS
     in the wrong order.
+
+    Score changes made while this task is pending don't schedule further tasks
+    (see `schedule_composite_outcome`), so this task sends the score for the
+    latest version of the assignment, rather than for `version`.
     """
-    assignment = GradedAssignment.objects.get(id=assignment_id)
-    if version != assignment.version_number:
+    pending_key = _pending_outcome_key(assignment_id)
+    pending_version = cache.get(pending_key)
+    if pending_version is not None and pending_version != version:
         log.info(
             "Score passback for GradedAssignment %s skipped. More recent score available.",
-            assignment.id
+            assignment_id
         )
         return
+    # Score changes from now on must schedule a new task.
+    cache.delete(pending_key)
+
+    assignment = GradedAssignment.objects.get(id=assignment_id)
+    version = assignment.version_number
     course_key = CourseKey.from_string(course_id)
     mapped_usage_key = assignment.usage_key.map_into_course(course_key)
     user = User.objects.get(id=user_id)
     course = modulestore().get_course(course_key, depth=0)
-    progress_summary = get_weighted_scores(user, course)
+    progress_summary = get_weighted_scores_for_subtree(user, course, mapped_usage_key)
+    if progress_summary is None:
+        log.info(
+            "Score passback for GradedAssignment %s skipped. The user can't load %s.",
+            assignment.id, mapped_usage_key
+        )
+        return
     earned, possible = progress_summary.score_for_module(mapped_usage_key)
     if possible == 0:
         weighted_score = 0
@@ -3,6 +3,7 @@ Tests for the LTI outcome service handlers, both in outcomes.py and in tasks.py
 """
 
 import ddt
+from django.core.cache import cache
 from django.test import TestCase
 from mock import patch, MagicMock
 from student.tests.factories import UserFactory
@@ -18,6 +19,7 @@ class BaseOutcomeTest(TestCase):
     """
     def setUp(self):
         super(BaseOutcomeTest, self).setUp()
+        self.addCleanup(cache.clear)
         self.course_key = CourseLocator(
             org='some_org',
             course='some_course',
@@ -101,7 +103,7 @@ class SendCompositeOutcomeTest(BaseOutcomeTest):
         )
         self.weighted_scores = MagicMock()
         self.weighted_scores_mock = self.setup_patch(
-            'lti_provider.tasks.get_weighted_scores', self.weighted_scores
+            'lti_provider.tasks.get_weighted_scores_for_subtree', self.weighted_scores
         )
         self.module_store = MagicMock()
         self.module_store.get_item = MagicMock(return_value=self.descriptor)
@@ -126,7 +128,30 @@ class SendCompositeOutcomeTest(BaseOutcomeTest):
     def test_outcome_with_outdated_version(self):
         self.assignment.version_number = 2
         self.assignment.save()
+        # A task for the newer version has been scheduled
+        cache.set(tasks._pending_outcome_key(self.assignment.id), 2)  # pylint: disable=protected-access, no-member
         tasks.send_composite_outcome(
             self.user.id, unicode(self.course_key), self.assignment.id, 1  # pylint: disable=no-member
         )
         self.assertEqual(self.weighted_scores_mock.call_count, 0)
+
+    def test_outcome_with_coalesced_versions(self):
+        # Score changes while this task was pending didn't schedule new tasks
+        self.weighted_scores.score_for_module = MagicMock(return_value=(1, 2))
+        cache.set(tasks._pending_outcome_key(self.assignment.id), 1)  # pylint: disable=protected-access, no-member
+        self.assignment.version_number = 3
+        self.assignment.save()
+        tasks.send_composite_outcome(
+            self.user.id, unicode(self.course_key), self.assignment.id, 1  # pylint: disable=no-member
+        )
+        self.send_score_update_mock.assert_called_once_with(self.assignment, 0.5)
+        pending_key = tasks._pending_outcome_key(self.assignment.id)  # pylint: disable=protected-access, no-member
+        self.assertIsNone(cache.get(pending_key))
+
+    def test_schedule_coalesces_tasks(self):
+        apply_async = self.setup_patch('lti_provider.tasks.send_composite_outcome.apply_async', None)
+        for version in (2, 3):
+            self.assignment.version_number = version
+            tasks.schedule_composite_outcome(self.user.id, unicode(self.course_key), self.assignment)
+        self.assertEqual(apply_async.call_count, 1)
+        self.assertEqual(apply_async.call_args[0][0][3], 2)
@@ -13,7 +13,7 @@ from opaque_keys.edx.keys import UsageKey
 from opaque_keys import InvalidKeyError
 
 from courseware.access import is_mobile_available_for_user
-from courseware.model_data import FieldDataCache
+from courseware.model_data import FieldDataCache, PrefetchPlan
 from courseware.module_render import get_module_for_descriptor
 from courseware.views import get_current_child, save_positions_recursively_up
 from student.models import CourseEnrollment, User
@@ -27,6 +27,10 @@ from .serializers import CourseEnrollmentSerializer, UserSerializer
 from .. import errors
 from ..utils import mobile_view, mobile_course_access
 
+# The course status views only read and write the course position, so other
+# scopes are only loaded if a block asks for them.
+COURSE_STATUS_PREFETCH_PLAN = PrefetchPlan(scopes=[Scope.user_state])
+
 
 @mobile_view(is_user=True)
 class UserDetail(generics.RetrieveAPIView):
@@ -112,7 +116,7 @@ class UserCourseStatus(views.APIView):
         tree is used.
         """
         field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course.id, request.user, course, depth=2)
+            course.id, request.user, course, depth=2, prefetch_plan=COURSE_STATUS_PREFETCH_PLAN)
 
         course_module = get_module_for_descriptor(
             request.user, request, course, field_data_cache, course.id, course=course
@@ -145,7 +149,7 @@ class UserCourseStatus(views.APIView):
         Saves the module id if the found modification_date is less recent than the passed modification date
         """
         field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course.id, request.user, course, depth=2)
+            course.id, request.user, course, depth=2, prefetch_plan=COURSE_STATUS_PREFETCH_PLAN)
         try:
             module_descriptor = modulestore().get_item(module_key)
         except ItemNotFoundError:
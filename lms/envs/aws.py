@@ -388,6 +388,9 @@ if FEATURES.get('ENABLE_CORS_HEADERS') or FEATURES.get('ENABLE_CROSS_DOMAIN_CSRF
 # 'courseware.student_field_overrides.IndividualStudentOverrideProvider'.
 FIELD_OVERRIDE_PROVIDERS = tuple(ENV_TOKENS.get('FIELD_OVERRIDE_PROVIDERS', []))
 
+# The XBlockUserStateClient that stores learner state.
+XBLOCK_USER_STATE_CLIENT = ENV_TOKENS.get('XBLOCK_USER_STATE_CLIENT', XBLOCK_USER_STATE_CLIENT)
+
 ############################## SECURE AUTH ITEMS ###############
 # Secret things: passwords, access keys, etc.
 
@@ -721,3 +724,12 @@ JWT_EXPIRATION = ENV_TOKENS.get('JWT_EXPIRATION', JWT_EXPIRATION)
 
 PROCTORING_BACKEND_PROVIDER = AUTH_TOKENS.get("PROCTORING_BACKEND_PROVIDER", PROCTORING_BACKEND_PROVIDER)
 PROCTORING_SETTINGS = ENV_TOKENS.get("PROCTORING_SETTINGS", PROCTORING_SETTINGS)
+
+################# CALL STACK MANAGER ##################
+
+CALL_STACK_SAMPLE_RATE = ENV_TOKENS.get('CALL_STACK_SAMPLE_RATE', CALL_STACK_SAMPLE_RATE)
+CALL_STACK_BOOK_SIZE = ENV_TOKENS.get('CALL_STACK_BOOK_SIZE', CALL_STACK_BOOK_SIZE)
+
+################# REQUEST PROFILER ##################
+
+REQUEST_PROFILER_SAMPLE_RATE = ENV_TOKENS.get('REQUEST_PROFILER_SAMPLE_RATE', REQUEST_PROFILER_SAMPLE_RATE)
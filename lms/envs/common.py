@@ -192,6 +192,9 @@ FEATURES = {
     # Enable URL that shows information about the status of variuous services
     'ENABLE_SERVICE_STATUS': False,
 
+    # Enable a page that lets staff see the call stacks sampled by the call stack manager
+    'ENABLE_CALL_STACK_REPORT': False,
+
     # Toggle to indicate use of the Stanford theming system
     'USE_CUSTOM_THEME': False,
 
@@ -706,6 +709,18 @@ XBLOCK_MIXINS = (LmsBlockMixin, InheritanceMixin, XModuleMixin, EditInfoMixin)
 # Allow any XBlock in the LMS
 XBLOCK_SELECT_FUNCTION = prefer_xmodules
 
+# The XBlockUserStateClient that stores XBlock Scope.user_state fields.
+# It must store state in StudentModule, which reports read directly: either
+# 'courseware.user_state_client.DjangoXBlockUserStateClient', or
+# 'courseware.user_state_client.DualWriteXBlockUserStateClient' with that client as the 'primary'
+# option, and another as the 'secondary' option, to which writes are copied. To copy state to a
+# Redis server, use 'courseware.kv_user_state_client.KeyValueXBlockUserStateClient' with
+# {'store': 'redis', 'store_options': {'host': ..., 'port': ...}} as options as the secondary.
+XBLOCK_USER_STATE_CLIENT = {
+    'class': 'courseware.user_state_client.DjangoXBlockUserStateClient',
+    'options': {},
+}
+
 ############# ModuleStore Configuration ##########
 
 MODULESTORE_BRANCH = 'published-only'
@@ -1118,7 +1133,12 @@ TEMPLATE_LOADERS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    # Sends buffered metrics after every other middleware has processed the response
+    'datadog.middleware.FlushMetricsMiddleware',
+
     'request_cache.middleware.RequestCache',
+    # Must come after RequestCache, which holds the profile of the current request
+    'performance.middleware.RequestProfilerMiddleware',
     'microsite_configuration.middleware.MicrositeMiddleware',
     'django_comment_client.middleware.AjaxExceptionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -1891,6 +1911,7 @@ INSTALLED_APPS = (
 
     # Monitoring
     'datadog',
+    'performance',
 
     # User API
     'rest_framework',
@@ -2487,6 +2508,10 @@ COUNTRIES_OVERRIDE = {
 # the course catalog. We default this to the legacy permission 'see_exists'.
 COURSE_CATALOG_VISIBILITY_PERMISSION = 'see_exists'
 
+# Seconds to cache the list of courses in the course catalog that anonymous users can see.
+# The cache is also invalidated whenever a course is published or deleted.
+COURSE_CATALOG_CACHE_TIMEOUT = 300
+
 # which access.py permission name to check in order to determine if a course about page is
 # visible. We default this to the legacy permission 'see_exists'.
 COURSE_ABOUT_VISIBILITY_PERMISSION = 'see_exists'
@@ -2678,3 +2703,15 @@ PROCTORING_BACKEND_PROVIDER = {
     'options': {},
 }
 PROCTORING_SETTINGS = {}
+
+#### CALL STACK MANAGER
+
+# Fraction of calls to tracked models whose call stack is captured.
+CALL_STACK_SAMPLE_RATE = 0.01
+# Number of distinct call stacks kept by each process.
+CALL_STACK_BOOK_SIZE = 1000
+
+#### REQUEST PROFILER
+
+# Fraction of requests whose queries and cache reads are profiled.
+REQUEST_PROFILER_SAMPLE_RATE = 0
@@ -489,6 +489,8 @@ FEATURES['ENABLE_TEAMS'] = True
 
 # Add milestones to Installed apps for testing
 INSTALLED_APPS += ('milestones', 'openedx.core.djangoapps.call_stack_manager')
+# Capture every call stack, so that tests are deterministic
+CALL_STACK_SAMPLE_RATE = 1.0
 
 # Enable courseware search for tests
 FEATURES['ENABLE_COURSEWARE_SEARCH'] = True
@@ -632,6 +632,11 @@ if settings.FEATURES.get('ENABLE_DEBUG_RUN_PYTHON'):
         url(r'^debug/run_python$', 'debug.views.run_python'),
     )
 
+if settings.FEATURES.get('ENABLE_CALL_STACK_REPORT'):
+    urlpatterns += (
+        url(r'^debug/call_stacks$', 'openedx.core.djangoapps.call_stack_manager.views.call_stacks'),
+    )
+
 urlpatterns += (
     url(r'^debug/show_parameters$', 'debug.views.show_parameters'),
 )
@@ -2,4 +2,4 @@
 Root Package for getting call stacks of various Model classes being used
 """
 from __future__ import absolute_import
-from .core import CallStackManager, CallStackMixin, donottrack, trackit
+from .core import CallStackManager, CallStackMixin, donottrack, trackit, call_stack_report
@@ -5,6 +5,7 @@ Call Stack Manager logs unique call stacks. The call stacks then can be retrieve
 classes:
 CallStackManager -  stores all stacks in global dictionary and logs
 CallStackMixin - used for Model save(), and delete() method
+StackBook - bounded LRU of call stacks and how many times each was sampled
 
 Decorators:
 @donottrack - Decorator that will halt tracking for parameterized entities,
@@ -38,15 +39,25 @@ FOR DISABLING TRACKING-
 1. Import following at appropriate location-
     from openedx.core.djangoapps.call_stack_manager import donottrack
 NOTE - You need to import function/class you do not want to track.
+
+SAMPLING-
+Only a fraction settings.CALL_STACK_SAMPLE_RATE of calls capture their call stack.
+Stacks are identified by the (code object, line number) of each frame, so a
+stack that has been seen before costs a frame walk and a dictionary lookup.
+At most settings.CALL_STACK_BOOK_SIZE stacks are kept, least recently seen first
+out. call_stack_report() returns the stacks and their sample counts.
 """
 
 import logging
+import random
+import sys
 import traceback
 import re
 import collections
 import wrapt
 import types
 import inspect
+from django.conf import settings
 from django.db.models import Manager
 
 log = logging.getLogger(__name__)
@@ -58,36 +69,100 @@ REGULAR_EXPS = [re.compile(x) for x in ['^.*python2.7.*$', '^.*<exec_function>.*
 # List keeping track of entities not to be tracked
 HALT_TRACKING = []
 
-STACK_BOOK = collections.defaultdict(list)
-# Dictionary which stores call logs
-# {'EntityName' : ListOf<CallStacks>}
-# CallStacks is ListOf<Frame>
+# Default fraction of calls whose call stack is captured
+DEFAULT_SAMPLE_RATE = 1.0
+
+# Default number of distinct call stacks kept in STACK_BOOK
+DEFAULT_STACK_BOOK_SIZE = 1000
+
+
+class StackRecord(object):
+    """ A call stack of an entity, and the number of times it was sampled """
+    __slots__ = ('entity_name', 'call_stack', 'count')
+
+    def __init__(self, entity_name, call_stack):
+        self.entity_name = entity_name
+        # ListOf<Frame>, where Frame is a tuple ('FilePath','LineNumber','Function Name', 'Context')
+        self.call_stack = call_stack
+        self.count = 0
+
+
+class StackBook(object):
+    """ Bounded LRU mapping of call stack keys to StackRecords
+
+    Arguments:
+        max_size - maximum number of records kept, defaults to settings.CALL_STACK_BOOK_SIZE
+    """
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._records = collections.OrderedDict()
+
+    def get(self, key):
+        """ Returns the record stored under key, marking it as recently used, or None """
+        record = self._records.pop(key, None)
+        if record is not None:
+            self._records[key] = record
+        return record
+
+    def add(self, key, record):
+        """ Stores record under key, evicting the least recently used records beyond the size limit """
+        self._records[key] = record
+        max_size = self.max_size or getattr(settings, 'CALL_STACK_BOOK_SIZE', DEFAULT_STACK_BOOK_SIZE)
+        while len(self._records) > max_size:
+            self._records.popitem(last=False)
+
+    def records(self):
+        """ Returns the distinct records, least recently used first """
+        seen = set()
+        records = []
+        for record in self._records.itervalues():
+            if id(record) not in seen:
+                seen.add(id(record))
+                records.append(record)
+        return records
+
+    def __len__(self):
+        return len(self._records)
+
+
+STACK_BOOK = StackBook()
+# Stores call stacks filtered with respect to REGULAR_EXPS
+# {(EntityName, CallStack) : StackRecord}
+# CallStack is TupleOf<Frame>
 # Frame is a tuple ('FilePath','LineNumber','Function Name', 'Context')
-# {"<class 'courseware.models.StudentModule'>" : [[(file, line number, function name, context),(---,---,---)],
-#                                                 [(file, line number, function name, context),(---,---,---)]]}
+
+FINGERPRINTS = StackBook()
+# Caches the StackRecord of every raw call stack, so that the filtering
+# and formatting is only done the first time a call stack is seen
+# {(EntityName, TupleOf<(CodeObject, LineNumber)>) : StackRecord}
+
+
+def _fingerprint(frame):
+    """ Returns the (code object, line number) of frame and each of its callers """
+    fingerprint = []
+    while frame is not None:
+        fingerprint.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    return tuple(fingerprint)
 
 
 def capture_call_stack(entity_name):
-    """ Logs customised call stacks in global dictionary STACK_BOOK and logs it.
+    """ Counts sampled call stacks of the entity in global STACK_BOOK, and logs new ones.
 
     Arguments:
         entity_name - entity
     """
-    # Holds temporary callstack
-    # List with each element 4-tuple(filename, line number, function name, text)
-    # and filtered with respect to regular expressions
-    temp_call_stack = [frame for frame in traceback.extract_stack()
-                       if not any(reg.match(frame[0]) for reg in REGULAR_EXPS)]
-
-    final_call_stack = "".join(traceback.format_list(temp_call_stack))
+    sample_rate = getattr(settings, 'CALL_STACK_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+    if sample_rate < 1 and random.random() >= sample_rate:
+        return
 
     def _should_get_logged(entity_name):  # pylint: disable=
-        """ Checks if current call stack of current entity should be logged or not.
+        """ Checks if call stacks of current entity should be captured or not.
 
         Arguments:
             entity_name - Name of the current entity
         Returns:
-            True if the current call stack is to logged, False otherwise
+            True if the current call stack is to be captured, False otherwise
         """
         is_class_in_halt_tracking = bool(HALT_TRACKING and inspect.isclass(entity_name) and
                                          issubclass(entity_name, tuple(HALT_TRACKING[-1])))
@@ -98,29 +173,69 @@ def capture_call_stack(entity_name):
                                                 for x in tuple(HALT_TRACKING[-1])))
 
         is_top_none = HALT_TRACKING and HALT_TRACKING[-1] is None
-        # if top of STACK_BOOK is None
+        # if top of HALT_TRACKING is None
         if is_top_none:
             return False
-        # if call stack is empty
-        if not temp_call_stack:
-            return False
 
-        if HALT_TRACKING:
-            if is_class_in_halt_tracking or is_function_in_halt_tracking:
-                return False
-            else:
-                return temp_call_stack not in STACK_BOOK[entity_name]
-        else:
-            return temp_call_stack not in STACK_BOOK[entity_name]
+        return not (is_class_in_halt_tracking or is_function_in_halt_tracking)
+
+    if not _should_get_logged(entity_name):
+        return
+
+    frame = sys._getframe(1)  # pylint: disable=protected-access
+    fingerprint = (entity_name, _fingerprint(frame))
+    record = FINGERPRINTS.get(fingerprint)
+    if record is None:
+        # Holds temporary callstack
+        # Tuple with each element 4-tuple(filename, line number, function name, text)
+        # and filtered with respect to regular expressions
+        temp_call_stack = tuple(frame_info for frame_info in traceback.extract_stack(frame)
+                                if not any(reg.match(frame_info[0]) for reg in REGULAR_EXPS))
+        record = STACK_BOOK.get((entity_name, temp_call_stack))
+        if record is None:
+            record = StackRecord(entity_name, temp_call_stack)
+            # if call stack is empty, it is counted but never logged or reported
+            if temp_call_stack:
+                STACK_BOOK.add((entity_name, temp_call_stack), record)
+                _log_new_call_stack(record)
+        FINGERPRINTS.add(fingerprint, record)
+    record.count += 1
+
+
+def _log_new_call_stack(record):
+    """ Logs a call stack that has not been seen before """
+    entity_name = record.entity_name
+    number = sum(1 for other in STACK_BOOK.records() if other.entity_name is entity_name)
+    final_call_stack = "".join(traceback.format_list(record.call_stack))
+    if inspect.isclass(entity_name):
+        log.info("Logging new call stack number %s for %s:\n %s", number,
+                 entity_name, final_call_stack)
+    else:
+        log.info("Logging new call stack number %s for %s.%s:\n %s", number,
+                 entity_name.__module__, entity_name.__name__, final_call_stack)
+
+
+def _entity_label(entity_name):
+    """ Returns the dotted name of a tracked class or function """
+    return u"{}.{}".format(entity_name.__module__, entity_name.__name__)
+
+
+def call_stack_report():
+    """ Returns the call stacks in STACK_BOOK of this process, most sampled first
 
-    if _should_get_logged(entity_name):
-        STACK_BOOK[entity_name].append(temp_call_stack)
-        if inspect.isclass(entity_name):
-            log.info("Logging new call stack number %s for %s:\n %s", len(STACK_BOOK[entity_name]),
-                     entity_name, final_call_stack)
-        else:
-            log.info("Logging new call stack number %s for %s.%s:\n %s", len(STACK_BOOK[entity_name]),
-                     entity_name.__module__, entity_name.__name__, final_call_stack)
+    Returns:
+        ListOf<dict> with keys 'entity', 'count' and 'call_stack', where call_stack
+        is the formatted stack.
+    """
+    records = sorted(STACK_BOOK.records(), key=lambda record: record.count, reverse=True)
+    return [
+        {
+            'entity': _entity_label(record.entity_name),
+            'count': record.count,
+            'call_stack': "".join(traceback.format_list(record.call_stack)),
+        }
+        for record in records
+    ]
 
 
 class CallStackMixin(object):
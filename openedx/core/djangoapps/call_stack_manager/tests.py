@@ -1,12 +1,14 @@
 """
 Test cases for Call Stack Manager
 """
-import collections
 from mock import patch
 from django.db import models
 from django.test import TestCase
+from django.test.utils import override_settings
 
-from openedx.core.djangoapps.call_stack_manager import donottrack, CallStackManager, CallStackMixin, trackit
+from openedx.core.djangoapps.call_stack_manager import (
+    donottrack, CallStackManager, CallStackMixin, trackit, call_stack_report
+)
 from openedx.core.djangoapps.call_stack_manager import core
 
 
@@ -146,7 +148,8 @@ class TestingCallStackManager(TestCase):
     """
     def setUp(self):
         core.TRACK_FLAG = True
-        core.STACK_BOOK = collections.defaultdict(list)
+        core.STACK_BOOK = core.StackBook()
+        core.FINGERPRINTS = core.StackBook()
         core.HALT_TRACKING = []
         super(TestingCallStackManager, self).setUp()
 
@@ -304,3 +307,35 @@ class TestingCallStackManager(TestCase):
         temp = donottrack_function()
         self.assertEqual(temp, 42)
         self.assertEqual(len(log_capt.call_args_list), 0)
+
+    def test_counts_duplicates(self, log_capt):
+        """ Test that repeated call stacks are counted and reported once """
+        for __ in range(4):
+            ModelMixinCallStckMngr(id_field=1).save()
+        ModelMixin(id_field=1).save()
+        report = call_stack_report()
+        self.assertEqual(len(log_capt.call_args_list), 2)
+        self.assertEqual([entry['count'] for entry in report], [4, 1])
+        self.assertEqual(report[0]['entity'], u'{}.ModelMixinCallStckMngr'.format(__name__))
+        self.assertIn('test_counts_duplicates', report[0]['call_stack'])
+
+    @override_settings(CALL_STACK_SAMPLE_RATE=0.5)
+    @patch('openedx.core.djangoapps.call_stack_manager.core.random.random')
+    def test_sampling(self, mock_random, log_capt):
+        """ Test that calls outside the sample rate are not captured """
+        mock_random.return_value = 0.75
+        ModelMixin(id_field=1).save()
+        self.assertEqual(len(log_capt.call_args_list), 0)
+        mock_random.return_value = 0.25
+        ModelMixin(id_field=1).save()
+        self.assertEqual(len(log_capt.call_args_list), 1)
+
+    @override_settings(CALL_STACK_BOOK_SIZE=2)
+    def test_bounded_stack_book(self, log_capt):
+        """ Test that only the most recently seen call stacks are kept """
+        ModelMixin(id_field=1).save()
+        ModelMixin(id_field=2).save()
+        ModelMixin(id_field=3).save()
+        self.assertEqual(len(log_capt.call_args_list), 3)
+        self.assertEqual(len(core.STACK_BOOK), 2)
+        self.assertEqual(len(call_stack_report()), 2)
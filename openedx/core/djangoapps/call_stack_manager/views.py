@@ -0,0 +1,21 @@
+"""
+Views for reporting the call stacks captured by the call stack manager.
+"""
+import json
+
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse
+
+from .core import call_stack_report
+
+
+@login_required
+def call_stacks(request):
+    """
+    Returns the call stacks sampled by this process, most sampled first, as JSON.
+
+    Only available to staff.
+    """
+    if not request.user.is_staff:
+        raise Http404
+    return HttpResponse(json.dumps(call_stack_report(), indent=4), mimetype="application/json")
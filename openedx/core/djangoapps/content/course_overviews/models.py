@@ -2,14 +2,22 @@
 Declaration of CourseOverview model
 """
 
+from datetime import datetime
 import json
-
-from django.db.models.fields import BooleanField, DateTimeField, DecimalField, TextField, FloatField, IntegerField
+from time import time
+
+import dateutil.parser
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.fields import (
+    BooleanField, CharField, DateTimeField, DecimalField, TextField, FloatField, IntegerField
+)
 from django.db.utils import IntegrityError
 from django.utils.translation import ugettext
 from model_utils.models import TimeStampedModel
 
 from opaque_keys.edx.keys import CourseKey
+from pytz import UTC
 from util.date_utils import strftime_localized
 from xmodule import course_metadata_utils
 from xmodule.course_module import CourseDescriptor
@@ -30,7 +38,14 @@ class CourseOverview(TimeStampedModel):
     """
 
     # IMPORTANT: Bump this whenever you modify this model and/or add a migration.
-    VERSION = 1
+    VERSION = 2
+
+    # The orderings supported by get_catalog_courses.
+    CATALOG_ORDERINGS = ('number', 'start', 'announcement')
+
+    # The cache key of the version of the catalog, which is incremented whenever
+    # a course overview is created or deleted.
+    CATALOG_VERSION_CACHE_KEY = 'course_overviews.catalog_version'
 
     # Cache entry versioning.
     version = IntegerField()
@@ -38,6 +53,8 @@ class CourseOverview(TimeStampedModel):
     # Course identification
     id = CourseKeyField(db_index=True, primary_key=True, max_length=255)  # pylint: disable=invalid-name
     _location = UsageKeyField(max_length=255)
+    org = CharField(max_length=255, db_index=True)
+    course_number = CharField(max_length=255)
     display_name = TextField(null=True)
     display_number_with_default = TextField()
     display_org_with_default = TextField()
@@ -46,6 +63,9 @@ class CourseOverview(TimeStampedModel):
     start = DateTimeField(null=True)
     end = DateTimeField(null=True)
     advertised_start = TextField(null=True)
+    announcement = DateTimeField(null=True)
+    # The advertised start, if it is a date, or else the start. Used to order the catalog.
+    catalog_start = DateTimeField(null=True)
 
     # URLs
     course_image_url = TextField()
@@ -68,6 +88,8 @@ class CourseOverview(TimeStampedModel):
     days_early_for_beta = FloatField(null=True)
     mobile_available = BooleanField()
     visible_to_staff_only = BooleanField()
+    catalog_visibility = TextField(null=True)
+    ispublic = BooleanField(default=False)
     _pre_requisite_courses_json = TextField()  # JSON representation of list of CourseKey strings
 
     # Enrollment details
@@ -114,10 +136,19 @@ class CourseOverview(TimeStampedModel):
             start = ccx.start
             end = ccx.due
 
+        try:
+            catalog_start = dateutil.parser.parse(course.advertised_start)
+            if catalog_start.tzinfo is None:
+                catalog_start = catalog_start.replace(tzinfo=UTC)
+        except (ValueError, AttributeError):
+            catalog_start = start
+
         return cls(
             version=cls.VERSION,
             id=course.id,
             _location=course.location,
+            org=course.location.org,
+            course_number=course.location.course,
             display_name=display_name,
             display_number_with_default=course.display_number_with_default,
             display_org_with_default=course.display_org_with_default,
@@ -125,6 +156,8 @@ class CourseOverview(TimeStampedModel):
             start=start,
             end=end,
             advertised_start=course.advertised_start,
+            announcement=course.announcement,
+            catalog_start=catalog_start,
 
             course_image_url=course_image_url(course),
             facebook_url=course.facebook_url,
@@ -142,6 +175,8 @@ class CourseOverview(TimeStampedModel):
             days_early_for_beta=course.days_early_for_beta,
             mobile_available=course.mobile_available,
             visible_to_staff_only=course.visible_to_staff_only,
+            catalog_visibility=course.catalog_visibility,
+            ispublic=bool(course.ispublic),
             _pre_requisite_courses_json=json.dumps(course.pre_requisite_courses),
 
             enrollment_start=course.enrollment_start,
@@ -186,6 +221,7 @@ class CourseOverview(TimeStampedModel):
                     # to save a duplicate.
                     # (see: https://openedx.atlassian.net/browse/TNL-2854).
                     pass
+                cls.invalidate_catalog()
                 return course_overview
             elif course is not None:
                 raise IOError(
@@ -358,3 +394,80 @@ class CourseOverview(TimeStampedModel):
             CourseKey.from_string(course_overview['id'])
             for course_overview in CourseOverview.objects.values('id')
         ]
+
+    @classmethod
+    def get_catalog_courses(cls, org=None, excluded_orgs=None, course_keys=None, order='number'):
+        """
+        Return a queryset of the course overviews of courses (but not CCXs), filtered and
+        ordered in the database.
+
+        Arguments:
+            org (str): Only include courses in this org.
+            excluded_orgs (iterable): Exclude courses in these orgs.
+            course_keys (iterable): Only include these courses.
+            order (str): One of CATALOG_ORDERINGS:
+                'number': by course number.
+                'start': courses that haven't ended first, then by start date, earliest first.
+                'announcement': announced courses first, most recently announced first, then
+                    the rest by (advertised) start date, latest first.
+                Ties are ordered by course number.
+        """
+        if order not in cls.CATALOG_ORDERINGS:
+            raise ValueError(u"Unknown catalog ordering: '{}'".format(order))
+
+        quote = connection.ops.quote_name
+        # CCXs have overviews, but aren't listed in the catalog.
+        queryset = cls.objects.extra(
+            where=['{} NOT LIKE %s'.format(quote('id'))],
+            params=['{}:%'.format(CCXLocator.CANONICAL_NAMESPACE)],
+        )
+        if org is not None:
+            queryset = queryset.filter(org=org)
+        if excluded_orgs:
+            queryset = queryset.exclude(org__in=list(excluded_orgs))
+        if course_keys is not None:
+            queryset = queryset.filter(id__in=list(course_keys))
+
+        if order == 'start':
+            # Mirrors ordering by (has_ended(), start is None, start).
+            queryset = queryset.extra(
+                select={
+                    'catalog_has_ended': '{end} IS NOT NULL AND {end} < %s'.format(end=quote('end')),
+                    'catalog_start_is_null': '{} IS NULL'.format(quote('start')),
+                },
+                select_params=(datetime.now(UTC),),
+                order_by=['catalog_has_ended', 'catalog_start_is_null', 'start', 'course_number', 'id'],
+            )
+        elif order == 'announcement':
+            # Mirrors ordering by CourseDescriptor.sorting_score.
+            queryset = queryset.extra(
+                select={'catalog_unannounced': '{} IS NULL'.format(quote('announcement'))},
+                order_by=['catalog_unannounced', '-announcement', '-catalog_start', 'course_number', 'id'],
+            )
+        else:
+            queryset = queryset.order_by('course_number', 'id')
+        return queryset
+
+    @classmethod
+    def get_catalog_version(cls):
+        """
+        Return the current version of the catalog, for use in the keys of cached catalog data.
+        """
+        version = cache.get(cls.CATALOG_VERSION_CACHE_KEY)
+        if version is None:
+            # Start from the current time, so that data cached under an evicted version isn't reused.
+            version = int(time())
+            if not cache.add(cls.CATALOG_VERSION_CACHE_KEY, version):
+                version = cache.get(cls.CATALOG_VERSION_CACHE_KEY, version)
+        return version
+
+    @classmethod
+    def invalidate_catalog(cls):
+        """
+        Increment the version of the catalog, so that cached catalog data is no longer used.
+        """
+        try:
+            cache.incr(cls.CATALOG_VERSION_CACHE_KEY)
+        except ValueError:
+            # The version isn't cached, so no cached catalog data will be used.
+            pass
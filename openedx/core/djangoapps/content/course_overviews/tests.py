@@ -94,6 +94,9 @@ class CourseOverviewTestCase(ModuleStoreTestCase):
             'enrollment_domain',
             'invitation_only',
             'max_student_enrollments_allowed',
+            'org',
+            'announcement',
+            'catalog_visibility',
         ]
         for attribute_name in fields_to_test:
             course_value = getattr(course, attribute_name)